@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+Gunicorn configuration (loaded automatically from the working directory).
+
+Enables Prometheus multiprocess mode so /metrics aggregates every worker:
+PROMETHEUS_MULTIPROC_DIR must be in the environment before prometheus_client
+is imported, so it is set here in the master, ahead of the app import. Set
+BRIKK_METRICS_MULTIPROCESS=false to keep per-worker registries.
+"""
+import os
+import tempfile
+
+if os.environ.get("BRIKK_METRICS_MULTIPROCESS", "true").lower() == "true":
+    os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR",
+        os.path.join(tempfile.gettempdir(), "brikk-prometheus-multiproc"))
+
+
+def on_starting(server):
+    """Start from an empty metrics directory; old files would be re-counted."""
+    from src.services.metrics import multiprocess_dir, prepare_multiprocess_dir
+
+    path = multiprocess_dir()
+    if path:
+        prepare_multiprocess_dir(path)
+
+
+def child_exit(server, worker):
+    """Drop the exited worker's live gauges; its counters remain in the totals."""
+    from src.services.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
@@ -0,0 +1,76 @@
+"""Add indexed key_digest to api_keys
+
+Revision ID: api_key_digest_001
+Revises: rules_dashboard_001
+Create Date: 2026-10-16 09:00:00.000000
+
+Adds api_keys.key_digest (HMAC-SHA256 of the secret under a server pepper)
+with a unique index so authentication is a single indexed lookup instead of
+decrypting every active key. Existing rows are backfilled by decrypting their
+Fernet-encrypted secret; rows that cannot be decrypted here are backfilled
+lazily on their first successful authentication.
+"""
+import hashlib
+import hmac
+import os
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = 'api_key_digest_001'
+down_revision = 'rules_dashboard_001'
+branch_labels = None
+depends_on = None
+
+
+def column_exists(table_name, column_name):
+    """Check if a column exists in a table."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    columns = [col['name'] for col in inspector.get_columns(table_name)]
+    return column_name in columns
+
+
+def backfill_digests(bind):
+    """Populate key_digest for rows that don't have one yet."""
+    encryption_key = os.environ.get("BRIKK_ENCRYPTION_KEY")
+    pepper = os.environ.get("BRIKK_API_KEY_PEPPER") or encryption_key
+    if not encryption_key or not pepper:
+        print("Skipping key_digest backfill: BRIKK_ENCRYPTION_KEY not set (rows backfill lazily).")
+        return
+
+    from cryptography.fernet import Fernet
+    fernet = Fernet(encryption_key.encode())
+
+    rows = bind.execute(sa.text(
+        "SELECT id, api_key_encrypted FROM api_keys WHERE key_digest IS NULL"
+    )).fetchall()
+    updated = 0
+    for row_id, encrypted in rows:
+        try:
+            secret = fernet.decrypt(encrypted.encode()).decode()
+        except Exception:
+            continue
+        digest = hmac.new(pepper.encode(), secret.encode(), hashlib.sha256).hexdigest()
+        bind.execute(
+            sa.text("UPDATE api_keys SET key_digest = :digest WHERE id = :id"),
+            {"digest": digest, "id": row_id},
+        )
+        updated += 1
+    print(f"Backfilled key_digest for {updated}/{len(rows)} api_keys rows")
+
+
+def upgrade():
+    if not column_exists('api_keys', 'key_digest'):
+        op.add_column('api_keys', sa.Column('key_digest', sa.String(length=64), nullable=True))
+        op.create_index(op.f('ix_api_keys_key_digest'), 'api_keys', ['key_digest'], unique=True)
+
+    backfill_digests(op.get_bind())
+
+
+def downgrade():
+    op.drop_index(op.f('ix_api_keys_key_digest'), table_name='api_keys')
+    op.drop_column('api_keys', 'key_digest')
@@ -0,0 +1,63 @@
+"""Add full-text search vector to marketplace_listings
+
+Revision ID: marketplace_search_001
+Revises: api_key_digest_001
+Create Date: 2026-10-16 12:00:00.000000
+
+Adds marketplace_listings.search_vector (tsvector) with a GIN index and
+backfills it, for the postgres search backend in
+src/services/search_index.py. The column is maintained by the application
+on listing/agent writes. PostgreSQL only; other databases use the sqlite_fts
+or memory backends, which build their own index.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'marketplace_search_001'
+down_revision = 'api_key_digest_001'
+branch_labels = None
+depends_on = None
+
+
+def column_exists(table_name, column_name):
+    """Check if a column exists in a table."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    columns = [col['name'] for col in inspector.get_columns(table_name)]
+    return column_name in columns
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        print("Skipping marketplace search_vector: not PostgreSQL.")
+        return
+
+    if not column_exists('marketplace_listings', 'search_vector'):
+        op.add_column('marketplace_listings', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+        op.create_index(
+            'ix_marketplace_listings_search_vector', 'marketplace_listings', ['search_vector'],
+            postgresql_using='gin')
+
+    # Same weighting as PostgresSearchBackend: name A, summary/tags B, descriptions C
+    op.execute(sa.text(
+        "UPDATE marketplace_listings AS ml SET search_vector = "
+        "setweight(to_tsvector('english', coalesce(a.name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(ml.short_description, '') || ' ' "
+        "|| coalesce(ml.tags, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(ml.long_description, '') || ' ' "
+        "|| coalesce(a.description, '')), 'C') "
+        "FROM agents AS a WHERE a.id = ml.agent_id"
+    ))
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_marketplace_listings_search_vector', table_name='marketplace_listings')
+    op.drop_column('marketplace_listings', 'search_vector')
@@ -0,0 +1,55 @@
+"""Add rating_sum to agent_rating_summary
+
+Revision ID: rating_summary_incremental_001
+Revises: marketplace_search_001
+Create Date: 2026-10-16 14:00:00.000000
+
+Adds agent_rating_summary.rating_sum so review writes can update the summary
+with relative increments (count + 1, sum + rating) instead of recounting
+every review. Existing summaries are recounted from agent_reviews with one
+GROUP BY.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = 'rating_summary_incremental_001'
+down_revision = 'marketplace_search_001'
+branch_labels = None
+depends_on = None
+
+
+def column_exists(table_name, column_name):
+    """Check if a column exists in a table."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    columns = [col['name'] for col in inspector.get_columns(table_name)]
+    return column_name in columns
+
+
+def upgrade():
+    if not column_exists('agent_rating_summary', 'rating_sum'):
+        op.add_column('agent_rating_summary',
+                      sa.Column('rating_sum', sa.Integer(), nullable=False, server_default='0'))
+
+    op.execute(sa.text(
+        "UPDATE agent_rating_summary SET "
+        "total_reviews = r.total, rating_sum = r.rating_sum, "
+        "rating_1_count = r.c1, rating_2_count = r.c2, rating_3_count = r.c3, "
+        "rating_4_count = r.c4, rating_5_count = r.c5, "
+        "average_rating = r.rating_sum * 1.0 / r.total "
+        "FROM (SELECT agent_id, COUNT(*) AS total, SUM(rating) AS rating_sum, "
+        "SUM(CASE WHEN rating = 1 THEN 1 ELSE 0 END) AS c1, "
+        "SUM(CASE WHEN rating = 2 THEN 1 ELSE 0 END) AS c2, "
+        "SUM(CASE WHEN rating = 3 THEN 1 ELSE 0 END) AS c3, "
+        "SUM(CASE WHEN rating = 4 THEN 1 ELSE 0 END) AS c4, "
+        "SUM(CASE WHEN rating = 5 THEN 1 ELSE 0 END) AS c5 "
+        "FROM agent_reviews GROUP BY agent_id) AS r "
+        "WHERE agent_rating_summary.agent_id = r.agent_id"
+    ))
+
+
+def downgrade():
+    op.drop_column('agent_rating_summary', 'rating_sum')
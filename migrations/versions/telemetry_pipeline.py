@@ -0,0 +1,82 @@
+"""Add telemetry_events and telemetry_rollups_minute
+
+Revision ID: telemetry_pipeline_001
+Revises: trending_rank_001
+Create Date: 2026-10-16 17:00:00.000000
+
+Storage for the SDK telemetry ingestion pipeline
+(src/services/telemetry_pipeline.py): raw events, written in batches, and
+per-minute rollups with a cumulative latency histogram, merged with
+additive upserts on (bucket_start, sdk_language, sdk_version, event_type).
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = 'telemetry_pipeline_001'
+down_revision = 'trending_rank_001'
+branch_labels = None
+depends_on = None
+
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def table_exists(table_name):
+    """Check if a table exists."""
+    bind = op.get_bind()
+    return inspect(bind).has_table(table_name)
+
+
+def upgrade():
+    if not table_exists('telemetry_events'):
+        op.create_table(
+            'telemetry_events',
+            sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'),
+                      primary_key=True, autoincrement=True),
+            sa.Column('occurred_at', sa.DateTime(), nullable=False),
+            sa.Column('received_at', sa.DateTime(), nullable=False),
+            sa.Column('event_type', sa.String(50), nullable=False),
+            sa.Column('sdk_name', sa.String(100), nullable=True),
+            sa.Column('sdk_version', sa.String(50), nullable=False),
+            sa.Column('sdk_language', sa.String(50), nullable=False),
+            sa.Column('platform', sa.String(50), nullable=True),
+            sa.Column('endpoint', sa.String(255), nullable=True),
+            sa.Column('method', sa.String(10), nullable=True),
+            sa.Column('status_code', sa.Integer(), nullable=True),
+            sa.Column('duration_ms', sa.Float(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('sample_rate', sa.Float(), nullable=False, server_default='1'),
+            sa.Column('event_metadata', sa.Text(), nullable=True),
+        )
+        op.create_index('ix_telemetry_events_occurred_at', 'telemetry_events', ['occurred_at'])
+        op.create_index('ix_telemetry_events_type_version', 'telemetry_events',
+                        ['event_type', 'sdk_version'])
+
+    if not table_exists('telemetry_rollups_minute'):
+        op.create_table(
+            'telemetry_rollups_minute',
+            sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'),
+                      primary_key=True, autoincrement=True),
+            sa.Column('bucket_start', sa.DateTime(), nullable=False),
+            sa.Column('sdk_language', sa.String(50), nullable=False),
+            sa.Column('sdk_version', sa.String(50), nullable=False),
+            sa.Column('event_type', sa.String(50), nullable=False),
+            sa.Column('event_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('error_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('duration_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('duration_sum_ms', sa.Float(), nullable=False, server_default='0'),
+            *[sa.Column(f'latency_le_{bound}ms', sa.Integer(), nullable=False, server_default='0')
+              for bound in LATENCY_BUCKETS_MS],
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.UniqueConstraint('bucket_start', 'sdk_language', 'sdk_version', 'event_type',
+                                name='uq_telemetry_rollup_minute'),
+        )
+
+
+def downgrade():
+    op.drop_table('telemetry_rollups_minute')
+    op.drop_index('ix_telemetry_events_type_version', table_name='telemetry_events')
+    op.drop_index('ix_telemetry_events_occurred_at', table_name='telemetry_events')
+    op.drop_table('telemetry_events')
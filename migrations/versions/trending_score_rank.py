@@ -0,0 +1,47 @@
+"""Add rank to agent_trending_scores
+
+Revision ID: trending_rank_001
+Revises: rating_summary_incremental_001
+Create Date: 2026-10-16 15:00:00.000000
+
+Adds agent_trending_scores.rank (1 = highest trending_score), assigned by
+the batch trending job in src/services/trending_scores.py. Existing rows are
+ranked once here; the next job run keeps them current.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = 'trending_rank_001'
+down_revision = 'rating_summary_incremental_001'
+branch_labels = None
+depends_on = None
+
+
+def column_exists(table_name, column_name):
+    """Check if a column exists in a table."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    columns = [col['name'] for col in inspector.get_columns(table_name)]
+    return column_name in columns
+
+
+def upgrade():
+    if not column_exists('agent_trending_scores', 'rank'):
+        op.add_column('agent_trending_scores', sa.Column('rank', sa.Integer(), nullable=True))
+        op.create_index('ix_agent_trending_scores_rank', 'agent_trending_scores', ['rank'])
+
+    op.execute(sa.text(
+        "UPDATE agent_trending_scores SET rank = r.position "
+        "FROM (SELECT agent_id, ROW_NUMBER() OVER "
+        "(ORDER BY trending_score DESC, agent_id) AS position "
+        "FROM agent_trending_scores) AS r "
+        "WHERE agent_trending_scores.agent_id = r.agent_id"
+    ))
+
+
+def downgrade():
+    op.drop_index('ix_agent_trending_scores_rank', table_name='agent_trending_scores')
+    op.drop_column('agent_trending_scores', 'rank')
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark usage event ingestion throughput through the Flask test client (sqlite).
+
+Sends the same number of events one per request to POST /events and in
+batches of 1, 100 and 1000 to POST /events/batch (JSON and NDJSON), and
+reports events/sec for each.
+
+Usage:
+    python scripts/benchmarks/bench_analytics_ingest.py [--events 5000] [--sizes 1,100,1000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("FEATURE_FLAG_AGENT_ANALYTICS", "true")
+
+from flask import Flask  # noqa: E402
+
+import src.models  # noqa: E402,F401
+from src.database import db  # noqa: E402
+from src.models.agent import Agent  # noqa: E402
+from src.models.analytics import AgentUsageEvent  # noqa: E402
+from src.models.marketplace import AgentInstallation  # noqa: E402
+from src.routes.analytics import analytics_bp  # noqa: E402
+from src.utils.feature_flags import init_feature_flags  # noqa: E402
+
+TABLES = [Agent.__table__, AgentUsageEvent.__table__, AgentInstallation.__table__]
+HEADERS = {"X-User-ID": "bench-user"}
+
+
+def make_events(agent_ids, n):
+    return [{"agent_id": agent_ids[i % len(agent_ids)], "event_type": "invocation",
+             "duration_ms": 20 + i % 300, "success": i % 17 != 0, "metadata": {"sdk": "bench"}}
+            for i in range(n)]
+
+
+def single(client, events):
+    for event in events:
+        assert client.post("/api/v1/analytics/events", json=event, headers=HEADERS).status_code == 201
+
+
+def batched(client, events, size, ndjson=False):
+    for start in range(0, len(events), size):
+        chunk = events[start:start + size]
+        if ndjson:
+            response = client.post("/api/v1/analytics/events/batch", headers=HEADERS,
+                                   data="\n".join(json.dumps(e) for e in chunk),
+                                   content_type="application/x-ndjson")
+        else:
+            response = client.post("/api/v1/analytics/events/batch", json=chunk, headers=HEADERS)
+        assert response.status_code == 201, response.get_json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--sizes", default="1,100,1000")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    init_feature_flags()
+    fd, path = tempfile.mkstemp(suffix=".db")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    app.register_blueprint(analytics_bp)
+    try:
+        with app.app_context():
+            db.metadata.create_all(bind=db.engine, tables=TABLES)
+            agents = [Agent(name=f"Agent {i}", language="en", organization_id="org-bench") for i in range(20)]
+            db.session.add_all(agents)
+            db.session.commit()
+            agent_ids = [a.id for a in agents]
+            db.session.add_all(AgentInstallation(agent_id=a, user_id="bench-user") for a in agent_ids)
+            db.session.commit()
+            events = make_events(agent_ids, args.events)
+            client = app.test_client()
+
+            runs = [("POST /events", lambda: single(client, events))]
+            for size in sizes:
+                runs.append((f"batch {size}", lambda size=size: batched(client, events, size)))
+                runs.append((f"batch {size} ndjson", lambda size=size: batched(client, events, size, True)))
+
+            print(f"{'mode':>18} | {'seconds':>8} | {'events/s':>10}")
+            print("-" * 42)
+            for name, run in runs:
+                start = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - start
+                print(f"{name:>18} | {elapsed:>8.2f} | {args.events / elapsed:>10,.0f}")
+            db.session.remove()
+    finally:
+        os.close(fd)
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark ApiKey.authenticate_api_key at different key-table sizes (sqlite).
+
+Compares the legacy decrypt-every-key scan against the indexed digest lookup,
+with and without the verified-key cache.
+
+Usage:
+    python scripts/benchmarks/bench_api_key_auth.py [--sizes 10,1000,100000] [--iterations 200]
+"""
+import argparse
+import os
+import secrets
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from cryptography.fernet import Fernet  # noqa: E402
+
+os.environ.setdefault("BRIKK_ENCRYPTION_KEY", Fernet.generate_key().decode())
+
+from flask import Flask  # noqa: E402
+
+import src.models  # noqa: E402,F401
+from src.database import db  # noqa: E402
+from src.models.api_key import ApiKey, compute_key_digest, get_fernet, verified_key_cache  # noqa: E402
+
+
+def legacy_authenticate(provided_api_key):
+    """The pre-digest implementation: decrypt every active key."""
+    for record in ApiKey.query.filter_by(is_active=True).all():
+        try:
+            if secrets.compare_digest(provided_api_key, record.decrypt_secret()) and record.is_valid():
+                return record
+        except Exception:
+            continue
+    return None
+
+
+def seed(n):
+    fernet = get_fernet()
+    rows, target = [], None
+    for i in range(n):
+        secret = f"brikk_{secrets.token_urlsafe(32)}"
+        rows.append({
+            "key_id": f"bk_{i:012d}",
+            "key_prefix": f"bk_{i:012d}"[:16],
+            "api_key_encrypted": fernet.encrypt(secret.encode()).decode(),
+            "key_digest": compute_key_digest(secret),
+            "name": f"bench-{i}",
+            "is_active": True,
+            "total_requests": 0,
+            "failed_requests": 0,
+            "requests_per_minute": 100,
+            "requests_per_hour": 1000,
+            "tier": "free",
+        })
+        if i == n // 2:
+            target = secret
+    db.session.execute(ApiKey.__table__.insert(), rows)
+    db.session.commit()
+    return target
+
+
+def measure(fn, secret, iterations):
+    samples = []
+    for _ in range(iterations):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        assert fn(secret) is not None
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return statistics.mean(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10,1000,100000")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--legacy-iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'keys':>8} | {'legacy scan us':>16} | {'digest us':>12} | {'cached us':>12} | speedup")
+    print("-" * 72)
+    for size in (int(s) for s in args.sizes.split(",")):
+        fd, path = tempfile.mkstemp(suffix=".db")
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+        with app.app_context():
+            db.metadata.create_all(bind=db.engine, tables=[ApiKey.__table__])
+            secret = seed(size)
+
+            legacy_mean, _ = measure(legacy_authenticate, secret, args.legacy_iterations)
+
+            verified_key_cache.max_size = 0  # disable cache for the uncached run
+            digest_mean, digest_p95 = measure(ApiKey.authenticate_api_key, secret, args.iterations)
+
+            verified_key_cache.max_size = 10000
+            verified_key_cache.clear()
+            cached_mean, cached_p95 = measure(ApiKey.authenticate_api_key, secret, args.iterations)
+
+            print(f"{size:>8} | {legacy_mean:>16.1f} | {digest_mean:>12.1f} | {cached_mean:>12.1f} | "
+                  f"{legacy_mean / digest_mean:>6.0f}x")
+            db.session.remove()
+        os.close(fd)
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
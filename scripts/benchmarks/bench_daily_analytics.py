@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark daily analytics aggregation at different event volumes (sqlite).
+
+Compares the previous load-everything implementation (ORM rows grouped and
+sorted in Python) against SQL GROUP BY + streamed percentile sketches, and
+reports wall time and peak Python memory for each.
+
+Usage:
+    python scripts/benchmarks/bench_daily_analytics.py [--sizes 10000,100000,1000000] [--agents 200]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from flask import Flask  # noqa: E402
+
+import src.models  # noqa: E402,F401
+from src.database import db  # noqa: E402
+from src.models.analytics import AgentUsageEvent, AgentAnalyticsDaily, UserAnalyticsDaily  # noqa: E402
+from src.services.analytics_aggregation import DailyAnalyticsAggregator  # noqa: E402
+
+DAY = date(2026, 3, 14)
+TABLES = [AgentUsageEvent.__table__, AgentAnalyticsDaily.__table__, UserAnalyticsDaily.__table__]
+
+
+def seed(n, agents, batch=100_000):
+    rng = random.Random(42)
+    start = datetime.combine(DAY, datetime.min.time())
+    for offset in range(0, n, batch):
+        db.session.execute(AgentUsageEvent.__table__.insert(), [{
+            "id": str(uuid.uuid4()),
+            "agent_id": f"agent-{rng.randrange(agents)}",
+            "user_id": f"user-{rng.randrange(agents * 20)}",
+            "event_type": "invocation",
+            "duration_ms": int(rng.lognormvariate(5, 1.2)),
+            "success": rng.random() < 0.95,
+            "created_at": start + timedelta(seconds=rng.randrange(86400)),
+        } for _ in range(min(batch, n - offset))])
+        db.session.commit()
+
+
+def legacy_aggregate():
+    """The previous implementation's read/group/sort path (without the row-by-row upsert)."""
+    start = datetime.combine(DAY, datetime.min.time())
+    events = AgentUsageEvent.query.filter(
+        AgentUsageEvent.created_at >= start,
+        AgentUsageEvent.created_at <= datetime.combine(DAY, datetime.max.time())).all()
+    by_agent = {}
+    for e in events:
+        by_agent.setdefault(e.agent_id, []).append(e)
+    results = {}
+    for agent_id, evs in by_agent.items():
+        durations = sorted(e.duration_ms for e in evs if e.duration_ms is not None)
+        results[agent_id] = (len(evs), durations[int(len(durations) * 0.99)])
+    return results
+
+
+def new_aggregate():
+    return DailyAnalyticsAggregator().agent_rows(DAY)
+
+
+def timed(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.expunge_all()
+    return elapsed, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--agents", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'events':>9} | {'legacy s':>9} | {'legacy MB':>9} | {'sql+sketch s':>12} | {'sql+sketch MB':>13}")
+    print("-" * 66)
+    for size in (int(s) for s in args.sizes.split(",")):
+        fd, path = tempfile.mkstemp(suffix=".db")
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+        with app.app_context():
+            db.metadata.create_all(bind=db.engine, tables=TABLES)
+            seed(size, args.agents)
+            legacy_s, legacy_mb = timed(legacy_aggregate)
+            new_s, new_mb = timed(new_aggregate)
+            print(f"{size:>9} | {legacy_s:>9.2f} | {legacy_mb:>9.1f} | {new_s:>12.2f} | {new_mb:>13.1f}")
+            db.session.remove()
+        os.close(fd)
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark memory and scrape cost of actor-labelled gateway metrics.
+
+Feeds --actors distinct actor_ids (each seen once) plus --heavy actors seen
+--heavy-hits times each, in random order, to brikk_rate_limit_remaining.
+Compares raw actor_id labels (one series per actor) with the cardinality
+guard (top-K series plus "other"). Reports traced memory held after
+recording, series count, scrape time and per-record cost. The unbounded run
+uses --unbounded-actors (a full million raw series needs ~750 MB) and its
+memory is also shown scaled linearly to --actors.
+
+Usage:
+    python scripts/benchmarks/bench_metrics_cardinality.py [--actors 1000000] [--unbounded-actors 100000]
+"""
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from prometheus_client import CollectorRegistry  # noqa: E402
+from prometheus_client.exposition import generate_latest  # noqa: E402
+
+from src.services.gateway_metrics import GatewayMetrics  # noqa: E402
+
+
+def make_stream(actors, heavy, heavy_hits, seed=7):
+    stream = [f"actor-{i}" for i in range(actors)]
+    stream += [f"heavy-{i}" for i in range(heavy) for _ in range(heavy_hits)]
+    random.Random(seed).shuffle(stream)
+    return stream
+
+
+def run(stream, guarded, top_k):
+    registry = CollectorRegistry()
+    gc.collect()
+    tracemalloc.start()
+    metrics = GatewayMetrics(registry, top_k=top_k)
+    start = time.perf_counter()
+    for i, actor in enumerate(stream):
+        if guarded:
+            metrics.record_rate_limit_remaining(actor_id=actor, tier="free", remaining=i % 100)
+        else:
+            metrics.rate_limit_remaining.labels(actor_id=actor, tier="free").set(i % 100)
+    record = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    series = generate_latest(registry).count(b"\nbrikk_rate_limit_remaining{")
+    scrape = time.perf_counter() - start
+    heavy = {s.labels["actor_id"] for m in metrics.rate_limit_remaining.collect() for s in m.samples
+             if s.labels["actor_id"].startswith("heavy-")}
+    return memory, series, scrape, record / len(stream), len(heavy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--actors", type=int, default=1_000_000)
+    parser.add_argument("--unbounded-actors", type=int, default=100_000)
+    parser.add_argument("--heavy", type=int, default=50)
+    parser.add_argument("--heavy-hits", type=int, default=2_000)
+    parser.add_argument("--top-k", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'labels':>9} | {'actors':>9} | {'memory MB':>9} | {'series':>7} | "
+          f"{'scrape ms':>9} | {'us/record':>9} | {'heavy kept':>10}")
+    print("-" * 80)
+    for name, actors, guarded in (("raw", args.unbounded_actors, False), ("guarded", args.actors, True)):
+        stream = make_stream(actors, args.heavy, args.heavy_hits)
+        memory, series, scrape, per_record, heavy = run(stream, guarded, args.top_k)
+        print(f"{name:>9} | {actors:>9,} | {memory / 1e6:>9.1f} | {series:>7,} | "
+              f"{scrape * 1e3:>9.1f} | {per_record * 1e6:>9.2f} | {heavy:>4}/{args.heavy:<5}")
+        if not guarded and actors < args.actors:
+            print(f"{'raw est.':>9} | {args.actors:>9,} | {memory / 1e6 * args.actors / actors:>9.1f} | "
+                  f"{args.actors + args.heavy:>7,} |")
+
+
+if __name__ == "__main__":
+    main()
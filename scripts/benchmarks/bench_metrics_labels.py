@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-request HTTP metrics overhead: route label resolution plus recording.
+
+Compares the previous labelling (uuid.UUID() attempted on every raw path
+segment) against route-template labels, for a matched route and for
+unmatched (404) paths, inside a pushed request context (the push itself is
+not timed). Also reports how many distinct route label values each approach
+produced.
+
+Usage:
+    python scripts/benchmarks/bench_metrics_labels.py [--requests 20000]
+"""
+import argparse
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from flask import Flask, request  # noqa: E402
+from prometheus_client import CollectorRegistry  # noqa: E402
+
+from src.services.metrics import MetricsService  # noqa: E402
+
+
+def legacy_normalize(route):
+    """Route normalisation as previously implemented."""
+    parts = route.split('/')
+    for i, part in enumerate(parts):
+        if part.isdigit():
+            parts[i] = '{id}'
+        try:
+            import uuid as uuid_module
+            uuid_module.UUID(part)
+            parts[i] = '{uuid}'
+        except (ValueError, AttributeError):
+            pass
+    return '/'.join(parts)
+
+
+def make_app():
+    app = Flask(__name__)
+
+    @app.route("/api/v1/agents/<agent_id>/runs/<run_id>")
+    def agent_run(agent_id, run_id):
+        return ""
+
+    return app
+
+
+def run(app, paths, record):
+    """Seconds spent in record() only; the request context push is not timed."""
+    elapsed = 0.0
+    for path in paths:
+        with app.test_request_context(path):
+            start = time.perf_counter()
+            record()
+            elapsed += time.perf_counter() - start
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    app = make_app()
+    cases = {
+        "matched": [f"/api/v1/agents/agent-{i % 500}/runs/{uuid.uuid4()}" for i in range(args.requests)],
+        "unmatched 404": [f"/wp/{i % 200}/{uuid.uuid4()}/x{i % 5000}" for i in range(args.requests)],
+    }
+
+    print(f"{'case':>14} | {'implementation':>14} | {'us/request':>10} | {'labels':>7}")
+    print("-" * 56)
+    for case, paths in cases.items():
+        for name in ("legacy", "route template"):
+            service = MetricsService(registry=CollectorRegistry())
+            if name == "legacy":
+                def record():
+                    route = legacy_normalize(request.path)
+                    service.http_requests_total.labels(route=route, method="GET", status=200).inc()
+                    service.http_request_duration_seconds.labels(route=route, method="GET").observe(0.01)
+            else:
+                def record():
+                    service.record_http_request(route=service.route_label(), method="GET",
+                                                status_code=200, duration_seconds=0.01)
+            elapsed = run(app, paths, record)
+            labels = {s.labels["route"] for m in service.http_requests_total.collect() for s in m.samples}
+            print(f"{case:>14} | {name:>14} | {elapsed / len(paths) * 1e6:>10.2f} | {len(labels):>7}")
+
+
+if __name__ == "__main__":
+    main()
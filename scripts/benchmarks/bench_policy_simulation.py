@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark policy simulation over synthetic usage events (sqlite).
+
+Compares the row-at-a-time ORM simulation (load every UsageEvent, evaluate
+conditions per event) against the streamed columnar engine, full and sampled.
+
+Usage:
+    python scripts/benchmarks/bench_policy_simulation.py [--events 1000000] [--sample-rate 0.05]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import numpy as np  # noqa: E402
+from flask import Flask  # noqa: E402
+
+import src.models  # noqa: E402,F401
+from src.database import db  # noqa: E402
+from src.models.api_key import ApiKey  # noqa: E402
+from src.models.usage_event import UsageEvent  # noqa: E402
+from src.services.policy_simulation import (  # noqa: E402
+    PROVIDER_COST_PER_1K_TOKENS, PROVIDER_LATENCY_MS, PolicySimulator, confidence_intervals
+)
+
+ORG_ID = 1
+PROVIDERS = np.array(["openai", "mistral", "anthropic", "google"], dtype=object)
+CONDITIONS = [
+    {"type": "latency", "operator": ">", "value": 1200},
+    {"type": "provider", "operator": "!=", "value": "google"},
+]
+ACTIONS = [{"type": "route", "provider": "anthropic"}]
+
+
+def request_id():
+    # Force a letter into the hex so sqlite's NUMERIC affinity can't read it as a float
+    return uuid.UUID(int=uuid.uuid4().int & ~0xF | 0xA)
+
+
+def seed(n, batch=100_000):
+    now = datetime.utcnow()
+    db.session.execute(ApiKey.__table__.insert(), [{
+        "id": 1, "key_id": "bk_bench", "key_prefix": "bk_bench", "organization_id": ORG_ID,
+        "name": "bench", "api_key_encrypted": "x", "is_active": True,
+        "total_requests": 0, "failed_requests": 0}])
+    rng = np.random.default_rng(42)
+    for start in range(0, n, batch):
+        size = min(batch, n - start)
+        providers = PROVIDERS[rng.integers(0, len(PROVIDERS), size)]
+        latency = rng.integers(50, 4000, size)
+        cost = rng.random(size) * 0.1
+        prompt = rng.integers(0, 4000, size)
+        completion = rng.integers(0, 1000, size)
+        age = rng.integers(0, 20 * 24 * 3600, size)
+        db.session.execute(UsageEvent.__table__.insert(), [{
+            "request_id": request_id(), "api_key_id": 1, "provider": providers[i], "model": "m",
+            "prompt_tokens": int(prompt[i]), "completion_tokens": int(completion[i]),
+            "cost_usd": float(cost[i]), "latency_ms": int(latency[i]), "fallback": False,
+            "created_at": now - timedelta(seconds=int(age[i])),
+        } for i in range(size)])
+        db.session.commit()
+
+
+def legacy_simulate(since):
+    """The pre-columnar implementation: ORM objects and a per-event loop."""
+    events = (UsageEvent.query.join(ApiKey, ApiKey.id == UsageEvent.api_key_id)
+              .filter(ApiKey.organization_id == ORG_ID, UsageEvent.created_at >= since).all())
+    provider = ACTIONS[0]["provider"]
+    matched, latency_delta, cost_delta = 0, 0.0, 0.0
+    for event in events:
+        if (event.latency_ms or 0) > 1200 and event.provider != "google":
+            matched += 1
+            latency_delta += PROVIDER_LATENCY_MS[provider] - (event.latency_ms or 0)
+            tokens = (event.prompt_tokens + event.completion_tokens) or 1000
+            cost_delta += tokens / 1000 * PROVIDER_COST_PER_1K_TOKENS[provider] - float(event.cost_usd or 0)
+    return len(events), matched, cost_delta
+
+
+def timed(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.expunge_all()
+    return result, elapsed, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--sample-rate", type=float, default=0.05)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.metadata.create_all(bind=db.engine, tables=[ApiKey.__table__, UsageEvent.__table__])
+        print(f"seeding {args.events:,} events...")
+        seed(args.events)
+        since = datetime.utcnow() - timedelta(days=30)
+        simulator = PolicySimulator(db.session, chunk_size=args.chunk_size)
+
+        print(f"{'mode':>10} | {'seconds':>8} | {'peak MB':>8} | {'analyzed':>9} | {'matched':>9} | cost change")
+        print("-" * 78)
+        if not args.skip_legacy:
+            (analyzed, matched, cost), secs, mb = timed(lambda: legacy_simulate(since))
+            print(f"{'legacy':>10} | {secs:>8.2f} | {mb:>8.1f} | {analyzed:>9} | {matched:>9} | {cost:.2f}")
+
+        totals, secs, mb = timed(lambda: simulator.run(
+            CONDITIONS, ACTIONS, simulator.iter_chunks(ORG_ID, since)))
+        cost = totals.cost_after - totals.cost_before
+        print(f"{'columnar':>10} | {secs:>8.2f} | {mb:>8.1f} | {totals.analyzed:>9} | "
+              f"{totals.matched:>9} | {cost:.2f}")
+
+        totals, secs, mb = timed(lambda: simulator.run(
+            CONDITIONS, ACTIONS, simulator.iter_chunks(ORG_ID, since, sample_rate=args.sample_rate)))
+        cost = (totals.cost_after - totals.cost_before) / args.sample_rate
+        ci = confidence_intervals(totals, args.sample_rate)["estimated_cost_change"]
+        print(f"{'sampled':>10} | {secs:>8.2f} | {mb:>8.1f} | {totals.analyzed:>9} | "
+              f"{totals.matched:>9} | {cost:.2f} (95% CI {ci[0]:.2f}..{ci[1]:.2f})")
+        db.session.remove()
+    os.close(fd)
+    os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark provider relay overhead against a local fake provider.
+
+Compares a fresh connection per call (the previous requests.post behaviour)
+with the pooled keep-alive transport, and buffered responses with streaming
+time to first token (TTFT).
+
+Usage:
+    python scripts/benchmarks/bench_provider_transport.py [--calls 200]
+        [--ttft-ms 200] [--token-ms 20] [--tokens 40]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import requests  # noqa: E402
+
+from scripts.benchmarks.fake_provider import FakeProviderServer  # noqa: E402
+from src.services.provider_transport import ProviderTransport, stream_chat_completion  # noqa: E402
+
+PAYLOAD = {"model": "bench", "messages": [{"role": "user", "content": "hi"}]}
+HEADERS = {"Content-Type": "application/json", "Authorization": "Bearer bench"}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def timed(fn, calls):
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--ttft-ms", type=float, default=200)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--stream-calls", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'mode':>18} | {'conns':>5} | {'p50 ms':>8} | {'p95 ms':>8}")
+    print("-" * 50)
+
+    # Relay overhead: no provider delay, so the numbers are connection cost
+    fake = FakeProviderServer(tokens=1)
+    url = f"{fake.url}/chat/completions"
+    transport = ProviderTransport("bench", pool_size=4, timeout=30)
+    for name, fn in [
+        ("requests.post", lambda: requests.post(url, headers=HEADERS, json=PAYLOAD, timeout=30)),
+        ("pooled", lambda: transport.post(url, HEADERS, PAYLOAD)),
+    ]:
+        before = fake.connections
+        samples = timed(fn, args.calls)
+        print(f"{name:>18} | {fake.connections - before:>5} | "
+              f"{statistics.median(samples):>8.2f} | {percentile(samples, 95):>8.2f}")
+    fake.close()
+
+    # Time to first token: buffered waits for the whole completion
+    fake = FakeProviderServer(ttft=args.ttft_ms / 1000, token_delay=args.token_ms / 1000, tokens=args.tokens)
+    url = f"{fake.url}/chat/completions"
+    buffered = timed(lambda: transport.post(url, HEADERS, PAYLOAD), args.stream_calls)
+    ttfts, totals = [], []
+    for _ in range(args.stream_calls):
+        events = list(stream_chat_completion(transport, url, HEADERS, {**PAYLOAD, "stream": True}, "bench", "bench"))
+        ttfts.append(events[-1]["ttft_ms"])
+        totals.append(events[-1]["latency_ms"])
+    fake.close()
+    transport.close()
+
+    print()
+    print(f"{'mode':>18} | {'ttft p50 ms':>11} | {'total p50 ms':>12}")
+    print("-" * 50)
+    print(f"{'buffered':>18} | {statistics.median(buffered):>11.1f} | {statistics.median(buffered):>12.1f}")
+    print(f"{'stream':>18} | {statistics.median(ttfts):>11.1f} | {statistics.median(totals):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for RateLimitService algorithms.
+
+Runs check_rate_limit for each algorithm (sliding_log ZSET, gcra, sliding_window)
+and reports checks/sec, Redis commands per check and keys/bytes held per scope.
+Uses fakeredis by default; pass --redis-url to measure a real server
+(round-trip savings only show up against a real network hop).
+
+Usage:
+    python scripts/benchmarks/bench_rate_limit.py [--checks 20000] [--scopes 100]
+    python scripts/benchmarks/bench_rate_limit.py --redis-url redis://localhost:6379/15
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.services.rate_limit import ALGORITHMS, RateLimitService  # noqa: E402
+
+
+class RoundTripCounter:
+    """Wraps a redis client to count round trips (commands and pipeline executes)."""
+
+    def __init__(self, client):
+        self.calls = 0
+        original_command = client.execute_command
+        original_pipeline = client.pipeline
+
+        def counted_command(*args, **kwargs):
+            self.calls += 1
+            return original_command(*args, **kwargs)
+
+        def counted_pipeline(*args, **kwargs):
+            pipe = original_pipeline(*args, **kwargs)
+            original_execute = pipe.execute
+
+            def counted_execute(*a, **kw):
+                self.calls += 1
+                return original_execute(*a, **kw)
+
+            pipe.execute = counted_execute
+            return pipe
+
+        client.execute_command = counted_command
+        client.pipeline = counted_pipeline
+
+
+def make_client(redis_url):
+    if redis_url:
+        import redis
+        client = redis.from_url(redis_url, decode_responses=True)
+        client.flushdb()
+        return client
+    import fakeredis
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def scope_footprint(client, scope):
+    keys = [k for k in client.keys("*")
+            if k in (scope, f"{scope}:gcra") or k.startswith(f"{{{scope}}}:swc:")]
+    size = 0
+    for key in keys:
+        try:
+            size += client.memory_usage(key) or 0
+        except Exception:
+            size = None  # fakeredis has no MEMORY USAGE
+            break
+    members = sum(client.zcard(k) for k in keys if client.type(k) == "zset")
+    return len(keys), members, size
+
+
+def bench(algorithm, checks, scopes, redis_url):
+    client = make_client(redis_url)
+    counter = RoundTripCounter(client)
+    # High enough that nothing is denied; GCRA interval stays well above 1ms
+    env = {
+        "BRIKK_RLIMIT_ENABLED": "true",
+        "BRIKK_RLIMIT_PER_MIN": "6000",
+        "BRIKK_RLIMIT_BURST": "1000000",
+        "BRIKK_RLIMIT_ALGORITHM": algorithm,
+    }
+    with patch.dict(os.environ, env):
+        limiter = RateLimitService(redis_client=client)
+
+    scope_keys = [f"rlimit:org:{i}" for i in range(scopes)]
+    limiter.check_rate_limit(scope_keys[0])  # load scripts
+    counter.calls = 0
+
+    start = time.perf_counter()
+    for i in range(checks):
+        limiter.check_rate_limit(scope_keys[i % scopes])
+    elapsed = time.perf_counter() - start
+
+    limiter.check_rate_limit("rlimit:org:1")  # make sure the scope is live
+    keys, members, size = scope_footprint(client, "rlimit:org:1")
+    return checks / elapsed, counter.calls / checks, keys, members, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--checks", type=int, default=20000)
+    parser.add_argument("--scopes", type=int, default=100)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    print(f"{'algorithm':<16} | {'checks/s':>10} | {'trips/check':>11} | {'keys/scope':>10} | "
+          f"{'zset members':>12} | {'bytes/scope':>11}")
+    print("-" * 86)
+    for algorithm in ALGORITHMS:
+        rate, cmds, keys, members, size = bench(algorithm, args.checks, args.scopes, args.redis_url)
+        print(f"{algorithm:<16} | {rate:>10.0f} | {cmds:>11.2f} | {keys:>10} | {members:>12} | "
+              f"{size if size is not None else 'n/a':>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark the cost of a structured log call on the request thread.
+
+Logs the coordination endpoint's coordination_success record inside a
+request context (RequestContextMiddleware values set on g) to a handler
+writing to os.devnull, and reports the time the calling thread spends per
+logger.info() in each mode:
+
+- sync json:    StructuredFormatter with json.dumps, written inline (before)
+- sync orjson:  the same with orjson (when installed)
+- async:        ContextQueueHandler; formatting and writing on the listener
+- async + 10%:  async with BRIKK_LOG_SAMPLE=coordination_success=0.1
+
+"thread cpu" is time.thread_time() of the calling thread, i.e. the work left
+on the request thread; "wall" also includes the listener thread whenever it
+holds the GIL (on one core it competes with the caller for every record).
+
+The async modes stop the listener after each run so queued records are not
+left to the next mode. Reports the fastest of --repeats runs of --records
+calls each.
+
+Usage:
+    python scripts/benchmarks/bench_structured_logging.py [--records 20000]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from flask import Flask, g  # noqa: E402
+
+from src.services import structured_logging  # noqa: E402
+from src.services.structured_logging import (  # noqa: E402
+    EventSampler, StructuredFormatter, StructuredLogger, start_async_logging, stop_async_logging,
+)
+
+
+def log_records(logger, records):
+    for _ in range(records):
+        logger.info(
+            "Coordination request processed successfully",
+            event_type="coordination_success",
+            message_id="0190b1e2-7c5e-7a10-8f3e-1b2c3d4e5f60",
+            message_type="event",
+            sender_agent_id="agent-sender",
+            recipient_agent_id="agent-recipient",
+            ttl_ms=30000,
+            request_id=g.request_id,
+        )
+
+
+def run(app, mode, records, devnull):
+    """Microseconds per logger.info() on the calling thread."""
+    stream_handler = logging.StreamHandler(devnull)
+    stream_handler.setFormatter(StructuredFormatter(json_enabled=True))
+    saved_orjson = structured_logging.orjson
+    if mode == "sync json":
+        structured_logging.orjson = None
+    handler = stream_handler if mode.startswith("sync") else start_async_logging(stream_handler)
+    if mode == "async + 10%":
+        handler.addFilter(EventSampler(sample_rates={"coordination_success": 0.1}))
+
+    logger = StructuredLogger("bench.coordination")
+    logger.logger.handlers[:] = [handler]
+    logger.logger.propagate = False
+    logger.logger.setLevel(logging.INFO)
+    try:
+        with app.test_request_context("/api/v1/coordination", method="POST"):
+            g.request_id = "0190b1e2-7c5e-7a10-8f3e-000000000001"
+            g.request_start_time = time.time()
+            g.request_method = "POST"
+            g.request_path = "/api/v1/coordination"
+            g.request_remote_addr = "127.0.0.1"
+            g.request_user_agent = "bench"
+            g.organization_id = "org-1"
+            g.api_key_id = "key-1"
+            start, start_cpu = time.perf_counter(), time.thread_time()
+            log_records(logger, records)
+            cpu = time.thread_time() - start_cpu
+            wall = time.perf_counter() - start
+    finally:
+        stop_async_logging()
+        structured_logging.orjson = saved_orjson
+    return wall / records * 1e6, cpu / records * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    modes = ["sync json", "async", "async + 10%"]
+    if structured_logging.orjson is not None:
+        modes.insert(1, "sync orjson")
+    wall = {mode: float("inf") for mode in modes}
+    cpu = dict(wall)
+    with open(os.devnull, "w") as devnull:
+        for _ in range(args.repeats):
+            for mode in modes:
+                mode_wall, mode_cpu = run(app, mode, args.records, devnull)
+                wall[mode] = min(wall[mode], mode_wall)
+                cpu[mode] = min(cpu[mode], mode_cpu)
+    baseline = cpu["sync json"]
+
+    print(f"{'mode':>12} | {'thread cpu us':>13} | {'wall us':>7} | {'speedup':>7}")
+    print("-" * 50)
+    for mode in modes:
+        print(f"{mode:>12} | {cpu[mode]:>13.2f} | {wall[mode]:>7.2f} | {baseline / cpu[mode]:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark SDK telemetry ingestion through the Flask test client (sqlite).
+
+Posts --events telemetry events to POST /telemetry/events in batches while
+the background flusher writes them, then waits for the buffer to drain.
+Reports request-side and end-to-end (stored) events/sec per batch size.
+
+Usage:
+    python scripts/benchmarks/bench_telemetry.py [--events 50000] [--sizes 50,500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from flask import Flask  # noqa: E402
+
+import src.models  # noqa: E402,F401
+from src.database import db  # noqa: E402
+from src.models.telemetry import TelemetryEvent, TelemetryRollupMinute  # noqa: E402
+from src.routes.telemetry import telemetry_bp  # noqa: E402
+from src.services.telemetry_pipeline import TelemetryPipeline  # noqa: E402
+
+TABLES = [TelemetryEvent.__table__, TelemetryRollupMinute.__table__]
+SDK = {"name": "brikk-python-sdk", "version": "1.0.0", "language": "python", "platform": "linux"}
+
+
+def make_events(n):
+    return [{"event_type": ("api_call", "retry", "error")[i % 3], "endpoint": f"/api/v1/route{i % 20}",
+             "method": "POST", "status_code": 200 if i % 50 else 503, "duration_ms": 5 + i % 900,
+             "sdk_version": f"1.{i % 4}.0", "metadata": {"attempt": i % 3}}
+            for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=50_000)
+    parser.add_argument("--sizes", default="50,500")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    app.register_blueprint(telemetry_bp, url_prefix="/telemetry")
+    pipeline = TelemetryPipeline(app, buffer_size=args.events * 2)
+    try:
+        with app.app_context():
+            db.metadata.create_all(bind=db.engine, tables=TABLES)
+            events = make_events(args.events)
+            client = app.test_client()
+
+            print(f"{'batch size':>10} | {'post s':>7} | {'posted/s':>9} | {'stored s':>8} | {'stored/s':>9}")
+            print("-" * 55)
+            for size in sizes:
+                db.session.execute(TelemetryEvent.__table__.delete())
+                db.session.commit()
+                start = time.perf_counter()
+                for i in range(0, len(events), size):
+                    response = client.post("/telemetry/events", json={"events": events[i:i + size], "sdk_info": SDK})
+                    assert response.status_code == 202
+                posted = time.perf_counter() - start
+                pipeline.flush()
+                stored = time.perf_counter() - start
+                assert db.session.query(TelemetryEvent).count() == args.events
+                print(f"{size:>10} | {posted:>7.2f} | {args.events / posted:>9,.0f} | "
+                      f"{stored:>8.2f} | {args.events / stored:>9,.0f}")
+            db.session.remove()
+    finally:
+        pipeline.stop()
+        os.close(fd)
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark the trending score job over synthetic agents (sqlite).
+
+Compares the previous per-agent loop (two queries per agent, ORM row
+updates, then a one-row-at-a-time ranking pass) against the batch job
+(GROUP BY queries, numpy scoring, one sort, bulk upserts).
+
+The legacy loop issues O(agents) queries; at large sizes it is timed on the
+first --legacy-agents agents and extrapolated linearly (0 runs all of them).
+
+Usage:
+    python scripts/benchmarks/bench_trending.py [--agents 50000] [--legacy-agents 5000]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from flask import Flask  # noqa: E402
+
+import src.models  # noqa: E402,F401
+from src.database import db  # noqa: E402
+from src.models.analytics import AgentAnalyticsDaily, AgentTrendingScore  # noqa: E402
+from src.models.marketplace import AgentInstallation, MarketplaceListing  # noqa: E402
+from src.models.reviews import AgentReview  # noqa: E402
+from src.services.trending_scores import TrendingScoreCalculator  # noqa: E402
+
+TODAY = date(2026, 3, 14)
+TABLES = [MarketplaceListing.__table__, AgentAnalyticsDaily.__table__, AgentTrendingScore.__table__,
+          AgentInstallation.__table__, AgentReview.__table__]
+
+
+def seed(n, batch=5_000):
+    rng = random.Random(42)
+    for start in range(0, n, batch):
+        agent_ids = [str(uuid.uuid4()) for _ in range(min(batch, n - start))]
+        db.session.execute(MarketplaceListing.__table__.insert(), [{
+            "id": str(uuid.uuid4()), "agent_id": agent_id, "publisher_id": "bench",
+            "status": "published", "install_count": rng.randrange(10_000),
+        } for agent_id in agent_ids])
+        db.session.execute(AgentAnalyticsDaily.__table__.insert(), [{
+            "id": str(uuid.uuid4()), "agent_id": agent_id, "date": TODAY - timedelta(days=ago),
+            "invocation_count": rng.randrange(500), "unique_users": rng.randrange(50),
+        } for agent_id in agent_ids for ago in range(14, 0, -1)])
+        db.session.commit()
+
+
+def legacy_score(agent_id):
+    """Per-agent trending formula as previously implemented."""
+    rows = AgentAnalyticsDaily.query.filter(
+        AgentAnalyticsDaily.agent_id == agent_id,
+        AgentAnalyticsDaily.date >= TODAY - timedelta(days=14),
+        AgentAnalyticsDaily.date < TODAY,
+    ).order_by(AgentAnalyticsDaily.date).all()
+    if len(rows) < 7:
+        return None
+    week1, week2 = rows[:7], rows[7:]
+
+    def rate(new, old):
+        return (new - old) / old if old > 0 else (1.0 if new > 0 else 0.0)
+
+    velocity = (rate(sum(a.invocation_count for a in week2), sum(a.invocation_count for a in week1)) +
+                rate(sum(a.unique_users for a in week2), sum(a.unique_users for a in week1))) / 2
+    half = len(week2) // 2
+    momentum = rate(sum(a.invocation_count for a in week2[half:]),
+                    sum(a.invocation_count for a in week2[:half]))
+    recency = min(sum(a.invocation_count for a in rows if a.date >= TODAY - timedelta(days=3)) / 100.0, 1.0)
+    listing = MarketplaceListing.query.filter_by(agent_id=agent_id).first()
+    popularity = min(math.log10(listing.install_count + 1) / 5.0, 1.0) if listing else 0.0
+    score = max(0, min(100, (velocity * 0.4 + momentum * 0.3 + recency * 0.2 + popularity * 0.1) * 100))
+    return Decimal(str(round(score, 4))), Decimal(str(round(velocity, 4))), Decimal(str(round(momentum, 4)))
+
+
+def legacy_run(limit):
+    listings = MarketplaceListing.query.filter_by(status="published").limit(limit).all()
+    for listing in listings:
+        result = legacy_score(listing.agent_id)
+        if result is None:
+            continue
+        trending = AgentTrendingScore.query.filter_by(agent_id=listing.agent_id).first()
+        if trending is None:
+            trending = AgentTrendingScore(agent_id=listing.agent_id)
+            db.session.add(trending)
+        trending.trending_score, trending.velocity, trending.momentum = result
+    db.session.commit()
+    for rank, trending in enumerate(
+            AgentTrendingScore.query.order_by(AgentTrendingScore.trending_score.desc()).all(), start=1):
+        trending.rank = rank
+        trending.updated_at = datetime.now(timezone.utc)
+    db.session.commit()
+    return len(listings)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--agents", type=int, default=50_000)
+    parser.add_argument("--legacy-agents", type=int, default=5_000,
+                        help="agents to time the legacy loop on (0: all)")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    try:
+        with app.app_context():
+            db.metadata.create_all(bind=db.engine, tables=TABLES)
+            print(f"seeding {args.agents:,} agents x 14 days...")
+            seed(args.agents)
+
+            sample = args.legacy_agents or args.agents
+            legacy_s, scored = timed(legacy_run, min(sample, args.agents))
+            legacy_total = legacy_s * args.agents / scored
+            db.session.execute(AgentTrendingScore.__table__.delete())
+            db.session.commit()
+
+            def batch():
+                counts = TrendingScoreCalculator(today=TODAY).run()
+                db.session.commit()
+                return counts
+
+            batch_s, counts = timed(batch)
+            rerun_s, _ = timed(batch)  # every row now updates instead of inserting
+
+            note = "" if scored == args.agents else f" (extrapolated from {scored:,})"
+            print(f"{'implementation':>16} | {'seconds':>9} | {'agents/s':>10}")
+            print("-" * 42)
+            print(f"{'legacy loop':>16} | {legacy_total:>9.2f} | {args.agents / legacy_total:>10,.0f}{note}")
+            print(f"{'batch (insert)':>16} | {batch_s:>9.2f} | {args.agents / batch_s:>10,.0f}")
+            print(f"{'batch (update)':>16} | {rerun_s:>9.2f} | {args.agents / rerun_s:>10,.0f}")
+            print(f"speedup: {legacy_total / batch_s:.0f}x, {counts}")
+            db.session.remove()
+    finally:
+        os.close(fd)
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
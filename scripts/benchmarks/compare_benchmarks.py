@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Compare a pytest-benchmark JSON run against a stored baseline.
+
+Flags every benchmark whose statistic (min by default: the least noisy on a
+shared machine) is slower than the baseline by more than the threshold and
+exits non-zero if any regressed.
+Benchmarks missing from either side are listed but never fail the run.
+
+Usage:
+    python scripts/benchmarks/compare_benchmarks.py .benchmarks/hot_paths.json
+        [--baseline scripts/benchmarks/baselines/hot_paths.json]
+        [--threshold 0.3] [--stat min]
+    python scripts/benchmarks/compare_benchmarks.py .benchmarks/hot_paths.json --update
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "hot_paths.json"
+STATS = ("min", "median", "mean", "stddev")
+
+
+def load(path):
+    """Return {name: stats} from a pytest-benchmark run or a stored baseline."""
+    data = json.loads(Path(path).read_text())
+    benchmarks = data["benchmarks"]
+    if isinstance(benchmarks, dict):  # stored baseline
+        return benchmarks
+    return {b["name"]: {stat: b["stats"][stat] for stat in STATS} for b in benchmarks}
+
+
+def write_baseline(run_path, baseline_path):
+    data = json.loads(Path(run_path).read_text())
+    machine = data.get("machine_info", {})
+    baseline = {
+        "created": data.get("datetime"),
+        "machine": {
+            "cpu": machine.get("cpu", {}).get("brand_raw"),
+            "python": machine.get("python_version"),
+        },
+        "benchmarks": dict(sorted(load(run_path).items())),
+    }
+    Path(baseline_path).parent.mkdir(parents=True, exist_ok=True)
+    Path(baseline_path).write_text(json.dumps(baseline, indent=2) + "\n")
+    print(f"wrote {len(baseline['benchmarks'])} benchmarks to {baseline_path}")
+
+
+def compare(baseline, current, stat, threshold):
+    """Yield (name, baseline_s, current_s, ratio, status) rows."""
+    for name in sorted(set(baseline) | set(current)):
+        if name not in current:
+            yield name, baseline[name][stat], None, None, "missing"
+            continue
+        if name not in baseline:
+            yield name, None, current[name][stat], None, "new"
+            continue
+        before, after = baseline[name][stat], current[name][stat]
+        ratio = after / before if before else float("inf")
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+        elif ratio < 1 / (1 + threshold):
+            status = "faster"
+        else:
+            status = "ok"
+        yield name, before, after, ratio, status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("current", help="pytest-benchmark --benchmark-json output")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--threshold", type=float, default=0.3,
+                        help="allowed slowdown as a fraction (0.3 = 30%%)")
+    parser.add_argument("--stat", choices=STATS[:3], default="min")
+    parser.add_argument("--update", action="store_true", help="overwrite the baseline with this run")
+    args = parser.parse_args()
+
+    if args.update:
+        write_baseline(args.current, args.baseline)
+        return 0
+
+    def us(seconds):
+        return "-" if seconds is None else f"{seconds * 1e6:.1f}"
+
+    rows = list(compare(load(args.baseline), load(args.current), args.stat, args.threshold))
+    width = max(len(row[0]) for row in rows)
+    print(f"{'benchmark':<{width}} | {'baseline us':>12} | {'current us':>12} | {'change':>7} | status")
+    print("-" * (width + 52))
+    for name, before, after, ratio, status in rows:
+        change = "-" if ratio is None else f"{(ratio - 1) * 100:+.0f}%"
+        print(f"{name:<{width}} | {us(before):>12} | {us(after):>12} | {change:>7} | {status}")
+
+    regressions = [row[0] for row in rows if row[4] == "REGRESSION"]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%} on {args.stat}")
+        return 1
+    print(f"\nno regressions beyond {args.threshold:.0%} on {args.stat}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible chat completion server for provider benchmarks/tests.
+
+Serves POST /v1/chat/completions over HTTP/1.1 keep-alive, buffered or as
+server-sent events ("stream": true), with a configurable time to first token
+and per-token delay. Counts accepted TCP connections so pooling can be checked.
+
+Usage:
+    python scripts/benchmarks/fake_provider.py [--port 8099] [--ttft-ms 200]
+        [--token-ms 20] [--tokens 40]
+"""
+import argparse
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeProviderServer:
+    """Threaded fake provider; use .url as the provider api_base."""
+
+    def __init__(self, port=0, ttft=0.0, token_delay=0.0, tokens=5, status=200):
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.status = status
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Headers and body are separate writes; avoid Nagle/delayed-ACK stalls
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with fake._lock:
+                    fake.connections += 1
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with fake._lock:
+                    fake.requests += 1
+                if fake.status >= 300:
+                    return self._send(fake.status, "application/json",
+                                      json.dumps({"error": {"message": "upstream failure"}}).encode())
+                words = [f"tok{i} " for i in range(fake.tokens)]
+                usage = {"prompt_tokens": 3, "completion_tokens": len(words),
+                         "total_tokens": 3 + len(words)}
+                if not body.get("stream"):
+                    time.sleep(fake.ttft + fake.token_delay * len(words))
+                    reply = {"choices": [{"message": {"content": "".join(words)}}], "usage": usage}
+                    return self._send(200, "application/json", json.dumps(reply).encode())
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                time.sleep(fake.ttft)
+                for i, word in enumerate(words):
+                    if i:
+                        time.sleep(fake.token_delay)
+                    self._chunk({"choices": [{"delta": {"content": word}}]})
+                self._chunk({"choices": [], "usage": usage})
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+
+            def _send(self, status, content_type, payload):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _chunk(self, event):
+                self._write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+
+            def _write_chunk(self, data):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--ttft-ms", type=float, default=200)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--tokens", type=int, default=40)
+    args = parser.parse_args()
+
+    fake = FakeProviderServer(args.port, args.ttft_ms / 1000, args.token_ms / 1000, args.tokens)
+    print(f"fake provider listening on {fake.url} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -205,6 +205,8 @@ def create_app() -> Flask:
     init_logging(app)
     init_request_context(app)
     init_metrics(app)
+    from src.services.query_profiler import init_query_profiler
+    init_query_profiler(app)
     
     # --- Initialize security middleware (Phase 10-12) ---
     init_security_middleware(app)
@@ -222,10 +224,21 @@ def create_app() -> Flask:
     from src.services.audit_logger import init_audit_logging
     from src.services.rate_limiter import init_rate_limiter
     from src.services.usage_metering import init_usage_metering
+    from src.services.search_index import init_search_index
+    from src.services.webhook_delivery import init_webhook_delivery
+    from src.services.telemetry_pipeline import init_telemetry_pipeline
     
     init_gateway_metrics(app)
     init_audit_logging(app)
     init_usage_metering(app)  # Phase 6: Usage metering for billing
+    init_search_index(app)  # Marketplace full-text search backend
+    init_webhook_delivery(app)  # Async webhook delivery workers (start on first event)
+    init_telemetry_pipeline(app)  # SDK telemetry ring buffer + batch flusher (starts on first event)
+    
+    # Feature flag snapshot; Redis-backed with pub/sub invalidation when REDIS_URL is set
+    from src.infra.redis_pool import get_redis
+    from src.utils.feature_flags import init_feature_flags
+    init_feature_flags(get_redis('feature_flags') if os.getenv('REDIS_URL') else None, listen=True)
     # Note: Rate limiter requires Redis, will gracefully degrade if unavailable
     try:
         limiter = init_rate_limiter(app)
@@ -399,6 +412,10 @@ def create_app() -> Flask:
             from src.routes import security
             app.register_blueprint(security.security_bp, url_prefix="/api")
 
+    # --- Per-stage request timing (wraps every hook and view installed above) ---
+    from src.services.request_timing import init_request_timing
+    init_request_timing(app)
+
     # --- DB init ---
     with app.app_context():
         # Only auto-create tables in testing or if explicitly enabled
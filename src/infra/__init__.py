@@ -2,20 +2,38 @@
 Infrastructure package - unified entry points for core services.
 
 This package provides standardized, centralized access to:
-- Database (db)
+- Database (db, bulk_upsert, batch_load)
+- Query logs (profile_queries, assert_max_queries)
+- Redis (get_redis: shared named connection pools)
 - Authentication (require_scope)
 - Logging (configure_logging, init_logging, get_logger)
+
+Exports are resolved lazily: services import submodules such as
+src.infra.redis_pool, and loading src.infra.auth eagerly here would import
+the services that are still being imported (auth_middleware -> idempotency).
 """
+from importlib import import_module
+
+_EXPORTS = {
+    "db": "src.infra.db",
+    "bulk_upsert": "src.infra.db",
+    "batch_load": "src.infra.db",
+    "profile_queries": "src.infra.query_log",
+    "assert_max_queries": "src.infra.query_log",
+    "get_redis": "src.infra.redis_pool",
+    "require_scope": "src.infra.auth",
+    "configure_logging": "src.infra.log",
+    "init_logging": "src.infra.log",
+    "get_logger": "src.infra.log",
+}
 
-from src.infra.db import db
-from src.infra.auth import require_scope
-from src.infra.log import configure_logging, init_logging, get_logger
+__all__ = list(_EXPORTS)
 
-__all__ = [
-    "db",
-    "require_scope",
-    "configure_logging",
-    "init_logging",
-    "get_logger",
-]
 
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
@@ -5,8 +5,114 @@ This module provides a single, standardized entry point for all database
 operations across the application. All models should import from here.
 """
 
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import and_, select
+
 from src.database import db
 
 # Export the main SQLAlchemy instance
-__all__ = ["db"]
+__all__ = ["db", "bulk_upsert", "batch_load"]
+
+NATIVE_UPSERT_DIALECTS = ("postgresql", "sqlite")
+UPSERT_BATCH_SIZE = 1000  # keeps PostgreSQL under its bind-parameter limit
+IN_BATCH_SIZE = 1000
+
+
+def bulk_upsert(
+    model,
+    rows: List[Dict[str, Any]],
+    index_elements: Sequence[str],
+    update_columns: Sequence[str],
+    increment_columns: Sequence[str] = (),
+) -> int:
+    """
+    Insert rows, updating update_columns where index_elements already exist.
+
+    increment_columns are added to the stored value instead of replacing it,
+    so partial aggregates (counters, histogram buckets) merge in place.
+
+    Uses a single INSERT ... ON CONFLICT DO UPDATE per batch on PostgreSQL
+    and SQLite. Other dialects fall back to an UPDATE per row followed by an
+    INSERT when nothing matched; that merge is not atomic, so concurrent
+    writers to the same keys can fail with an IntegrityError there. Every
+    row must have the same keys, including every NOT NULL column without a
+    server default (and Python-side primary key defaults). Does not commit.
+
+    Returns:
+        Number of rows sent
+    """
+    if not rows:
+        return 0
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in NATIVE_UPSERT_DIALECTS:
+        return _merge_rows(model.__table__, rows, index_elements, update_columns, increment_columns)
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    # One cached statement executed with parameter lists: SQLAlchemy batches
+    # them into multi-row VALUES without recompiling the SQL per batch
+    stmt = insert(model.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(index_elements),
+        set_={
+            **{col: stmt.excluded[col] for col in update_columns},
+            **{col: model.__table__.c[col] + stmt.excluded[col] for col in increment_columns},
+        },
+    )
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        db.session.execute(stmt, rows[start:start + UPSERT_BATCH_SIZE])
+    return len(rows)
+
+
+def _merge_rows(table, rows, index_elements, update_columns, increment_columns) -> int:
+    """Portable per-row upsert for dialects without ON CONFLICT."""
+    for row in rows:
+        match = and_(*(table.c[col] == row[col] for col in index_elements))
+        values = {
+            **{col: row[col] for col in update_columns},
+            **{col: table.c[col] + row[col] for col in increment_columns},
+        }
+        if values:
+            matched = db.session.execute(table.update().where(match).values(values)).rowcount
+        else:
+            matched = db.session.execute(select(1).select_from(table).where(match)).first() is not None
+        if not matched:
+            db.session.execute(table.insert().values(row))
+    return len(rows)
+
+
+def batch_load(model, ids: Iterable[Any], key: Optional[str] = None, options: Sequence[Any] = ()) -> Dict[Any, Any]:
+    """
+    Load instances of model for many ids with one IN query per batch.
+
+    Use this instead of model.query.get() inside a loop. None and duplicate
+    ids are ignored; ids with no row are absent from the result.
+
+    Args:
+        model: Mapped model class
+        ids: Values to look up
+        key: Attribute to match on (defaults to the single-column primary key)
+        options: Loader options, e.g. selectinload(...)
+
+    Returns:
+        Dict of id -> instance
+    """
+    wanted = list(dict.fromkeys(i for i in ids if i is not None))
+    if not wanted:
+        return {}
+
+    if key is None:
+        mapper = model.__mapper__
+        key = mapper.get_property_by_column(mapper.primary_key[0]).key
+    column = getattr(model, key)
 
+    found = {}
+    for start in range(0, len(wanted), IN_BATCH_SIZE):
+        stmt = select(model).where(column.in_(wanted[start:start + IN_BATCH_SIZE])).options(*options)
+        for obj in db.session.scalars(stmt):
+            found[getattr(obj, key)] = obj
+    return found
@@ -0,0 +1,202 @@
+"""
+SQL query log infrastructure.
+
+One pair of SQLAlchemy before_cursor_execute/after_cursor_execute listeners
+(on Engine, so every engine is covered) times each statement and records it
+into the active QueryLogs: every profile_queries() block around it, plus
+the logs the request profiler (src.services.query_profiler) activates per
+request. A QueryLog keeps the statement count, total time and
+per-fingerprint counts, where a fingerprint is the statement with literals
+and bind parameters replaced by ? and IN / VALUES lists collapsed
+(memoised per statement string). Statements slower than BRIKK_SLOW_QUERY_MS
+are logged wherever they run.
+
+Usage:
+    from src.infra.query_log import assert_max_queries, profile_queries
+
+    with profile_queries() as queries:
+        client.get('/api/v1/marketplace/agents')
+    assert queries.count <= 4
+
+    with assert_max_queries(4):  # also the assert_max_queries fixture
+        client.get('/api/v1/marketplace/agents')
+"""
+import logging
+import os
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from functools import lru_cache
+from time import perf_counter_ns
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_START_KEY = "brikk_query_start_ns"
+
+# Logs recording the current context's queries, innermost last
+_active: ContextVar[Tuple["QueryLog", ...]] = ContextVar("brikk_query_logs", default=())
+# Called with the elapsed ns of every statement (request timing's db stage)
+_observers: List[Callable[[int], None]] = []
+
+_slow_query_ns = int(float(os.environ.get("BRIKK_SLOW_QUERY_MS", "200")) * 1e6)
+_slow_queries: deque = deque(maxlen=100)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_BIND = re.compile(r"%\(\w+\)s|%s|:\w+|\$\d+|\?")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES = re.compile(r"(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Statement shape: literals and parameters become ?, lists become (...)."""
+    sql = _WHITESPACE.sub(" ", statement).strip()
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _BIND.sub("?", sql)
+    sql = _LIST.sub("(...)", sql)
+    return _VALUES.sub(r"\1", sql)
+
+
+class QueryLog:
+    """Statements executed while the log was active, grouped by fingerprint."""
+
+    __slots__ = ("count", "total_ns", "fingerprints")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        # fingerprint -> [executions, total ns]
+        self.fingerprints: Dict[str, List[int]] = {}
+
+    def record(self, statement_fingerprint: str, elapsed_ns: int) -> None:
+        self.count += 1
+        self.total_ns += elapsed_ns
+        entry = self.fingerprints.get(statement_fingerprint)
+        if entry is None:
+            self.fingerprints[statement_fingerprint] = [1, elapsed_ns]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed_ns
+
+    def repeated(self, threshold: int) -> List[Dict]:
+        """Fingerprints executed at least threshold times (probable N+1), most frequent first."""
+        return [_fingerprint_dict(fp, count, ns)
+                for fp, (count, ns) in sorted(self.fingerprints.items(), key=lambda item: -item[1][0])
+                if count >= threshold]
+
+    def to_dict(self, top: int = 5) -> Dict:
+        slowest = sorted(self.fingerprints.items(), key=lambda item: -item[1][1])[:top]
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ns / 1e6, 3),
+            "top": [_fingerprint_dict(fp, count, ns) for fp, (count, ns) in slowest],
+        }
+
+
+def _fingerprint_dict(fp: str, count: int, ns: int) -> Dict:
+    return {"fingerprint": fp, "count": count, "total_ms": round(ns / 1e6, 3)}
+
+
+def add_query_observer(observer: Callable[[int], None]) -> None:
+    """Call observer(elapsed_ns) after every SQL statement (idempotent)."""
+    install_listeners()
+    if observer not in _observers:
+        _observers.append(observer)
+
+
+def install_listeners() -> None:
+    """Register the cursor listeners on Engine once per process."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info[_START_KEY] = perf_counter_ns()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop(_START_KEY, None)
+    if start is None:
+        return
+    elapsed = perf_counter_ns() - start
+    for observer in _observers:
+        observer(elapsed)
+    logs = _active.get()
+    if logs:
+        statement_fingerprint = fingerprint(statement)
+        for log in logs:
+            log.record(statement_fingerprint, elapsed)
+    if elapsed >= _slow_query_ns:
+        _record_slow_query(statement, elapsed)
+
+
+def _record_slow_query(statement: str, elapsed_ns: int) -> None:
+    statement_fingerprint = fingerprint(statement)
+    _slow_queries.append({
+        "fingerprint": statement_fingerprint,
+        "duration_ms": round(elapsed_ns / 1e6, 3),
+        "timestamp": time.time(),
+    })
+    logger.warning(f"Slow query ({elapsed_ns / 1e6:.1f} ms): {statement_fingerprint}")
+
+
+def set_slow_query_threshold(milliseconds: float) -> None:
+    global _slow_query_ns
+    _slow_query_ns = int(milliseconds * 1e6)
+
+
+def slow_query_threshold_ms() -> float:
+    return _slow_query_ns / 1e6
+
+
+def recent_slow_queries() -> List[Dict]:
+    """The last 100 slow queries, oldest first."""
+    return list(_slow_queries)
+
+
+def activate_query_log(log: QueryLog) -> Token:
+    """Record this context's statements into log until deactivate_query_log(token)."""
+    install_listeners()
+    return _active.set(_active.get() + (log,))
+
+
+def deactivate_query_log(token: Token) -> None:
+    _active.reset(token)
+
+
+def current_query_log() -> Optional[QueryLog]:
+    """The innermost active QueryLog, or None."""
+    logs = _active.get()
+    return logs[-1] if logs else None
+
+
+@contextmanager
+def profile_queries() -> Iterator[QueryLog]:
+    """Record SQL statements executed inside the block (this thread/task only)."""
+    log = QueryLog()
+    token = activate_query_log(log)
+    try:
+        yield log
+    finally:
+        deactivate_query_log(token)
+
+
+@contextmanager
+def assert_max_queries(n: int) -> Iterator[QueryLog]:
+    """Fail with a per-fingerprint breakdown if the block runs more than n statements."""
+    with profile_queries() as log:
+        yield log
+    if log.count > n:
+        breakdown = "\n".join(f"  {count} x {fp}" for fp, (count, _) in
+                              sorted(log.fingerprints.items(), key=lambda item: -item[1][0]))
+        raise AssertionError(f"Expected at most {n} queries, {log.count} were executed:\n{breakdown}")
@@ -0,0 +1,255 @@
+"""
+Unified Redis infrastructure module.
+
+Every service gets its Redis client from here instead of calling
+redis.from_url() itself, so a process holds a fixed set of connection pools
+no matter how many service objects are created per request.
+
+- Named pools (one per consumer) with a hard size limit; a saturated pool
+  blocks for up to BRIKK_REDIS_POOL_TIMEOUT seconds instead of opening more
+  connections
+- One shared client per pool (redis.Redis is thread-safe)
+- Fork-safe: inherited connections are dropped in the child after
+  os.fork() (gunicorn --preload), never shared with the parent
+- Idle connections are health-checked (PING) before reuse and connection
+  errors are retried with backoff, so clients recover after a Redis restart
+- Pool utilisation is exported as brikk_redis_pool_connections{pool,state};
+  in_use/idle are set() on every checkout and release (set_function gauges
+  are never written to the files of prometheus multiprocess mode)
+
+Configuration:
+    REDIS_URL=redis://localhost:6379/0       - Server for every pool
+    BRIKK_REDIS_POOL_SIZE=20                 - Default max connections per pool
+    BRIKK_REDIS_POOL_TIMEOUT=5               - Seconds to wait for a free connection
+    BRIKK_REDIS_HEALTH_CHECK_INTERVAL=30     - Idle seconds before a PING on reuse
+
+Usage:
+    from src.infra.redis_pool import get_redis
+
+    client = get_redis('idempotency')
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import redis
+from prometheus_client import Gauge
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+
+__all__ = [
+    "POOLS",
+    "PoolSpec",
+    "MeteredConnectionPool",
+    "RedisPoolRegistry",
+    "get_redis",
+    "get_redis_registry",
+    "configure_redis_pools",
+    "reset_redis_pools",
+]
+
+DEFAULT_URL = "redis://localhost:6379/0"
+
+
+@dataclass(frozen=True)
+class PoolSpec:
+    decode_responses: bool = False
+    max_connections: Optional[int] = None  # None: BRIKK_REDIS_POOL_SIZE
+    socket_timeout: Optional[float] = 5.0  # None for pools that run blocking pops
+    default_url: str = DEFAULT_URL  # used when REDIS_URL is unset
+
+
+POOLS: Dict[str, PoolSpec] = {
+    "idempotency": PoolSpec(),
+    "rate_limit": PoolSpec(decode_responses=True),
+    "cache": PoolSpec(decode_responses=True, default_url="redis://localhost:6379/1"),
+    "feature_flags": PoolSpec(max_connections=4),
+    "monitoring": PoolSpec(decode_responses=True, max_connections=4),
+    "queue": PoolSpec(socket_timeout=None),  # RQ pickles jobs: must stay binary
+    "webhooks": PoolSpec(socket_timeout=None),  # workers block in BRPOP
+}
+
+redis_pool_connections = Gauge(
+    'brikk_redis_pool_connections',
+    'Redis connections per named pool',
+    ['pool', 'state'],  # in_use, idle, max
+    multiprocess_mode='livesum'
+)
+
+
+def _pool_counts(pool: redis.BlockingConnectionPool) -> Dict[str, int]:
+    created = len(pool._connections)
+    idle = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+    return {
+        'max': pool.max_connections,
+        'created': created,
+        'in_use': created - idle,
+        'idle': idle,
+    }
+
+
+class MeteredConnectionPool(redis.BlockingConnectionPool):
+    """BlockingConnectionPool publishing its in_use/idle gauges on checkout and release."""
+
+    def __init__(self, *args: Any, pool_name: str = "default", **kwargs: Any):
+        self._in_use_gauge = redis_pool_connections.labels(pool_name, 'in_use')
+        self._idle_gauge = redis_pool_connections.labels(pool_name, 'idle')
+        super().__init__(*args, **kwargs)
+        redis_pool_connections.labels(pool_name, 'max').set(self.max_connections)
+
+    def _publish(self) -> None:
+        counts = _pool_counts(self)
+        self._in_use_gauge.set(counts['in_use'])
+        self._idle_gauge.set(counts['idle'])
+
+    def get_connection(self, *args: Any, **kwargs: Any):
+        connection = super().get_connection(*args, **kwargs)
+        self._publish()
+        return connection
+
+    def release(self, connection) -> None:
+        super().release(connection)
+        self._publish()
+
+    def reset(self) -> None:
+        super().reset()
+        self._publish()
+
+
+def _env_int(key: str, default: int) -> int:
+    try:
+        return int(os.getenv(key, str(default)))
+    except ValueError:
+        return default
+
+
+class RedisPoolRegistry:
+    """Process-wide set of named, sized Redis connection pools."""
+
+    def __init__(self,
+                 url: Optional[str] = None,
+                 pool_size: Optional[int] = None,
+                 timeout: Optional[float] = None,
+                 health_check_interval: Optional[int] = None,
+                 connection_class: Optional[type] = None,
+                 **connection_kwargs: Any):
+        self.url = url
+        self.pool_size = pool_size or _env_int('BRIKK_REDIS_POOL_SIZE', 20)
+        self.timeout = timeout if timeout is not None else _env_int('BRIKK_REDIS_POOL_TIMEOUT', 5)
+        self.health_check_interval = (health_check_interval if health_check_interval is not None
+                                      else _env_int('BRIKK_REDIS_HEALTH_CHECK_INTERVAL', 30))
+        self.connection_class = connection_class
+        self.connection_kwargs = connection_kwargs
+        self._pools: Dict[str, redis.BlockingConnectionPool] = {}
+        self._clients: Dict[str, redis.Redis] = {}
+        self._lock = threading.Lock()
+
+    def _create_pool(self, name: str) -> redis.BlockingConnectionPool:
+        spec = POOLS.get(name, PoolSpec())
+        kwargs = dict(
+            max_connections=spec.max_connections or self.pool_size,
+            timeout=self.timeout,
+            decode_responses=spec.decode_responses,
+            socket_connect_timeout=2,
+            socket_timeout=spec.socket_timeout,
+            socket_keepalive=True,
+            health_check_interval=self.health_check_interval,
+            retry=Retry(ExponentialBackoff(cap=1.0, base=0.05), 3),
+            retry_on_error=[redis.ConnectionError, redis.TimeoutError],
+            client_name=f"brikk-{name}",
+            **self.connection_kwargs,
+        )
+        if self.connection_class is not None:
+            kwargs['connection_class'] = self.connection_class
+        url = self.url or os.getenv('REDIS_URL', spec.default_url)
+        return MeteredConnectionPool.from_url(url, pool_name=name, **kwargs)
+
+    def pool(self, name: str) -> redis.BlockingConnectionPool:
+        pool = self._pools.get(name)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(name)
+                if pool is None:
+                    pool = self._pools[name] = self._create_pool(name)
+        return pool
+
+    def client(self, name: str) -> redis.Redis:
+        """Shared client for a named pool (created on first use; does not connect)."""
+        client = self._clients.get(name)
+        if client is None:
+            pool = self.pool(name)
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = self._clients[name] = redis.Redis(connection_pool=pool)
+        return client
+
+    def ping(self, name: str) -> bool:
+        try:
+            return bool(self.client(name).ping())
+        except redis.RedisError:
+            return False
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-pool connection counts: max, created, in_use, idle."""
+        return {name: _pool_counts(pool) for name, pool in list(self._pools.items())}
+
+    def reset_after_fork(self) -> None:
+        """Drop connections inherited from the parent; pools and clients stay valid."""
+        for pool in list(self._pools.values()):
+            pool.reset()
+
+    def close(self) -> None:
+        with self._lock:
+            for pool in self._pools.values():
+                pool.disconnect()
+            self._pools.clear()
+            self._clients.clear()
+
+
+_registry: Optional[RedisPoolRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_redis_registry() -> RedisPoolRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = RedisPoolRegistry()
+    return _registry
+
+
+def get_redis(name: str = "default") -> redis.Redis:
+    """Shared Redis client for a named pool (see POOLS)."""
+    return get_redis_registry().client(name)
+
+
+def configure_redis_pools(**kwargs: Any) -> RedisPoolRegistry:
+    """Replace the registry (e.g. tests: connection_class=fakeredis.FakeConnection)."""
+    global _registry
+    with _registry_lock:
+        if _registry is not None:
+            _registry.close()
+        _registry = RedisPoolRegistry(**kwargs)
+    return _registry
+
+
+def reset_redis_pools() -> None:
+    """Close all pools; the next get_redis() builds them from the environment again."""
+    global _registry
+    with _registry_lock:
+        if _registry is not None:
+            _registry.close()
+        _registry = None
+
+
+def _after_fork_in_child() -> None:
+    if _registry is not None:
+        _registry.reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
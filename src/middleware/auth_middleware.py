@@ -12,9 +12,10 @@ from flask import request, jsonify, g
 from datetime import datetime, timedelta
 from decimal import Decimal
 
-from src.models.api_key import ApiKey
+from src.models.api_key import ApiKey, VerifiedKeyContext
 from src.models.usage_event import UsageEvent
 from src.infra.db import db
+from src.services.request_timing import span, timed
 
 
 # Configuration from environment
@@ -37,6 +38,7 @@ def clean_rate_limit_cache():
         del _rate_limit_cache[k]
 
 
+@timed("rate_limit")
 def check_rate_limit(api_key_id: int, limit_per_min: int) -> tuple[bool, dict]:
     """
     Check if request is within rate limit.
@@ -93,7 +95,7 @@ def get_usage_today(api_key_id: int) -> Decimal:
     return total or Decimal('0')
 
 
-def check_budget(api_key: ApiKey) -> tuple[bool, bool, dict]:
+def check_budget(api_key: VerifiedKeyContext) -> tuple[bool, bool, dict]:
     """
     Check if API key is within budget.
     Returns (allowed: bool, soft_cap_exceeded: bool, headers: dict)
@@ -147,9 +149,10 @@ def require_api_key(f):
             }), 401
 
         # Authenticate API key
-        api_key_record = ApiKey.authenticate_api_key(api_key_header)
+        with span("auth"):
+            api_key_context = ApiKey.verify_api_key(api_key_header)
 
-        if not api_key_record:
+        if not api_key_context:
             return jsonify({
                 "error": "Invalid API key",
                 "message": "The provided API key is invalid or expired",
@@ -157,7 +160,7 @@ def require_api_key(f):
             }), 401
 
         # Check if key is active and valid
-        if not api_key_record.is_valid():
+        if not api_key_context.is_valid():
             return jsonify({
                 "error": "API key expired or disabled",
                 "message": "Your API key has expired or been disabled",
@@ -165,8 +168,8 @@ def require_api_key(f):
             }), 401
 
         # Check rate limit
-        rate_limit = api_key_record.requests_per_minute or DEFAULT_RATE_LIMIT
-        allowed, rate_headers = check_rate_limit(api_key_record.id, rate_limit)
+        rate_limit = api_key_context.requests_per_minute or DEFAULT_RATE_LIMIT
+        allowed, rate_headers = check_rate_limit(api_key_context.id, rate_limit)
 
         if not allowed:
             response = jsonify({
@@ -179,7 +182,7 @@ def require_api_key(f):
             return response, 429
 
         # Check budget
-        allowed, soft_cap_exceeded, budget_headers = check_budget(api_key_record)
+        allowed, soft_cap_exceeded, budget_headers = check_budget(api_key_context)
 
         if not allowed:
             response = jsonify({
@@ -191,9 +194,9 @@ def require_api_key(f):
                 response.headers[k] = v
             return response, 429
 
-        # Store API key in Flask's g object for use in route
-        g.api_key = api_key_record
-        g.api_key_id = api_key_record.id
+        # Store the verified key in Flask's g object; routes load the row on demand
+        g.api_key_context = api_key_context
+        g.api_key_id = api_key_context.id
         g.soft_cap_exceeded = soft_cap_exceeded
 
         # Call the actual route function
@@ -216,8 +219,11 @@ def require_api_key(f):
 
 
 def get_current_api_key() -> ApiKey | None:
-    """Get the current API key from Flask's g object"""
-    return getattr(g, 'api_key', None)
+    """Get the current API key row, loading it on first use in the request"""
+    if 'api_key' not in g:
+        context = g.get('api_key_context')
+        g.api_key = db.session.get(ApiKey, context.id) if context is not None else None
+    return g.api_key
 
 
 def get_current_api_key_id() -> int | None:
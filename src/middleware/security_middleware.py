@@ -11,6 +11,7 @@ import os
 
 from src.models.audit_log import AuditLog
 from src.infra.db import db
+from src.services.audit_sink import get_audit_sink
 
 logger = logging.getLogger(__name__)
 
@@ -57,7 +58,10 @@ def log_audit_event(
     user_agent=None
 ):
     """
-    Log an audit event to the database.
+    Log an audit event to the audit_logs table via the async audit sink.
+    
+    The API key (or 'anonymous') is recorded as the actor; the client IP and
+    user agent are stored in details.
     
     Args:
         event_type: Type of event (e.g., 'api_call', 'key_rotation', 'auth_failure')
@@ -69,23 +73,30 @@ def log_audit_event(
         user_agent: Client user agent
     """
     try:
-        audit_log = AuditLog(
-            event_type=event_type,
-            api_key_id=api_key_id,
+        ip_address = ip_address or request.remote_addr
+        row = AuditLog.build_row(
+            actor_id=api_key_id or 'anonymous',
+            action=event_type,
             resource_type=resource_type,
             resource_id=resource_id,
-            details=details,
-            ip_address=ip_address or request.remote_addr,
-            user_agent=user_agent or request.headers.get('User-Agent')
+            details={
+                **(details or {}),
+                'ip_address': ip_address,
+                'user_agent': user_agent or request.headers.get('User-Agent'),
+            },
         )
-        db.session.add(audit_log)
-        db.session.commit()
+        sink = get_audit_sink()
+        if sink is not None:
+            sink.submit(AuditLog, row)
+        else:
+            db.session.execute(AuditLog.__table__.insert(), [row])
+            db.session.commit()
         
         logger.info(f"Audit log created: {event_type}", extra={
             "event_type": event_type,
             "api_key_id": api_key_id,
             "resource_type": resource_type,
-            "ip_address": ip_address or request.remote_addr
+            "ip_address": ip_address
         })
     except Exception as e:
         logger.error(f"Failed to create audit log: {str(e)}", exc_info=True)
@@ -25,3 +25,6 @@ from .reviews import AgentReview, ReviewVote, AgentRatingSummary
 # Beta Program
 from .beta_application import BetaApplication
 from .usage_event import UsageEvent
+
+# SDK telemetry
+from .telemetry import TelemetryEvent, TelemetryRollupMinute
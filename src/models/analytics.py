@@ -172,6 +172,7 @@ class AgentTrendingScore(db.Model):
     trending_score = db.Column(db.Numeric(10, 4), default=0.0)  # Composite score
     velocity = db.Column(db.Numeric(10, 4), default=0.0)  # Rate of growth
     momentum = db.Column(db.Numeric(10, 4), default=0.0)  # Sustained growth
+    rank = db.Column(db.Integer, index=True)  # 1 = highest trending_score
     
     # Contributing factors
     recent_installs = db.Column(db.Integer, default=0)
@@ -194,6 +195,7 @@ class AgentTrendingScore(db.Model):
             'trending_score': float(self.trending_score) if self.trending_score else 0.0,
             'velocity': float(self.velocity) if self.velocity else 0.0,
             'momentum': float(self.momentum) if self.momentum else 0.0,
+            'rank': self.rank,
             'recent_installs': self.recent_installs,
             'recent_views': self.recent_views,
             'recent_reviews': self.recent_reviews,
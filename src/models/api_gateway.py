@@ -233,4 +233,30 @@ class ApiAuditLog(db.Model):
         )
         db.session.add(log)
         return log
+    
+    @classmethod
+    def build_row(cls, org_id, actor_type, actor_id, request_id, method, path,
+                  status, cost_units=0, ip=None, user_agent=None, auth_method='api_key',
+                  created_at=None):
+        """
+        Build a plain row for bulk insertion (same truncation as log_request).
+        
+        Raises:
+            ValueError: If org_id is not a UUID (the row could never be written)
+        """
+        return {
+            'id': uuid.uuid4(),
+            'org_id': org_id if isinstance(org_id, uuid.UUID) else uuid.UUID(str(org_id)),
+            'actor_type': actor_type,
+            'actor_id': actor_id,
+            'auth_method': auth_method or actor_type,
+            'request_id': request_id,
+            'method': method,
+            'path': path[:256],
+            'status': status,
+            'cost_units': cost_units,
+            'ip': ip,
+            'user_agent': user_agent[:256] if user_agent else None,
+            'created_at': created_at or datetime.utcnow(),
+        }
 
@@ -2,14 +2,29 @@
 """
 API Key model for secure per-org/per-agent authentication in Brikk infrastructure.
 Uses Fernet encryption for secure, reversible API key storage.
+
+Authentication does not decrypt stored secrets. Each key also carries an
+indexed keyed digest (HMAC-SHA256 of the secret under a server pepper), so a
+presented key resolves with a single indexed lookup. Verified lookups are kept
+in a small in-process LRU/TTL cache of VerifiedKeyContexts; a cache hit runs no
+query. Entries are invalidated whenever a flush changes a key's auth fields in
+this process (revoke, rotate, expiry, limits) and expire after
+BRIKK_API_KEY_CACHE_TTL seconds for changes made by other processes.
 """
 from __future__ import annotations
 
+import hashlib
+import hmac
 import os
 import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from decimal import Decimal
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Numeric, event, inspect
 from sqlalchemy.orm import relationship
 from cryptography.fernet import Fernet
 
@@ -24,6 +39,96 @@ def get_fernet():
     return Fernet(encryption_key.encode())
 
 
+def get_key_pepper() -> bytes:
+    """Get the server-side pepper used for API key digests.
+
+    Falls back to BRIKK_ENCRYPTION_KEY so existing deployments need no new secret.
+    """
+    pepper = os.environ.get("BRIKK_API_KEY_PEPPER") or os.environ.get("BRIKK_ENCRYPTION_KEY")
+    if not pepper:
+        raise ValueError("BRIKK_API_KEY_PEPPER or BRIKK_ENCRYPTION_KEY environment variable not set.")
+    return pepper.encode()
+
+
+def compute_key_digest(secret: str) -> str:
+    """Return the hex HMAC-SHA256 digest of an API key secret under the server pepper."""
+    return hmac.new(get_key_pepper(), secret.encode(), hashlib.sha256).hexdigest()
+
+
+@dataclass(frozen=True)
+class VerifiedKeyContext:
+    """Immutable snapshot of a verified API key, safe to share across requests."""
+    id: int
+    key_id: str
+    organization_id: int | None
+    agent_id: str | None
+    expires_at: datetime | None
+    scopes: str | None = None
+    is_active: bool = True
+    requests_per_minute: int | None = None
+    soft_cap_usd: Decimal | None = None
+    hard_cap_usd: Decimal | None = None
+
+    def is_valid(self) -> bool:
+        if not self.is_active:
+            return False
+        return not (self.expires_at and datetime.utcnow() > self.expires_at)
+
+
+class VerifiedKeyCache:
+    """Bounded, thread-safe LRU cache of verified key contexts with a TTL.
+
+    Entries are keyed by key digest, never by the plaintext secret.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 60.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, VerifiedKeyContext]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest: str) -> VerifiedKeyContext | None:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            stored_at, context = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return context
+
+    def put(self, digest: str, context: VerifiedKeyContext) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[digest] = (time.monotonic(), context)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, api_key_id: int) -> None:
+        """Drop every entry that resolves to the given ApiKey row."""
+        with self._lock:
+            stale = [d for d, (_, ctx) in self._entries.items() if ctx.id == api_key_id]
+            for digest in stale:
+                del self._entries[digest]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+verified_key_cache = VerifiedKeyCache(
+    max_size=int(os.environ.get("BRIKK_API_KEY_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.environ.get("BRIKK_API_KEY_CACHE_TTL", "60")),
+)
+
+
 class ApiKey(db.Model):
     """API Key model for secure authentication with Fernet encryption."""
     __tablename__ = "api_keys"
@@ -58,6 +163,8 @@ class ApiKey(db.Model):
 
     # Secret storage - Fernet encrypted
     api_key_encrypted = Column(Text, nullable=False)
+    # Keyed digest of the secret for indexed lookup (HMAC-SHA256 under pepper)
+    key_digest = Column(String(64), unique=True, nullable=True, index=True)
 
     # Metadata
     name = Column(String(255), nullable=False)
@@ -123,6 +230,7 @@ class ApiKey(db.Model):
             organization_id=organization_id,
             agent_id=agent_id,
             api_key_encrypted=api_key_encrypted,
+            key_digest=compute_key_digest(api_key),
             name=name,
             description=description,
             expires_at=expires_at,
@@ -141,9 +249,11 @@ class ApiKey(db.Model):
         fernet = get_fernet()
         new_secret = f"brikk_{secrets.token_urlsafe(32)}"
         self.api_key_encrypted = fernet.encrypt(new_secret.encode()).decode()
+        self.key_digest = compute_key_digest(new_secret)
         self.updated_at = datetime.utcnow()
         db.session.add(self)
         db.session.commit()
+        verified_key_cache.invalidate(self.id)
         return new_secret
 
     def is_valid(self) -> bool:
@@ -163,6 +273,7 @@ class ApiKey(db.Model):
         self.is_active = False
         self.updated_at = datetime.utcnow()
         db.session.commit()
+        verified_key_cache.invalidate(self.id)
 
     def get_success_rate(self) -> float:
         if self.total_requests == 0:
@@ -212,17 +323,120 @@ class ApiKey(db.Model):
             q = q.filter_by(is_active=True)
         return q.all()
 
+    def to_context(self) -> VerifiedKeyContext:
+        return VerifiedKeyContext(
+            id=self.id,
+            key_id=self.key_id,
+            organization_id=self.organization_id,
+            agent_id=self.agent_id,
+            expires_at=self.expires_at,
+            scopes=self.scopes,
+            is_active=self.is_active,
+            requests_per_minute=self.requests_per_minute,
+            soft_cap_usd=self.soft_cap_usd,
+            hard_cap_usd=self.hard_cap_usd,
+        )
+
+    @classmethod
+    def verify_api_key(cls, provided_api_key: str) -> VerifiedKeyContext | None:
+        """Verify an API key and return its VerifiedKeyContext if valid.
+
+        Resolution order: verified-key cache (no query), indexed digest lookup,
+        then a decrypting scan of legacy rows that have no digest yet. Legacy
+        rows are backfilled on first successful match.
+        """
+        if not provided_api_key:
+            return None
+        try:
+            digest = compute_key_digest(provided_api_key)
+        except ValueError:
+            return None
+
+        context = verified_key_cache.get(digest)
+        if context is not None:
+            if context.is_valid():
+                return context
+            verified_key_cache.invalidate(context.id)
+            return None
+
+        record = cls.query.filter_by(key_digest=digest, is_active=True).first()
+        if record is None:
+            record = cls._authenticate_legacy(provided_api_key, digest)
+        if record is None or not record.is_valid():
+            return None
+
+        context = record.to_context()
+        verified_key_cache.put(digest, context)
+        return context
+
     @classmethod
     def authenticate_api_key(cls, provided_api_key: str) -> "ApiKey | None":
-        """Authenticate an API key and return the ApiKey record if valid."""
-        active_keys = cls.query.filter_by(is_active=True).all()
-        for api_key_record in active_keys:
+        """Authenticate an API key and return the ApiKey record if valid.
+
+        For callers that update the row; read-only callers should use
+        verify_api_key(), which answers cache hits without a query.
+        """
+        context = cls.verify_api_key(provided_api_key)
+        if context is None:
+            return None
+        return db.session.get(cls, context.id)
+
+    @classmethod
+    def _authenticate_legacy(cls, provided_api_key: str, digest: str) -> "ApiKey | None":
+        """Fallback for keys created before key_digest existed (not yet backfilled)."""
+        legacy_keys = cls.query.filter(
+            cls.is_active.is_(True),
+            cls.key_digest.is_(None),
+        ).all()
+        for api_key_record in legacy_keys:
             try:
                 decrypted_secret = api_key_record.decrypt_secret()
-                if secrets.compare_digest(
-                        provided_api_key,
-                        decrypted_secret) and api_key_record.is_valid():
-                    return api_key_record
             except Exception:
                 continue
+            if secrets.compare_digest(provided_api_key, decrypted_secret):
+                api_key_record.key_digest = digest
+                db.session.commit()
+                return api_key_record
         return None
+
+    @classmethod
+    def backfill_key_digests(cls, batch_size: int = 500) -> int:
+        """Compute key_digest for every row missing one. Returns rows updated."""
+        updated = 0
+        last_id = 0
+        while True:
+            batch = (
+                cls.query.filter(cls.key_digest.is_(None), cls.id > last_id)
+                .order_by(cls.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                return updated
+            for api_key_record in batch:
+                last_id = api_key_record.id
+                try:
+                    api_key_record.key_digest = compute_key_digest(api_key_record.decrypt_secret())
+                    updated += 1
+                except Exception:
+                    continue
+            db.session.commit()
+
+
+# Columns copied into VerifiedKeyContext; changing any of them drops cached entries
+_CONTEXT_COLUMNS = (
+    "key_id", "key_digest", "organization_id", "agent_id", "expires_at", "scopes",
+    "is_active", "requests_per_minute", "soft_cap_usd", "hard_cap_usd",
+)
+
+
+@event.listens_for(ApiKey, "after_update")
+def _invalidate_changed_key(mapper, connection, target):
+    attrs = inspect(target).attrs
+    if any(attrs[name].history.has_changes() for name in _CONTEXT_COLUMNS):
+        verified_key_cache.invalidate(target.id)
+
+
+@event.listens_for(ApiKey, "after_delete")
+def _invalidate_deleted_key(mapper, connection, target):
+    verified_key_cache.invalidate(target.id)
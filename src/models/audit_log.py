@@ -8,7 +8,6 @@ from sqlalchemy import Column, String, DateTime
 # generic JSON that works on SQLite & Postgres
 from sqlalchemy.types import JSON as SA_JSON
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy import Text
 from src.infra.db import db
 
 
@@ -34,8 +33,8 @@ class AuditLog(db.Model):
     # UUID of the resource
     resource_id = Column(String(36), nullable=True)
 
-    # Metadata - use JSONB for PostgreSQL, fallback to Text for SQLite
-    details = Column(JSONB().with_variant(Text, "sqlite"), nullable=True)
+    # Metadata - use JSONB for PostgreSQL, fallback to JSON (TEXT storage) for SQLite
+    details = Column(JSONB().with_variant(SA_JSON, "sqlite"), nullable=True)
 
     # Timestamp with timezone
     created_at = Column(
@@ -52,6 +51,21 @@ class AuditLog(db.Model):
             if hasattr(self, key):
                 setattr(self, key, value)
 
+    @classmethod
+    def build_row(cls, actor_id: str, action: str, resource_type: Optional[str] = None,
+                  resource_id: Optional[str] = None, details: Optional[Dict[str, Any]] = None,
+                  created_at: Optional[datetime] = None) -> Dict[str, Any]:
+        """Build a plain row for bulk insertion."""
+        return {
+            "id": str(uuid.uuid4()),
+            "actor_id": actor_id,
+            "action": action,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "details": details,
+            "created_at": created_at or datetime.now(timezone.utc),
+        }
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "id": self.id,
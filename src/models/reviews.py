@@ -9,8 +9,13 @@ from datetime import datetime, timezone
 from typing import Optional, Dict, Any
 from decimal import Decimal
 
+from sqlalchemy import bindparam, case, func, update
+from sqlalchemy.exc import IntegrityError
+
 from src.infra.db import db
 
+RATING_BUCKETS = (1, 2, 3, 4, 5)
+
 
 class AgentReview(db.Model):
     """
@@ -168,6 +173,11 @@ class AgentRatingSummary(db.Model):
     """
     Aggregated rating summary for agents
     Pre-computed for performance
+
+    Maintained incrementally: each review write applies its delta with one
+    atomic UPDATE (apply_review_change) in the same transaction, so writes
+    cost O(1) regardless of how many reviews the agent has. reconcile()
+    periodically recounts everything with a single GROUP BY and repairs drift.
     """
     __tablename__ = 'agent_rating_summary'
     
@@ -175,6 +185,7 @@ class AgentRatingSummary(db.Model):
     
     # Aggregate metrics
     total_reviews = db.Column(db.Integer, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     average_rating = db.Column(db.Numeric(3, 2), default=0.0)
     
     # Rating distribution
@@ -205,40 +216,164 @@ class AgentRatingSummary(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
     
+    @staticmethod
+    def _bucket(rating: int) -> str:
+        if rating not in RATING_BUCKETS:
+            raise ValueError(f"rating must be 1-5, got {rating!r}")
+        return f'rating_{rating}_count'
+    
+    @staticmethod
+    def _counts(total: int, rating_sum: int, buckets) -> Dict[str, Any]:
+        """Column values for a summary from its counts."""
+        values = {
+            'total_reviews': total,
+            'rating_sum': rating_sum,
+            'average_rating': (Decimal(rating_sum) / Decimal(total)).quantize(Decimal('0.01')) if total else Decimal('0.00'),
+        }
+        for rating, count in zip(RATING_BUCKETS, buckets):
+            values[f'rating_{rating}_count'] = count
+        return values
+    
+    @staticmethod
+    def _recount(agent_id: Optional[str] = None):
+        """One GROUP BY over agent_reviews: (agent_id, count, sum, bucket counts...)."""
+        query = db.session.query(
+            AgentReview.agent_id,
+            func.count(AgentReview.id),
+            func.coalesce(func.sum(AgentReview.rating), 0),
+            *[func.sum(case((AgentReview.rating == rating, 1), else_=0)) for rating in RATING_BUCKETS],
+        )
+        if agent_id is not None:
+            query = query.filter(AgentReview.agent_id == agent_id)
+        return query.group_by(AgentReview.agent_id).all()
+    
+    @classmethod
+    def apply_review_change(cls, agent_id: str,
+                            old_rating: Optional[int] = None,
+                            new_rating: Optional[int] = None) -> None:
+        """
+        Apply one review write to the summary: insert (new_rating only),
+        delete (old_rating only) or rating change (both).
+
+        Issues a single UPDATE with relative increments, so concurrent
+        writers never lose each other's changes. Does not commit: call it in
+        the transaction that writes the review.
+        """
+        if old_rating == new_rating:
+            return
+        count_delta = (new_rating is not None) - (old_rating is not None)
+        sum_delta = (new_rating or 0) - (old_rating or 0)
+        total = cls.total_reviews + count_delta
+        rating_sum = cls.rating_sum + sum_delta
+        values = {
+            'total_reviews': total,
+            'rating_sum': rating_sum,
+            # Every SET expression sees the pre-update row
+            'average_rating': case((total > 0, rating_sum * 1.0 / total), else_=0),
+            'updated_at': datetime.now(timezone.utc),
+        }
+        if new_rating is not None:
+            column = cls._bucket(new_rating)
+            values[column] = getattr(cls, column) + 1
+        if old_rating is not None:
+            column = cls._bucket(old_rating)
+            values[column] = getattr(cls, column) - 1
+        
+        stmt = update(cls).where(cls.agent_id == agent_id).values(values).execution_options(
+            synchronize_session=False)
+        if db.session.execute(stmt).rowcount:
+            return
+        
+        # No summary yet (first review, or lost): build it from a recount,
+        # which already includes this transaction's review write
+        rows = cls._recount(agent_id)
+        values = cls._counts(*rows[0][1:3], rows[0][3:]) if rows else cls._counts(0, 0, [0] * 5)
+        try:
+            with db.session.begin_nested():
+                db.session.add(cls(agent_id=agent_id, **values))
+        except IntegrityError:
+            # A concurrent first review created it: apply our delta on top
+            db.session.execute(stmt)
+    
     def recalculate(self):
         """
         Recalculate rating summary from all reviews
-        Should be called after review changes
+        Repairs a single summary; prefer reconcile() for bulk repair
         """
-        from sqlalchemy import func
+        rows = self._recount(self.agent_id)
+        values = self._counts(*rows[0][1:3], rows[0][3:]) if rows else self._counts(0, 0, [0] * 5)
+        for column, value in values.items():
+            setattr(self, column, value)
         
-        # Get all reviews for this agent
-        reviews = db.session.query(AgentReview).filter_by(agent_id=self.agent_id).all()
+        self.updated_at = datetime.now(timezone.utc)
+        db.session.commit()
+    
+    @classmethod
+    def reconcile(cls) -> Dict[str, int]:
+        """
+        Recount all summaries with one GROUP BY and repair those that drifted.
+
+        Summaries are read before the recount, and each repair only applies
+        if the row still holds the counts that were read, so a review written
+        while this runs is never overwritten (any drift it causes is picked up
+        on the next run). Does not commit.
+
+        Returns:
+            dict: checked, drifted, created and repaired counts
+        """
+        columns = ['total_reviews', 'rating_sum'] + [f'rating_{r}_count' for r in RATING_BUCKETS]
+        current = {
+            row[0]: tuple(v or 0 for v in row[1:])
+            for row in db.session.query(cls.agent_id, *[getattr(cls, c) for c in columns])
+        }
+        expected = {
+            agent_id: (count, rating_sum, *buckets)
+            for agent_id, count, rating_sum, *buckets in cls._recount()
+        }
+        for agent_id in current.keys() - expected.keys():
+            expected[agent_id] = (0,) * len(columns)
         
-        # Calculate totals
-        self.total_reviews = len(reviews)
+        updates, inserts = [], []
+        for agent_id, counts in expected.items():
+            seen = current.get(agent_id)
+            if seen == counts:
+                continue
+            values = cls._counts(counts[0], counts[1], counts[2:])
+            if seen is None:
+                inserts.append({'agent_id': agent_id, **values})
+            else:
+                updates.append({
+                    'b_agent_id': agent_id, 'b_total': seen[0], 'b_sum': seen[1],
+                    **{f'v_{column}': value for column, value in values.items()},
+                })
         
-        if self.total_reviews == 0:
-            self.average_rating = 0.0
-            self.rating_1_count = 0
-            self.rating_2_count = 0
-            self.rating_3_count = 0
-            self.rating_4_count = 0
-            self.rating_5_count = 0
-        else:
-            # Calculate average
-            total_rating = sum(review.rating for review in reviews)
-            self.average_rating = Decimal(total_rating) / Decimal(self.total_reviews)
-            
-            # Calculate distribution
-            self.rating_1_count = sum(1 for r in reviews if r.rating == 1)
-            self.rating_2_count = sum(1 for r in reviews if r.rating == 2)
-            self.rating_3_count = sum(1 for r in reviews if r.rating == 3)
-            self.rating_4_count = sum(1 for r in reviews if r.rating == 4)
-            self.rating_5_count = sum(1 for r in reviews if r.rating == 5)
+        repaired = 0
+        if updates:
+            table = cls.__table__
+            stmt = update(table).where(
+                table.c.agent_id == bindparam('b_agent_id'),
+                func.coalesce(table.c.total_reviews, 0) == bindparam('b_total'),
+                table.c.rating_sum == bindparam('b_sum'),
+            ).values(updated_at=datetime.now(timezone.utc), **{
+                column: bindparam(f'v_{column}') for column in cls._counts(0, 0, [0] * 5)
+            })
+            result = db.session.execute(stmt, updates)
+            repaired = max(result.rowcount, 0)
+        created = 0
+        for values in inserts:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(cls(**values))
+                created += 1
+            except IntegrityError:
+                pass  # created by a concurrent review write
         
-        self.updated_at = datetime.now(timezone.utc)
-        db.session.commit()
+        return {
+            'checked': len(expected),
+            'drifted': len(updates) + len(inserts),
+            'created': created,
+            'repaired': repaired,
+        }
     
     @staticmethod
     def get_or_create(agent_id: str) -> AgentRatingSummary:
@@ -249,4 +384,3 @@ class AgentRatingSummary(db.Model):
             db.session.add(summary)
             db.session.commit()
         return summary
-
@@ -0,0 +1,164 @@
+"""
+SDK telemetry models
+Raw telemetry events plus per-minute rollups written by the telemetry
+ingestion pipeline (src/services/telemetry_pipeline.py)
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from src.infra.db import db
+from src.models.agent import JSONDict
+
+# Upper bounds (ms) of the rollup latency histogram; counts are cumulative
+# like Prometheus `le` buckets, the last bucket (+Inf) is duration_count
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+LATENCY_COLUMNS = tuple(f'latency_le_{bound}ms' for bound in LATENCY_BUCKETS_MS)
+
+# Columns written by bulk_insert (order matters for COPY)
+BULK_COLUMNS = (
+    'occurred_at', 'received_at', 'event_type', 'sdk_name', 'sdk_version', 'sdk_language',
+    'platform', 'endpoint', 'method', 'status_code', 'duration_ms', 'error', 'sample_rate',
+    'event_metadata',
+)
+
+# Additive counters merged into an existing rollup row
+ROLLUP_COUNTERS = ('event_count', 'error_count', 'duration_count', 'duration_sum_ms') + LATENCY_COLUMNS
+
+
+class TelemetryEvent(db.Model):
+    """
+    Individual SDK telemetry event
+    Append-only, high-volume table; rows are inserted in batches ordered by
+    (event_type, sdk_version, occurred_at) so neighbouring rows share values
+    """
+    __tablename__ = 'telemetry_events'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    occurred_at = db.Column(db.DateTime, nullable=False)
+    received_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    # Dimensions
+    event_type = db.Column(db.String(50), nullable=False)
+    sdk_name = db.Column(db.String(100))
+    sdk_version = db.Column(db.String(50), nullable=False)
+    sdk_language = db.Column(db.String(50), nullable=False)
+    platform = db.Column(db.String(50))
+
+    # Call details
+    endpoint = db.Column(db.String(255))
+    method = db.Column(db.String(10))
+    status_code = db.Column(db.Integer)
+    duration_ms = db.Column(db.Float)
+    error = db.Column(db.Text)
+
+    # 1.0 unless the event was admitted while load shedding
+    sample_rate = db.Column(db.Float, nullable=False, default=1.0)
+    event_metadata = db.Column(JSONDict)
+
+    __table_args__ = (
+        db.Index('ix_telemetry_events_occurred_at', 'occurred_at'),
+        db.Index('ix_telemetry_events_type_version', 'event_type', 'sdk_version'),
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert event to dictionary"""
+        return {
+            'id': self.id,
+            'occurred_at': self.occurred_at.isoformat() if self.occurred_at else None,
+            'received_at': self.received_at.isoformat() if self.received_at else None,
+            'event_type': self.event_type,
+            'sdk_name': self.sdk_name,
+            'sdk_version': self.sdk_version,
+            'sdk_language': self.sdk_language,
+            'platform': self.platform,
+            'endpoint': self.endpoint,
+            'method': self.method,
+            'status_code': self.status_code,
+            'duration_ms': self.duration_ms,
+            'error': self.error,
+            'sample_rate': self.sample_rate,
+            'metadata': self.event_metadata or {},
+        }
+
+    @classmethod
+    def bulk_insert(cls, rows: List[Dict[str, Any]]) -> int:
+        """
+        Insert many events in one round trip. Does not commit.
+
+        Uses COPY on Postgres (psycopg 3) and executemany elsewhere.
+        """
+        if not rows:
+            return 0
+
+        bind = db.session.connection()
+        if bind.dialect.name == 'postgresql' and bind.dialect.driver == 'psycopg':
+            columns = list(BULK_COLUMNS)
+            metadata_type = cls.__table__.c.event_metadata.type
+            with bind.connection.dbapi_connection.cursor() as cursor:
+                with cursor.copy(
+                    f"COPY {cls.__tablename__} ({', '.join(columns)}) FROM STDIN"
+                ) as copy:
+                    for row in rows:
+                        copy.write_row(tuple(
+                            metadata_type.process_bind_param(row[c], bind.dialect)
+                            if c == 'event_metadata' else row[c]
+                            for c in columns))
+        else:
+            db.session.execute(cls.__table__.insert(), rows)
+        return len(rows)
+
+
+class TelemetryRollupMinute(db.Model):
+    """
+    Per-minute telemetry aggregates by SDK language, version and event type
+    Counts include every received event, including ones shed from raw storage
+    """
+    __tablename__ = 'telemetry_rollups_minute'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    sdk_language = db.Column(db.String(50), nullable=False)
+    sdk_version = db.Column(db.String(50), nullable=False)
+    event_type = db.Column(db.String(50), nullable=False)
+
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    duration_count = db.Column(db.Integer, nullable=False, default=0)
+    duration_sum_ms = db.Column(db.Float, nullable=False, default=0.0)
+
+    # Latency histogram (cumulative, see LATENCY_BUCKETS_MS)
+    latency_le_10ms = db.Column(db.Integer, nullable=False, default=0)
+    latency_le_25ms = db.Column(db.Integer, nullable=False, default=0)
+    latency_le_50ms = db.Column(db.Integer, nullable=False, default=0)
+    latency_le_100ms = db.Column(db.Integer, nullable=False, default=0)
+    latency_le_250ms = db.Column(db.Integer, nullable=False, default=0)
+    latency_le_500ms = db.Column(db.Integer, nullable=False, default=0)
+    latency_le_1000ms = db.Column(db.Integer, nullable=False, default=0)
+    latency_le_2500ms = db.Column(db.Integer, nullable=False, default=0)
+    latency_le_5000ms = db.Column(db.Integer, nullable=False, default=0)
+    latency_le_10000ms = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        db.UniqueConstraint('bucket_start', 'sdk_language', 'sdk_version', 'event_type',
+                            name='uq_telemetry_rollup_minute'),
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert rollup to dictionary"""
+        return {
+            'bucket_start': self.bucket_start.isoformat() if self.bucket_start else None,
+            'sdk_language': self.sdk_language,
+            'sdk_version': self.sdk_version,
+            'event_type': self.event_type,
+            'event_count': self.event_count,
+            'error_count': self.error_count,
+            'avg_duration_ms': (self.duration_sum_ms / self.duration_count) if self.duration_count else None,
+            'latency_histogram': {
+                **{str(bound): getattr(self, name) for bound, name in zip(LATENCY_BUCKETS_MS, LATENCY_COLUMNS)},
+                '+Inf': self.duration_count,
+            },
+        }
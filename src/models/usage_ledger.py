@@ -14,6 +14,13 @@ from sqlalchemy.orm import relationship
 from src.infra.db import db
 
 
+# Columns written by bulk_insert (order matters for COPY)
+BULK_COLUMNS = (
+    'id', 'org_id', 'actor_id', 'agent_id', 'route',
+    'usage_units', 'unit_cost', 'total_cost', 'created_at',
+)
+
+
 class UsageLedger(db.Model):
     """
     Usage Ledger for metered billing.
@@ -27,11 +34,11 @@ class UsageLedger(db.Model):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     
     # Organization and Actor
-    org_id = Column(Integer, ForeignKey('organizations.id', ondelete='CASCADE'), nullable=False, index=True)
+    org_id = Column(Integer, ForeignKey('organizations.id', ondelete='CASCADE'), nullable=False)
     actor_id = Column(Text, nullable=False)  # API key or OAuth client ID
     
     # Optional Agent Reference
-    agent_id = Column(String(36), ForeignKey('agents.id', ondelete='SET NULL'), nullable=True, index=True)
+    agent_id = Column(String(36), ForeignKey('agents.id', ondelete='SET NULL'), nullable=True)
     
     # Usage Details
     route = Column(Text, nullable=False)
@@ -113,6 +120,64 @@ class UsageLedger(db.Model):
         
         return entry
     
+    @classmethod
+    def build_row(cls,
+                  org_id: int,
+                  actor_id: str,
+                  route: str,
+                  unit_cost: Decimal,
+                  usage_units: int = 1,
+                  agent_id: Optional[str] = None,
+                  created_at: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Build a plain row for bulk insertion (same cost calculation as record_usage).
+        
+        Returns:
+            Column -> value mapping suitable for bulk_insert
+        """
+        return {
+            'id': uuid.uuid4(),
+            'org_id': org_id,
+            'actor_id': actor_id,
+            'agent_id': agent_id,
+            'route': route,
+            'usage_units': usage_units,
+            'unit_cost': unit_cost,
+            'total_cost': Decimal(str(usage_units)) * unit_cost,
+            'created_at': created_at or datetime.utcnow(),
+        }
+    
+    @classmethod
+    def bulk_insert(cls, rows: List[Dict[str, Any]]) -> int:
+        """
+        Insert many ledger rows in one round trip and commit.
+        
+        Uses COPY on Postgres (psycopg 3) and executemany elsewhere.
+        
+        Args:
+            rows: Rows produced by build_row
+            
+        Returns:
+            Number of rows written
+        """
+        if not rows:
+            return 0
+        
+        bind = db.session.connection()
+        if bind.dialect.name == 'postgresql' and bind.dialect.driver == 'psycopg':
+            columns = list(BULK_COLUMNS)
+            with bind.connection.dbapi_connection.cursor() as cursor:
+                with cursor.copy(
+                    f"COPY {cls.__tablename__} ({', '.join(columns)}) FROM STDIN"
+                ) as copy:
+                    for row in rows:
+                        copy.write_row(tuple(row[c] for c in columns))
+        else:
+            db.session.execute(cls.__table__.insert(), rows)
+        
+        db.session.commit()
+        return len(rows)
+    
     @classmethod
     def get_unbilled(cls, org_id: Optional[int] = None, 
                      start_date: Optional[datetime] = None,
@@ -6,7 +6,7 @@ from flask import Blueprint, request, jsonify
 from typing import Optional
 
 from src.services.discovery import DiscoveryService
-from src.utils.feature_flags import FeatureFlagManager, FeatureFlag
+from src.utils.feature_flags import FeatureFlag, current_org_id, is_enabled
 from src.infra.log import get_logger
 
 logger = get_logger(__name__)
@@ -19,8 +19,7 @@ agent_discovery_bp = Blueprint('agent_discovery', __name__, url_prefix='/api/v1/
 
 def check_discovery_enabled():
     """Check if discovery feature is enabled"""
-    feature_flags = FeatureFlagManager()
-    if not feature_flags.is_enabled(FeatureFlag.ENHANCED_DISCOVERY):
+    if not is_enabled(FeatureFlag.ENHANCED_DISCOVERY, org_id=current_org_id()):
         return jsonify({'error': 'discovery_disabled', 'message': 'Discovery feature is not enabled'}), 503
     return None
 
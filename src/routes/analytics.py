@@ -2,10 +2,13 @@
 Analytics routes for Phase 7
 Handles agent usage tracking, metrics, and dashboards
 """
+import json
+import os
+import uuid
 from flask import Blueprint, request, jsonify
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timezone, timedelta, date
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, select, update
 
 from src.database import db
 from src.models.analytics import (
@@ -16,12 +19,20 @@ from src.models.analytics import (
 )
 from src.models.marketplace import MarketplaceListing, AgentInstallation
 from src.models.agent import Agent
-from src.utils.feature_flags import FeatureFlagManager, FeatureFlag
+from src.utils.feature_flags import FeatureFlag, current_org_id, is_enabled
+from src.services.analytics_aggregation import DailyAnalyticsAggregator
 from src.infra.log import get_logger
 
 logger = get_logger(__name__)
 analytics_bp = Blueprint('analytics', __name__, url_prefix='/api/v1/analytics')
 
+MAX_BATCH_EVENTS = int(os.getenv('BRIKK_ANALYTICS_BATCH_MAX', '1000'))
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+
+class BatchTooLarge(Exception):
+    """More than MAX_BATCH_EVENTS events in one request."""
+
 
 # =============================================================================
 # HELPER FUNCTIONS
@@ -29,8 +40,7 @@ analytics_bp = Blueprint('analytics', __name__, url_prefix='/api/v1/analytics')
 
 def check_analytics_enabled():
     """Check if analytics feature is enabled"""
-    feature_flags = FeatureFlagManager()
-    if not feature_flags.is_enabled(FeatureFlag.AGENT_ANALYTICS):
+    if not is_enabled(FeatureFlag.AGENT_ANALYTICS, org_id=current_org_id()):
         return jsonify({'error': 'analytics_disabled', 'message': 'Analytics feature is not enabled'}), 503
     return None
 
@@ -114,6 +124,192 @@ def track_usage_event():
         return jsonify({'error': 'internal_error', 'message': str(e)}), 500
 
 
+def _iter_lines(stream, chunk_size: int = 64 * 1024):
+    """Yield lines from a binary stream read in large chunks."""
+    pending = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def _read_event_batch() -> List[Any]:
+    """
+    Parse a JSON array ({"events": [...]} also accepted) or an NDJSON body.
+
+    NDJSON is read line by line and rejected as soon as it exceeds
+    MAX_BATCH_EVENTS, without buffering the rest of the body.
+
+    Raises:
+        ValueError: malformed body
+        BatchTooLarge: more than MAX_BATCH_EVENTS events
+    """
+    if request.mimetype in NDJSON_TYPES:
+        events = []
+        for number, line in enumerate(_iter_lines(request.stream), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if len(events) >= MAX_BATCH_EVENTS:
+                raise BatchTooLarge()
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                raise ValueError(f'line {number} is not valid JSON')
+        return events
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('events')
+    if not isinstance(data, list):
+        raise ValueError('body must be a JSON array of events or NDJSON')
+    if len(data) > MAX_BATCH_EVENTS:
+        raise BatchTooLarge()
+    return data
+
+
+def _validate_event(item: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Check one batch item; returns (event fields, None) or (None, error message)."""
+    if not isinstance(item, dict):
+        return None, 'event must be an object'
+    agent_id = item.get('agent_id')
+    if not agent_id or not isinstance(agent_id, str):
+        return None, 'agent_id is required'
+    event_type = item.get('event_type')
+    if not event_type or not isinstance(event_type, str):
+        return None, 'event_type is required'
+    if len(event_type) > 50:
+        return None, 'event_type must be at most 50 characters'
+    duration_ms = item.get('duration_ms')
+    if duration_ms is not None and (isinstance(duration_ms, bool) or not isinstance(duration_ms, int)
+                                    or duration_ms < 0):
+        return None, 'duration_ms must be a non-negative integer'
+    success = item.get('success', True)
+    if success is not None and not isinstance(success, bool):
+        return None, 'success must be a boolean'
+    error_message = item.get('error_message')
+    if error_message is not None and not isinstance(error_message, str):
+        return None, 'error_message must be a string'
+    metadata = item.get('metadata', {})
+    if metadata is not None and not isinstance(metadata, dict):
+        return None, 'metadata must be an object'
+    
+    created_at = None
+    if item.get('timestamp') is not None:
+        try:
+            created_at = datetime.fromisoformat(str(item['timestamp']).replace('Z', '+00:00'))
+        except ValueError:
+            return None, 'timestamp must be an ISO 8601 datetime'
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+    
+    return {
+        'agent_id': agent_id,
+        'event_type': event_type,
+        'duration_ms': duration_ms,
+        'success': success,
+        'error_message': error_message,
+        'event_metadata': metadata or {},
+        'created_at': created_at,
+    }, None
+
+
+@analytics_bp.route('/events/batch', methods=['POST'])
+def track_usage_events_batch():
+    """
+    Track many agent usage events in one request
+    
+    Request Body (application/json): array of events, or {"events": [...]}
+    Request Body (application/x-ndjson): one event per line
+    
+    Each event has the fields accepted by POST /events, plus an optional
+    ISO 8601 timestamp (defaults to now). At most BRIKK_ANALYTICS_BATCH_MAX
+    events per request.
+    
+    Valid events are written with one bulk insert, and installation
+    last_used_at is updated once per installation. Invalid events are
+    reported per item and do not fail the batch.
+    
+    Returns 201 (all accepted), 207 (some rejected) or 400 (none accepted),
+    with results[i] = {index, status: accepted|rejected, event_id | error, message}.
+    """
+    # Check if analytics is enabled
+    error_response = check_analytics_enabled()
+    if error_response:
+        return error_response
+    
+    try:
+        items = _read_event_batch()
+    except BatchTooLarge:
+        return jsonify({
+            'error': 'batch_too_large',
+            'message': f'At most {MAX_BATCH_EVENTS} events per batch',
+            'max_events': MAX_BATCH_EVENTS,
+        }), 413
+    except ValueError as e:
+        return jsonify({'error': 'validation_error', 'message': str(e)}), 400
+    
+    try:
+        user_id = get_current_user_id()
+        results: List[Dict[str, Any]] = []
+        events: List[Tuple[int, Dict[str, Any]]] = []
+        for index, item in enumerate(items):
+            event, error = _validate_event(item)
+            if error:
+                results.append({'index': index, 'status': 'rejected',
+                                'error': 'validation_error', 'message': error})
+            else:
+                results.append(None)
+                events.append((index, event))
+        
+        # Validate agent ids for the whole batch with one query
+        agent_ids = {event['agent_id'] for _, event in events}
+        known = set(db.session.scalars(select(Agent.id).where(Agent.id.in_(agent_ids)))) if agent_ids else set()
+        
+        now = datetime.now(timezone.utc)
+        rows = []
+        for index, event in events:
+            if event['agent_id'] not in known:
+                results[index] = {'index': index, 'status': 'rejected',
+                                  'error': 'unknown_agent', 'message': 'agent_id does not exist'}
+                continue
+            row = {**event, 'id': str(uuid.uuid4()), 'user_id': user_id,
+                   'created_at': event['created_at'] or now}
+            rows.append(row)
+            results[index] = {'index': index, 'status': 'accepted', 'event_id': row['id']}
+        
+        if rows:
+            db.session.execute(AgentUsageEvent.__table__.insert(), rows)
+            
+            # One last_used_at update covering every installation in the batch
+            if user_id:
+                db.session.execute(
+                    update(AgentInstallation)
+                    .where(AgentInstallation.user_id == user_id,
+                           AgentInstallation.agent_id.in_(sorted({r['agent_id'] for r in rows})),
+                           AgentInstallation.uninstalled_at.is_(None))
+                    .values(last_used_at=now)
+                    .execution_options(synchronize_session=False))
+            db.session.commit()
+        
+        accepted = len(rows)
+        rejected = len(results) - accepted
+        logger.info(f"Usage event batch tracked: accepted={accepted}, rejected={rejected}")
+        
+        status = 201 if not rejected else (207 if accepted else 400)
+        return jsonify({'accepted': accepted, 'rejected': rejected, 'results': results}), status
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error tracking usage event batch: {str(e)}")
+        return jsonify({'error': 'internal_error', 'message': str(e)}), 500
+
+
 # =============================================================================
 # AGENT ANALYTICS ENDPOINTS
 # =============================================================================
@@ -499,84 +695,8 @@ def aggregate_daily_analytics():
         
         agent_id = data.get('agent_id')
         
-        # Build query for usage events
-        start_datetime = datetime.combine(target_date, datetime.min.time())
-        end_datetime = datetime.combine(target_date, datetime.max.time())
-        
-        query = AgentUsageEvent.query.filter(
-            AgentUsageEvent.created_at >= start_datetime,
-            AgentUsageEvent.created_at <= end_datetime
-        )
-        
-        if agent_id:
-            query = query.filter_by(agent_id=agent_id)
-        
-        # Get all events for the day
-        events = query.all()
-        
-        # Group by agent
-        agent_events = {}
-        for event in events:
-            if event.agent_id not in agent_events:
-                agent_events[event.agent_id] = []
-            agent_events[event.agent_id].append(event)
-        
-        # Aggregate for each agent
-        aggregated_count = 0
-        for agent_id, agent_event_list in agent_events.items():
-            # Calculate metrics
-            invocation_count = len(agent_event_list)
-            unique_users = len(set(e.user_id for e in agent_event_list if e.user_id))
-            success_count = sum(1 for e in agent_event_list if e.success)
-            error_count = sum(1 for e in agent_event_list if not e.success)
-            
-            # Calculate duration metrics
-            durations = [e.duration_ms for e in agent_event_list if e.duration_ms is not None]
-            if durations:
-                durations.sort()
-                avg_duration = sum(durations) / len(durations)
-                p50_duration = durations[len(durations) // 2]
-                p95_duration = durations[int(len(durations) * 0.95)]
-                p99_duration = durations[int(len(durations) * 0.99)]
-            else:
-                avg_duration = None
-                p50_duration = None
-                p95_duration = None
-                p99_duration = None
-            
-            # Check if analytics record exists
-            analytics = AgentAnalyticsDaily.query.filter_by(
-                agent_id=agent_id,
-                date=target_date
-            ).first()
-            
-            if analytics:
-                # Update existing record
-                analytics.invocation_count = invocation_count
-                analytics.unique_users = unique_users
-                analytics.success_count = success_count
-                analytics.error_count = error_count
-                analytics.avg_duration_ms = avg_duration
-                analytics.p50_duration_ms = p50_duration
-                analytics.p95_duration_ms = p95_duration
-                analytics.p99_duration_ms = p99_duration
-            else:
-                # Create new record
-                analytics = AgentAnalyticsDaily(
-                    agent_id=agent_id,
-                    date=target_date,
-                    invocation_count=invocation_count,
-                    unique_users=unique_users,
-                    success_count=success_count,
-                    error_count=error_count,
-                    avg_duration_ms=avg_duration,
-                    p50_duration_ms=p50_duration,
-                    p95_duration_ms=p95_duration,
-                    p99_duration_ms=p99_duration
-                )
-                db.session.add(analytics)
-            
-            aggregated_count += 1
+        # Aggregate in SQL + streamed percentile sketch, bulk upsert
+        aggregated_count = DailyAnalyticsAggregator().aggregate_agents(target_date, agent_id)
         
         db.session.commit()
         
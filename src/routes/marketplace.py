@@ -5,8 +5,10 @@ Handles agent marketplace listing, publishing, and discovery
 from flask import Blueprint, request, jsonify
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
+from sqlalchemy.orm import selectinload
 
 from src.database import db
+from src.infra.db import batch_load
 from src.models.marketplace import (
     MarketplaceListing,
     AgentCategory,
@@ -15,7 +17,7 @@ from src.models.marketplace import (
 )
 from src.models.agent import Agent
 from src.models.reviews import AgentRatingSummary
-from src.utils.feature_flags import FeatureFlagManager, FeatureFlag
+from src.utils.feature_flags import FeatureFlag, current_org_id, is_enabled
 from src.infra.log import get_logger
 from src.services.metrics import get_metrics_service
 
@@ -29,8 +31,7 @@ marketplace_bp = Blueprint('marketplace', __name__, url_prefix='/api/v1/marketpl
 
 def check_marketplace_enabled():
     """Check if marketplace feature is enabled"""
-    feature_flags = FeatureFlagManager()
-    if not feature_flags.is_enabled(FeatureFlag.AGENT_MARKETPLACE):
+    if not is_enabled(FeatureFlag.AGENT_MARKETPLACE, org_id=current_org_id()):
         return jsonify({'error': 'marketplace_disabled', 'message': 'Marketplace feature is not enabled'}), 503
     return None
 
@@ -127,8 +128,10 @@ def list_agents():
         else:
             query = query.order_by(MarketplaceListing.created_at.desc())
         
-        # Paginate
+        # Paginate; agents and rating summaries are loaded for the whole page at once
+        query = query.options(selectinload(MarketplaceListing.agent))
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        ratings = batch_load(AgentRatingSummary, (l.agent_id for l in pagination.items))
         
         # Build response
         listings = []
@@ -145,7 +148,7 @@ def list_agents():
                 }
             
             # Include rating summary
-            rating_summary = AgentRatingSummary.query.get(listing.agent_id)
+            rating_summary = ratings.get(listing.agent_id)
             if rating_summary:
                 listing_dict['rating'] = rating_summary.to_dict()
             
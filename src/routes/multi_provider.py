@@ -5,7 +5,9 @@ Multi-Provider Routes for Phase 9
 Provides Mistral relay, Router with fallback, and provider status endpoints.
 """
 
-from flask import Blueprint, request, jsonify
+import json
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from src.services.openai_service import OpenAIService
 from src.services.mistral_service import MistralService
 from src.services.router_service import RouterService
@@ -76,9 +78,14 @@ def route_chat():
         "language": "en"|"es"|"ja"|"ar" (optional, default: "en"),
         "hint": "cheap"|"quality"|"balanced" (optional, default: "balanced"),
         "policy": string (optional, custom policy override),
-        "meta": object (optional)
+        "meta": object (optional),
+        "stream": boolean (optional; also enabled by Accept: text/event-stream)
     }
     
+    When streaming, responds with text/event-stream: one "token" event per
+    content delta ({"content": string}) and a final "done" or "error" event
+    carrying the fields below plus ttft_ms.
+    
     Returns: {
         "provider": "openai"|"mistral",
         "fallback": boolean,
@@ -105,6 +112,21 @@ def route_chat():
             "error": "message field is required"
         }), 400
     
+    if data.get("stream") or request.accept_mimetypes.best == "text/event-stream":
+        events = router_service.route_chat_stream(
+            message=message,
+            system=system,
+            language=language,
+            hint=hint,
+            policy=policy,
+            meta=meta
+        )
+        return Response(
+            stream_with_context(_sse(events)),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
     result = router_service.route_chat(
         message=message,
         system=system,
@@ -121,6 +143,13 @@ def route_chat():
     return jsonify(result), 200
 
 
+def _sse(events):
+    """Format router stream events as server-sent events."""
+    for event in events:
+        kind = event.pop("type")
+        yield f"event: {kind}\ndata: {json.dumps(event)}\n\n"
+
+
 @bp.route("/health/providers", methods=["GET"])
 @bp.route("/api/v1/providers/status", methods=["GET"])
 def provider_status():
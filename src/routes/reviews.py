@@ -9,7 +9,7 @@ from datetime import datetime, timezone
 from src.database import db
 from src.models.reviews import AgentReview, ReviewVote, AgentRatingSummary
 from src.models.marketplace import MarketplaceListing, AgentInstallation
-from src.utils.feature_flags import FeatureFlagManager, FeatureFlag
+from src.utils.feature_flags import FeatureFlag, current_org_id, is_enabled
 from src.infra.log import get_logger
 
 logger = get_logger(__name__)
@@ -22,8 +22,7 @@ reviews_bp = Blueprint('reviews', __name__, url_prefix='/api/v1/reviews')
 
 def check_reviews_enabled():
     """Check if reviews feature is enabled"""
-    feature_flags = FeatureFlagManager()
-    if not feature_flags.is_enabled(FeatureFlag.REVIEWS_RATINGS):
+    if not is_enabled(FeatureFlag.REVIEWS_RATINGS, org_id=current_org_id()):
         return jsonify({'error': 'reviews_disabled', 'message': 'Reviews feature is not enabled'}), 503
     return None
 
@@ -114,10 +113,11 @@ def submit_review(agent_id: str):
         )
         
         db.session.add(review)
-        db.session.commit()
+        db.session.flush()
         
-        # Update rating summary
-        _update_rating_summary(agent_id)
+        # Update rating summary in the same transaction
+        AgentRatingSummary.apply_review_change(agent_id, new_rating=rating)
+        db.session.commit()
         
         logger.info(f"Review submitted for agent {agent_id} by user {user_id}")
         
@@ -164,6 +164,7 @@ def update_review(review_id: str):
         
         # Update fields
         data = request.get_json()
+        old_rating = review.rating
         
         if 'rating' in data:
             rating = data['rating']
@@ -181,10 +182,10 @@ def update_review(review_id: str):
             review.cons = data['cons']
         
         review.updated_at = datetime.now(timezone.utc)
-        db.session.commit()
         
-        # Update rating summary
-        _update_rating_summary(review.agent_id)
+        # Update rating summary in the same transaction
+        AgentRatingSummary.apply_review_change(review.agent_id, old_rating=old_rating, new_rating=review.rating)
+        db.session.commit()
         
         logger.info(f"Review {review_id} updated by user {user_id}")
         
@@ -222,10 +223,11 @@ def delete_review(review_id: str):
         
         agent_id = review.agent_id
         db.session.delete(review)
-        db.session.commit()
+        db.session.flush()
         
-        # Update rating summary
-        _update_rating_summary(agent_id)
+        # Update rating summary in the same transaction
+        AgentRatingSummary.apply_review_change(agent_id, old_rating=review.rating)
+        db.session.commit()
         
         logger.info(f"Review {review_id} deleted by user {user_id}")
         
@@ -581,65 +583,3 @@ def get_rating_summary(agent_id: str):
     except Exception as e:
         logger.error(f"Error getting rating summary: {str(e)}")
         return jsonify({'error': 'internal_error', 'message': str(e)}), 500
-
-
-# =============================================================================
-# HELPER FUNCTIONS
-# =============================================================================
-
-def _update_rating_summary(agent_id: str):
-    """Update or create rating summary for an agent"""
-    try:
-        # Get all reviews for the agent
-        reviews = AgentReview.query.filter_by(agent_id=agent_id).all()
-        
-        if not reviews:
-            # Delete summary if no reviews
-            summary = AgentRatingSummary.query.get(agent_id)
-            if summary:
-                db.session.delete(summary)
-                db.session.commit()
-            return
-        
-        # Calculate metrics
-        total_reviews = len(reviews)
-        total_rating = sum(r.rating for r in reviews)
-        average_rating = total_rating / total_reviews
-        
-        # Calculate rating distribution
-        rating_distribution = {
-            5: sum(1 for r in reviews if r.rating == 5),
-            4: sum(1 for r in reviews if r.rating == 4),
-            3: sum(1 for r in reviews if r.rating == 3),
-            2: sum(1 for r in reviews if r.rating == 2),
-            1: sum(1 for r in reviews if r.rating == 1)
-        }
-        
-        # Update or create summary
-        summary = AgentRatingSummary.query.get(agent_id)
-        if summary:
-            summary.update_summary(
-                total_reviews=total_reviews,
-                average_rating=average_rating,
-                rating_distribution=rating_distribution
-            )
-        else:
-            summary = AgentRatingSummary(
-                agent_id=agent_id,
-                total_reviews=total_reviews,
-                average_rating=average_rating,
-                rating_1_count=rating_distribution[1],
-                rating_2_count=rating_distribution[2],
-                rating_3_count=rating_distribution[3],
-                rating_4_count=rating_distribution[4],
-                rating_5_count=rating_distribution[5]
-            )
-            db.session.add(summary)
-        
-        db.session.commit()
-        
-    except Exception as e:
-        db.session.rollback()
-        logger.error(f"Error updating rating summary for agent {agent_id}: {str(e)}")
-        raise
-
@@ -7,7 +7,7 @@ Handles Stripe webhook events for subscription lifecycle management.
 import os
 import stripe
 from flask import Blueprint, request, jsonify, current_app
-from src.models.api_key import ApiKey
+from src.models.api_key import ApiKey, verified_key_cache
 from src.infra.db import db
 from src.models.user import User
 from src.services.api_key_service import APIKeyService
@@ -162,6 +162,7 @@ def handle_subscription_updated(subscription):
         api_key.is_active = False
     
     db.session.commit()
+    verified_key_cache.invalidate(api_key.id)
     current_app.logger.info(f"Updated API key for subscription {subscription_id}: tier={tier}, status={status}")
 
 
@@ -178,6 +179,7 @@ def handle_subscription_deleted(subscription):
     if api_key:
         api_key.is_active = False
         db.session.commit()
+        verified_key_cache.invalidate(api_key.id)
         current_app.logger.info(f"Deactivated API key for canceled subscription {subscription_id}")
     else:
         current_app.logger.warning(f"No API key found for subscription {subscription_id}")
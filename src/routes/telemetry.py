@@ -7,6 +7,10 @@ Allows SDKs and client applications to send telemetry events for monitoring and
 from flask import Blueprint, request, jsonify, current_app
 from datetime import datetime
 
+from src.services.telemetry_pipeline import (
+    get_telemetry_pipeline, normalize_event, telemetry_events_total,
+)
+
 telemetry_bp = Blueprint('telemetry', __name__)
 
 
@@ -41,48 +45,54 @@ def collect_events():
             }
         }
     
+    Events are normalised and handed to the telemetry ingestion pipeline
+    (src/services/telemetry_pipeline.py), which stores them in batches and
+    maintains per-minute rollups. Events without an event_type are rejected;
+    under load some raw events may be shed (rollups still count them).
+    
     Response (202 Accepted):
         {
             "message": "Events received",
-            "events_count": 1
+            "events_count": 1,
+            "accepted": 1,
+            "rejected": 0
         }
     """
-    data = request.get_json(silent=True) or {}
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
     
     events = data.get('events', [])
-    sdk_info = data.get('sdk_info', {})
+    sdk_info = data.get('sdk_info')
+    if not isinstance(sdk_info, dict):
+        sdk_info = {}
     
-    if not events:
+    if not events or not isinstance(events, list):
         return jsonify({
             'error': 'validation_error',
             'message': 'No events provided'
         }), 400
     
-    # Log events for monitoring
-    current_app.logger.info(
+    received_at = datetime.utcnow()
+    rows = [normalize_event(event, sdk_info, received_at) for event in events]
+    rows = [row for row in rows if row is not None]
+    rejected = len(events) - len(rows)
+    
+    telemetry_events_total.labels(outcome='received').inc(len(events))
+    if rejected:
+        telemetry_events_total.labels(outcome='rejected').inc(rejected)
+    get_telemetry_pipeline().submit(rows)
+    
+    current_app.logger.debug(
         f"Telemetry events received: {len(events)} events from "
         f"{sdk_info.get('name', 'unknown')} v{sdk_info.get('version', 'unknown')}"
     )
     
-    # Process each event
-    for event in events:
-        event_type = event.get('event_type')
-        
-        # Log to application logs
-        current_app.logger.debug(
-            f"Telemetry event: {event_type}",
-            extra={
-                'event': event,
-                'sdk_info': sdk_info
-            }
-        )
-        
-        # TODO: Store in database or send to analytics platform
-        # For now, just log to stdout/stderr
-    
     return jsonify({
         'message': 'Events received',
-        'events_count': len(events)
+        'events_count': len(events),
+        'accepted': len(rows),
+        'rejected': rejected
     }), 202
 
 
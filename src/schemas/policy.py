@@ -115,6 +115,8 @@ class PolicySimulateRequest(BaseModel):
     """Request schema for simulating a policy."""
     time_window_minutes: int = Field(default=60, ge=1, le=1440, description="Time window to analyze (1-1440 min)")
     sample_size: Optional[int] = Field(None, ge=1, le=10000, description="Max requests to analyze")
+    sample_rate: Optional[float] = Field(None, gt=0, le=1, description="Fraction of events to sample (reports confidence intervals)")
+    confidence_level: float = Field(default=0.95, gt=0, lt=1, description="Confidence level for sampled estimates")
 
 
 class PolicyApprovalRequest(BaseModel):
@@ -225,6 +227,10 @@ class SimulationResult(BaseModel):
     # Recommendation
     recommendation: str  # "safe_to_deploy", "review_required", "high_risk"
 
+    # Sampling mode
+    sample_rate: Optional[float] = None
+    confidence_intervals: Optional[Dict[str, List[float]]] = None  # {metric: [low, high]}
+
 
 class PolicyApprovalResponse(BaseModel):
     """Response schema for policy approval."""
@@ -0,0 +1,229 @@
+"""
+Daily analytics aggregation engine
+Computes AgentAnalyticsDaily / UserAnalyticsDaily rows for one day with
+memory that does not grow with event volume:
+- COUNT/SUM/AVG and DISTINCT users are pushed down to SQL GROUP BY
+- Duration percentiles come from a mergeable log-bucketed sketch
+  (DDSketch-style, bounded relative error) fed from a streamed cursor
+- Results are written with a single bulk upsert per table
+"""
+import math
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import case, func, select
+
+from src.infra.db import db, bulk_upsert
+from src.models.analytics import AgentUsageEvent, AgentAnalyticsDaily, UserAnalyticsDaily
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+STREAM_CHUNK_SIZE = 50_000
+
+# Packing (agent, bucket) pairs into one int64 for np.unique
+_KEY_SPAN = 1 << 16
+_KEY_OFFSET = 1 << 15
+_ZERO_KEY = -_KEY_OFFSET  # bucket for durations <= 0
+
+
+class DurationSketch:
+    """
+    Mergeable quantile sketch with bounded relative error.
+
+    Values are counted in logarithmic buckets (gamma = (1+a)/(1-a)), so any
+    quantile is returned within relative_accuracy of the exact value, using
+    a few hundred buckets for durations from 1ms to hours.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = defaultdict(int)
+        self.count = 0
+
+    def key(self, value: float) -> int:
+        if value <= 0:
+            return _ZERO_KEY
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def keys(self, values: np.ndarray) -> np.ndarray:
+        """Vectorised key() for an array of values."""
+        positive = np.maximum(values, 1e-300)
+        keys = np.ceil(np.log(positive) / self._log_gamma).astype(np.int64)
+        return np.where(values > 0, keys, _ZERO_KEY)
+
+    def add(self, value: float, count: int = 1) -> None:
+        self.add_key(self.key(value), count)
+
+    def add_key(self, key: int, count: int) -> None:
+        self.bins[key] += count
+        self.count += count
+
+    def merge(self, other: "DurationSketch") -> None:
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for key, count in other.bins.items():
+            self.add_key(key, count)
+
+    def _value(self, key: int) -> float:
+        if key == _ZERO_KEY:
+            return 0.0
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Value at rank int(count * q), matching nearest-rank indexing into a
+        sorted list (sorted_values[int(n * q)]).
+        """
+        if self.count == 0:
+            return None
+        rank = min(int(self.count * q), self.count - 1)
+        seen = 0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.bins))
+
+
+def _day_bounds(target_date: date):
+    start = datetime.combine(target_date, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+
+class DailyAnalyticsAggregator:
+    """Aggregates one day of AgentUsageEvent rows into the daily tables."""
+
+    def __init__(self,
+                 relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 chunk_size: int = STREAM_CHUNK_SIZE):
+        self.relative_accuracy = relative_accuracy
+        self.chunk_size = chunk_size
+
+    def _event_filter(self, target_date: date, agent_id: Optional[str]):
+        start, end = _day_bounds(target_date)
+        conditions = [AgentUsageEvent.created_at >= start, AgentUsageEvent.created_at < end]
+        if agent_id:
+            conditions.append(AgentUsageEvent.agent_id == agent_id)
+        return conditions
+
+    def duration_sketches(self,
+                          target_date: date,
+                          agent_id: Optional[str] = None) -> Dict[str, DurationSketch]:
+        """Stream (agent_id, duration_ms) rows into one sketch per agent."""
+        stmt = select(AgentUsageEvent.agent_id, AgentUsageEvent.duration_ms).where(
+            *self._event_filter(target_date, agent_id),
+            AgentUsageEvent.duration_ms.isnot(None))
+        result = db.session.connection().execute(
+            stmt.execution_options(yield_per=self.chunk_size))
+
+        sketches: Dict[str, DurationSketch] = {}
+        template = DurationSketch(self.relative_accuracy)
+        for rows in result.partitions():
+            agent_ids, durations = zip(*rows)
+            agents, agent_idx = np.unique(np.array(agent_ids, dtype=object), return_inverse=True)
+            keys = template.keys(np.fromiter(durations, dtype=np.float64, count=len(durations)))
+            # Count each (agent, bucket) pair once per chunk
+            packed, counts = np.unique(
+                agent_idx.astype(np.int64) * _KEY_SPAN + (keys + _KEY_OFFSET), return_counts=True)
+            for value, count in zip(packed.tolist(), counts.tolist()):
+                agent = agents[value // _KEY_SPAN]
+                sketch = sketches.get(agent)
+                if sketch is None:
+                    sketch = sketches[agent] = DurationSketch(self.relative_accuracy)
+                sketch.add_key(value % _KEY_SPAN - _KEY_OFFSET, count)
+        return sketches
+
+    def agent_rows(self, target_date: date, agent_id: Optional[str] = None) -> List[dict]:
+        """Build AgentAnalyticsDaily rows for the day."""
+        success = func.sum(case((AgentUsageEvent.success.is_(True), 1), else_=0))
+        stmt = select(
+            AgentUsageEvent.agent_id,
+            func.count().label('invocations'),
+            # Anonymous ('' or NULL) users are not counted, as before
+            func.count(case((AgentUsageEvent.user_id != '', AgentUsageEvent.user_id)).distinct())
+            .label('unique_users'),
+            success.label('success_count'),
+            func.avg(AgentUsageEvent.duration_ms).label('avg_duration'),
+        ).where(*self._event_filter(target_date, agent_id)).group_by(AgentUsageEvent.agent_id)
+
+        sketches = self.duration_sketches(target_date, agent_id)
+        now = datetime.now(timezone.utc)
+        rows = []
+        for row in db.session.execute(stmt):
+            sketch = sketches.get(row.agent_id)
+            rows.append({
+                'id': str(uuid.uuid4()),
+                'agent_id': row.agent_id,
+                'date': target_date,
+                'invocation_count': row.invocations,
+                'unique_users': row.unique_users,
+                'success_count': int(row.success_count or 0),
+                # Anything not explicitly successful counts as an error
+                'error_count': row.invocations - int(row.success_count or 0),
+                'avg_duration_ms': float(row.avg_duration) if row.avg_duration is not None else None,
+                'p50_duration_ms': _rounded(sketch, 0.50),
+                'p95_duration_ms': _rounded(sketch, 0.95),
+                'p99_duration_ms': _rounded(sketch, 0.99),
+                'created_at': now,
+            })
+        return rows
+
+    def user_rows(self, target_date: date) -> List[dict]:
+        """Build UserAnalyticsDaily rows for the day."""
+        stmt = select(
+            AgentUsageEvent.user_id,
+            func.count(AgentUsageEvent.agent_id.distinct()).label('agents_used'),
+            func.count().label('invocations'),
+            func.sum(AgentUsageEvent.duration_ms).label('total_duration_ms'),
+        ).where(
+            *self._event_filter(target_date, None),
+            AgentUsageEvent.user_id.isnot(None),
+            AgentUsageEvent.user_id != '',
+        ).group_by(AgentUsageEvent.user_id)
+
+        now = datetime.now(timezone.utc)
+        return [{
+            'id': str(uuid.uuid4()),
+            'user_id': row.user_id,
+            'date': target_date,
+            'agents_used': row.agents_used,
+            'total_invocations': row.invocations,
+            'active_time_minutes': int((row.total_duration_ms or 0) / 60000),
+            'created_at': now,
+        } for row in db.session.execute(stmt)]
+
+    def count_events(self, target_date: date, agent_id: Optional[str] = None) -> int:
+        return db.session.execute(
+            select(func.count()).select_from(AgentUsageEvent).where(
+                *self._event_filter(target_date, agent_id))
+        ).scalar() or 0
+
+    def aggregate_agents(self, target_date: date, agent_id: Optional[str] = None) -> int:
+        """Upsert agent daily analytics; returns the number of agents. Does not commit."""
+        rows = self.agent_rows(target_date, agent_id)
+        return bulk_upsert(
+            AgentAnalyticsDaily, rows,
+            index_elements=['agent_id', 'date'],
+            update_columns=[
+                'invocation_count', 'unique_users', 'success_count', 'error_count',
+                'avg_duration_ms', 'p50_duration_ms', 'p95_duration_ms', 'p99_duration_ms',
+            ])
+
+    def aggregate_users(self, target_date: date) -> int:
+        """Upsert user daily analytics; returns the number of users. Does not commit."""
+        rows = self.user_rows(target_date)
+        return bulk_upsert(
+            UserAnalyticsDaily, rows,
+            index_elements=['user_id', 'date'],
+            update_columns=['agents_used', 'total_invocations', 'active_time_minutes'])
+
+
+def _rounded(sketch: Optional[DurationSketch], q: float) -> Optional[int]:
+    if sketch is None:
+        return None
+    value = sketch.quantile(q)
+    return int(round(value)) if value is not None else None
@@ -4,6 +4,10 @@ Audit Logging Service for API Gateway.
 
 Logs all API requests to the api_audit_log table for compliance and debugging.
 Includes request details, authentication info, and response status.
+
+Rows are handed to the async audit sink (src/services/audit_sink.py) so the
+request never waits on an audit commit. Set BRIKK_AUDIT_ASYNC=false to fall
+back to one synchronous insert per request.
 """
 import time
 import uuid
@@ -11,6 +15,7 @@ from datetime import datetime
 from flask import g, request, current_app
 from src.database import db
 from src.models.api_gateway import ApiAuditLog
+from src.services.audit_sink import get_audit_sink, init_audit_sink
 
 
 def log_api_request(response_status: int, response_time_ms: float):
@@ -37,8 +42,7 @@ def log_api_request(response_status: int, response_time_ms: float):
         if not org_id or not actor_id:
             return
         
-        # Create audit log entry with correct field names
-        audit_entry = ApiAuditLog(
+        row = ApiAuditLog.build_row(
             request_id=request_id,
             org_id=org_id,
             actor_type=actor_type,
@@ -52,8 +56,12 @@ def log_api_request(response_status: int, response_time_ms: float):
             user_agent=request.headers.get('User-Agent')
         )
         
-        db.session.add(audit_entry)
-        db.session.commit()
+        sink = get_audit_sink()
+        if sink is not None:
+            sink.submit(ApiAuditLog, row)
+        else:
+            db.session.execute(ApiAuditLog.__table__.insert(), [row])
+            db.session.commit()
         
     except Exception as e:
         # Don't fail the request if audit logging fails
@@ -68,6 +76,8 @@ def init_audit_logging(app):
     Args:
         app: Flask application instance
     """
+    init_audit_sink(app)
+    
     # Note: request_id and request_start_time are set by RequestContextMiddleware
     # We don't need to set them here to avoid conflicts
     
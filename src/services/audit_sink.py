@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Asynchronous Batched Audit Sink.
+
+Moves audit writes (ApiAuditLog from the gateway after_request hook and
+AuditLog from the security middleware) off the request path:
+- Requests enqueue fully built rows on one bounded in-process queue
+- A writer thread drains the queue and inserts each table's rows with one
+  executemany, committing the whole batch in a single transaction
+- When the queue is full the overflow policy decides: drop the row, block
+  the request for up to BRIKK_AUDIT_BLOCK_TIMEOUT seconds (then drop), or
+  spool it to an append-only local file
+- Batches that fail to write are spooled and replayed once the database
+  recovers (and on startup); claim files left by a crash mid-replay are
+  adopted, as in the usage spool
+- Remaining rows are flushed at interpreter exit and on SIGTERM
+
+Configuration:
+    BRIKK_AUDIT_ASYNC=true|false           - Enable the sink (default: true)
+    BRIKK_AUDIT_QUEUE_SIZE=10000           - Max rows held in memory
+    BRIKK_AUDIT_BATCH_SIZE=500             - Rows per write transaction
+    BRIKK_AUDIT_FLUSH_INTERVAL=1.0         - Max seconds a row waits in memory
+    BRIKK_AUDIT_OVERFLOW=spool             - drop | block | spool
+    BRIKK_AUDIT_BLOCK_TIMEOUT=0.1          - Max seconds a request waits for space (block policy)
+    BRIKK_AUDIT_SPOOL_PATH=...             - Spool file (default: <instance>/audit_spool.jsonl)
+"""
+import atexit
+import logging
+import os
+import queue
+import signal
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Flask
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import DateTime, Table, Uuid
+
+from src.database import db
+from src.services.batch_writer import SpooledBatchWriter
+from src.services.usage_pipeline import UsageSpool, unwritten_rows
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('drop', 'block', 'spool')
+
+AuditEntry = Tuple[Table, Dict[str, Any]]
+
+
+audit_queue_depth = Gauge(
+    'brikk_audit_queue_depth',
+    'Audit rows waiting in the async audit sink queue',
+    multiprocess_mode='livesum'
+)
+
+audit_rows_total = Counter(
+    'brikk_audit_rows_total',
+    'Audit rows handled by the async audit sink',
+    ['table', 'outcome']  # enqueued, written, dropped, spooled, replayed
+)
+
+audit_flush_seconds = Histogram(
+    'brikk_audit_flush_seconds',
+    'Latency of audit batch writes in seconds',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+audit_flush_batch_size = Histogram(
+    'brikk_audit_flush_batch_size',
+    'Rows per audit batch write',
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 5000)
+)
+
+
+class AuditSpool(UsageSpool):
+    """JSONL spool of (table, row) entries; values are decoded by column type."""
+
+    @staticmethod
+    def _encode(entry: AuditEntry) -> Dict[str, Any]:
+        table, row = entry
+        return {
+            'table': table.name,
+            'row': {
+                key: str(value) if isinstance(value, uuid.UUID)
+                else value.isoformat() if isinstance(value, datetime) else value
+                for key, value in row.items()
+            },
+        }
+
+    @staticmethod
+    def _decode(data: Dict[str, Any]) -> AuditEntry:
+        table = db.metadata.tables[data['table']]
+        row = {}
+        for key, value in data['row'].items():
+            column_type = table.c[key].type
+            if value is not None and isinstance(column_type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif value is not None and isinstance(column_type, Uuid) and column_type.as_uuid:
+                value = uuid.UUID(value)
+            row[key] = value
+        return table, row
+
+
+def _write_batch(entries: List[AuditEntry]) -> None:
+    """Insert entries grouped by table (one executemany each) and commit once."""
+    by_table: Dict[Table, List[Dict[str, Any]]] = defaultdict(list)
+    for table, row in entries:
+        by_table[table].append(row)
+    try:
+        for table, rows in by_table.items():
+            db.session.execute(table.insert(), rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _unwritten_entries(entries: List[AuditEntry]) -> List[AuditEntry]:
+    """Entries not stored yet (a replay after a crash may repeat committed rows)."""
+    by_table: Dict[Table, List[Dict[str, Any]]] = defaultdict(list)
+    for table, row in entries:
+        by_table[table].append(row)
+    return [(table, row) for table, rows in by_table.items() for row in unwritten_rows(table, rows)]
+
+
+def _count_rows(entries: List[AuditEntry], outcome: str) -> None:
+    counts: Dict[str, int] = defaultdict(int)
+    for table, _ in entries:
+        counts[table.name] += 1
+    for name, n in counts.items():
+        audit_rows_total.labels(table=name, outcome=outcome).inc(n)
+
+
+class AuditSink(SpooledBatchWriter):
+    """
+    Bounded queue plus background writer shared by all audit tables.
+
+    The writer thread starts lazily on the first submitted row.
+    """
+
+    thread_name = 'audit-sink'
+    depth_gauge = audit_queue_depth
+
+    def __init__(self,
+                 app: Optional[Flask] = None,
+                 max_queue_size: Optional[int] = None,
+                 batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None,
+                 overflow: Optional[str] = None,
+                 block_timeout: Optional[float] = None,
+                 spool_path: Optional[str] = None):
+        super().__init__(
+            flush_interval=flush_interval or float(os.getenv('BRIKK_AUDIT_FLUSH_INTERVAL', '1.0')),
+            batch_size=batch_size or int(os.getenv('BRIKK_AUDIT_BATCH_SIZE', '500')),
+            max_queue_size=max_queue_size or int(os.getenv('BRIKK_AUDIT_QUEUE_SIZE', '10000')),
+        )
+        self.overflow = (overflow or os.getenv('BRIKK_AUDIT_OVERFLOW', 'spool')).lower()
+        if self.overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"BRIKK_AUDIT_OVERFLOW must be one of {', '.join(OVERFLOW_POLICIES)}")
+        self.block_timeout = (block_timeout if block_timeout is not None
+                              else float(os.getenv('BRIKK_AUDIT_BLOCK_TIMEOUT', '0.1')))
+        self._spool_path = spool_path
+        self.spool: Optional[AuditSpool] = None
+        self.app: Optional[Flask] = None
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app: Flask, handle_signals: bool = True) -> None:
+        """Bind to the app, replay any spooled rows and register shutdown flush."""
+        self.app = app
+        path = self._spool_path or os.getenv('BRIKK_AUDIT_SPOOL_PATH') or os.path.join(
+            app.instance_path, 'audit_spool.jsonl')
+        self.spool = AuditSpool(path)
+        app.extensions['audit_sink'] = self
+
+        if self.spool.has_rows():
+            self._spool_dirty = True
+            try:
+                self.replay_spool()
+            except Exception as e:
+                logger.warning(f"Audit spool replay deferred: {e}")
+
+        atexit.register(self.stop)
+        if handle_signals:
+            self._install_sigterm_handler()
+
+    def _install_sigterm_handler(self) -> None:
+        """Flush on SIGTERM, then defer to the previous handler."""
+        if threading.current_thread() is not threading.main_thread():
+            return  # signal handlers can only be installed from the main thread
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def handle_sigterm(signum, frame):
+            try:
+                self.stop()
+            finally:
+                if callable(previous):
+                    previous(signum, frame)
+                elif previous == signal.SIG_DFL:
+                    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                    os.kill(os.getpid(), signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, handle_sigterm)
+
+    # --- Producer side (request thread) ---
+
+    def submit(self, model, row: Dict[str, Any]) -> bool:
+        """
+        Enqueue a row built by model.build_row(); applies the overflow policy when full.
+
+        Returns:
+            True if queued, False if the row was dropped or spooled
+        """
+        self._ensure_started()
+        entry = (model.__table__, row)
+        try:
+            if self.overflow == 'block':
+                self._queue.put(entry, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(entry)
+        except queue.Full:
+            if self.overflow == 'spool':
+                self._spill([entry])
+            else:
+                self._count([entry], 'dropped')
+            return False
+        audit_rows_total.labels(table=entry[0].name, outcome='enqueued').inc()
+        self._enqueued()
+        return True
+
+    # --- Writer side ---
+
+    def _write(self, entries: List[AuditEntry]) -> bool:
+        """Write one batch; spool it on failure."""
+        if not entries:
+            return True
+        start = time.perf_counter()
+        try:
+            with self.app.app_context():
+                try:
+                    _write_batch(entries)
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            logger.error(f"Audit flush failed, spooling {len(entries)} rows: {e}")
+            self._spill(entries)
+            return False
+        audit_flush_seconds.observe(time.perf_counter() - start)
+        audit_flush_batch_size.observe(len(entries))
+        self._count(entries, 'written')
+        return True
+
+    def _replay_batch(self, entries: List[AuditEntry]) -> None:
+        with self.app.app_context():
+            try:
+                _write_batch(_unwritten_entries(entries))
+            finally:
+                db.session.remove()
+
+    def _count(self, entries: List[AuditEntry], outcome: str) -> None:
+        _count_rows(entries, outcome)
+
+
+def get_audit_sink() -> Optional[AuditSink]:
+    """Get the audit sink from the current app context."""
+    from flask import current_app, has_app_context
+
+    if has_app_context():
+        return current_app.extensions.get('audit_sink')
+    return None
+
+
+def init_audit_sink(app: Flask) -> Optional[AuditSink]:
+    """Create the app's audit sink unless BRIKK_AUDIT_ASYNC=false (idempotent)."""
+    if os.getenv('BRIKK_AUDIT_ASYNC', 'true').lower() != 'true':
+        return None
+    sink = app.extensions.get('audit_sink')
+    if sink is None:
+        sink = AuditSink(app)
+    return sink
@@ -12,6 +12,7 @@ from src.models.org import Organization
 from src.models.agent import Agent
 from src.services.security_enhanced import HMACSecurityService
 from src.services.idempotency import IdempotencyService
+from src.services.request_timing import timed
 
 
 class AuthMiddleware:
@@ -32,6 +33,7 @@ class AuthMiddleware:
         return os.environ.get(feature_flag,
                               str(default).lower()).lower() == 'true'
 
+    @timed("auth")
     def authenticate_request(
             self) -> Tuple[bool, Optional[Dict[str, Any]], Optional[int]]:
         """
@@ -138,6 +140,7 @@ class AuthMiddleware:
                 'authentication_error', 'Authentication processing failed'
             ), 500
 
+    @timed("idempotency")
     def check_idempotency(
             self) -> Tuple[bool, Optional[Dict[str, Any]], Optional[int]]:
         """
@@ -163,19 +166,19 @@ class AuthMiddleware:
             # Check for custom idempotency key
             custom_idempotency_key = request.headers.get('X-Idempotency-Key')
 
-            # Process idempotency check
-            should_process, response_data, status_code = self.idempotency_service.process_request_idempotency(
+            # Process idempotency check (takes the in-flight lock on proceed)
+            outcome = self.idempotency_service.begin_request(
                 api_key_id=g.api_key.key_id,
                 body_hash=body_hash,
                 custom_idempotency_key=custom_idempotency_key
             )
 
-            if not should_process:
-                return False, response_data, status_code
+            if not outcome.should_process:
+                return False, outcome.response_data, outcome.status_code
 
             # Store idempotency info for response caching
-            g.idempotency_key = self.idempotency_service.generate_idempotency_key(
-                g.api_key.key_id, body_hash, custom_idempotency_key)
+            g.idempotency_outcome = outcome
+            g.idempotency_key = outcome.record_key
             g.body_hash = body_hash
 
             return True, None, None
@@ -189,6 +192,7 @@ class AuthMiddleware:
             self, response_data: Dict[str, Any], status_code: int = 200):
         """Cache response for idempotency if enabled and applicable."""
         try:
+            outcome = g.pop('idempotency_outcome', None)
             if (self.is_feature_enabled('BRIKK_IDEM_ENABLED', True) and
                 hasattr(g, 'idempotency_key') and
                     200 <= status_code < 300):
@@ -196,8 +200,12 @@ class AuthMiddleware:
                 self.idempotency_service.store_response(
                     idempotency_key=g.idempotency_key,
                     response_data=response_data,
-                    status_code=status_code
+                    status_code=status_code,
+                    body_hash=getattr(g, 'body_hash', None)
                 )
+            elif outcome is not None:
+                # Nothing to replay; let retries run immediately
+                self.idempotency_service.release(outcome)
         except Exception as e:
             current_app.logger.error(f"Response caching error: {e}")
             # Don't fail the request if caching fails
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Background Batch Writer.
+
+Shared thread scaffolding for the write-behind pipelines (usage ledger,
+SDK telemetry, audit sink):
+- The writer thread starts lazily on the first submitted row
+- It wakes on the flush interval, or early when a producer calls wake()
+  because a full batch is waiting
+- stop() ends the thread and flushes what is left on the calling thread
+
+Subclasses implement flush() and may override _flush_cycle() to do more
+work per wake-up. SpooledBatchWriter adds the bounded queue and the local
+spool (see usage_pipeline.UsageSpool) for rows that cannot be written, as
+used by the usage pipeline and the audit sink.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """Lazily started background thread that calls flush() on a size or time threshold."""
+
+    thread_name = 'batch-writer'
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self.app = None
+
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def wake(self) -> None:
+        """Flush now instead of at the next interval."""
+        self._wake.set()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(timeout=self.flush_interval)
+            self._wake.clear()
+            try:
+                self._flush_cycle()
+            except Exception as e:  # never let the writer thread die
+                logger.error(f"{self.thread_name} error: {e}")
+
+    def _flush_cycle(self) -> None:
+        self.flush()
+
+    def flush(self):
+        """Synchronously write everything currently queued."""
+        raise NotImplementedError
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the writer thread and flush what is still queued."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        if self.app is not None:
+            self.flush()
+
+
+class SpooledBatchWriter(BatchWriter):
+    """
+    BatchWriter over a bounded queue whose failed batches go to a spool.
+
+    Subclasses set self.spool in init_app() and implement _write(),
+    _replay_batch() and _count().
+    """
+
+    depth_gauge = None
+
+    def __init__(self, flush_interval: float, batch_size: int, max_queue_size: int):
+        super().__init__(flush_interval)
+        self.batch_size = batch_size
+        self.max_queue_size = max_queue_size
+        self.spool = None
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._spool_dirty = False
+        self._last_replay_attempt = 0.0
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _enqueued(self) -> None:
+        """Bookkeeping after a successful put: depth gauge, early wake-up."""
+        depth = self._queue.qsize()
+        self.depth_gauge.set(depth)
+        if depth >= self.batch_size:
+            self.wake()
+
+    def _drain(self, max_rows: int) -> List[Any]:
+        rows = []
+        while len(rows) < max_rows:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _write(self, rows: List[Any]) -> bool:
+        """Write one batch; spool it on failure."""
+        raise NotImplementedError
+
+    def _replay_batch(self, rows: List[Any]) -> None:
+        """Write spooled rows not stored yet; raise on failure."""
+        raise NotImplementedError
+
+    def _count(self, rows: List[Any], outcome: str) -> None:
+        raise NotImplementedError
+
+    def _spill(self, rows: List[Any]) -> None:
+        if self.spool is None:
+            logger.error(f"{self.thread_name} not initialised; dropping {len(rows)} rows")
+            self._count(rows, 'dropped')
+            return
+        self.spool.append(rows)
+        self._spool_dirty = True
+        self._count(rows, 'spooled')
+
+    def _flush_cycle(self) -> None:
+        self.flush()
+        self._maybe_replay()
+
+    def _maybe_replay(self) -> None:
+        if not self._spool_dirty:
+            return
+        now = time.monotonic()
+        if now - self._last_replay_attempt < self.flush_interval:
+            return
+        self._last_replay_attempt = now
+        try:
+            self.replay_spool()
+        except Exception as e:
+            logger.warning(f"{self.thread_name} spool replay failed: {e}")
+
+    def replay_spool(self) -> int:
+        """
+        Write spooled rows in batches.
+
+        Rows from batches that fail are appended back to the spool.
+
+        Returns:
+            Number of rows replayed
+        """
+        with self._flush_lock:
+            claimed, rows = self.spool.claim()
+            self._spool_dirty = False
+            replayed = 0
+            respooled = True
+            try:
+                for i in range(0, len(rows), self.batch_size):
+                    batch = rows[i:i + self.batch_size]
+                    try:
+                        self._replay_batch(batch)
+                    except Exception:
+                        self._spool_dirty = True
+                        respooled = False
+                        self.spool.append(rows[i:])
+                        respooled = True
+                        raise
+                    replayed += len(batch)
+                    self._count(batch, 'replayed')
+            finally:
+                if respooled:
+                    self.spool.release(claimed)
+                else:
+                    # The rows are only in the claim files now
+                    self.spool.abandon(claimed)
+            return replayed
+
+    def flush(self) -> None:
+        """Synchronously write everything currently queued."""
+        with self._flush_lock:
+            while True:
+                rows = self._drain(self.batch_size)
+                if not rows:
+                    break
+                self._write(rows)
+            self.depth_gauge.set(self._queue.qsize())
@@ -3,34 +3,202 @@
 Caching Service
 
 Provides a caching layer to reduce database load and improve performance.
+
+Two tiers:
+- L1: bounded in-process LRU (no network hop); entries live at most
+  BRIKK_CACHE_L1_TTL seconds because other processes cannot invalidate them
+- L2: Redis, shared by every process
+
+get_or_set() / @cached protect the data source from stampedes:
+- Single flight: on a miss one caller per process computes while the other
+  threads wait for it, and a Redis lock (SET NX PX) elects one process;
+  the others poll L2 until the value appears
+- Probabilistic early expiration (XFetch): shortly before a key expires a
+  caller is randomly picked to recompute it, weighted by how long the last
+  computation took, so hot keys are refreshed before they ever miss
+- Tags are Redis SETs of member keys, so invalidate_tags() touches only
+  the keys carrying the tag instead of scanning the keyspace. A tagged
+  write is one Lua call that stores the value, adds it to its tag sets and
+  extends each set's TTL to cover it (works on Redis < 7, which lacks
+  EXPIRE NX/GT)
+
+Configuration:
+    CACHE_DEFAULT_TTL_SECONDS=3600   - L2 TTL when none is given
+    BRIKK_CACHE_L1_SIZE=1024         - L1 entries per process (0 disables L1)
+    BRIKK_CACHE_L1_TTL=5             - Max seconds an L1 entry is served
+    BRIKK_CACHE_LOCK_TIMEOUT=10      - Single-flight lock TTL / max wait in seconds
+    BRIKK_CACHE_XFETCH_BETA=1.0      - Early expiration eagerness (0 disables)
+
+Usage:
+    from src.services.caching_service import cached
+
+    @cached(ttl=300, tags=lambda agent_id: [f"agent:{agent_id}"])
+    def agent_profile(agent_id): ...
+
+    caching_service.invalidate_tags([f"agent:{agent_id}"])
 """
 
-import os
+import functools
+import hashlib
 import json
-from typing import Any, Optional
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Union
 
 import redis
+from prometheus_client import Counter, Histogram
+
+from src.infra.redis_pool import get_redis
 from src.services.structured_logging import get_logger
 
 logger = get_logger("brikk.caching")
 
+TAG_KEY = "cache:tag:{}"
+LOCK_KEY = "cache:lock:{}"
+XFETCH_PREFIX = "xf:"  # "xf:<delta>:<expires_at>:<json>"; JSON never starts with "x"
+POLL_INTERVAL = 0.05
+
+# Release the single-flight lock only if we still own it
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Store a tagged value; each tag set's TTL only ever grows to cover its members
+STORE_TAGGED_SCRIPT = """
+local ttl = tonumber(ARGV[2])
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ttl)
+for i = 2, #KEYS do
+    redis.call('SADD', KEYS[i], KEYS[1])
+    if redis.call('TTL', KEYS[i]) < ttl then
+        redis.call('EXPIRE', KEYS[i], ttl)
+    end
+end
+return 1
+"""
+
+cache_requests_total = Counter(
+    'brikk_cache_requests_total',
+    'Cache lookups by tier and result',
+    ['tier', 'result']  # tier: l1, l2; result: hit, miss
+)
+
+cache_recomputes_total = Counter(
+    'brikk_cache_recomputes_total',
+    'Values computed by get_or_set',
+    ['reason']  # miss, early, lock_timeout
+)
+
+cache_latency_seconds = Histogram(
+    'brikk_cache_latency_seconds',
+    'Cache operation latency in seconds',
+    ['operation'],  # get, set, compute
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0, 5.0)
+)
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    value: Any
+    expires_at: float  # L2 expiry (wall clock)
+    delta: float  # seconds the last computation took (XFetch weight)
+
+
+class LocalCache:
+    """Bounded, thread-safe LRU of CacheEntry with a per-entry deadline."""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 5.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, CacheEntry]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: float) -> Optional[CacheEntry]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            deadline, entry = item
+            if now >= deadline:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CacheEntry, now: float) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (min(entry.expires_at, now + self.ttl_seconds), entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _decode(raw: Union[str, bytes], now: float) -> CacheEntry:
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8")
+    if raw.startswith(XFETCH_PREFIX):
+        _, delta, expires_at, payload = raw.split(":", 3)
+        return CacheEntry(json.loads(payload), float(expires_at), float(delta))
+    # Plain JSON (written without metadata): never refreshed early
+    return CacheEntry(json.loads(raw), math.inf, 0.0)
+
+
+def _encode(entry: CacheEntry) -> str:
+    return f"{XFETCH_PREFIX}{entry.delta:.4f}:{entry.expires_at:.3f}:{json.dumps(entry.value)}"
+
 
 class CachingService:
-    """Service for caching data in Redis"""
+    """Two-tier (in-process LRU + Redis) cache with stampede protection"""
 
-    def __init__(self):
-        self.redis_client = self._get_redis_client()
-        self.default_ttl = int(
+    def __init__(self,
+                 redis_client: Optional[redis.Redis] = None,
+                 default_ttl: Optional[int] = None,
+                 l1_size: Optional[int] = None,
+                 l1_ttl: Optional[float] = None,
+                 lock_timeout: Optional[float] = None,
+                 beta: Optional[float] = None):
+        self.redis_client = redis_client if redis_client is not None else self._get_redis_client()
+        self.default_ttl = default_ttl or int(
             os.getenv(
                 "CACHE_DEFAULT_TTL_SECONDS",
                 "3600"))  # 1 hour
+        self.l1 = LocalCache(
+            max_size=l1_size if l1_size is not None else int(os.getenv("BRIKK_CACHE_L1_SIZE", "1024")),
+            ttl_seconds=l1_ttl if l1_ttl is not None else float(os.getenv("BRIKK_CACHE_L1_TTL", "5")))
+        self.lock_timeout = lock_timeout or float(os.getenv("BRIKK_CACHE_LOCK_TIMEOUT", "10"))
+        self.beta = beta if beta is not None else float(os.getenv("BRIKK_CACHE_XFETCH_BETA", "1.0"))
+        self._inflight: Dict[str, threading.Event] = {}
+        self._inflight_lock = threading.Lock()
+        self._release_script = None
+        self._store_tagged_script = None
 
     def _get_redis_client(self) -> Optional[redis.Redis]:
         """Get Redis client for caching"""
         try:
-            # Use a different DB for cache
-            redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/1")
-            client = redis.from_url(redis_url, decode_responses=True)
+            # Shared pool (defaults to DB 1 when REDIS_URL is unset)
+            client = get_redis("cache")
             client.ping()
             logger.info("Caching service connected to Redis")
             return client
@@ -38,40 +206,80 @@ class CachingService:
             logger.warning(f"Redis not available for caching: {e}")
             return None
 
-    def get(self, key: str) -> Optional[Any]:
-        """Get a value from the cache"""
+    # --- Tier lookups -----------------------------------------------------
+
+    def _lookup_l2(self, key: str, now: float) -> Optional[CacheEntry]:
         if not self.redis_client:
             return None
-
+        start = time.perf_counter()
         try:
-            cached_value = self.redis_client.get(key)
-            if cached_value:
-                logger.debug(f"Cache HIT for key: {key}")
-                return json.loads(cached_value)
-            else:
-                logger.debug(f"Cache MISS for key: {key}")
-                return None
+            raw = self.redis_client.get(key)
         except Exception as e:
             logger.error(f"Failed to get from cache for key {key}: {e}")
             return None
+        finally:
+            cache_latency_seconds.labels('get').observe(time.perf_counter() - start)
+        if not raw:
+            cache_requests_total.labels('l2', 'miss').inc()
+            return None
+        try:
+            entry = _decode(raw, now)
+        except (ValueError, TypeError) as e:
+            logger.error(f"Undecodable cache value for key {key}: {e}")
+            return None
+        cache_requests_total.labels('l2', 'hit').inc()
+        self.l1.put(key, entry, now)
+        return entry
 
-    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
-        """Set a value in the cache"""
+    def _lookup(self, key: str, now: float) -> Optional[CacheEntry]:
+        entry = self.l1.get(key, now)
+        if entry is not None:
+            cache_requests_total.labels('l1', 'hit').inc()
+            return entry
+        cache_requests_total.labels('l1', 'miss').inc()
+        return self._lookup_l2(key, now)
+
+    def _store(self, key: str, entry: CacheEntry, ttl: int, tags: Optional[Iterable[str]]) -> None:
         if not self.redis_client:
             return
-
-        if ttl is None:
-            ttl = self.default_ttl
-
+        start = time.perf_counter()
         try:
-            serialized_value = json.dumps(value)
-            self.redis_client.setex(key, ttl, serialized_value)
+            serialized_value = _encode(entry)
+            if not tags:
+                self.redis_client.setex(key, ttl, serialized_value)
+            else:
+                if self._store_tagged_script is None:
+                    self._store_tagged_script = self.redis_client.register_script(STORE_TAGGED_SCRIPT)
+                self._store_tagged_script(
+                    keys=[key] + [TAG_KEY.format(tag) for tag in tags], args=[serialized_value, ttl])
             logger.debug(f"Cached value for key: {key} with TTL: {ttl}s")
         except Exception as e:
             logger.error(f"Failed to set cache for key {key}: {e}")
+        finally:
+            cache_latency_seconds.labels('set').observe(time.perf_counter() - start)
+
+    # --- Public API -------------------------------------------------------
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a value from the cache"""
+        entry = self._lookup(key, time.time())
+        if entry is None:
+            logger.debug(f"Cache MISS for key: {key}")
+            return None
+        logger.debug(f"Cache HIT for key: {key}")
+        return entry.value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None,
+            tags: Optional[Iterable[str]] = None) -> None:
+        """Set a value in the cache (the local L1 copy is dropped, not refilled)"""
+        if ttl is None:
+            ttl = self.default_ttl
+        self.l1.discard([key])
+        self._store(key, CacheEntry(value, time.time() + ttl, 0.0), ttl, tags)
 
     def delete(self, key: str) -> None:
         """Delete a value from the cache"""
+        self.l1.discard([key])
         if not self.redis_client:
             return
 
@@ -81,20 +289,165 @@ class CachingService:
         except Exception as e:
             logger.error(f"Failed to delete cache for key {key}: {e}")
 
-    def invalidate_tags(self, tags: list[str]) -> None:
-        """Invalidate cache entries based on tags (requires Redis search or custom indexing)"""
-        # This is a simplified implementation. A real-world scenario would use more
-        # advanced techniques like Redisearch or maintaining sets of keys for
-        # each tag.
+    def invalidate_tags(self, tags: list[str]) -> int:
+        """
+        Delete every key stored with one of the tags.
+
+        Other processes may serve their L1 copy for up to BRIKK_CACHE_L1_TTL
+        seconds afterwards. Returns the number of keys deleted from Redis.
+        """
         if not self.redis_client:
-            return
+            self.l1.clear()
+            return 0
 
+        deleted = 0
         for tag in tags:
-            # Example: delete all keys matching a pattern
-            for key in self.redis_client.scan_iter(f"cache:{tag}:*"):
-                self.delete(key)
-            logger.info(f"Invalidated cache for tag: {tag}")
+            tag_key = TAG_KEY.format(tag)
+            try:
+                # Read and drop the set atomically; keys tagged afterwards start a new set
+                pipe = self.redis_client.pipeline(transaction=True)
+                pipe.smembers(tag_key)
+                pipe.delete(tag_key)
+                members, _ = pipe.execute()
+                keys = [m.decode("utf-8") if isinstance(m, bytes) else m for m in members]
+                self.l1.discard(keys)
+                if keys:
+                    deleted += self.redis_client.delete(*keys)
+                logger.info(f"Invalidated cache for tag: {tag} ({len(keys)} keys)")
+            except Exception as e:
+                logger.error(f"Failed to invalidate cache tag {tag}: {e}")
+        return deleted
+
+    def get_or_set(self, key: str, compute: Callable[[], Any], ttl: Optional[int] = None,
+                   tags: Optional[Iterable[str]] = None) -> Any:
+        """Return the cached value, computing and storing it at most once per expiry."""
+        if ttl is None:
+            ttl = self.default_ttl
+        now = time.time()
+        entry = self._lookup(key, now)
+        if entry is not None:
+            if not self._expires_early(entry, now):
+                return entry.value
+            # XFetch: one caller refreshes ahead of expiry, the rest keep the current value
+            token = self._acquire(key)
+            if token is None:
+                return entry.value
+            try:
+                return self._compute(key, compute, ttl, tags, 'early')
+            finally:
+                self._release(key, token)
+        return self._fill(key, compute, ttl, tags)
+
+    # --- Stampede protection ------------------------------------------------
+
+    def _expires_early(self, entry: CacheEntry, now: float) -> bool:
+        if self.beta <= 0 or entry.delta <= 0:
+            return False
+        return now - entry.delta * self.beta * math.log(1.0 - random.random()) >= entry.expires_at
+
+    def _compute(self, key: str, compute: Callable[[], Any], ttl: int,
+                 tags: Optional[Iterable[str]], reason: str) -> Any:
+        cache_recomputes_total.labels(reason).inc()
+        start = time.perf_counter()
+        value = compute()
+        delta = time.perf_counter() - start
+        cache_latency_seconds.labels('compute').observe(delta)
+        now = time.time()
+        entry = CacheEntry(value, now + ttl, delta)
+        self._store(key, entry, ttl, tags)
+        self.l1.put(key, entry, now)
+        return value
+
+    def _fill(self, key: str, compute: Callable[[], Any], ttl: int,
+              tags: Optional[Iterable[str]]) -> Any:
+        with self._inflight_lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+        if not leader:
+            # Another thread in this process is computing the key
+            event.wait(self.lock_timeout)
+            entry = self._lookup(key, time.time())
+            if entry is not None:
+                return entry.value
+            return self._compute(key, compute, ttl, tags, 'lock_timeout')
+
+        try:
+            token = self._acquire(key)
+            if token is None and self.redis_client:
+                # Another process holds the lock: wait for its value in L2
+                deadline = time.monotonic() + self.lock_timeout
+                while time.monotonic() < deadline:
+                    time.sleep(POLL_INTERVAL)
+                    entry = self._lookup_l2(key, time.time())
+                    if entry is not None:
+                        return entry.value
+                return self._compute(key, compute, ttl, tags, 'lock_timeout')
+            try:
+                return self._compute(key, compute, ttl, tags, 'miss')
+            finally:
+                self._release(key, token)
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def _acquire(self, key: str) -> Optional[str]:
+        """Take the cross-process recompute lock; returns its token or None."""
+        if not self.redis_client:
+            return ""  # no L2: the in-process single flight is all there is
+        token = uuid.uuid4().hex
+        try:
+            if self.redis_client.set(LOCK_KEY.format(key), token, nx=True,
+                                     px=int(self.lock_timeout * 1000)):
+                return token
+            return None
+        except Exception as e:
+            logger.error(f"Failed to lock cache key {key}: {e}")
+            return ""  # Redis is failing: compute without it
+
+    def _release(self, key: str, token: Optional[str]) -> None:
+        if not token or not self.redis_client:
+            return
+        try:
+            if self._release_script is None:
+                self._release_script = self.redis_client.register_script(RELEASE_SCRIPT)
+            self._release_script(keys=[LOCK_KEY.format(key)], args=[token])
+        except Exception as e:
+            logger.error(f"Failed to unlock cache key {key}: {e}")
 
 
 # Global caching service instance
 caching_service = CachingService()
+
+
+def _call_key(args: tuple, kwargs: dict) -> str:
+    payload = json.dumps([args, kwargs], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def cached(ttl: Optional[int] = None,
+           tags: Union[Iterable[str], Callable[..., Iterable[str]], None] = None,
+           key_prefix: Optional[str] = None,
+           service: Optional[CachingService] = None):
+    """
+    Cache a function's JSON-serialisable result through get_or_set().
+
+    The key is key_prefix (default: module.qualname) plus a digest of the
+    arguments. tags may be a list or a callable taking the same arguments.
+    """
+    def decorator(func):
+        prefix = key_prefix or f"cache:{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = f"{prefix}:{_call_key(args, kwargs)}"
+            key_tags = tags(*args, **kwargs) if callable(tags) else tags
+            return (service or caching_service).get_or_set(
+                key, lambda: func(*args, **kwargs), ttl=ttl, tags=key_tags)
+
+        wrapper.key_prefix = prefix
+        return wrapper
+    return decorator
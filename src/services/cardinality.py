@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Cardinality guard for tenant-labelled Prometheus metrics.
+
+Labels such as key_id, org_id and actor_id grow with the customer base, and
+every distinct value is a new series held in process memory and serialised
+on each scrape. A LabelGuard tracks the heavy hitters of one label with a
+Space-Saving sketch (fixed number of counters, no matter how many distinct
+values are seen) and lets only the top-K values through as their own series;
+all other values are recorded under OTHER_LABEL.
+
+The first top-K distinct values are admitted as they arrive, so small
+deployments see exactly the labels they did before. Every rebalance_every
+observations the admitted set is replaced by the sketch's current top-K:
+newly heavy values get their own series and demoted values' series are
+removed (they go stale in Prometheus, so rate() over the remaining series
+stays correct). In multiprocess mode removed series keep their last value in
+the worker's files until it restarts.
+
+Label sets that were folded into OTHER_LABEL are themselves counted in a
+bounded sketch so GET /metrics/cardinality can list the heaviest of them.
+"""
+import heapq
+import threading
+from operator import itemgetter
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+OTHER_LABEL = "other"
+
+
+class SpaceSaving:
+    """Space-Saving heavy-hitter sketch (Metwally et al.) over `capacity` counters.
+
+    An item's estimate overcounts its true frequency by at most its error, and
+    every item seen more than total / capacity times is guaranteed to be held.
+    Counters are kept in buckets by count so add() and eviction are O(1).
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.total = 0
+        self._counts: Dict[Hashable, int] = {}
+        self._errors: Dict[Hashable, int] = {}
+        self._buckets: Dict[int, Set[Hashable]] = {}
+        self._min = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._counts
+
+    def add(self, item: Hashable) -> int:
+        """Count one occurrence of item; returns its new estimate."""
+        self.total += 1
+        count = self._counts.get(item)
+        if count is not None:
+            self._unbucket(item, count)
+            if count == self._min and count not in self._buckets:
+                self._min = count + 1
+            count += 1
+        elif len(self._counts) < self.capacity:
+            self._errors[item] = 0
+            count = self._min = 1
+        else:
+            # Replace a minimum counter; the newcomer inherits its count as error
+            floor = self._min
+            victim = next(iter(self._buckets[floor]))
+            self._unbucket(victim, floor)
+            del self._counts[victim], self._errors[victim]
+            if floor not in self._buckets:
+                self._min = floor + 1
+            self._errors[item] = floor
+            count = floor + 1
+        self._counts[item] = count
+        self._buckets.setdefault(count, set()).add(item)
+        return count
+
+    def estimate(self, item: Hashable) -> int:
+        """Upper bound on item's frequency (0 when not held)."""
+        return self._counts.get(item, 0)
+
+    def top(self, k: int) -> List[Tuple[Hashable, int, int]]:
+        """The k heaviest held items as (item, estimate, error), heaviest first."""
+        return [(item, count, self._errors[item])
+                for item, count in heapq.nlargest(k, self._counts.items(), key=itemgetter(1))]
+
+    def _unbucket(self, item: Hashable, count: int) -> None:
+        bucket = self._buckets[count]
+        bucket.discard(item)
+        if not bucket:
+            del self._buckets[count]
+
+
+class LabelGuard:
+    """Admits the top-K values of one label; everything else becomes OTHER_LABEL."""
+
+    def __init__(self, label: str, top_k: int = 100, capacity: Optional[int] = None,
+                 rebalance_every: int = 1000):
+        self.label = label
+        self.top_k = top_k
+        self.rebalance_every = rebalance_every
+        self.sketch = SpaceSaving(capacity or top_k * 10)
+        self.dropped_total = 0
+        self._admitted: Set[str] = set()
+        # admitted value -> series it appears in, removed when it is demoted
+        self._series: Dict[str, Set[Tuple[object, Tuple[str, ...]]]] = {}
+        self._since_rebalance = 0
+        self._lock = threading.Lock()
+
+    def admit(self, value: str) -> Tuple[str, List[str]]:
+        """Count value; returns (label value to emit, values demoted by a rebalance)."""
+        demoted: List[str] = []
+        with self._lock:
+            self.sketch.add(value)
+            self._since_rebalance += 1
+            if self._since_rebalance >= self.rebalance_every:
+                demoted = self._rebalance()
+            if value in self._admitted:
+                return value, demoted
+            if len(self._admitted) < self.top_k:
+                self._admitted.add(value)
+                return value, demoted
+            self.dropped_total += 1
+        return OTHER_LABEL, demoted
+
+    def track(self, value: str, metric, labelvalues: Tuple[str, ...]) -> None:
+        """Remember that an admitted value appears in metric's series labelvalues."""
+        series = self._series.get(value)
+        if series is None:
+            with self._lock:
+                if value not in self._admitted:
+                    return
+                series = self._series.setdefault(value, set())
+        series.add((metric, labelvalues))
+
+    def pop_series(self, values: List[str]) -> List[Tuple[object, Tuple[str, ...]]]:
+        """Forget and return the series of demoted values."""
+        with self._lock:
+            return [entry for value in values for entry in self._series.pop(value, ())]
+
+    def admitted(self) -> Set[str]:
+        with self._lock:
+            return set(self._admitted)
+
+    def _rebalance(self) -> List[str]:
+        self._since_rebalance = 0
+        top = {item for item, _, _ in self.sketch.top(self.top_k)}
+        demoted = list(self._admitted - top)
+        self._admitted = top
+        return demoted
+
+
+class CardinalityGuard:
+    """Applies per-label guards to metric.labels() calls."""
+
+    def __init__(self, labels, top_k: int = 100, capacity: Optional[int] = None,
+                 rebalance_every: int = 1000, dropped_capacity: int = 1000):
+        self.top_k = top_k
+        self.guards = {label: LabelGuard(label, top_k, capacity, rebalance_every) for label in labels}
+        self.dropped = SpaceSaving(dropped_capacity)
+        self._dropped_lock = threading.Lock()
+
+    def labels(self, metric, **labelvalues: str):
+        """metric.labels(**labelvalues) with guarded labels bounded to top-K + other."""
+        original = None
+        demoted = []
+        for name, guard in self.guards.items():
+            value = labelvalues.get(name)
+            if value is None:
+                continue
+            emitted, demoted_values = guard.admit(str(value))
+            if demoted_values:
+                demoted.append((guard, demoted_values))
+            if emitted == OTHER_LABEL:
+                if original is None:
+                    original = dict(labelvalues)
+                labelvalues[name] = OTHER_LABEL
+        for guard, values in demoted:
+            for series_metric, series_labels in guard.pop_series(values):
+                try:
+                    series_metric.remove(*series_labels)
+                except KeyError:
+                    pass
+        key = tuple(str(labelvalues[name]) for name in metric._labelnames)
+        child = metric.labels(*key)
+        for name, guard in self.guards.items():
+            value = labelvalues.get(name)
+            if value is not None and value != OTHER_LABEL:
+                guard.track(str(value), metric, key)
+        if original is not None:
+            with self._dropped_lock:
+                self.dropped.add((metric._name, tuple(sorted(original.items()))))
+        return child
+
+    def report(self, limit: int = 100) -> dict:
+        """Guard state and the heaviest label sets folded into OTHER_LABEL."""
+        with self._dropped_lock:
+            dropped = self.dropped.top(limit)
+        return {
+            "top_k": self.top_k,
+            "labels": {
+                name: {
+                    "observations": guard.sketch.total,
+                    "tracked": len(guard.admitted()),
+                    "dropped_observations": guard.dropped_total,
+                }
+                for name, guard in self.guards.items()
+            },
+            "dropped": [
+                {"metric": metric, "labels": dict(labels), "count": count, "error": error}
+                for (metric, labels), count, error in dropped
+            ],
+        }
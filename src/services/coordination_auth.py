@@ -9,11 +9,12 @@ Supports both session-based auth (primary) and HMAC auth (optional).
 import os
 import hashlib
 from datetime import datetime, timezone
-from flask import request, g, session
+from flask import request, g, session, after_this_request
 from typing import Optional, Tuple, Dict, Any
 
 from src.services.security_enhanced import HMACSecurityService
 from src.services.idempotency import IdempotencyService
+from src.services.request_timing import timed
 from src.models.api_key import ApiKey
 from src.models.agent import Agent
 from src.models.user import User
@@ -54,6 +55,7 @@ class CoordinationAuthService:
 
         return error_data
 
+    @timed("auth")
     def authenticate_request(self,
                              raw_body: bytes,
                              request_id: str) -> Tuple[bool,
@@ -270,6 +272,7 @@ class CoordinationAuthService:
                 request_id=request_id
             ), 401
 
+    @timed("idempotency")
     def check_idempotency(self,
                           body_hash: str,
                           request_id: str) -> Tuple[bool,
@@ -296,12 +299,19 @@ class CoordinationAuthService:
             # Check for custom idempotency key header
             custom_idem_key = request.headers.get('Idempotency-Key')
 
-            # Process idempotency
-            should_process, response, status = self.idempotency_service.process_request_idempotency(
-                key_id=key_id, body_hash=body_hash, custom_idempotency_key=custom_idem_key)
-
-            if not should_process:
-                if status == 409:
+            # Single round trip: replay, conflict, or take the in-flight lock
+            outcome = self.idempotency_service.begin_request(
+                api_key_id=key_id, body_hash=body_hash, custom_idempotency_key=custom_idem_key)
+
+            if not outcome.should_process:
+                if outcome.status_code == 409:
+                    if outcome.response_data.get('code') == 'idempotency_in_progress':
+                        return False, self.create_error_response(
+                            "idempotency_in_progress",
+                            "A request with the same idempotency key is still being processed",
+                            409,
+                            request_id=request_id
+                        ), 409
                     # Idempotency conflict
                     return False, self.create_error_response(
                         "idempotency_conflict",
@@ -311,7 +321,17 @@ class CoordinationAuthService:
                     ), 409
                 else:
                     # Return cached response
-                    return False, response, status
+                    return False, outcome.response_data, outcome.status_code
+
+            # Release the lock if the request ends without a cached response
+            g.idempotency_outcome = outcome
+
+            @after_this_request
+            def release_idempotency_lock(response):
+                pending = g.pop('idempotency_outcome', None)
+                if pending is not None:
+                    self.idempotency_service.release(pending)
+                return response
 
             return True, None, None  # Should process request
 
@@ -334,15 +354,21 @@ class CoordinationAuthService:
             status_code: HTTP status code
         """
         try:
+            outcome = g.pop('idempotency_outcome', None)
+            if outcome is not None:
+                self.idempotency_service.complete_request(
+                    outcome, response_data, status_code, body_hash=body_hash)
+                return
+
             key_id = getattr(g, 'auth_context', {}).get('key_id', 'anonymous')
             custom_idem_key = request.headers.get('Idempotency-Key')
 
-            idem_key = self.idempotency_service.generate_idempotency_key(
+            idem_key = self.idempotency_service.record_key(
                 key_id, body_hash, custom_idem_key
             )
 
             self.idempotency_service.store_response(
-                idem_key, response_data, status_code)
+                idem_key, response_data, status_code, body_hash=body_hash)
 
         except Exception as e:
             # Don't fail the request if caching fails
@@ -381,6 +407,7 @@ class CoordinationAuthService:
                 "true"),
             "uuid4_allowed": self.get_feature_flag("BRIKK_ALLOW_UUID4")}
 
+    @timed("rate_limit")
     def check_rate_limit(self, request_id: str):
         """
         Check rate limit for the current request.
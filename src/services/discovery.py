@@ -5,12 +5,16 @@ Handles agent search, filtering, and personalized recommendations
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timezone, timedelta
 from sqlalchemy import func, or_, and_, desc
+from sqlalchemy.orm import selectinload
 
 from src.database import db
+from src.infra.db import batch_load
 from src.models.marketplace import MarketplaceListing, AgentTag, AgentInstallation
 from src.models.analytics import AgentAnalyticsDaily, AgentTrendingScore
 from src.models.reviews import AgentRatingSummary
-from src.models.agent import Agent
+from src.services.search_index import (
+    LikeSearchBackend, SearchFilters, apply_listing_filters, get_search_index
+)
 from src.infra.log import get_logger
 
 logger = get_logger(__name__)
@@ -45,54 +49,39 @@ class DiscoveryService:
             dict: Search results with listings and metadata
         """
         try:
-            # Build base query
-            base_query = MarketplaceListing.query.filter_by(status='published')
+            filters = SearchFilters(
+                category=category, tags=tags, pricing=pricing, min_rating=min_rating
+            )
             
-            # Apply search query (simple text matching for now)
-            # In production, use PostgreSQL full-text search or Elasticsearch
             if query:
-                search_term = f"%{query}%"
-                base_query = base_query.join(Agent).filter(
-                    or_(
-                        MarketplaceListing.short_description.ilike(search_term),
-                        MarketplaceListing.long_description.ilike(search_term),
-                        Agent.name.ilike(search_term),
-                        Agent.description.ilike(search_term)
-                    )
+                # Ranked by the full-text search index (see search_index.py)
+                backend = get_search_index() or LikeSearchBackend()
+                total_count, hits = backend.search(query, filters, limit=limit, offset=offset)
+                listing_ids = [listing_id for listing_id, _ in hits]
+                by_id = batch_load(
+                    MarketplaceListing, listing_ids,
+                    options=[selectinload(MarketplaceListing.agent)]
                 )
-            
-            # Apply category filter
-            if category:
-                base_query = base_query.filter_by(category=category)
-            
-            # Apply tags filter
-            if tags:
-                for tag in tags:
-                    base_query = base_query.filter(MarketplaceListing.tags.contains([tag]))
-            
-            # Apply pricing filter
-            if pricing:
-                base_query = base_query.filter_by(pricing_model=pricing)
-            
-            # Apply rating filter
-            if min_rating:
-                base_query = base_query.join(
-                    AgentRatingSummary,
-                    MarketplaceListing.agent_id == AgentRatingSummary.agent_id
-                ).filter(AgentRatingSummary.average_rating >= min_rating)
-            
-            # Get total count before pagination
-            total_count = base_query.count()
-            
-            # Apply pagination and ordering (by relevance/popularity)
-            listings = base_query.order_by(
-                MarketplaceListing.install_count.desc()
-            ).limit(limit).offset(offset).all()
+                # Rows deleted since they were indexed are skipped
+                ranked = [(by_id[i], score) for i, score in hits if i in by_id]
+            else:
+                base_query = apply_listing_filters(MarketplaceListing.query, filters)
+                total_count = base_query.count()
+                listings = base_query.options(
+                    selectinload(MarketplaceListing.agent)
+                ).order_by(
+                    MarketplaceListing.install_count.desc()
+                ).limit(limit).offset(offset).all()
+                ranked = [(listing, None) for listing in listings]
+            
+            ratings = batch_load(AgentRatingSummary, (l.agent_id for l, _ in ranked))
             
             # Build results with additional metadata
             results = []
-            for listing in listings:
+            for listing, score in ranked:
                 listing_dict = listing.to_dict()
+                if score is not None:
+                    listing_dict['relevance'] = score
                 
                 # Add agent details
                 if listing.agent:
@@ -103,7 +92,7 @@ class DiscoveryService:
                     }
                 
                 # Add rating
-                rating = AgentRatingSummary.query.get(listing.agent_id)
+                rating = ratings.get(listing.agent_id)
                 if rating:
                     listing_dict['rating'] = {
                         'average': float(rating.average_rating),
@@ -334,12 +323,17 @@ class DiscoveryService:
                 AgentTrendingScore.trending_score.desc()
             ).limit(limit).all()
             
+            published = {}
+            if trending_scores:
+                for listing in MarketplaceListing.query.filter(
+                    MarketplaceListing.agent_id.in_([s.agent_id for s in trending_scores]),
+                    MarketplaceListing.status == 'published'
+                ):
+                    published.setdefault(listing.agent_id, listing)
+            
             results = []
             for score in trending_scores:
-                listing = MarketplaceListing.query.filter_by(
-                    agent_id=score.agent_id,
-                    status='published'
-                ).first()
+                listing = published.get(score.agent_id)
                 
                 if listing:
                     listing_dict = listing.to_dict()
@@ -447,13 +441,14 @@ class DiscoveryService:
             ).order_by(
                 MarketplaceListing.install_count.desc()
             ).limit(limit).all()
+            ratings = batch_load(AgentRatingSummary, (l.agent_id for l in listings))
             
             results = []
             for listing in listings:
                 listing_dict = listing.to_dict()
                 
                 # Add rating
-                rating = AgentRatingSummary.query.get(listing.agent_id)
+                rating = ratings.get(listing.agent_id)
                 if rating:
                     listing_dict['rating'] = {
                         'average': float(rating.average_rating),
@@ -483,7 +478,9 @@ class DiscoveryService:
         try:
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
             
-            listings = MarketplaceListing.query.filter(
+            listings = MarketplaceListing.query.options(
+                selectinload(MarketplaceListing.agent)
+            ).filter(
                 MarketplaceListing.status == 'published',
                 MarketplaceListing.published_at >= cutoff_date
             ).order_by(
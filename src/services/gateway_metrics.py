@@ -7,18 +7,32 @@ Extends the base metrics service with API Gateway specific metrics:
 - Rate limit events
 - Tier-based request tracking
 - OAuth token generation/verification
+
+Tenant labels (key_id, org_id, actor_id, client_id) go through a
+CardinalityGuard: only each label's top-K values (BRIKK_METRICS_LABEL_TOP_K)
+get their own series and the long tail is recorded as "other". Folded label
+sets are listed at GET /metrics/cardinality.
 """
+import os
+
 from prometheus_client import Counter, Histogram, Gauge
-from flask import g, request
+from flask import g, jsonify, request
 from typing import Optional
 
+from src.services.cardinality import CardinalityGuard
+
+GUARDED_LABELS = ("key_id", "org_id", "actor_id", "client_id")
+
 
 class GatewayMetrics:
     """API Gateway specific metrics."""
     
-    def __init__(self, registry):
+    def __init__(self, registry, top_k: Optional[int] = None):
         """Initialize gateway metrics."""
         self.registry = registry
+        self.guard = CardinalityGuard(
+            GUARDED_LABELS,
+            top_k=top_k or int(os.environ.get("BRIKK_METRICS_LABEL_TOP_K", "100")))
         
         # Authentication metrics
         self.auth_requests_total = Counter(
@@ -47,7 +61,8 @@ class GatewayMetrics:
             "brikk_rate_limit_remaining",
             "Remaining requests in current window",
             ["actor_id", "tier"],
-            registry=self.registry
+            registry=self.registry,
+            multiprocess_mode="livemin"
         )
         
         # Risk scoring metrics (Phase 7)
@@ -122,7 +137,7 @@ class GatewayMetrics:
     
     def record_oauth_token_issued(self, client_id: str):
         """Record an OAuth token issuance."""
-        self.oauth_tokens_issued_total.labels(client_id=client_id).inc()
+        self.guard.labels(self.oauth_tokens_issued_total, client_id=client_id).inc()
     
     def record_oauth_token_verification(self, success: bool):
         """Record an OAuth token verification."""
@@ -131,8 +146,16 @@ class GatewayMetrics:
     
     def record_api_key_usage(self, key_id: str, org_id: str):
         """Record API key usage."""
-        self.api_key_usage_total.labels(key_id=key_id, org_id=org_id).inc()
+        self.guard.labels(self.api_key_usage_total, key_id=key_id, org_id=org_id).inc()
     
+    def record_rate_limit_remaining(self, actor_id: str, tier: str, remaining: int):
+        """Record the remaining requests in an actor's current window."""
+        self.guard.labels(self.rate_limit_remaining, actor_id=actor_id, tier=tier).set(remaining)
+
+    def record_risk_score(self, org_id: str):
+        """Record a computed risk score."""
+        self.guard.labels(self.risk_score_computed, org_id=org_id).inc()
+
     def record_auth_latency(self, method: str, duration_seconds: float):
         """Record authentication latency."""
         self.auth_latency_seconds.labels(method=method).observe(duration_seconds)
@@ -163,6 +186,15 @@ def init_gateway_metrics(app):
                 )
             return response
 
+        from src.routes.auth_admin import require_admin_token
+
+        # Lists raw tenant identifiers: admin only
+        @app.route("/metrics/cardinality")
+        @require_admin_token
+        def metrics_cardinality():
+            limit = request.args.get("limit", 100, type=int)
+            return jsonify(gateway_metrics.guard.report(limit=limit))
+
 
 def get_gateway_metrics():
     """Get the gateway metrics instance from the current app context."""
@@ -1,26 +1,120 @@
 # -*- coding: utf-8 -*-
 '''
 Redis-based idempotency service for Brikk API to prevent duplicate request processing.
+
+The check and the in-flight lock are a single Lua call (one round trip):
+- a stored result is replayed (or reported as a conflict if the body differs)
+- otherwise a short lease lock is taken with SET NX PX so only one duplicate runs
+- concurrent duplicates wait briefly for the first result instead of re-running
+
+Stored results use a compact binary record: a fixed header carrying the body
+hash (so Lua can detect conflicts) followed by zlib-compressed JSON. Legacy
+plain-JSON records are still readable.
+
+Configuration:
+    BRIKK_IDEM_LEASE_MS=10000  - In-flight lock lease
+    BRIKK_IDEM_WAIT_MS=2000    - How long a duplicate waits for the first result (0 = don't wait)
 '''
 import json
+import secrets
+import time
+import zlib
 import redis
+from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple, Union
 from flask import current_app
 import os
 
+from src.infra.redis_pool import get_redis
+
+
+RECORD_MAGIC = b'BKI1'
+BODY_HASH_FIELD_LEN = 64
+ANY_BODY = b'*' * BODY_HASH_FIELD_LEN  # record stored without a body hash
+
+# KEYS: record, lock   ARGV: body hash field, lease ms, lock token
+# Returns {0} acquired, {1, record} replay, {2} conflict, {3} in flight
+BEGIN_SCRIPT = '''
+local record = redis.call('GET', KEYS[1])
+if record then
+    if string.sub(record, 1, 4) == 'BKI1' then
+        local stored = string.sub(record, 5, 68)
+        if stored ~= string.rep('*', 64) and stored ~= ARGV[1] then
+            return {2}
+        end
+    end
+    return {1, record}
+end
+if redis.call('SET', KEYS[2], ARGV[3], 'NX', 'PX', ARGV[2]) then
+    return {0}
+end
+return {3}
+'''
+
+# KEYS: record, lock   ARGV: record bytes, ttl seconds
+COMPLETE_SCRIPT = '''
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('DEL', KEYS[2])
+return 1
+'''
+
+# KEYS: lock   ARGV: lock token
+RELEASE_SCRIPT = '''
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+'''
+
+
+def _body_hash_field(body_hash: Optional[str]) -> bytes:
+    '''Fixed-width body hash for the record header.'''
+    if not body_hash:
+        return ANY_BODY
+    return body_hash.encode()[:BODY_HASH_FIELD_LEN].ljust(BODY_HASH_FIELD_LEN, b'.')
+
+
+def encode_record(record: Dict[str, Any], body_hash: Optional[str] = None) -> bytes:
+    '''Encode a stored response as header + zlib(JSON).'''
+    payload = json.dumps(record, separators=(',', ':')).encode()
+    return RECORD_MAGIC + _body_hash_field(body_hash) + zlib.compress(payload)
+
+
+def decode_record(data: Union[bytes, str]) -> Dict[str, Any]:
+    '''Decode a binary record, or a legacy plain-JSON record.'''
+    if isinstance(data, bytes) and data.startswith(RECORD_MAGIC):
+        header_len = len(RECORD_MAGIC) + BODY_HASH_FIELD_LEN
+        return json.loads(zlib.decompress(data[header_len:]))
+    return json.loads(data)
+
+
+@dataclass
+class IdempotencyOutcome:
+    '''Result of begin_request.'''
+    should_process: bool
+    response_data: Optional[Dict[str, Any]] = None
+    status_code: Optional[int] = None
+    record_key: Optional[str] = None
+    lock_token: Optional[str] = None
+
 
 class IdempotencyService:
     '''Redis-based idempotency service with 24-hour TTL.'''
 
     def __init__(self, redis_client: Optional[redis.Redis] = None):
-        '''Initialize idempotency service with Redis client.'''
+        '''Initialize idempotency service with Redis client (must be binary-safe).'''
         if redis_client:
             self.redis = redis_client
         else:
-            # Create Redis client from environment variables
-            redis_url = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
-            self.redis = redis.from_url(redis_url, decode_responses=True)
+            # Shared process-wide pool: this service is built per request
+            self.redis = get_redis('idempotency')
+
+        self.lease_ms = int(os.environ.get('BRIKK_IDEM_LEASE_MS', '10000'))
+        self.wait_ms = int(os.environ.get('BRIKK_IDEM_WAIT_MS', '2000'))
+        self._begin_script = None
+        self._complete_script = None
+        self._release_script = None
 
     @staticmethod
     def generate_idempotency_key(
@@ -45,15 +139,113 @@ class IdempotencyService:
 
         return base_key
 
+    @classmethod
+    def record_key(
+            cls,
+            api_key_id: str,
+            body_hash: str,
+            custom_key: Optional[str] = None) -> str:
+        '''
+        Key the stored result lives under.
+
+        With a client idempotency key the record is scoped to that key (the
+        body hash in the record header detects conflicts); otherwise it is
+        scoped to the body hash.
+        '''
+        if custom_key:
+            return cls.generate_idempotency_key(api_key_id, "", custom_key)
+        return cls.generate_idempotency_key(api_key_id, body_hash)
+
+    @staticmethod
+    def lock_key(record_key: str) -> str:
+        '''In-flight lock key for a record key.'''
+        return f"{record_key}:lock"
+
+    def _script(self, name: str, source: str):
+        '''Lazily register a Lua script (EVALSHA with NOSCRIPT fallback).'''
+        script = getattr(self, name)
+        if script is None:
+            script = self.redis.register_script(source)
+            setattr(self, name, script)
+        return script
+
+    def begin_request(
+        self,
+        api_key_id: str,
+        body_hash: str,
+        custom_idempotency_key: Optional[str] = None
+    ) -> IdempotencyOutcome:
+        '''
+        Atomically check for a stored result and take the in-flight lock.
+
+        Concurrent duplicates wait up to BRIKK_IDEM_WAIT_MS for the first
+        request's result and replay it; if it doesn't arrive they get 409.
+        '''
+        record_key = self.record_key(api_key_id, body_hash, custom_idempotency_key)
+        lock_key = self.lock_key(record_key)
+        token = secrets.token_hex(8)
+        script = self._script('_begin_script', BEGIN_SCRIPT)
+
+        deadline = time.monotonic() + self.wait_ms / 1000.0
+        delay = 0.01
+        while True:
+            result = script(
+                keys=[record_key, lock_key],
+                args=[_body_hash_field(body_hash), self.lease_ms, token])
+            state = int(result[0])
+
+            if state == 0:
+                return IdempotencyOutcome(True, record_key=record_key, lock_token=token)
+            if state == 1:
+                record = decode_record(result[1])
+                return IdempotencyOutcome(
+                    False, record.get('response_data'), record.get('status_code'), record_key)
+            if state == 2:
+                return IdempotencyOutcome(False, self._conflict_response(api_key_id), 409, record_key)
+
+            # state == 3: another request holds the lock
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return IdempotencyOutcome(False, {
+                    'code': 'idempotency_in_progress',
+                    'message': 'A request with the same idempotency key is still being processed',
+                    'request_id': f"req_{api_key_id[:8]}"}, 409, record_key)
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.1)
+
+    def complete_request(
+        self,
+        outcome: IdempotencyOutcome,
+        response_data: Dict[str, Any],
+        status_code: int,
+        body_hash: Optional[str] = None,
+        ttl_hours: int = 24
+    ) -> bool:
+        '''Store the result for an acquired request and drop its lock.'''
+        return self.store_response(
+            outcome.record_key, response_data, status_code, ttl_hours, body_hash=body_hash)
+
+    def release(self, outcome: IdempotencyOutcome) -> bool:
+        '''Release an in-flight lock without storing a result (e.g. on error).'''
+        if not outcome.lock_token:
+            return False
+        try:
+            script = self._script('_release_script', RELEASE_SCRIPT)
+            return bool(script(keys=[self.lock_key(outcome.record_key)], args=[outcome.lock_token]))
+        except Exception as e:
+            current_app.logger.error(f"Failed to release idempotency lock: {e}")
+            return False
+
     def store_response(
         self,
         idempotency_key: str,
         response_data: Dict[str, Any],
         status_code: int = 200,
-        ttl_hours: int = 24
+        ttl_hours: int = 24,
+        body_hash: Optional[str] = None
     ) -> bool:
         '''
-        Store response data for idempotency checking.
+        Store response data for idempotency checking and release the in-flight lock.
 
         Returns True if stored successfully, False otherwise.
         '''
@@ -66,13 +258,12 @@ class IdempotencyService:
                 'ttl_hours': ttl_hours
             }
 
-            # Store in Redis with TTL
+            # Store in Redis with TTL and drop the lock in one round trip
             ttl_seconds = ttl_hours * 3600
-            return self.redis.setex(
-                idempotency_key,
-                ttl_seconds,
-                json.dumps(record)
-            )
+            script = self._script('_complete_script', COMPLETE_SCRIPT)
+            return bool(script(
+                keys=[idempotency_key, self.lock_key(idempotency_key)],
+                args=[encode_record(record, body_hash), ttl_seconds]))
 
         except Exception as e:
             current_app.logger.error(
@@ -91,7 +282,7 @@ class IdempotencyService:
             if not cached_data:
                 return None, None
 
-            record = json.loads(cached_data)
+            record = decode_record(cached_data)
             return record.get('response_data'), record.get('status_code')
 
         except Exception as e:
@@ -99,103 +290,12 @@ class IdempotencyService:
                 f"Failed to retrieve idempotency record: {e}")
             return None, None
 
-    def check_request_conflict(
-        self,
-        api_key_id: str,
-        current_body_hash: str,
-        custom_idempotency_key: Optional[str] = None
-    ) -> Tuple[bool, Optional[str], Optional[Tuple[Dict[str, Any], int]]]:
-        '''
-        Check for idempotency conflicts.
-
-        Returns:
-        - (False, None, None): No conflict, proceed with request
-        - (True, "cached", (response_data, status_code)): Same request, return cached response
-        - (True, "conflict", None): Different request with same idempotency key, return 409
-        '''
-        try:
-            if custom_idempotency_key:
-                # Check if custom idempotency key is already used with
-                # different body
-                custom_key = self.generate_idempotency_key(
-                    api_key_id, "", custom_idempotency_key)
-                response_data, status_code = self.get_cached_response(
-                    custom_key)
-                cached_response = (
-                    response_data,
-                    status_code) if response_data else None
-
-                if cached_response:
-                    # Check if this is the same request (same body hash)
-                    stored_body_key = self.generate_idempotency_key(
-                        api_key_id, current_body_hash)
-                    same_request_response, same_status_code = self.get_cached_response(
-                        stored_body_key)
-                    same_request_tuple = (
-                        same_request_response,
-                        same_status_code) if same_request_response else None
-
-                    if same_request_tuple:
-                        # Same request, return cached response
-                        return True, "cached", same_request_tuple
-                    else:
-                        # Different request with same custom idempotency key
-                        return True, "conflict", None
-
-            # Check for exact request match (same API key + body hash)
-            request_key = self.generate_idempotency_key(
-                api_key_id, current_body_hash)
-            response_data, status_code = self.get_cached_response(request_key)
-            cached_response = (response_data,
-                               status_code) if response_data else None
-
-            if cached_response:
-                return True, "cached", cached_response
-
-            return False, None, None
-
-        except Exception as e:
-            current_app.logger.error(
-                f"Failed to check idempotency conflict: {e}")
-            # On error, allow request to proceed (fail open)
-            return False, None, None
-
-    def process_request_idempotency(
-        self,
-        api_key_id: str,
-        body_hash: str,
-        custom_idempotency_key: Optional[str] = None
-    ) -> Tuple[bool, Optional[Dict[str, Any]], Optional[int]]:
-        '''
-        Process request idempotency check.
-
-        Returns:
-        - (True, None, None): Proceed with request processing
-        - (False, response_data, status_code): Return cached/error response immediately
-        '''
-        try:
-            is_conflict, conflict_type, cached_response = self.check_request_conflict(
-                api_key_id, body_hash, custom_idempotency_key)
-
-            if is_conflict:
-                if conflict_type == "cached":
-                    # Return cached response
-                    return False, cached_response[0], cached_response[1]
-                elif conflict_type == "conflict":
-                    # Return 409 Conflict
-                    error_response = {
-                        'code': 'idempotency_conflict',
-                        'message': 'Request with same idempotency key but different body already processed',
-                        'request_id': f"req_{api_key_id[:8]}"}
-                    return False, error_response, 409
-
-            # No conflict, proceed with request
-            return True, None, None
-
-        except Exception as e:
-            current_app.logger.error(f"Failed to process idempotency: {e}")
-            # On error, allow request to proceed (fail open)
-            return True, None, None
+    @staticmethod
+    def _conflict_response(api_key_id: str) -> Dict[str, Any]:
+        return {
+            'code': 'idempotency_conflict',
+            'message': 'Request with same idempotency key but different body already processed',
+            'request_id': f"req_{api_key_id[:8]}"}
 
     def cleanup_expired_keys(self, batch_size: int = 1000) -> int:
         '''
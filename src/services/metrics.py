@@ -4,15 +4,93 @@ Service for managing Prometheus metrics.
 
 Provides a centralized service for creating, registering, and collecting metrics.
 Also includes middleware for automatically recording HTTP request metrics.
+
+HTTP metrics are labelled with the matched route template (e.g.
+/api/v1/agents/{agent_id}), memoised per rule. Requests that match no rule
+(404s) fall back to a cached regex normaliser that collapses ID-like path
+segments, and at most BRIKK_METRICS_MAX_ROUTES distinct fallback labels are
+kept before further paths are recorded as __other__.
+
+Under gunicorn each worker is a separate process with its own registry. When
+PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py sets it before workers
+start), prometheus_client backs every metric value with an mmap'd file in
+that directory and /metrics aggregates all workers' files through a
+MultiProcessCollector; gunicorn.conf.py marks exited workers dead so their
+live gauges are dropped.
 """
 
 import os
+import re
+import threading
 import time
-from typing import Optional
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
 from flask import Flask, request, g, current_app, has_app_context
-from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, Gauge
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, Gauge, multiprocess
 from prometheus_client.exposition import generate_latest
 
+OTHER_ROUTE = "__other__"
+# Clients can send any method token; everything else is counted as OTHER_METHOD
+HTTP_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE"))
+OTHER_METHOD = "other"
+
+_RULE_VARIABLE = re.compile(r"<(?:[^:<>]+:)?([^<>]+)>")
+_ID_SEGMENTS = (
+    (re.compile(r"^[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}$"), "{uuid}"),
+    (re.compile(r"^\d+$"), "{id}"),
+    # Hex digests and opaque tokens (long, containing a digit)
+    (re.compile(r"^(?=[^/]*\d)[A-Za-z0-9_\-.~]{16,}$"), "{id}"),
+)
+
+
+def rule_label(rule: str) -> str:
+    """Route template label: /agents/<int:agent_id> -> /agents/{agent_id}."""
+    return _RULE_VARIABLE.sub(r"{\1}", rule)
+
+
+@lru_cache(maxsize=4096)
+def normalize_path(path: str) -> str:
+    """Collapse ID-like segments of a raw path: /x/42/ab12... -> /x/{id}/{id}."""
+    parts = path.split("/")
+    for i, part in enumerate(parts):
+        for pattern, replacement in _ID_SEGMENTS:
+            if pattern.match(part):
+                parts[i] = replacement
+                break
+    return "/".join(parts)
+
+
+def multiprocess_dir() -> Optional[str]:
+    """Shared metrics directory when running in multiprocess mode, else None."""
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or None
+
+
+def collect_metrics(registry: CollectorRegistry = REGISTRY) -> bytes:
+    """Exposition text for this process, or for all workers in multiprocess mode."""
+    path = multiprocess_dir()
+    if path is None:
+        return generate_latest(registry)
+    # A fresh registry per scrape: the collector reads every worker's files
+    aggregate = CollectorRegistry()
+    multiprocess.MultiProcessCollector(aggregate, path=path)
+    return generate_latest(aggregate)
+
+
+def prepare_multiprocess_dir(path: str) -> None:
+    """Create the multiprocess directory and remove files left by a previous run."""
+    directory = Path(path)
+    directory.mkdir(parents=True, exist_ok=True)
+    for stale in directory.glob("*.db"):
+        stale.unlink()
+
+
+def mark_process_dead(pid: int, path: Optional[str] = None) -> None:
+    """Drop an exited worker's live gauge files (gunicorn child_exit hook)."""
+    path = path or multiprocess_dir()
+    if path:
+        multiprocess.mark_process_dead(pid, path)
+
 
 def init_metrics(app: Flask) -> None:
     """Initialize metrics service and endpoints."""
@@ -23,13 +101,13 @@ def init_metrics(app: Flask) -> None:
         # Add middleware to record HTTP requests
         @app.before_request
         def before_request():
-            g.start_time = time.time()
+            g.start_time = time.perf_counter()
 
         @app.after_request
         def after_request(response):
-            duration = time.time() - g.start_time
+            duration = time.perf_counter() - g.start_time
             service.record_http_request(
-                route=request.path,
+                route=service.route_label(),
                 method=request.method,
                 status_code=response.status_code,
                 duration_seconds=duration
@@ -39,7 +117,7 @@ def init_metrics(app: Flask) -> None:
         # Add /metrics endpoint
         @app.route("/metrics")
         def metrics():
-            return generate_latest(service.registry), 200, {
+            return collect_metrics(service.registry), 200, {
                 'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
 
 
@@ -53,12 +131,20 @@ def get_metrics_service() -> Optional['MetricsService']:
 class MetricsService:
     """Service for managing Prometheus metrics."""
 
-    def __init__(self, registry: Optional[CollectorRegistry] = None):
+    def __init__(self, registry: Optional[CollectorRegistry] = None,
+                 max_routes: Optional[int] = None):
         """Initialize the metrics service."""
         self.enabled = os.environ.get(
             "BRIKK_METRICS_ENABLED",
             "true").lower() == "true"
         self.registry = registry if registry is not None else REGISTRY
+        self.max_routes = max_routes or int(os.environ.get("BRIKK_METRICS_MAX_ROUTES", "500"))
+        self._rule_labels: Dict[str, str] = {}
+        self._route_labels: Set[str] = {OTHER_ROUTE}
+        self._fallback_labels = 0
+        self._route_lock = threading.Lock()
+        # (route, method, status) -> pre-resolved (counter, histogram) children
+        self._http_children: Dict[Tuple[str, str, int], Tuple[Counter, Histogram]] = {}
 
         if self.enabled:
             self.http_requests_total = Counter(
@@ -93,12 +179,14 @@ class MetricsService:
             self.redis_up = Gauge(
                 "brikk_redis_up",
                 "Redis connection status (1 for up, 0 for down).",
+                multiprocess_mode="livemin",
                 registry=self.registry
             )
             self.feature_flags = Gauge(
                 "brikk_feature_flag",
                 "Status of feature flags (1 for enabled, 0 for disabled).",
                 ["flag", "enabled"],
+                multiprocess_mode="livemax",
                 registry=self.registry
             )
             # Phase 8.5 metrics
@@ -128,18 +216,36 @@ class MetricsService:
             duration_seconds: float):
         """Record an HTTP request."""
         if self.enabled:
-            normalized_route = self._normalize_route(route)
-            self.http_requests_total.labels(
-                route=normalized_route,
-                method=method,
-                status=status_code).inc()
-            self.http_request_duration_seconds.labels(
-                route=normalized_route, method=method).observe(duration_seconds)
+            if method not in HTTP_METHODS:
+                method = OTHER_METHOD
+            children = self._http_children.get((route, method, status_code))
+            if children is None:
+                children = self._resolve_http_children(route, method, status_code)
+            counter, histogram = children
+            counter.inc()
+            histogram.observe(duration_seconds)
+
+    def _resolve_http_children(self, route: str, method: str, status_code: int):
+        """Resolve and cache the labelled children for one route/method/status.
+
+        Skips labels() (lock, label validation, child lookup) on every later
+        request; in multiprocess mode the children write straight to their
+        mmap'd value files. The cache is bounded by the route-label cap and
+        HTTP_METHODS.
+        """
+        normalized_route = self._normalize_route(route)
+        children = (
+            self.http_requests_total.labels(route=normalized_route, method=method, status=status_code),
+            self.http_request_duration_seconds.labels(route=normalized_route, method=method),
+        )
+        if normalized_route == route:
+            self._http_children[(route, method, status_code)] = children
+        return children
 
     def get_metrics(self) -> str:
         """Get metrics data as text."""
         if self.enabled:
-            return generate_latest(self.registry).decode('utf-8')
+            return collect_metrics(self.registry).decode('utf-8')
         return ""
 
     def record_playground_agent_run(self, agent_id: str, status: str):
@@ -160,15 +266,31 @@ class MetricsService:
         if self.enabled:
             self.access_me_requests_total.labels(status=status).inc()
 
+    def route_label(self) -> str:
+        """Metrics route label for the current request."""
+        rule = request.url_rule
+        if rule is None:
+            return self._normalize_route(request.path)
+        label = self._rule_labels.get(rule.rule)
+        if label is None:
+            label = rule_label(rule.rule)
+            with self._route_lock:
+                # Bounded by the URL map, so templates do not use the cap
+                self._route_labels.add(label)
+                self._rule_labels[rule.rule] = label
+        return label
+
     def _normalize_route(self, route: str) -> str:
-        parts = route.split('/')
-        for i, part in enumerate(parts):
-            if part.isdigit():
-                parts[i] = '{id}'
-            try:
-                import uuid
-                uuid.UUID(part)
-                parts[i] = '{uuid}'
-            except (ValueError, AttributeError):
-                pass
-        return '/'.join(parts)
+        """Label for a route template or raw path, enforcing the fallback-label cap."""
+        if route in self._route_labels:
+            return route
+        label = normalize_path(route)
+        if label in self._route_labels:
+            return label
+        with self._route_lock:
+            if label not in self._route_labels:
+                if self._fallback_labels >= self.max_routes:
+                    return OTHER_ROUTE
+                self._route_labels.add(label)
+                self._fallback_labels += 1
+        return label
@@ -7,9 +7,9 @@ import os
 import uuid
 import time
 import logging
-import requests
-from typing import Dict, Any, Optional
-from src.services.provider_metrics import record_request, update_provider_availability
+from typing import Dict, Any, Iterator, Optional, Tuple
+from src.services.provider_metrics import record_request, record_stream_latency, update_provider_availability
+from src.services.provider_transport import ProviderTimeout, get_transport, stream_chat_completion
 
 logger = logging.getLogger(__name__)
 
@@ -19,13 +19,35 @@ class MistralService:
     def __init__(self):
         self.api_key = os.getenv("MISTRAL_API_KEY", "")
         self.model = os.getenv("MISTRAL_MODEL", "mistral-small-latest")
-        self.api_base = "https://api.mistral.ai/v1"
-        self.timeout = 30
+        self.api_base = os.getenv("MISTRAL_API_BASE", "https://api.mistral.ai/v1")
+        # Shared keep-alive connection pool (see provider_transport.py)
+        self.transport = get_transport("mistral")
+        self.timeout = self.transport.timeout
         
     def is_configured(self) -> bool:
         """Check if Mistral API key is configured."""
         return bool(self.api_key)
     
+    def _build_request(self, message: str, system: Optional[str]) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """Headers and chat completion payload for a message."""
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": message})
+        
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 500
+        }
+        return headers, payload
+    
     def chat(
         self,
         message: str,
@@ -63,33 +85,15 @@ class MistralService:
                 "latency_ms": int((time.time() - start_time) * 1000)
             }
         
-        # Build messages
-        messages = []
-        if system:
-            messages.append({"role": "system", "content": system})
-        messages.append({"role": "user", "content": message})
-        
-        # Prepare request
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": 0.7,
-            "max_tokens": 500
-        }
+        headers, payload = self._build_request(message, system)
         
         try:
             logger.info(f"[{request_id}] Mistral request: model={self.model}, language={language}")
             
-            response = requests.post(
+            response = self.transport.post(
                 f"{self.api_base}/chat/completions",
                 headers=headers,
-                json=payload,
-                timeout=self.timeout
+                payload=payload
             )
             
             latency_ms = int((time.time() - start_time) * 1000)
@@ -107,6 +111,7 @@ class MistralService:
                 
                 # Record metrics
                 record_request("mistral", "success", False, latency_ms)
+                record_stream_latency("mistral", "buffered", latency_ms, latency_ms)
                 update_provider_availability("mistral", True)
                 
                 return {
@@ -142,7 +147,7 @@ class MistralService:
                     "latency_ms": latency_ms
                 }
                 
-        except requests.exceptions.Timeout:
+        except ProviderTimeout:
             latency_ms = int((time.time() - start_time) * 1000)
             logger.error(f"[{request_id}] Mistral timeout after {latency_ms}ms")
             return {
@@ -163,4 +168,42 @@ class MistralService:
                 "request_id": request_id,
                 "latency_ms": latency_ms
             }
-
+    
+    def chat_stream(
+        self,
+        message: str,
+        system: Optional[str] = None,
+        language: Optional[str] = None,
+        meta: Optional[Dict[str, Any]] = None,
+        request_id: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a chat completion from Mistral as it is generated.
+        
+        Yields:
+            {"type": "token", "content": str} events, then a final "done"
+            or "error" event (see provider_transport.stream_chat_completion)
+        """
+        if not request_id:
+            request_id = str(uuid.uuid4())
+        
+        if not self.is_configured():
+            logger.warning(f"[{request_id}] Mistral API key not configured")
+            yield {
+                "type": "error",
+                "error": "MISTRAL_API_KEY not configured",
+                "provider": "mistral",
+                "model": self.model,
+                "request_id": request_id,
+                "latency_ms": 0,
+                "partial": False
+            }
+            return
+        
+        headers, payload = self._build_request(message, system)
+        payload["stream"] = True
+        
+        logger.info(f"[{request_id}] Mistral stream request: model={self.model}, language={language}")
+        yield from stream_chat_completion(
+            self.transport, f"{self.api_base}/chat/completions", headers, payload, self.model, request_id
+        )
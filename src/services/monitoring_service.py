@@ -19,6 +19,7 @@ import redis
 from flask import current_app
 from sqlalchemy import text, func
 from src.database import db
+from src.infra.redis_pool import get_redis
 from src.models.agent import Agent, Coordination
 from src.models.audit_log import AuditLog
 from src.services.structured_logging import get_logger
@@ -76,8 +77,7 @@ class MonitoringService:
     def _get_redis_client(self) -> Optional[redis.Redis]:
         """Get Redis client for metrics storage"""
         try:
-            redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
-            client = redis.from_url(redis_url, decode_responses=True)
+            client = get_redis('monitoring')
             client.ping()
             return client
         except Exception as e:
@@ -7,9 +7,9 @@ import os
 import uuid
 import time
 import logging
-import requests
-from typing import Dict, Any, Optional
-from src.services.provider_metrics import record_request, update_provider_availability
+from typing import Dict, Any, Iterator, Optional, Tuple
+from src.services.provider_metrics import record_request, record_stream_latency, update_provider_availability
+from src.services.provider_transport import ProviderTimeout, get_transport, stream_chat_completion
 
 logger = logging.getLogger(__name__)
 
@@ -19,13 +19,37 @@ class OpenAIService:
     def __init__(self):
         self.api_key = os.getenv("OPENAI_API_KEY", "")
         self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-        self.api_base = "https://api.openai.com/v1"
-        self.timeout = 30
+        self.api_base = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+        # Shared keep-alive connection pool (see provider_transport.py)
+        self.transport = get_transport("openai")
+        self.timeout = self.transport.timeout
         
     def is_configured(self) -> bool:
         """Check if OpenAI API key is configured."""
         return bool(self.api_key)
     
+    def _build_request(self, message: str, system: Optional[str]) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """Headers and chat completion payload for a message."""
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        else:
+            messages.append({"role": "system", "content": "You are a helpful AI assistant."})
+        messages.append({"role": "user", "content": message})
+        
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 500
+        }
+        return headers, payload
+    
     def chat(
         self,
         message: str,
@@ -63,35 +87,15 @@ class OpenAIService:
                 "latency_ms": int((time.time() - start_time) * 1000)
             }
         
-        # Build messages
-        messages = []
-        if system:
-            messages.append({"role": "system", "content": system})
-        else:
-            messages.append({"role": "system", "content": "You are a helpful AI assistant."})
-        messages.append({"role": "user", "content": message})
-        
-        # Prepare request
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": 0.7,
-            "max_tokens": 500
-        }
+        headers, payload = self._build_request(message, system)
         
         try:
             logger.info(f"[{request_id}] OpenAI request: model={self.model}, language={language}")
             
-            response = requests.post(
+            response = self.transport.post(
                 f"{self.api_base}/chat/completions",
                 headers=headers,
-                json=payload,
-                timeout=self.timeout
+                payload=payload
             )
             
             latency_ms = int((time.time() - start_time) * 1000)
@@ -109,6 +113,7 @@ class OpenAIService:
                 
                 # Record metrics
                 record_request("openai", "success", False, latency_ms)
+                record_stream_latency("openai", "buffered", latency_ms, latency_ms)
                 update_provider_availability("openai", True)
                 
                 return {
@@ -144,7 +149,7 @@ class OpenAIService:
                     "latency_ms": latency_ms
                 }
                 
-        except requests.exceptions.Timeout:
+        except ProviderTimeout:
             latency_ms = int((time.time() - start_time) * 1000)
             logger.error(f"[{request_id}] OpenAI timeout after {latency_ms}ms")
             return {
@@ -165,4 +170,44 @@ class OpenAIService:
                 "request_id": request_id,
                 "latency_ms": latency_ms
             }
-
+    
+    def chat_stream(
+        self,
+        message: str,
+        system: Optional[str] = None,
+        language: Optional[str] = None,
+        meta: Optional[Dict[str, Any]] = None,
+        request_id: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a chat completion from OpenAI as it is generated.
+        
+        Yields:
+            {"type": "token", "content": str} events, then a final "done"
+            or "error" event (see provider_transport.stream_chat_completion)
+        """
+        if not request_id:
+            request_id = str(uuid.uuid4())
+        
+        if not self.is_configured():
+            logger.warning(f"[{request_id}] OpenAI API key not configured")
+            yield {
+                "type": "error",
+                "error": "OPENAI_API_KEY not configured",
+                "provider": "openai",
+                "model": self.model,
+                "request_id": request_id,
+                "latency_ms": 0,
+                "partial": False
+            }
+            return
+        
+        headers, payload = self._build_request(message, system)
+        payload["stream"] = True
+        # Usage arrives in a final chunk only when asked for
+        payload["stream_options"] = {"include_usage": True}
+        
+        logger.info(f"[{request_id}] OpenAI stream request: model={self.model}, language={language}")
+        yield from stream_chat_completion(
+            self.transport, f"{self.api_base}/chat/completions", headers, payload, self.model, request_id
+        )
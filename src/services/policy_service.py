@@ -16,7 +16,9 @@ from src.models.policy import (
     PolicyStatus, PolicyGoal, DeploymentStrategy
 )
 from src.models.user import User
-from src.models.usage_event import UsageEvent
+from src.services.policy_simulation import (
+    PolicySimulator, confidence_intervals, effective_sample_rate
+)
 from src.schemas.policy import (
     PolicyCreate, PolicyUpdate, PolicySimulateRequest,
     SimulationResult, PolicyExplainResponse
@@ -197,27 +199,30 @@ class PolicyService:
         """
         Simulate policy against recent traffic.
         
-        Analyzes last N minutes of usage events to predict impact.
+        Analyzes last N minutes of usage events to predict impact. Events are
+        streamed in chunks and evaluated column-wise; with sample_rate set,
+        only a sample is evaluated and confidence intervals are reported.
         """
         policy = self.get_policy(policy_id, org_id)
         if not policy:
             raise ValueError("Policy not found")
 
-        # Get recent usage events
+        # Stream recent usage events
         cutoff_time = datetime.utcnow() - timedelta(
             minutes=simulate_request.time_window_minutes
         )
-        
-        events_query = self.db.query(UsageEvent).filter(
-            UsageEvent.org_id == org_id,
-            UsageEvent.created_at >= cutoff_time
-        )
+        sample_rate = simulate_request.sample_rate
+        sampled = sample_rate is not None and sample_rate < 1
 
-        if simulate_request.sample_size:
-            events_query = events_query.limit(simulate_request.sample_size)
-
-        events = events_query.all()
-        total_requests = len(events)
+        simulator = PolicySimulator(self.db)
+        chunks = simulator.iter_chunks(
+            org_id=org_id,
+            since=cutoff_time,
+            limit=simulate_request.sample_size,
+            sample_rate=sample_rate
+        )
+        totals = simulator.run(policy.conditions, policy.actions, chunks)
+        total_requests = totals.analyzed
 
         if total_requests == 0:
             return SimulationResult(
@@ -233,47 +238,28 @@ class PolicyService:
                 risk_flags=[],
                 compliance_violations=[],
                 sample_matches=[],
-                recommendation="insufficient_data"
+                recommendation="insufficient_data",
+                sample_rate=sample_rate if sampled else None
             )
 
-        # Evaluate policy against each event
-        matched_events = []
-        routing_changes = {}
-        total_latency_before = 0
-        total_latency_after = 0
-        total_cost_before = 0
-        total_cost_after = 0
-
-        for event in events:
-            if self._evaluate_conditions(policy.conditions, event):
-                matched_events.append(event)
-                
-                # Simulate routing change
-                action = policy.actions[0] if policy.actions else {}
-                if action.get("type") == "route":
-                    new_provider = action.get("provider", "unknown")
-                    routing_changes[new_provider] = routing_changes.get(new_provider, 0) + 1
-                    
-                    # Estimate latency/cost impact (simplified)
-                    total_latency_before += event.latency_ms or 0
-                    total_latency_after += self._estimate_latency(new_provider)
-                    
-                    total_cost_before += event.cost or 0.0
-                    total_cost_after += self._estimate_cost(new_provider, event)
-
-        requests_matched = len(matched_events)
+        requests_matched = totals.matched
         hit_rate = (requests_matched / total_requests) * 100 if total_requests > 0 else 0
 
-        # Calculate impact
+        # Calculate impact (totals are scaled up from the sample when sampling)
+        scale = 1 / effective_sample_rate(sample_rate) if sampled else 1
+        routing_changes = {
+            provider: int(round(count * scale))
+            for provider, count in totals.routing_changes.items()
+        }
         avg_latency_change = None
         cost_change = None
         cost_savings_pct = None
 
-        if requests_matched > 0:
-            avg_latency_change = (total_latency_after - total_latency_before) / requests_matched
-            cost_change = total_cost_after - total_cost_before
-            if total_cost_before > 0:
-                cost_savings_pct = ((total_cost_before - total_cost_after) / total_cost_before) * 100
+        if totals.routed > 0:
+            avg_latency_change = (totals.latency_after - totals.latency_before) / totals.routed
+            cost_change = (totals.cost_after - totals.cost_before) * scale
+            if totals.cost_before > 0:
+                cost_savings_pct = ((totals.cost_before - totals.cost_after) / totals.cost_before) * 100
 
         # Identify risks
         risk_flags = []
@@ -294,18 +280,6 @@ class PolicyService:
         else:
             recommendation = "high_risk"
 
-        # Sample matches (first 10)
-        sample_matches = [
-            {
-                "event_id": e.id,
-                "timestamp": e.created_at.isoformat(),
-                "latency_ms": e.latency_ms,
-                "cost": e.cost,
-                "provider": e.provider
-            }
-            for e in matched_events[:10]
-        ]
-
         return SimulationResult(
             policy_id=policy_id,
             time_window_minutes=simulate_request.time_window_minutes,
@@ -318,8 +292,11 @@ class PolicyService:
             estimated_cost_savings_percentage=round(cost_savings_pct, 2) if cost_savings_pct else None,
             risk_flags=risk_flags,
             compliance_violations=compliance_violations,
-            sample_matches=sample_matches,
-            recommendation=recommendation
+            sample_matches=totals.sample_matches,
+            recommendation=recommendation,
+            sample_rate=sample_rate if sampled else None,
+            confidence_intervals=confidence_intervals(
+                totals, sample_rate, simulate_request.confidence_level) if sampled else None
         )
 
     # ============================================================================
@@ -671,65 +648,3 @@ This policy optimizes for {policy.goal.value}.
             "priority": policy.priority,
             "tags": policy.tags
         }
-
-    def _evaluate_conditions(
-        self,
-        conditions: List[Dict],
-        event: UsageEvent
-    ) -> bool:
-        """Evaluate if event matches policy conditions."""
-        for cond in conditions:
-            cond_type = cond.get("type")
-            operator = cond.get("operator")
-            value = cond.get("value")
-
-            # Get event value based on condition type
-            if cond_type == "latency":
-                event_value = event.latency_ms or 0
-            elif cond_type == "cost":
-                event_value = event.cost or 0.0
-            elif cond_type == "provider":
-                event_value = event.provider
-            else:
-                continue
-
-            # Evaluate condition
-            if operator == ">":
-                if not (event_value > value):
-                    return False
-            elif operator == "<":
-                if not (event_value < value):
-                    return False
-            elif operator == "==":
-                if not (event_value == value):
-                    return False
-            elif operator == "!=":
-                if not (event_value != value):
-                    return False
-
-        return True
-
-    def _estimate_latency(self, provider: str) -> float:
-        """Estimate latency for a provider (simplified)."""
-        # In production, this would query actual metrics
-        latency_map = {
-            "openai": 800,
-            "anthropic": 600,
-            "google": 700,
-            "cohere": 750
-        }
-        return latency_map.get(provider, 1000)
-
-    def _estimate_cost(self, provider: str, event: UsageEvent) -> float:
-        """Estimate cost for a provider (simplified)."""
-        # In production, this would use actual pricing models
-        cost_map = {
-            "openai": 0.03,
-            "anthropic": 0.025,
-            "google": 0.02,
-            "cohere": 0.015
-        }
-        base_cost = cost_map.get(provider, 0.05)
-        tokens = event.tokens_used or 1000
-        return (tokens / 1000) * base_cost
-
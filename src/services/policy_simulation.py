@@ -0,0 +1,296 @@
+"""
+Policy Simulation Engine - columnar evaluation of policies over usage events.
+
+Streams usage events from the database in chunks (yield_per) into numpy
+column arrays, compiles policy conditions into vectorised boolean masks and
+aggregates match, latency and cost deltas per chunk, so memory stays flat no
+matter how large the time window is.
+
+Sampling mode evaluates a pseudo-random subset of events, selected in SQL by
+a multiplicative hash of the event id (deterministic, so reruns agree), and
+reports normal-approximation confidence intervals for the estimates.
+"""
+
+import operator
+from dataclasses import dataclass, field
+from datetime import datetime
+from statistics import NormalDist
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+from sqlalchemy import Float, cast, select
+from sqlalchemy.orm import Session
+
+from src.models.api_key import ApiKey
+from src.models.usage_event import UsageEvent
+
+
+DEFAULT_CHUNK_SIZE = 50_000
+SAMPLE_BUCKETS = 10_000
+SAMPLE_HASH_MULTIPLIER = 2654435761  # Knuth multiplicative hash
+SAMPLE_MATCH_LIMIT = 10
+
+OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    ">": operator.gt,
+    "<": operator.lt,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Simplified provider models (in production these would come from live metrics/pricing)
+PROVIDER_LATENCY_MS = {
+    "openai": 800,
+    "anthropic": 600,
+    "google": 700,
+    "cohere": 750
+}
+DEFAULT_LATENCY_MS = 1000
+
+PROVIDER_COST_PER_1K_TOKENS = {
+    "openai": 0.03,
+    "anthropic": 0.025,
+    "google": 0.02,
+    "cohere": 0.015
+}
+DEFAULT_COST_PER_1K_TOKENS = 0.05
+DEFAULT_TOKENS = 1000  # assumed when an event recorded no tokens
+
+
+@dataclass
+class EventChunk:
+    """Columnar view of a chunk of usage events."""
+    ids: np.ndarray
+    providers: np.ndarray  # object array of provider names
+    latency_ms: np.ndarray
+    cost_usd: np.ndarray
+    tokens: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows) -> "EventChunk":
+        ids, providers, latency, cost, tokens = zip(*rows)
+        n = len(ids)
+        return cls(
+            ids=np.fromiter(ids, dtype=np.int64, count=n),
+            providers=np.array(providers, dtype=object),
+            latency_ms=np.fromiter((v or 0 for v in latency), dtype=np.float64, count=n),
+            cost_usd=np.fromiter((v or 0.0 for v in cost), dtype=np.float64, count=n),
+            tokens=np.fromiter((v or 0 for v in tokens), dtype=np.float64, count=n),
+        )
+
+
+def compile_conditions(conditions: List[Dict]) -> Callable[[EventChunk], np.ndarray]:
+    """
+    Compile policy conditions into a function returning a boolean match mask.
+
+    Semantics match the per-event evaluator: all conditions are ANDed, and
+    unknown condition types or operators are ignored.
+    """
+    predicates = []
+    for cond in conditions or []:
+        op = OPERATORS.get(cond.get("operator"))
+        cond_type = cond.get("type")
+        value = cond.get("value")
+        if op is None:
+            continue
+        if cond_type == "latency":
+            predicates.append(lambda c, op=op, v=value: op(c.latency_ms, v))
+        elif cond_type == "cost":
+            predicates.append(lambda c, op=op, v=value: op(c.cost_usd, v))
+        elif cond_type == "provider":
+            predicates.append(lambda c, op=op, v=value: _categorical_mask(c.providers, op, v))
+
+    def evaluate(chunk: EventChunk) -> np.ndarray:
+        mask = np.ones(len(chunk), dtype=bool)
+        for predicate in predicates:
+            mask &= predicate(chunk)
+        return mask
+
+    return evaluate
+
+
+def _categorical_mask(values: np.ndarray, op: Callable, value: Any) -> np.ndarray:
+    """Evaluate a comparison once per distinct value and broadcast it back."""
+    uniques, inverse = np.unique(values, return_inverse=True)
+    per_unique = np.fromiter((bool(op(u, value)) for u in uniques), dtype=bool, count=len(uniques))
+    return per_unique[inverse]
+
+
+@dataclass
+class SimulationTotals:
+    """Running aggregates across chunks."""
+    analyzed: int = 0
+    matched: int = 0
+    routing_changes: Dict[str, int] = field(default_factory=dict)
+    routed: int = 0
+    latency_before: float = 0.0
+    latency_after: float = 0.0
+    cost_before: float = 0.0
+    cost_after: float = 0.0
+    # Sums of squared per-event deltas, for sampling variance
+    latency_delta_sq: float = 0.0
+    cost_delta_sq: float = 0.0
+    sample_matches: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class PolicySimulator:
+    """Evaluates a policy's conditions and first action over streamed usage events."""
+
+    def __init__(
+        self,
+        session: Session,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ):
+        self.session = session
+        self.chunk_size = chunk_size
+
+    def iter_chunks(
+        self,
+        org_id: int,
+        since: datetime,
+        limit: Optional[int] = None,
+        sample_rate: Optional[float] = None
+    ) -> Iterator[EventChunk]:
+        """Stream an org's usage events since a cutoff as column chunks."""
+        stmt = (
+            select(
+                UsageEvent.id,
+                UsageEvent.provider,
+                UsageEvent.latency_ms,
+                cast(UsageEvent.cost_usd, Float),
+                UsageEvent.prompt_tokens + UsageEvent.completion_tokens,
+            )
+            .join(ApiKey, ApiKey.id == UsageEvent.api_key_id)
+            .where(ApiKey.organization_id == org_id, UsageEvent.created_at >= since)
+        )
+        if sample_rate is not None and sample_rate < 1:
+            threshold = max(1, int(round(sample_rate * SAMPLE_BUCKETS)))
+            stmt = stmt.where(
+                (UsageEvent.id * SAMPLE_HASH_MULTIPLIER) % SAMPLE_BUCKETS < threshold)
+        if limit:
+            stmt = stmt.limit(limit)
+
+        # Core execution: plain tuples, no ORM row processing
+        result = self.session.connection().execute(
+            stmt.execution_options(yield_per=self.chunk_size))
+        for rows in result.partitions():
+            yield EventChunk.from_rows(rows)
+
+    def run(
+        self,
+        conditions: List[Dict],
+        actions: List[Dict],
+        chunks: Iterator[EventChunk]
+    ) -> SimulationTotals:
+        """Aggregate match counts and latency/cost deltas over all chunks."""
+        match = compile_conditions(conditions)
+        action = actions[0] if actions else {}
+        route_to = action.get("provider", "unknown") if action.get("type") == "route" else None
+
+        if route_to is not None:
+            new_latency = PROVIDER_LATENCY_MS.get(route_to, DEFAULT_LATENCY_MS)
+            new_cost_per_1k = PROVIDER_COST_PER_1K_TOKENS.get(route_to, DEFAULT_COST_PER_1K_TOKENS)
+
+        totals = SimulationTotals()
+        for chunk in chunks:
+            mask = match(chunk)
+            matched = int(mask.sum())
+            totals.analyzed += len(chunk)
+            totals.matched += matched
+            if matched == 0:
+                continue
+
+            if len(totals.sample_matches) < SAMPLE_MATCH_LIMIT:
+                self._collect_samples(totals, chunk, mask)
+
+            if route_to is None:
+                continue
+
+            latency = chunk.latency_ms[mask]
+            cost = chunk.cost_usd[mask]
+            tokens = chunk.tokens[mask]
+            new_cost = np.where(tokens > 0, tokens, DEFAULT_TOKENS) / 1000 * new_cost_per_1k
+            latency_delta = new_latency - latency
+            cost_delta = new_cost - cost
+
+            totals.routed += matched
+            totals.routing_changes[route_to] = totals.routing_changes.get(route_to, 0) + matched
+            totals.latency_before += float(latency.sum())
+            totals.latency_after += new_latency * matched
+            totals.cost_before += float(cost.sum())
+            totals.cost_after += float(new_cost.sum())
+            totals.latency_delta_sq += float(np.dot(latency_delta, latency_delta))
+            totals.cost_delta_sq += float(np.dot(cost_delta, cost_delta))
+
+        self._attach_timestamps(totals.sample_matches)
+        return totals
+
+    @staticmethod
+    def _collect_samples(totals: SimulationTotals, chunk: EventChunk, mask: np.ndarray) -> None:
+        needed = SAMPLE_MATCH_LIMIT - len(totals.sample_matches)
+        for i in np.flatnonzero(mask)[:needed]:
+            totals.sample_matches.append({
+                "event_id": int(chunk.ids[i]),
+                "timestamp": None,
+                "latency_ms": int(chunk.latency_ms[i]),
+                "cost": float(chunk.cost_usd[i]),
+                "provider": chunk.providers[i]
+            })
+
+    def _attach_timestamps(self, samples: List[Dict[str, Any]]) -> None:
+        """Fetch created_at for the sample matches only (not streamed per event)."""
+        if not samples:
+            return
+        rows = self.session.execute(
+            select(UsageEvent.id, UsageEvent.created_at)
+            .where(UsageEvent.id.in_([s["event_id"] for s in samples]))
+        ).all()
+        created = {row.id: row.created_at for row in rows}
+        for sample in samples:
+            ts = created.get(sample["event_id"])
+            sample["timestamp"] = ts.isoformat() if ts else None
+
+
+def effective_sample_rate(sample_rate: float) -> float:
+    """Fraction of events the SQL hash filter actually keeps."""
+    return max(1, int(round(sample_rate * SAMPLE_BUCKETS))) / SAMPLE_BUCKETS
+
+
+def confidence_intervals(
+    totals: SimulationTotals,
+    sample_rate: float,
+    confidence_level: float = 0.95
+) -> Dict[str, List[float]]:
+    """
+    Normal-approximation confidence intervals for a sampled simulation.
+
+    Hit rate uses the binomial proportion; average latency change uses the
+    sample mean of the per-event deltas; total cost change is the
+    Horvitz-Thompson estimate (sum / rate) under Bernoulli sampling.
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence_level / 2)
+    intervals: Dict[str, List[float]] = {}
+    rate = effective_sample_rate(sample_rate)
+
+    n = totals.analyzed
+    if n > 0:
+        p = totals.matched / n
+        half = z * (p * (1 - p) / n) ** 0.5
+        intervals["hit_rate_percentage"] = [
+            round(max(0.0, p - half) * 100, 2), round(min(1.0, p + half) * 100, 2)]
+
+    m = totals.routed
+    if m > 1:
+        mean = (totals.latency_after - totals.latency_before) / m
+        variance = max(0.0, (totals.latency_delta_sq - m * mean * mean) / (m - 1))
+        half = z * (variance / m) ** 0.5
+        intervals["estimated_latency_change_ms"] = [round(mean - half, 2), round(mean + half, 2)]
+
+    if m > 0:
+        estimate = (totals.cost_after - totals.cost_before) / rate
+        half = z * ((1 - rate) / (rate * rate) * totals.cost_delta_sq) ** 0.5
+        intervals["estimated_cost_change"] = [round(estimate - half, 4), round(estimate + half, 4)]
+
+    return intervals
@@ -1,6 +1,6 @@
 """
 Prometheus metrics for multi-provider orchestration.
-Tracks provider requests, status, fallbacks, and latency.
+Tracks provider requests, status, fallbacks, latency and time to first token.
 """
 
 from prometheus_client import Counter, Histogram, Gauge
@@ -20,11 +20,29 @@ provider_latency_seconds = Histogram(
     buckets=(0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
 )
 
+# Time until the first completion token reaches us; for buffered (non-stream)
+# calls this equals the total latency
+provider_ttft_seconds = Histogram(
+    'brikk_relay_ttft_seconds',
+    'Time to first token of relay requests in seconds',
+    ['provider', 'mode'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+)
+
+# End-to-end latency split by buffered/stream mode
+provider_total_latency_seconds = Histogram(
+    'brikk_relay_total_latency_seconds',
+    'Total latency of successful relay requests in seconds',
+    ['provider', 'mode'],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+)
+
 # Provider availability gauge
 provider_available = Gauge(
     'brikk_provider_available',
     'Provider availability (1=available, 0=unavailable)',
-    ['provider']
+    ['provider'],
+    multiprocess_mode='livemin'
 )
 
 def record_request(provider: str, status: str, fallback: bool, latency_ms: int):
@@ -45,6 +63,19 @@ def record_request(provider: str, status: str, fallback: bool, latency_ms: int):
     
     provider_latency_seconds.labels(provider=provider).observe(latency_ms / 1000.0)
 
+def record_stream_latency(provider: str, mode: str, ttft_ms: int, latency_ms: int):
+    """
+    Record time to first token and total latency of a successful request.
+    
+    Args:
+        provider: Provider name (openai, mistral)
+        mode: "stream" or "buffered"
+        ttft_ms: Time to first token in milliseconds
+        latency_ms: Total latency in milliseconds
+    """
+    provider_ttft_seconds.labels(provider=provider, mode=mode).observe(ttft_ms / 1000.0)
+    provider_total_latency_seconds.labels(provider=provider, mode=mode).observe(latency_ms / 1000.0)
+
 def update_provider_availability(provider: str, available: bool):
     """
     Update provider availability gauge.
@@ -0,0 +1,249 @@
+"""
+Shared HTTP transport for AI provider calls.
+
+Each provider gets one long-lived client whose connection pool is reused
+across requests (keep-alive), instead of a new TCP+TLS handshake per call.
+Chat completions can be streamed: server-sent events are parsed as they
+arrive and content deltas are relayed immediately.
+
+Configuration:
+    BRIKK_PROVIDER_POOL_SIZE=20     - Keep-alive connections per provider
+    BRIKK_PROVIDER_TIMEOUT=30       - Read timeout in seconds
+    BRIKK_PROVIDER_HTTP2=false      - Use HTTP/2 (requires httpx[http2])
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.services.provider_metrics import (
+    record_request, record_stream_latency, update_provider_availability
+)
+
+try:
+    import httpx
+    import h2  # noqa: F401  (httpx needs it for http2=True)
+    HAVE_HTTP2 = True
+except ImportError:
+    HAVE_HTTP2 = False
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = 5.0
+_TIMEOUT_ERRORS = (requests.exceptions.Timeout,) + ((httpx.TimeoutException,) if HAVE_HTTP2 else ())
+
+
+class ProviderTimeout(Exception):
+    """The provider did not respond within the configured timeout."""
+
+
+class ProviderHTTPError(Exception):
+    """The provider answered with a non-2xx status."""
+
+    def __init__(self, status_code: int, body: str):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.body = body
+
+
+@dataclass
+class TransportResponse:
+    status_code: int
+    text: str
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+def iter_sse_data(lines: Iterator[str]) -> Iterator[str]:
+    """Yield the data payload of each server-sent event (multi-line data joined)."""
+    data = []
+    for line in lines:
+        if line is None:
+            continue
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.rstrip('\r')
+        if not line:
+            if data:
+                yield '\n'.join(data)
+                data = []
+        elif line.startswith('data:'):
+            data.append(line[5:].lstrip(' '))
+    if data:
+        yield '\n'.join(data)
+
+
+class ProviderTransport:
+    """Pooled keep-alive client for one provider."""
+
+    def __init__(self,
+                 provider: str,
+                 pool_size: Optional[int] = None,
+                 timeout: Optional[float] = None,
+                 http2: Optional[bool] = None):
+        self.provider = provider
+        self.pool_size = pool_size or int(os.getenv('BRIKK_PROVIDER_POOL_SIZE', '20'))
+        self.timeout = timeout or float(os.getenv('BRIKK_PROVIDER_TIMEOUT', '30'))
+        if http2 is None:
+            http2 = os.getenv('BRIKK_PROVIDER_HTTP2', 'false').lower() == 'true'
+        if http2 and not HAVE_HTTP2:
+            logger.warning("BRIKK_PROVIDER_HTTP2 set but httpx[http2] is not installed; using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+
+        if self.http2:
+            self._client = httpx.Client(
+                http2=True,
+                timeout=httpx.Timeout(self.timeout, connect=CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=self.pool_size,
+                                    max_keepalive_connections=self.pool_size))
+        else:
+            self._client = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+            self._client.mount('https://', adapter)
+            self._client.mount('http://', adapter)
+
+    def post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> TransportResponse:
+        """POST JSON and read the full response."""
+        try:
+            if self.http2:
+                response = self._client.post(url, headers=headers, json=payload)
+            else:
+                response = self._client.post(
+                    url, headers=headers, json=payload, timeout=(CONNECT_TIMEOUT, self.timeout))
+            return TransportResponse(response.status_code, response.text)
+        except _TIMEOUT_ERRORS as e:
+            raise ProviderTimeout(str(e)) from e
+
+    def stream(self, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> Iterator[str]:
+        """
+        POST JSON and yield SSE data payloads as they arrive.
+
+        Raises:
+            ProviderHTTPError: non-2xx status (before anything is yielded)
+            ProviderTimeout: connect or read timeout
+        """
+        headers = {**headers, 'Accept': 'text/event-stream'}
+        try:
+            if self.http2:
+                with self._client.stream('POST', url, headers=headers, json=payload) as response:
+                    if response.status_code >= 300:
+                        raise ProviderHTTPError(response.status_code, response.read().decode('utf-8', 'replace'))
+                    yield from iter_sse_data(response.iter_lines())
+            else:
+                with self._client.post(url, headers=headers, json=payload, stream=True,
+                                       timeout=(CONNECT_TIMEOUT, self.timeout)) as response:
+                    if response.status_code >= 300:
+                        raise ProviderHTTPError(response.status_code, response.text)
+                    yield from iter_sse_data(response.iter_lines(decode_unicode=True))
+        except _TIMEOUT_ERRORS as e:
+            raise ProviderTimeout(str(e)) from e
+
+    def close(self) -> None:
+        self._client.close()
+
+
+_transports: Dict[str, ProviderTransport] = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(provider: str) -> ProviderTransport:
+    """Process-wide transport for a provider."""
+    transport = _transports.get(provider)
+    if transport is None:
+        with _transports_lock:
+            transport = _transports.get(provider)
+            if transport is None:
+                transport = _transports[provider] = ProviderTransport(provider)
+    return transport
+
+
+def reset_transports() -> None:
+    """Close and drop all pooled transports (tests, config changes)."""
+    with _transports_lock:
+        for transport in _transports.values():
+            transport.close()
+        _transports.clear()
+
+
+def stream_chat_completion(
+    transport: ProviderTransport,
+    url: str,
+    headers: Dict[str, str],
+    payload: Dict[str, Any],
+    model: str,
+    request_id: str,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream an OpenAI-compatible chat completion.
+
+    Yields {"type": "token", "content": ...} per content delta, then one
+    {"type": "done", ...} or {"type": "error", ...} event carrying provider,
+    model, usage, request_id, latency_ms and ttft_ms.
+    """
+    provider = transport.provider
+    start = time.perf_counter()
+    ttft_ms = None
+    usage: Dict[str, Any] = {}
+
+    def elapsed_ms() -> int:
+        return int((time.perf_counter() - start) * 1000)
+
+    def error(message: str, **extra) -> Dict[str, Any]:
+        latency_ms = elapsed_ms()
+        record_request(provider, "error", False, latency_ms)
+        update_provider_availability(provider, False)
+        return {"type": "error", "error": message, "provider": provider, "model": model,
+                "request_id": request_id, "latency_ms": latency_ms, "ttft_ms": ttft_ms,
+                "partial": ttft_ms is not None, **extra}
+
+    try:
+        for data in transport.stream(url, headers, payload):
+            if data == '[DONE]':
+                break
+            chunk = json.loads(data)
+            if chunk.get("usage"):
+                usage = chunk["usage"]
+            for choice in chunk.get("choices") or ():
+                content = (choice.get("delta") or {}).get("content")
+                if content:
+                    if ttft_ms is None:
+                        ttft_ms = elapsed_ms()
+                    yield {"type": "token", "content": content}
+    except ProviderHTTPError as e:
+        logger.error(f"[{request_id}] {provider} stream error: status={e.status_code}, error={e.body}")
+        yield error(f"{provider.capitalize()} API error: {e.status_code}", error_details=e.body)
+        return
+    except ProviderTimeout:
+        yield error(f"{provider.capitalize()} API timeout")
+        return
+    except Exception as e:
+        logger.error(f"[{request_id}] {provider} stream exception: {e}")
+        yield error(f"{provider.capitalize()} API exception: {e}")
+        return
+
+    latency_ms = elapsed_ms()
+    record_request(provider, "success", False, latency_ms)
+    record_stream_latency(provider, "stream", ttft_ms if ttft_ms is not None else latency_ms, latency_ms)
+    update_provider_availability(provider, True)
+    yield {
+        "type": "done",
+        "provider": provider,
+        "model": model,
+        "usage": {
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0),
+        },
+        "request_id": request_id,
+        "latency_ms": latency_ms,
+        "ttft_ms": ttft_ms,
+    }
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+SQL query profiler and N+1 detector.
+
+Per-request view of the statements recorded by src.infra.query_log.
+init_query_profiler() gives every request its own QueryLog (g.query_log).
+When a request finishes, fingerprints executed BRIKK_NPLUS1_THRESHOLD or
+more times are logged as probable N+1 patterns and counted in
+brikk_db_nplus1_total{route}, and the query count is observed in
+brikk_db_queries_per_request. The most recent request summaries and slow
+queries are served at GET /debug/queries (BRIKK_ADMIN_TOKEN required).
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from flask import Flask, g, jsonify, request
+from prometheus_client import Counter, Histogram
+
+from src.infra.query_log import (
+    QueryLog, activate_query_log, deactivate_query_log, install_listeners, recent_slow_queries,
+    slow_query_threshold_ms,
+)
+from src.services.metrics import OTHER_ROUTE, rule_label
+
+logger = logging.getLogger(__name__)
+
+
+class QueryProfilerMiddleware:
+    """Per-request query logs, N+1 detection and the /debug/queries view."""
+
+    def __init__(self, app: Flask, registry=None, nplus1_threshold: Optional[int] = None,
+                 history: Optional[int] = None):
+        self.app = app
+        self.nplus1_threshold = nplus1_threshold or int(os.environ.get("BRIKK_NPLUS1_THRESHOLD", "5"))
+        self.recent: deque = deque(maxlen=history or int(os.environ.get("BRIKK_QUERY_PROFILER_HISTORY", "100")))
+        self.queries_per_request = None
+        self.nplus1_total = None
+        if registry is not None:
+            self.queries_per_request = Histogram(
+                "brikk_db_queries_per_request",
+                "SQL statements executed per HTTP request.",
+                buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+                registry=registry
+            )
+            self.nplus1_total = Counter(
+                "brikk_db_nplus1_total",
+                "Requests that repeated one statement fingerprint at least BRIKK_NPLUS1_THRESHOLD times.",
+                ["route"],
+                registry=registry
+            )
+        self._lock = threading.Lock()
+        install_listeners()
+
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        self._register_debug_view(app)
+
+    def _before_request(self):
+        log = QueryLog()
+        g.query_log = log
+        g._query_log_token = activate_query_log(log)
+
+    def _teardown_request(self, exc):
+        log = g.pop("query_log", None)
+        token = g.pop("_query_log_token", None)
+        if token is not None:
+            deactivate_query_log(token)
+        if log is None:
+            return
+        if self.queries_per_request is not None:
+            self.queries_per_request.observe(log.count)
+        if not log.count:
+            return
+
+        repeated = log.repeated(self.nplus1_threshold)
+        summary = {
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "timestamp": time.time(),
+            **log.to_dict(),
+            "n_plus_one": repeated,
+        }
+        with self._lock:
+            self.recent.append(summary)
+        if repeated:
+            if self.nplus1_total is not None:
+                self.nplus1_total.labels(route=self._route_label()).inc()
+            worst = repeated[0]
+            logger.warning(
+                f"Probable N+1 in {request.method} {request.path}: "
+                f"{worst['count']} x {worst['fingerprint']} ({log.count} queries total)")
+
+    def _route_label(self) -> str:
+        metrics_service = self.app.extensions.get("metrics")
+        if metrics_service is not None and metrics_service.enabled:
+            return metrics_service.route_label()
+        return rule_label(request.url_rule.rule) if request.url_rule is not None else OTHER_ROUTE
+
+    def report(self, limit: int = 50, n_plus_one_only: bool = False) -> Dict:
+        with self._lock:
+            recent = list(self.recent)
+        if n_plus_one_only:
+            recent = [summary for summary in recent if summary["n_plus_one"]]
+        return {
+            "settings": {
+                "nplus1_threshold": self.nplus1_threshold,
+                "slow_query_ms": slow_query_threshold_ms(),
+            },
+            "requests": recent[::-1][:limit],
+            "slow_queries": recent_slow_queries()[::-1][:limit],
+        }
+
+    def _register_debug_view(self, app: Flask) -> None:
+        from src.routes.auth_admin import require_admin_token
+
+        @app.route("/debug/queries")
+        @require_admin_token
+        def debug_queries():
+            return jsonify(self.report(
+                limit=request.args.get("limit", 50, type=int),
+                n_plus_one_only=request.args.get("n_plus_one", "").lower() in ("1", "true"),
+            ))
+
+
+def init_query_profiler(app: Flask) -> Optional[QueryProfilerMiddleware]:
+    """Profile every request's queries unless BRIKK_QUERY_PROFILER_ENABLED=false."""
+    if os.environ.get("BRIKK_QUERY_PROFILER_ENABLED", "true").lower() != "true":
+        return None
+    metrics_service = app.extensions.get("metrics")
+    registry = metrics_service.registry if metrics_service and metrics_service.enabled else None
+    profiler = QueryProfilerMiddleware(app, registry)
+    app.extensions["query_profiler"] = profiler
+    return profiler
@@ -3,16 +3,17 @@
 from __future__ import annotations
 import os
 from typing import Any
-import redis
 from rq import Queue
 
+from src.infra.redis_pool import get_redis
+
 # Single source of truth for Redis URL.
 # Use your Render Redis "Internal Key-Value URL" here via env var.
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
-# One global connection that everyone (web & worker) should use.
-# decode_responses=False keeps RQ binary-safe for pickled jobs.
-_redis = redis.from_url(REDIS_URL, decode_responses=False)
+# One global client that everyone (web & worker) should use, from the shared
+# "queue" pool (binary: decode_responses=False keeps RQ safe for pickled jobs).
+_redis = get_redis("queue")
 
 # Queue name MUST match your worker start command. We use "default".
 queue = Queue("default", connection=_redis)
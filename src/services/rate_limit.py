@@ -8,8 +8,13 @@ Implements per-organization or per-API-key rate limiting with:
 - Standard X-RateLimit-* headers
 - Graceful degradation when Redis is unavailable
 - Configurable scoping (org vs key)
+- Selectable algorithm (BRIKK_RLIMIT_ALGORITHM):
+    sliding_log     - sorted-set log of every request (default, exact)
+    gcra            - Lua GCRA/token bucket, one EVALSHA and O(1) memory per key
+    sliding_window  - Lua sliding-window-counter approximation, two counters per key
 """
 
+import math
 import os
 import time
 import redis
@@ -17,6 +22,9 @@ from typing import Tuple, Optional, Dict, Any
 from datetime import datetime, timezone
 import logging
 
+from src.infra.redis_pool import get_redis
+from src.services.request_timing import timed
+
 logger = logging.getLogger(__name__)
 
 
@@ -50,6 +58,68 @@ class RateLimitResult:
         return headers
 
 
+# GCRA (generic cell rate algorithm), equivalent to a token bucket holding
+# `capacity` tokens refilled one per `interval_ms`. State is a single
+# theoretical-arrival-time (TAT) value per key.
+# ARGV: now_ms, interval_ms, capacity
+# Returns: {allowed, remaining, retry_after_ms, reset_after_ms}
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local capacity = tonumber(ARGV[3])
+local tolerance = interval * capacity
+
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+
+local new_tat = tat + interval
+local allow_at = new_tat - tolerance
+if now < allow_at then
+    local remaining = math.floor((tolerance - (tat - now)) / interval)
+    return {0, remaining, allow_at - now, tat - now}
+end
+
+redis.call('SET', KEYS[1], new_tat, 'PX', new_tat - now)
+local remaining = math.floor((tolerance - (new_tat - now)) / interval)
+return {1, remaining, 0, new_tat - now}
+"""
+
+# Sliding window counter: weights the previous fixed window's count by the
+# fraction of it still inside the sliding window and adds the current count.
+# KEYS: current window counter, previous window counter
+# ARGV: now_ms, window_ms, limit
+# Returns: {allowed, estimated_count, retry_after_ms}
+SLIDING_WINDOW_COUNTER_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+local elapsed = now % window
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local weight = (window - elapsed) / window
+local estimated = math.floor(previous * weight + current)
+
+if estimated + 1 > limit then
+    local retry_after = window - elapsed
+    if previous > 0 and current < limit then
+        -- time until the previous window's weight decays enough to admit one
+        local needed = (previous * (window - elapsed) - (limit - 1 - current) * window) / previous
+        retry_after = math.max(1, math.min(retry_after, math.ceil(needed)))
+    end
+    return {0, estimated, retry_after}
+end
+
+redis.call('INCR', KEYS[1])
+redis.call('PEXPIRE', KEYS[1], window * 2)
+return {1, estimated + 1, 0}
+"""
+
+ALGORITHMS = ('sliding_log', 'gcra', 'sliding_window')
+
+
 class RateLimitService:
     """Redis-based sliding window rate limiter."""
 
@@ -71,32 +141,36 @@ class RateLimitService:
             'BRIKK_RLIMIT_SCOPE',
             'org')  # 'org' or 'key'
 
+        self.algorithm = self._get_env(
+            'BRIKK_RLIMIT_ALGORITHM',
+            'sliding_log')
+
         # Validate configuration
         if self.scope not in ['org', 'key']:
             logger.warning(
                 f"Invalid BRIKK_RLIMIT_SCOPE '{self.scope}', defaulting to 'org'")
             self.scope = 'org'
 
+        if self.algorithm not in ALGORITHMS:
+            logger.warning(
+                f"Invalid BRIKK_RLIMIT_ALGORITHM '{self.algorithm}', defaulting to 'sliding_log'")
+            self.algorithm = 'sliding_log'
+
         # Total limit includes burst capacity
         self.total_limit = self.per_minute_limit + self.burst_capacity
 
-    def _create_redis_client(self) -> redis.Redis:
-        """Create Redis client from environment configuration."""
-        redis_url = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+        # Lua scripts are registered lazily (EVALSHA with NOSCRIPT fallback)
+        self._gcra_script = None
+        self._sliding_window_script = None
 
+    def _create_redis_client(self) -> redis.Redis:
+        """Get the shared rate limit Redis client (see src/infra/redis_pool.py)."""
         try:
-            client = redis.from_url(
-                redis_url,
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_timeout=5,
-                retry_on_timeout=True,
-                health_check_interval=30
-            )
+            client = get_redis('rate_limit')
 
             # Test connection
             client.ping()
-            logger.info(f"Connected to Redis for rate limiting: {redis_url}")
+            logger.info("Connected to Redis for rate limiting")
             return client
 
         except Exception as e:
@@ -178,6 +252,7 @@ class RateLimitService:
             # Fallback to anonymous scope
             return "rlimit:anonymous"
 
+    @timed("rate_limit")
     def check_rate_limit(self, scope_key: str) -> RateLimitResult:
         """
         Check rate limit for a scope using sliding window algorithm.
@@ -210,6 +285,14 @@ class RateLimitService:
             )
 
     def _check_rate_limit_redis(self, scope_key: str) -> RateLimitResult:
+        """Dispatch the check to the configured algorithm."""
+        if self.algorithm == 'gcra':
+            return self._check_rate_limit_gcra(scope_key)
+        if self.algorithm == 'sliding_window':
+            return self._check_rate_limit_sliding_window(scope_key)
+        return self._check_rate_limit_sliding_log(scope_key)
+
+    def _check_rate_limit_sliding_log(self, scope_key: str) -> RateLimitResult:
         """
         Perform rate limit check using Redis sliding window.
 
@@ -270,6 +353,77 @@ class RateLimitService:
             retry_after=retry_after
         )
 
+    def _check_rate_limit_gcra(self, scope_key: str) -> RateLimitResult:
+        """
+        Perform rate limit check using the GCRA Lua script.
+
+        Capacity is total_limit (per-minute limit plus burst) and the bucket
+        refills at per_minute_limit per window. One round trip, one key.
+        """
+        if self._gcra_script is None:
+            self._gcra_script = self.redis_client.register_script(GCRA_SCRIPT)
+
+        now_ms = int(time.time() * 1000)
+        interval_ms = self._emission_interval_ms()
+        allowed, remaining, retry_after_ms, reset_after_ms = self._gcra_script(
+            keys=[f"{scope_key}:gcra"],
+            args=[now_ms, interval_ms, self.total_limit])
+
+        retry_after = None
+        if not allowed:
+            retry_after = max(1, math.ceil(int(retry_after_ms) / 1000))
+
+        return RateLimitResult(
+            allowed=bool(allowed),
+            limit=self.total_limit,
+            remaining=max(0, int(remaining)),
+            reset_time=int((now_ms + int(reset_after_ms)) / 1000),
+            retry_after=retry_after
+        )
+
+    def _check_rate_limit_sliding_window(self, scope_key: str) -> RateLimitResult:
+        """
+        Perform rate limit check using the sliding-window-counter Lua script.
+
+        Approximates the sliding log with two fixed-window counters per scope.
+        """
+        if self._sliding_window_script is None:
+            self._sliding_window_script = self.redis_client.register_script(
+                SLIDING_WINDOW_COUNTER_SCRIPT)
+
+        now_ms = int(time.time() * 1000)
+        window_ms = self.window_size * 1000
+        current_key, previous_key = self._sliding_window_keys(scope_key, now_ms)
+        allowed, count, retry_after_ms = self._sliding_window_script(
+            keys=[current_key, previous_key],
+            args=[now_ms, window_ms, self.total_limit])
+
+        retry_after = None
+        if not allowed:
+            retry_after = max(1, math.ceil(int(retry_after_ms) / 1000))
+
+        return RateLimitResult(
+            allowed=bool(allowed),
+            limit=self.total_limit,
+            remaining=max(0, self.total_limit - int(count)),
+            reset_time=int(now_ms / 1000) + self.window_size,
+            retry_after=retry_after
+        )
+
+    def _emission_interval_ms(self) -> int:
+        """Milliseconds between tokens for GCRA (window / per-minute limit)."""
+        return max(1, int(self.window_size * 1000 / max(1, self.per_minute_limit)))
+
+    def _sliding_window_keys(self, scope_key: str, now_ms: int) -> Tuple[str, str]:
+        """Current and previous fixed-window counter keys (same hash slot)."""
+        index = now_ms // (self.window_size * 1000)
+        return f"{{{scope_key}}}:swc:{index}", f"{{{scope_key}}}:swc:{index - 1}"
+
+    def _algorithm_keys(self, scope_key: str) -> list:
+        """All Redis keys any algorithm may hold for a scope."""
+        now_ms = int(time.time() * 1000)
+        return [scope_key, f"{scope_key}:gcra", *self._sliding_window_keys(scope_key, now_ms)]
+
     def get_current_usage(self, scope_key: str) -> Dict[str, Any]:
         """
         Get current usage statistics for a scope.
@@ -290,16 +444,7 @@ class RateLimitService:
             }
 
         try:
-            now = time.time()
-            window_start = now - self.window_size
-
-            # Clean up expired entries and count current
-            pipe = self.redis_client.pipeline()
-            pipe.zremrangebyscore(scope_key, 0, window_start)
-            pipe.zcard(scope_key)
-            results = pipe.execute()
-
-            current_count = results[1]
+            current_count = self._current_count(scope_key)
             remaining = max(0, self.total_limit - current_count)
 
             return {
@@ -310,7 +455,8 @@ class RateLimitService:
                 'window_size': self.window_size,
                 'scope': self.scope,
                 'per_minute_limit': self.per_minute_limit,
-                'burst_capacity': self.burst_capacity
+                'burst_capacity': self.burst_capacity,
+                'algorithm': self.algorithm
             }
 
         except Exception as e:
@@ -324,6 +470,32 @@ class RateLimitService:
                 'window_size': self.window_size
             }
 
+    def _current_count(self, scope_key: str) -> int:
+        """Requests currently counted against a scope (read-only)."""
+        now = time.time()
+
+        if self.algorithm == 'gcra':
+            tat = self.redis_client.get(f"{scope_key}:gcra")
+            if tat is None:
+                return 0
+            backlog_ms = max(0.0, float(tat) - now * 1000)
+            return min(self.total_limit, math.ceil(backlog_ms / self._emission_interval_ms()))
+
+        if self.algorithm == 'sliding_window':
+            now_ms = int(now * 1000)
+            window_ms = self.window_size * 1000
+            current, previous = self.redis_client.mget(
+                self._sliding_window_keys(scope_key, now_ms))
+            weight = (window_ms - now_ms % window_ms) / window_ms
+            return int(int(previous or 0) * weight + int(current or 0))
+
+        # Clean up expired entries and count current
+        pipe = self.redis_client.pipeline()
+        pipe.zremrangebyscore(scope_key, 0, now - self.window_size)
+        pipe.zcard(scope_key)
+        results = pipe.execute()
+        return results[1]
+
     def reset_scope(self, scope_key: str) -> bool:
         """
         Reset rate limit for a scope (admin function).
@@ -335,7 +507,10 @@ class RateLimitService:
             True if reset successful, False otherwise
         """
         try:
-            self.redis_client.delete(scope_key)
+            if self.algorithm == 'sliding_log':
+                self.redis_client.delete(scope_key)
+            else:
+                self.redis_client.delete(*self._algorithm_keys(scope_key))
             logger.info(f"Reset rate limit for scope: {scope_key}")
             return True
         except Exception as e:
@@ -356,6 +531,7 @@ class RateLimitService:
             'total_limit': self.total_limit,
             'window_size': self.window_size,
             'scope': self.scope,
+            'algorithm': self.algorithm,
             'redis_connected': self._test_redis_connection()
         }
 
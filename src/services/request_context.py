@@ -91,28 +91,34 @@ def get_request_id() -> Optional[str]:
 
 def get_request_context() -> dict:
     """Get complete request context for logging."""
+    # Resolve the proxy once; every g attribute access goes through it
+    ctx = g._get_current_object()
     context = {
-        'request_id': getattr(g, 'request_id', None),
-        'method': getattr(g, 'request_method', None),
-        'path': getattr(g, 'request_path', None),
-        'remote_addr': getattr(g, 'request_remote_addr', None),
-        'user_agent': getattr(g, 'request_user_agent', None),
+        'request_id': getattr(ctx, 'request_id', None),
+        'method': getattr(ctx, 'request_method', None),
+        'path': getattr(ctx, 'request_path', None),
+        'remote_addr': getattr(ctx, 'request_remote_addr', None),
+        'user_agent': getattr(ctx, 'request_user_agent', None),
     }
 
     # Add timing information if available
-    if hasattr(g, 'request_start_time'):
+    request_start_time = getattr(ctx, 'request_start_time', None)
+    if request_start_time is not None:
         context['duration_ms'] = round(
-            (time.time() - g.request_start_time) * 1000, 2)
+            (time.time() - request_start_time) * 1000, 2)
 
     # Add auth context if available
-    if hasattr(g, 'organization_id') and g.organization_id:
-        context['organization_id'] = g.organization_id
+    organization_id = getattr(ctx, 'organization_id', None)
+    if organization_id:
+        context['organization_id'] = organization_id
 
-    if hasattr(g, 'api_key_id') and g.api_key_id:
-        context['api_key_id'] = g.api_key_id
+    api_key_id = getattr(ctx, 'api_key_id', None)
+    if api_key_id:
+        context['api_key_id'] = api_key_id
 
-    if hasattr(g, 'auth_context') and g.auth_context:
-        context['auth_context'] = g.auth_context
+    auth_context = getattr(ctx, 'auth_context', None)
+    if auth_context:
+        context['auth_context'] = auth_context
 
     return context
 
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""
+Per-stage request latency breakdown.
+
+Every request gets a RequestTimer (g.request_timer) that accumulates
+nanoseconds per stage with time.perf_counter_ns:
+
+- before / after: the before_request and after_request phases
+  (preprocess_request / process_response), hooks included
+- before.<module> / after.<module>: each hook, named after the module that
+  registered it (before.request_context, after.audit_logger, ...). Only for
+  detailed requests: those asking for Server-Timing and a sampled
+  BRIKK_REQUEST_TIMING_HOOK_SAMPLE fraction (default 1%). The phase stage
+  then keeps only Flask's own work between the hooks; timing every hook on
+  every request would not fit the 20us per-request budget.
+- handler: the view function (dispatch_request)
+- auth, rate_limit, idempotency: code marked with timed() or span()
+- db: SQLAlchemy cursor execution (timed by src.infra.query_log's listeners)
+
+Stage times are exclusive: time spent in a nested stage (a db query inside
+auth, auth inside the handler) is only counted once, in the innermost
+stage. The stages plus Flask's own dispatch work make up the request total.
+
+Stage times go to brikk_request_stage_seconds{stage}. Histogram.observe()
+costs about 2us and a request has 20+ stages, so requests are queued and
+bucketed in bulk (sort + bisect per stage against integer nanosecond bounds,
+one inc() per non-empty bucket) every 64 requests or once a second,
+whichever comes first. A background thread flushes buffers left idle for a
+second and an atexit hook flushes the rest at shutdown. Bulk bucketing
+writes the child histogram's _buckets/_sum counters directly; if a
+prometheus_client release drops them, flushes fall back to observe().
+Callers that send X-Brikk-Server-Timing with the BRIKK_ADMIN_TOKEN value also
+get the breakdown as a Server-Timing response header (milliseconds).
+
+init_request_timing() wraps the hooks registered at the time it is called,
+so create_app calls it after all middleware and blueprints are installed.
+Async hooks are left unwrapped so Flask's ensure_sync() still sees them.
+"""
+import atexit
+import hmac
+import inspect
+import os
+import random
+import threading
+from bisect import bisect_right
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter_ns
+from typing import Callable, Dict, List, Optional
+
+from flask import Flask, g, request
+from prometheus_client import Histogram
+
+from src.infra.query_log import add_query_observer
+
+SERVER_TIMING_HEADER = "X-Brikk-Server-Timing"
+SERVER_TIMING_ENVIRON = "HTTP_" + SERVER_TIMING_HEADER.upper().replace("-", "_")
+
+STAGE_BUCKETS = (.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5)
+
+_current: ContextVar[Optional["RequestTimer"]] = ContextVar("brikk_request_timer", default=None)
+
+
+class RequestTimer:
+    """Exclusive nanoseconds per stage for one request."""
+
+    __slots__ = ("stages", "started_ns", "server_timing_requested", "detailed", "_nested")
+
+    def __init__(self, server_timing_requested: bool = False, detailed: Optional[bool] = None):
+        self.stages: Dict[str, int] = {}
+        self.started_ns = perf_counter_ns()
+        self.server_timing_requested = server_timing_requested
+        # Time each request hook separately (see module docstring)
+        self.detailed = server_timing_requested if detailed is None else detailed
+        # Time spent in stages nested inside the currently open one
+        self._nested = 0
+
+    def add(self, stage: str, elapsed_ns: int) -> None:
+        """Record elapsed_ns measured inside the currently open stage."""
+        self.stages[stage] = self.stages.get(stage, 0) + elapsed_ns
+        self._nested += elapsed_ns
+
+    def total_ns(self) -> int:
+        return perf_counter_ns() - self.started_ns
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, durations in milliseconds."""
+        entries = [f"{stage};dur={ns / 1e6:.3f}" for stage, ns in self.stages.items()]
+        entries.append(f"total;dur={self.total_ns() / 1e6:.3f}")
+        return ", ".join(entries)
+
+
+def current_timer() -> Optional[RequestTimer]:
+    """The current request's timer, or None outside an instrumented request."""
+    return _current.get()
+
+
+def timed(stage: str):
+    """Decorator recording the wrapped call's time under stage."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            timer = _current.get()
+            if timer is None:
+                return func(*args, **kwargs)
+            outer = timer._nested
+            timer._nested = 0
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter_ns() - start
+                stages = timer.stages
+                stages[stage] = stages.get(stage, 0) + elapsed - timer._nested
+                timer._nested = outer + elapsed
+        return wrapper
+    return decorator
+
+
+class span:
+    """Context manager recording the enclosed block's time under stage."""
+
+    __slots__ = ("stage", "timer", "outer", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.timer = timer = _current.get()
+        if timer is not None:
+            self.outer = timer._nested
+            timer._nested = 0
+            self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        timer = self.timer
+        if timer is not None:
+            elapsed = perf_counter_ns() - self.start
+            timer.stages[self.stage] = timer.stages.get(self.stage, 0) + elapsed - timer._nested
+            timer._nested = self.outer + elapsed
+        return False
+
+
+def hook_stage(phase: str, func: Callable) -> str:
+    """Stage name for a request hook: src.services.metrics -> after.metrics."""
+    module = getattr(func, "__module__", None) or "unknown"
+    if module.startswith("src."):
+        name = module.rsplit(".", 1)[1]
+    else:
+        name = module.split(".", 1)[0]
+    return f"{phase}.{name}"
+
+
+def _instrument_before(func: Callable, stage: str) -> Callable:
+    """timed() for a no-argument before_request hook, minus the *args packing."""
+    if inspect.iscoroutinefunction(func):
+        return func
+
+    @wraps(func)
+    def hook():
+        timer = _current.get()
+        if timer is None or not timer.detailed:
+            return func()
+        outer = timer._nested
+        timer._nested = 0
+        start = perf_counter_ns()
+        try:
+            return func()
+        finally:
+            elapsed = perf_counter_ns() - start
+            stages = timer.stages
+            stages[stage] = stages.get(stage, 0) + elapsed - timer._nested
+            timer._nested = outer + elapsed
+    return hook
+
+
+def _instrument_after(func: Callable, stage: str) -> Callable:
+    """timed() for an after_request hook, minus the *args packing."""
+    if inspect.iscoroutinefunction(func):
+        return func
+
+    @wraps(func)
+    def hook(response):
+        timer = _current.get()
+        if timer is None or not timer.detailed:
+            return func(response)
+        outer = timer._nested
+        timer._nested = 0
+        start = perf_counter_ns()
+        try:
+            return func(response)
+        finally:
+            elapsed = perf_counter_ns() - start
+            stages = timer.stages
+            stages[stage] = stages.get(stage, 0) + elapsed - timer._nested
+            timer._nested = outer + elapsed
+    return hook
+
+
+def _record_db_time(elapsed_ns: int) -> None:
+    """Query observer counting SQLAlchemy cursor execution under the db stage."""
+    timer = _current.get()
+    if timer is not None:
+        timer.add("db", elapsed_ns)
+
+
+class StageHistogram:
+    """brikk_request_stage_seconds with a local pre-aggregation buffer."""
+
+    def __init__(self, registry, flush_every: int = 64, flush_interval: float = 1.0):
+        self.histogram = Histogram(
+            "brikk_request_stage_seconds",
+            "Exclusive time spent in each request stage in seconds.",
+            ["stage"],
+            buckets=STAGE_BUCKETS,
+            registry=registry
+        )
+        self.flush_every = flush_every
+        self.flush_interval_ns = int(flush_interval * 1e9)
+        self._bounds_ns = [round(bound * 1e9) for bound in STAGE_BUCKETS]
+        self._pending: List[Dict[str, int]] = []
+        self._last_flush_ns = perf_counter_ns()
+        self._children: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher_pid: Optional[int] = None
+        atexit.register(self.close)
+
+    def record(self, stages: Dict[str, int], now_ns: int) -> None:
+        """Queue one request's stage times; flushes when the buffer is due."""
+        with self._lock:
+            # Once per flushed batch: getpid() is a syscall
+            if not self._pending and self._flusher_pid != os.getpid():
+                self._start_flusher()
+            self._pending.append(stages)
+            if (len(self._pending) >= self.flush_every
+                    or now_ns - self._last_flush_ns >= self.flush_interval_ns):
+                self._flush(now_ns)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush(perf_counter_ns())
+
+    def close(self) -> None:
+        """Stop the flush thread and flush what is still queued."""
+        self._stop.set()
+        self.flush()
+
+    def _start_flusher(self) -> None:
+        # Threads do not survive fork (gunicorn --preload): start one per process
+        self._flusher_pid = os.getpid()
+        threading.Thread(target=self._run_flusher, name="request-timing-flush", daemon=True).start()
+
+    def _run_flusher(self) -> None:
+        while not self._stop.wait(self.flush_interval_ns / 1e9):
+            with self._lock:
+                now_ns = perf_counter_ns()
+                if self._pending and now_ns - self._last_flush_ns >= self.flush_interval_ns:
+                    self._flush(now_ns)
+
+    def _flush(self, now_ns: int) -> None:
+        by_stage: Dict[str, List[int]] = {}
+        for stages in self._pending:
+            for stage, ns in stages.items():
+                values = by_stage.get(stage)
+                if values is None:
+                    by_stage[stage] = [ns]
+                else:
+                    values.append(ns)
+        self._pending = []
+        self._last_flush_ns = now_ns
+        for stage, values in by_stage.items():
+            child = self._children.get(stage)
+            if child is None:
+                child = self._children[stage] = self.histogram.labels(stage=stage)
+            if not self.bulk_supported(child):
+                for ns in values:
+                    child.observe(ns / 1e9)
+                continue
+            # Same updates as observe(), one inc per non-empty bucket
+            values.sort()
+            below = 0
+            for bucket, bound in zip(child._buckets, self._bounds_ns):
+                upto = bisect_right(values, bound, below)
+                if upto > below:
+                    bucket.inc(upto - below)
+                    below = upto
+            if below < len(values):
+                child._buckets[-1].inc(len(values) - below)
+            child._sum.inc(sum(values) / 1e9)
+
+    @staticmethod
+    def bulk_supported(child) -> bool:
+        """Whether this prometheus_client exposes the counters bulk flushing writes."""
+        return hasattr(child, "_buckets") and hasattr(child, "_sum")
+
+
+class RequestTimingMiddleware:
+    """Installs per-request timers and wraps the app's hooks and dispatch."""
+
+    def __init__(self, app: Flask, registry=None, hook_sample: Optional[float] = None):
+        self.app = app
+        self.admin_token = os.environ.get("BRIKK_ADMIN_TOKEN") or None
+        self.hook_sample = hook_sample if hook_sample is not None else float(
+            os.environ.get("BRIKK_REQUEST_TIMING_HOOK_SAMPLE", "0.01"))
+        self.stage_seconds = StageHistogram(registry) if registry is not None else None
+
+        for funcs in app.before_request_funcs.values():
+            funcs[:] = [_instrument_before(f, hook_stage("before", f)) for f in funcs]
+        for funcs in app.after_request_funcs.values():
+            funcs[:] = [_instrument_after(f, hook_stage("after", f)) for f in funcs]
+        add_query_observer(_record_db_time)
+
+        # Instance attributes shadow the Flask methods: full_dispatch_request
+        # spans all hooks and the view, preprocess_request / process_response
+        # are the before / after phases and dispatch_request is the view alone.
+        # Cheaper than adding hooks (each costs an ensure_sync() call).
+        self._full_dispatch_request = app.full_dispatch_request
+        self._dispatch_request = timed("handler")(app.dispatch_request)
+        app.full_dispatch_request = self.full_dispatch_request
+        app.preprocess_request = timed("before")(app.preprocess_request)
+        app.process_response = timed("after")(app.process_response)
+        app.dispatch_request = self._dispatch_request
+
+    def full_dispatch_request(self):
+        # Resolve the proxies once; each proxied attribute access costs ~1us
+        requested = False
+        if self.admin_token is not None:
+            provided = request._get_current_object().environ.get(SERVER_TIMING_ENVIRON)
+            requested = bool(provided) and hmac.compare_digest(provided.encode(), self.admin_token.encode())
+        timer = RequestTimer(requested, requested or random.random() < self.hook_sample)
+        g._get_current_object().request_timer = timer
+        token = _current.set(timer)
+        try:
+            response = self._full_dispatch_request()
+        finally:
+            _current.reset(token)
+        if self.stage_seconds is not None:
+            self.stage_seconds.record(timer.stages, perf_counter_ns())
+        if requested:
+            response.headers["Server-Timing"] = timer.server_timing()
+        return response
+
+
+def init_request_timing(app: Flask) -> Optional[RequestTimingMiddleware]:
+    """Instrument the app's request hooks unless BRIKK_REQUEST_TIMING_ENABLED=false."""
+    if os.environ.get("BRIKK_REQUEST_TIMING_ENABLED", "true").lower() != "true":
+        return None
+    metrics_service = app.extensions.get("metrics")
+    registry = metrics_service.registry if metrics_service and metrics_service.enabled else None
+    middleware = RequestTimingMiddleware(app, registry)
+    app.extensions["request_timing"] = middleware
+    return middleware
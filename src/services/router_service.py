@@ -5,7 +5,7 @@ Routes requests to appropriate AI providers based on language, hints, and availa
 
 import uuid
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional
 from src.services.openai_service import OpenAIService
 from src.services.mistral_service import MistralService
 from src.services.provider_metrics import record_request
@@ -156,4 +156,56 @@ class RouterService:
                 )
         
         return result
-
+    
+    def route_chat_stream(
+        self,
+        message: str,
+        system: Optional[str] = None,
+        language: Optional[str] = "en",
+        hint: Optional[str] = "balanced",
+        policy: Optional[str] = None,
+        meta: Optional[Dict[str, Any]] = None,
+        request_id: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of route_chat.
+        
+        Yields token events as the provider produces them, then a final
+        "done" or "error" event with the fallback flag. Falls back to the
+        other provider only if the primary fails before its first token.
+        """
+        if not request_id:
+            request_id = str(uuid.uuid4())
+        
+        primary_provider = self._select_provider(language, hint, policy)
+        if primary_provider == "mistral":
+            fallback_provider = "openai"
+        else:
+            fallback_provider = "mistral" if self.mistral.is_configured() else None
+        services = {"openai": self.openai, "mistral": self.mistral}
+        
+        logger.info(
+            f"[{request_id}] Router stream: "
+            f"language={language}, hint={hint}, "
+            f"primary={primary_provider}"
+        )
+        
+        for event in services[primary_provider].chat_stream(message, system, language, meta, request_id):
+            if event["type"] == "error" and not event.get("partial") and fallback_provider:
+                logger.warning(
+                    f"[{request_id}] {primary_provider} stream failed, falling back to "
+                    f"{fallback_provider}: {event.get('error')}"
+                )
+                break
+            if event["type"] != "token":
+                event["fallback"] = False
+            yield event
+        else:
+            return
+        
+        for event in services[fallback_provider].chat_stream(message, system, language, meta, request_id):
+            if event["type"] != "token":
+                event["fallback"] = True
+                if event["type"] == "done":
+                    record_request(event["provider"], "success", True, event.get("latency_ms", 0))
+            yield event
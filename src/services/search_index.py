@@ -0,0 +1,637 @@
+"""
+Full-text search index for marketplace discovery
+
+Backends (BRIKK_SEARCH_BACKEND):
+- postgres:   tsvector column with a GIN index, ranked with ts_rank
+- sqlite_fts: FTS5 virtual table ranked with bm25() (local development)
+- memory:     in-process inverted index with field-weighted BM25
+- like:       unindexed ILIKE scan over listing and agent text (previous behaviour)
+- auto:       postgres on PostgreSQL, sqlite_fts on SQLite with FTS5, memory otherwise
+
+Indexed text per listing is weighted: agent name > short description and tags
+> long description and agent description. Queries match all terms, with prefix
+matching on the last one so results update while the user types.
+
+Indexes are kept in sync from SQLAlchemy session events whenever a listing is
+created, updated, published, archived or deleted, or its agent is renamed. SQL
+backends write inside the flushing transaction; the memory backend applies
+changes after commit. Core bulk inserts bypass the ORM, so call rebuild()
+after loading listings that way.
+
+The memory backend is per process: session events only reach the worker
+that committed the change. Each search checks, at most every
+BRIKK_SEARCH_MEMORY_REFRESH seconds, a watermark of the listing count and
+the newest listing and agent updated_at, and rebuilds when it has moved.
+Multi-worker deployments should prefer postgres or sqlite_fts.
+"""
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import (
+    Float, String, bindparam, event, func, inspect, literal_column, or_, select, text, type_coerce
+)
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from src.infra.db import db
+from src.infra.log import get_logger
+from src.models.agent import Agent
+from src.models.marketplace import MarketplaceListing
+from src.models.reviews import AgentRatingSummary
+
+logger = get_logger(__name__)
+
+BACKENDS = ('auto', 'postgres', 'sqlite_fts', 'memory', 'like')
+
+# Listing/agent attributes that feed the index or its filters
+LISTING_FIELDS = ('agent_id', 'status', 'category', 'pricing_model', 'tags',
+                  'short_description', 'long_description')
+AGENT_FIELDS = ('name', 'description')
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+_PENDING_KEY = 'search_index_pending'
+_ID_BATCH = 500
+
+# (total matches, [(listing_id, relevance score or None)]) for one page
+SearchPage = Tuple[int, List[Tuple[str, Optional[float]]]]
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """Lower-cased alphanumeric terms of a string."""
+    return _TOKEN_RE.findall(value.lower()) if value else []
+
+
+@dataclass
+class SearchFilters:
+    """Structured filters applied alongside the text query."""
+    category: Optional[str] = None
+    tags: Optional[List[str]] = None
+    pricing: Optional[str] = None
+    min_rating: Optional[float] = None
+
+
+@dataclass
+class SearchDocument:
+    """Indexed view of one listing."""
+    listing_id: str
+    agent_id: Optional[str]
+    status: Optional[str]
+    category: Optional[str]
+    pricing_model: Optional[str]
+    tags: List[str] = field(default_factory=list)
+    name: str = ''
+    summary: str = ''
+    body: str = ''
+
+
+def apply_listing_filters(query, filters: SearchFilters):
+    """Restrict a MarketplaceListing query to published listings matching the filters."""
+    query = query.filter(MarketplaceListing.status == 'published')
+    if filters.category:
+        query = query.filter(MarketplaceListing.category == filters.category)
+    for tag in filters.tags or ():
+        # tags is a JSON list in a TEXT column; match the encoded element
+        query = query.filter(
+            type_coerce(MarketplaceListing.tags, db.Text).contains(json.dumps(tag)))
+    if filters.pricing:
+        query = query.filter(MarketplaceListing.pricing_model == filters.pricing)
+    if filters.min_rating:
+        query = query.join(
+            AgentRatingSummary,
+            MarketplaceListing.agent_id == AgentRatingSummary.agent_id
+        ).filter(AgentRatingSummary.average_rating >= filters.min_rating)
+    return query
+
+
+def load_documents(connection, listing_ids: Optional[Iterable[str]] = None,
+                   batch_size: int = _ID_BATCH) -> Iterator[List[SearchDocument]]:
+    """Yield batches of SearchDocuments for the given listings (all listings if None)."""
+    stmt = select(
+        MarketplaceListing.id, MarketplaceListing.agent_id, MarketplaceListing.status,
+        MarketplaceListing.category, MarketplaceListing.pricing_model, MarketplaceListing.tags,
+        MarketplaceListing.short_description, MarketplaceListing.long_description,
+        Agent.name, Agent.description,
+    ).select_from(MarketplaceListing).outerjoin(Agent, Agent.id == MarketplaceListing.agent_id)
+
+    if listing_ids is None:
+        result = connection.execute(stmt.execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            yield [_document(row) for row in rows]
+        return
+
+    ids = list(listing_ids)
+    for start in range(0, len(ids), batch_size):
+        rows = connection.execute(
+            stmt.where(MarketplaceListing.id.in_(ids[start:start + batch_size])))
+        yield [_document(row) for row in rows]
+
+
+def _document(row) -> SearchDocument:
+    tags = list(row.tags or [])
+    return SearchDocument(
+        listing_id=row.id,
+        agent_id=row.agent_id,
+        status=row.status,
+        category=row.category,
+        pricing_model=row.pricing_model,
+        tags=tags,
+        name=row.name or '',
+        summary=' '.join([row.short_description or ''] + [str(t) for t in tags]),
+        body=' '.join(filter(None, (row.long_description, row.description))),
+    )
+
+
+class SearchIndexBackend:
+    """Common interface for search backends."""
+
+    name = 'base'
+    # Whether session events need to feed this backend
+    needs_sync = True
+
+    def sync(self, connection, changed_ids: Set[str], removed_ids: Set[str]):
+        """
+        Index changed listings and drop removed ones inside the flushing
+        transaction. Returns state for apply() after commit, or None.
+        """
+        return None
+
+    def apply(self, pending) -> None:
+        """Apply state returned by sync() once the transaction has committed."""
+
+    def rebuild(self, connection=None) -> int:
+        """Re-index every listing; returns the number indexed."""
+        raise NotImplementedError
+
+    def search(self, query: str, filters: SearchFilters,
+               limit: int = 20, offset: int = 0) -> SearchPage:
+        raise NotImplementedError
+
+
+class LikeSearchBackend(SearchIndexBackend):
+    """ILIKE scan ordered by install count; no index to maintain."""
+
+    name = 'like'
+    needs_sync = False
+
+    def rebuild(self, connection=None) -> int:
+        return 0
+
+    def search(self, query, filters, limit=20, offset=0):
+        term = f"%{query}%"
+        q = apply_listing_filters(MarketplaceListing.query.join(Agent), filters).filter(or_(
+            MarketplaceListing.short_description.ilike(term),
+            MarketplaceListing.long_description.ilike(term),
+            Agent.name.ilike(term),
+            Agent.description.ilike(term),
+        ))
+        total = q.count()
+        rows = q.with_entities(MarketplaceListing.id).order_by(
+            MarketplaceListing.install_count.desc()).limit(limit).offset(offset).all()
+        return total, [(row.id, None) for row in rows]
+
+
+class PostgresSearchBackend(SearchIndexBackend):
+    """
+    marketplace_listings.search_vector (tsvector, GIN-indexed) ranked with
+    ts_rank. The column and index come from the marketplace_search_001
+    migration and are not mapped on the model.
+    """
+
+    name = 'postgres'
+    CONFIG = 'english'
+
+    _VECTOR_SQL = (
+        "setweight(to_tsvector('{cfg}', coalesce(a.name, '')), 'A') || "
+        "setweight(to_tsvector('{cfg}', coalesce(ml.short_description, '') || ' ' "
+        "|| coalesce(ml.tags, '')), 'B') || "
+        "setweight(to_tsvector('{cfg}', coalesce(ml.long_description, '') || ' ' "
+        "|| coalesce(a.description, '')), 'C')"
+    ).format(cfg=CONFIG)
+    _UPDATE_SQL = (
+        "UPDATE marketplace_listings AS ml SET search_vector = " + _VECTOR_SQL +
+        " FROM agents AS a WHERE a.id = ml.agent_id"
+    )
+
+    def sync(self, connection, changed_ids, removed_ids):
+        if changed_ids:
+            connection.execute(
+                text(self._UPDATE_SQL + " AND ml.id IN :ids").bindparams(
+                    bindparam('ids', expanding=True)),
+                {'ids': sorted(changed_ids)})
+        # Deleted rows take their vector with them
+        return None
+
+    def rebuild(self, connection=None) -> int:
+        connection = connection or db.session.connection()
+        return connection.execute(text(self._UPDATE_SQL)).rowcount
+
+    @staticmethod
+    def to_tsquery(query: str) -> Optional[str]:
+        terms = tokenize(query)
+        if not terms:
+            return None
+        terms[-1] += ':*'
+        return ' & '.join(terms)
+
+    def search(self, query, filters, limit=20, offset=0):
+        tsquery_text = self.to_tsquery(query)
+        if tsquery_text is None:
+            return 0, []
+        tsquery = db.func.to_tsquery(self.CONFIG, tsquery_text)
+        vector = literal_column('marketplace_listings.search_vector')
+        q = apply_listing_filters(MarketplaceListing.query, filters).filter(vector.op('@@')(tsquery))
+        total = q.count()
+        score = db.func.ts_rank(vector, tsquery).label('score')
+        rows = q.with_entities(MarketplaceListing.id, score).order_by(
+            score.desc(), MarketplaceListing.install_count.desc()
+        ).limit(limit).offset(offset).all()
+        return total, [(row.id, float(row.score)) for row in rows]
+
+
+class SqliteFTSSearchBackend(SearchIndexBackend):
+    """
+    FTS5 virtual table (porter stemming) ranked with bm25(). The table is
+    created and populated on first use.
+    """
+
+    name = 'sqlite_fts'
+    TABLE = 'marketplace_listings_fts'
+    # bm25 column weights: listing_id (unindexed), name, summary, body
+    WEIGHTS = (0.0, 3.0, 2.0, 1.0)
+
+    def __init__(self):
+        self._ready = False
+
+    @staticmethod
+    def fts_rowid(listing_id: str) -> int:
+        """Stable signed 64-bit rowid for a listing, so updates delete by rowid."""
+        digest = hashlib.blake2b(listing_id.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big', signed=True)
+
+    def _ensure_table(self, connection) -> None:
+        if self._ready:
+            return
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"), {'name': self.TABLE}
+        ).first()
+        if not exists:
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE {self.TABLE} USING fts5("
+                "listing_id UNINDEXED, name, summary, body, tokenize='porter unicode61')"))
+            self._ready = True
+            self.rebuild(connection)
+        self._ready = True
+
+    def _write(self, connection, documents: List[SearchDocument]) -> None:
+        if documents:
+            connection.execute(text(
+                f"INSERT INTO {self.TABLE} (rowid, listing_id, name, summary, body) "
+                "VALUES (:rowid, :listing_id, :name, :summary, :body)"
+            ), [{'rowid': self.fts_rowid(d.listing_id), 'listing_id': d.listing_id,
+                 'name': d.name, 'summary': d.summary, 'body': d.body} for d in documents])
+
+    def sync(self, connection, changed_ids, removed_ids):
+        self._ensure_table(connection)
+        stale = changed_ids | removed_ids
+        if stale:
+            connection.execute(text(f"DELETE FROM {self.TABLE} WHERE rowid = :rowid"),
+                               [{'rowid': self.fts_rowid(i)} for i in stale])
+        for batch in load_documents(connection, changed_ids):
+            self._write(connection, batch)
+        return None
+
+    def rebuild(self, connection=None) -> int:
+        connection = connection or db.session.connection()
+        self._ensure_table(connection)
+        connection.execute(text(f"DELETE FROM {self.TABLE}"))
+        count = 0
+        for batch in load_documents(connection):
+            self._write(connection, batch)
+            count += len(batch)
+        return count
+
+    @staticmethod
+    def match_expression(query: str) -> Optional[str]:
+        terms = tokenize(query)
+        if not terms:
+            return None
+        quoted = [f'"{t}"' for t in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def search(self, query, filters, limit=20, offset=0):
+        match = self.match_expression(query)
+        if match is None:
+            return 0, []
+        self._ensure_table(db.session.connection())
+        weights = ', '.join(str(w) for w in self.WEIGHTS)
+        fts = text(
+            f"SELECT listing_id, -bm25({self.TABLE}, {weights}) AS score "
+            f"FROM {self.TABLE} WHERE {self.TABLE} MATCH :match"
+        ).bindparams(match=match).columns(listing_id=String, score=Float).subquery('fts')
+        q = apply_listing_filters(
+            MarketplaceListing.query.join(fts, fts.c.listing_id == MarketplaceListing.id), filters)
+        total = q.count()
+        rows = q.with_entities(MarketplaceListing.id, fts.c.score).order_by(
+            fts.c.score.desc(), MarketplaceListing.install_count.desc()
+        ).limit(limit).offset(offset).all()
+        return total, [(row.id, float(row.score)) for row in rows]
+
+
+class MemorySearchBackend(SearchIndexBackend):
+    """
+    In-process inverted index scored with field-weighted BM25. Filters other
+    than min_rating are evaluated in memory. Built lazily on first search;
+    each worker process holds its own copy and rebuilds it when the
+    watermark shows changes made elsewhere (checked every refresh_interval
+    seconds, 0 = on every search).
+    """
+
+    name = 'memory'
+    FIELD_WEIGHTS = (3.0, 2.0, 1.0)  # name, summary, body
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, refresh_interval: Optional[float] = None):
+        if refresh_interval is None:
+            refresh_interval = float(os.environ.get('BRIKK_SEARCH_MEMORY_REFRESH', '10'))
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._built = False
+        self._watermark = None
+        self._next_check = 0.0
+        self._reset()
+
+    def _reset(self) -> None:
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._doc_terms: Dict[str, List[str]] = {}
+        self._doc_len: Dict[str, float] = {}
+        self._docs: Dict[str, SearchDocument] = {}
+        self._total_len = 0.0
+        self._vocab: Optional[List[str]] = None
+
+    def _add(self, doc: SearchDocument) -> None:
+        self._remove(doc.listing_id)
+        tf: Counter = Counter()
+        for weight, value in zip(self.FIELD_WEIGHTS, (doc.name, doc.summary, doc.body)):
+            for term in tokenize(value):
+                tf[term] += weight
+        for term, freq in tf.items():
+            if term not in self._postings:
+                self._vocab = None
+            self._postings[term][doc.listing_id] = freq
+        length = sum(tf.values())
+        self._docs[doc.listing_id] = doc
+        self._doc_terms[doc.listing_id] = list(tf)
+        self._doc_len[doc.listing_id] = length
+        self._total_len += length
+
+    def _remove(self, listing_id: str) -> None:
+        if listing_id not in self._docs:
+            return
+        for term in self._doc_terms.pop(listing_id):
+            posting = self._postings[term]
+            posting.pop(listing_id, None)
+            if not posting:
+                del self._postings[term]
+                self._vocab = None
+        self._total_len -= self._doc_len.pop(listing_id)
+        del self._docs[listing_id]
+
+    def sync(self, connection, changed_ids, removed_ids):
+        if not self._built:
+            return None
+        documents = [d for batch in load_documents(connection, changed_ids) for d in batch]
+        return documents, set(removed_ids)
+
+    def apply(self, pending) -> None:
+        documents, removed_ids = pending
+        with self._lock:
+            for listing_id in removed_ids:
+                self._remove(listing_id)
+            for doc in documents:
+                self._add(doc)
+
+    def rebuild(self, connection=None) -> int:
+        connection = connection or db.session.connection()
+        with self._lock:
+            # Taken before loading, so changes racing the load trigger another rebuild
+            self._watermark = self._current_watermark(connection)
+            self._next_check = time.monotonic() + self.refresh_interval
+            self._reset()
+            for batch in load_documents(connection):
+                for doc in batch:
+                    self._add(doc)
+            self._built = True
+            return len(self._docs)
+
+    @staticmethod
+    def _current_watermark(connection) -> Tuple:
+        count, listing_updated = connection.execute(
+            select(func.count(MarketplaceListing.id), func.max(MarketplaceListing.updated_at))).one()
+        agent_updated = connection.scalar(
+            select(func.max(Agent.updated_at)).select_from(MarketplaceListing)
+            .join(Agent, Agent.id == MarketplaceListing.agent_id))
+        return count, listing_updated, agent_updated
+
+    def _refresh_if_stale(self) -> None:
+        """Rebuild if another process changed listings since the last build."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.refresh_interval
+        connection = db.session.connection()
+        if self._current_watermark(connection) != self._watermark:
+            logger.info("Memory search index is stale; rebuilding")
+            self.rebuild(connection)
+
+    def _expand(self, prefix: str) -> List[str]:
+        if self._vocab is None:
+            self._vocab = sorted(self._postings)
+        start = bisect_left(self._vocab, prefix)
+        terms = []
+        for term in self._vocab[start:]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def _matches(self, doc: SearchDocument, filters: SearchFilters,
+                 rated_agents: Optional[Set[str]]) -> bool:
+        if doc.status != 'published':
+            return False
+        if filters.category and doc.category != filters.category:
+            return False
+        if filters.pricing and doc.pricing_model != filters.pricing:
+            return False
+        if filters.tags and not set(filters.tags).issubset(doc.tags):
+            return False
+        if rated_agents is not None and doc.agent_id not in rated_agents:
+            return False
+        return True
+
+    def search(self, query, filters, limit=20, offset=0):
+        terms = tokenize(query)
+        if not terms:
+            return 0, []
+        rated_agents = None
+        if filters.min_rating:
+            rated_agents = set(db.session.scalars(
+                select(AgentRatingSummary.agent_id).where(
+                    AgentRatingSummary.average_rating >= filters.min_rating)))
+
+        with self._lock:
+            if not self._built:
+                self.rebuild()
+            else:
+                self._refresh_if_stale()
+            n_docs = len(self._docs)
+            if not n_docs:
+                return 0, []
+            avg_len = self._total_len / n_docs
+            # Each query term matches exactly; the last also as a prefix
+            groups = [[t] for t in terms[:-1]] + [self._expand(terms[-1])]
+            if any(not group or any(t not in self._postings for t in group) for group in groups):
+                return 0, []
+
+            candidates: Optional[Set[str]] = None
+            for group in sorted(groups, key=lambda g: sum(len(self._postings[t]) for t in g)):
+                ids = set().union(*(self._postings[t] for t in group))
+                candidates = ids if candidates is None else candidates & ids
+                if not candidates:
+                    return 0, []
+
+            scores: Dict[str, float] = {}
+            for group in groups:
+                for term in group:
+                    posting = self._postings[term]
+                    df = len(posting)
+                    idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                    for listing_id in candidates.intersection(posting):
+                        tf = posting[listing_id]
+                        norm = self.K1 * (1 - self.B + self.B * self._doc_len[listing_id] / avg_len)
+                        scores[listing_id] = scores.get(listing_id, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+
+            hits = [(listing_id, score) for listing_id, score in scores.items()
+                    if self._matches(self._docs[listing_id], filters, rated_agents)]
+
+        page = heapq.nlargest(offset + limit, hits, key=lambda h: (h[1], h[0]))[offset:]
+        return len(hits), page
+
+
+_BACKEND_CLASSES = {
+    'postgres': PostgresSearchBackend,
+    'sqlite_fts': SqliteFTSSearchBackend,
+    'memory': MemorySearchBackend,
+    'like': LikeSearchBackend,
+}
+
+
+def _sqlite_has_fts5() -> bool:
+    try:
+        conn = sqlite3.connect(':memory:')
+        try:
+            conn.execute("CREATE VIRTUAL TABLE probe USING fts5(x)")
+        finally:
+            conn.close()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def create_search_backend(name: str, database_uri: Optional[str] = None) -> SearchIndexBackend:
+    """Instantiate a backend by name; 'auto' picks one from the database dialect."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown search backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    if name == 'auto':
+        dialect = make_url(database_uri).get_backend_name() if database_uri else ''
+        if dialect == 'postgresql':
+            name = 'postgres'
+        elif dialect == 'sqlite' and _sqlite_has_fts5():
+            name = 'sqlite_fts'
+        else:
+            name = 'memory'
+    return _BACKEND_CLASSES[name]()
+
+
+def init_search_index(app: Flask) -> SearchIndexBackend:
+    """Select the search backend for the app and register it as an extension."""
+    name = app.config.get('BRIKK_SEARCH_BACKEND') or os.getenv('BRIKK_SEARCH_BACKEND', 'auto')
+    backend = create_search_backend(name.lower(), app.config.get('SQLALCHEMY_DATABASE_URI'))
+    app.extensions['search_index'] = backend
+    logger.info(f"Marketplace search backend: {backend.name}")
+    return backend
+
+
+def get_search_index() -> Optional[SearchIndexBackend]:
+    """Search backend of the current app, if one was initialised."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('search_index')
+
+
+# ---------------------------------------------------------
+# Keep the index in sync with ORM changes
+# ---------------------------------------------------------
+def _has_changes(obj, fields) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in fields)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_search_changes(session, flush_context):
+    backend = get_search_index()
+    if backend is None or not backend.needs_sync:
+        return
+
+    changed: Set[str] = set()
+    removed: Set[str] = set()
+    agent_ids: Set[str] = set()
+    for obj in session.new:
+        if isinstance(obj, MarketplaceListing):
+            changed.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, MarketplaceListing) and _has_changes(obj, LISTING_FIELDS):
+            changed.add(obj.id)
+        elif isinstance(obj, Agent) and _has_changes(obj, AGENT_FIELDS):
+            agent_ids.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, MarketplaceListing):
+            removed.add(obj.id)
+    if not (changed or removed or agent_ids):
+        return
+
+    connection = session.connection()
+    if agent_ids:
+        changed.update(connection.scalars(
+            select(MarketplaceListing.id).where(MarketplaceListing.agent_id.in_(agent_ids))))
+    changed -= removed
+    pending = backend.sync(connection, changed, removed)
+    if pending is not None:
+        session.info.setdefault(_PENDING_KEY, []).append((backend, pending))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_search_changes(session):
+    for backend, pending in session.info.pop(_PENDING_KEY, ()):
+        try:
+            backend.apply(pending)
+        except Exception as e:
+            logger.error(f"Failed to apply search index changes: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_search_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -11,17 +11,49 @@ Provides structured logging with:
 
 Logs include: timestamp, level, message, request_id, method, path, status,
 organization_id, api_key_id, duration_ms, and other contextual information.
+
+Records are serialised with orjson when it is installed (json otherwise).
+With BRIKK_LOG_ASYNC=true the request thread only captures the request
+context and merges the message; a QueueHandler hands the record to a
+QueueListener thread that formats and writes it. Per-event sampling
+(BRIKK_LOG_SAMPLE="coordination_success=0.1") and rate-limited
+deduplication (BRIKK_LOG_RATE_LIMIT="coordination_success=100/60", at most
+100 identical records per 60s; the next one carries a `suppressed` count)
+drop high-volume records before they are queued or written.
 """
 
 import os
 import json
+import atexit
 import logging
+import queue
+import random
+import threading
 import time
-from typing import Dict, Any, Optional
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timezone
 from flask import Flask, has_request_context
 from src.services.request_context import get_request_context, get_request_id
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(log_entry: Dict[str, Any]) -> str:
+    """Serialise a log entry, preferring orjson."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                log_entry,
+                default=str,
+                option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; json handles them
+    return json.dumps(log_entry, default=str)
+
 
 class StructuredFormatter(logging.Formatter):
     """Custom formatter for structured JSON logging."""
@@ -48,9 +80,11 @@ class StructuredFormatter(logging.Formatter):
             'function': record.funcName,
             'line': record.lineno}
 
-        # Add request context if available
-        if has_request_context():
+        # Add request context (captured on the request thread in async mode)
+        request_context = getattr(record, 'request_context', None)
+        if request_context is None and has_request_context():
             request_context = get_request_context()
+        if request_context:
             log_entry.update(request_context)
 
         # Add extra fields from log record
@@ -61,7 +95,149 @@ class StructuredFormatter(logging.Formatter):
         if record.exc_info:
             log_entry['exception'] = self.formatException(record.exc_info)
 
-        return json.dumps(log_entry, default=str)
+        return _dumps(log_entry)
+
+
+class ContextQueueHandler(QueueHandler):
+    """QueueHandler that captures request context on the calling thread."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Attach request context and merge the message; formatting happens on the listener."""
+        if has_request_context():
+            record.request_context = get_request_context()
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        """Queue the record, dropping it when the queue is full."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class EventSampler(logging.Filter):
+    """Per-event_type sampling and rate-limited deduplication."""
+
+    MAX_KEYS = 1024
+
+    def __init__(self,
+                 sample_rates: Optional[Dict[str, float]] = None,
+                 rate_limits: Optional[Dict[str, Tuple[int, float]]] = None):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.rate_limits = rate_limits or {}
+        # (logger, event_type, msg) -> [window start, emitted, suppressed]
+        self._windows: Dict[Tuple[str, str, Any], list] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional['EventSampler']:
+        """Sampler from BRIKK_LOG_SAMPLE / BRIKK_LOG_RATE_LIMIT, or None if neither is set."""
+        sample_rates = {
+            event: float(rate) for event, rate in _parse_event_settings(
+                os.environ.get('BRIKK_LOG_SAMPLE', '')).items()}
+        rate_limits = {}
+        for event, limit in _parse_event_settings(
+                os.environ.get('BRIKK_LOG_RATE_LIMIT', '')).items():
+            count, _, seconds = limit.partition('/')
+            rate_limits[event] = (int(count), float(seconds or 60))
+        if not sample_rates and not rate_limits:
+            return None
+        return cls(sample_rates, rate_limits)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        extra_fields = getattr(record, 'extra_fields', None)
+        event_type = extra_fields.get('event_type') if extra_fields else None
+        if event_type is None:
+            return True
+
+        rate = self.sample_rates.get(event_type)
+        if rate is not None:
+            if random.random() >= rate:
+                return False
+            extra_fields['sample_rate'] = rate
+
+        limit = self.rate_limits.get(event_type)
+        if limit is not None:
+            return self._allow((record.name, event_type, record.msg), limit, extra_fields)
+        return True
+
+    def _allow(self, key, limit: Tuple[int, float], extra_fields: Dict[str, Any]) -> bool:
+        max_count, window_seconds = limit
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= window_seconds:
+                if window is not None and window[2]:
+                    extra_fields['suppressed'] = window[2]
+                if window is None and len(self._windows) >= self.MAX_KEYS:
+                    self._windows.clear()
+                self._windows[key] = [now, 1, 0]
+                return True
+            if window[1] < max_count:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+def _parse_event_settings(value: str) -> Dict[str, str]:
+    """Parse "event=value,event=value" into a dict."""
+    settings = {}
+    for item in value.split(','):
+        event, _, setting = item.partition('=')
+        if event.strip() and setting.strip():
+            settings[event.strip()] = setting.strip()
+    return settings
+
+
+# The running listener and the handler feeding it when BRIKK_LOG_ASYNC=true
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[ContextQueueHandler] = None
+
+
+def start_async_logging(handler: logging.Handler) -> ContextQueueHandler:
+    """Move handler onto a QueueListener thread; returns the handler to install instead."""
+    stop_async_logging()
+    global _listener, _queue_handler
+    log_queue = queue.Queue(maxsize=int(os.environ.get('BRIKK_LOG_QUEUE_SIZE', '10000')))
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    _queue_handler = ContextQueueHandler(log_queue)
+    return _queue_handler
+
+
+def stop_async_logging():
+    """Write the queued records and stop the listener thread."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        listener, _listener, _queue_handler = _listener, None, None
+        listener.stop()
+
+
+def _restart_listener_after_fork():
+    # Threads do not survive fork (gunicorn --preload). The inherited queue
+    # may have its lock held by the dead listener thread and still holds
+    # records the parent writes, so the child gets a new queue and listener.
+    global _listener
+    if _listener is not None and _queue_handler is not None:
+        log_queue = queue.Queue(maxsize=_queue_handler.queue.maxsize)
+        _listener = QueueListener(log_queue, *_listener.handlers,
+                                  respect_handler_level=_listener.respect_handler_level)
+        _queue_handler.queue = log_queue
+        _listener.start()
+
+
+atexit.register(stop_async_logging)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
 
 
 class StructuredLogger:
@@ -225,6 +401,7 @@ def get_logger(name: str) -> StructuredLogger:
 def configure_logging(app: Flask):
     """Configure structured logging for Flask application."""
     json_enabled = os.environ.get('BRIKK_LOG_JSON', 'true').lower() == 'true'
+    async_enabled = os.environ.get('BRIKK_LOG_ASYNC', 'false').lower() == 'true'
     log_level = os.environ.get('LOG_LEVEL', 'INFO').upper()
 
     # Configure root logger
@@ -234,13 +411,20 @@ def configure_logging(app: Flask):
     # Remove existing handlers
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
+    stop_async_logging()
 
     # Create console handler with structured formatter
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(
         StructuredFormatter(
             json_enabled=json_enabled))
-    root_logger.addHandler(console_handler)
+    handler = start_async_logging(console_handler) if async_enabled else console_handler
+
+    # Sampling and deduplication run before the record is queued or written
+    event_sampler = EventSampler.from_env()
+    if event_sampler is not None:
+        handler.addFilter(event_sampler)
+    root_logger.addHandler(handler)
 
     # Configure Flask app logger
     app.logger.setLevel(getattr(logging, log_level, logging.INFO))
@@ -264,6 +448,7 @@ def configure_logging(app: Flask):
     config_logger.info(
         "Logging configured",
         json_enabled=json_enabled,
+        async_enabled=async_enabled,
         log_level=log_level,
         loggers_configured=loggers_to_configure
     )
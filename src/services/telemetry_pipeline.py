@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+SDK Telemetry Ingestion Pipeline.
+
+Stores SDK telemetry without putting database writes on the request path:
+- Requests normalise events and append them to an in-process ring buffer
+- Every event is folded into per-minute rollups (counts and a latency
+  histogram by SDK language, version and event type) before any shedding,
+  so rollups stay exact under load
+- Above a high-water mark the buffer sheds raw events by sampling; errors
+  are always kept and sampled rows record their sample_rate
+- A flusher thread bulk-inserts raw events in batches ordered by
+  (event_type, sdk_version, occurred_at) and merges rollups with one
+  additive upsert per flush
+
+Telemetry is best effort: raw events that cannot be written are dropped
+(and counted); rollups from a failed flush are kept and retried.
+
+Configuration:
+    BRIKK_TELEMETRY_BUFFER_SIZE=50000       - Ring buffer capacity (oldest events are overwritten)
+    BRIKK_TELEMETRY_BATCH_SIZE=2000         - Raw events per bulk insert
+    BRIKK_TELEMETRY_FLUSH_INTERVAL=1.0      - Max seconds an event waits in memory
+    BRIKK_TELEMETRY_HIGH_WATER=0.8          - Buffer fill fraction at which shedding starts
+    BRIKK_TELEMETRY_SHED_SAMPLE_RATE=0.1    - Fraction of non-error events kept while shedding
+"""
+import atexit
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from flask import Flask
+from prometheus_client import Counter, Gauge, Histogram
+
+from src.infra.db import db, bulk_upsert
+from src.services.batch_writer import BatchWriter
+from src.models.telemetry import (
+    LATENCY_BUCKETS_MS, LATENCY_COLUMNS, ROLLUP_COUNTERS, TelemetryEvent, TelemetryRollupMinute,
+)
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_KEY = ('bucket_start', 'sdk_language', 'sdk_version', 'event_type')
+UNKNOWN = 'unknown'
+
+RollupKey = Tuple[datetime, str, str, str]
+
+
+telemetry_events_total = Counter(
+    'brikk_telemetry_events_total',
+    'SDK telemetry events handled by the ingestion pipeline',
+    ['outcome']  # received, rejected, buffered, shed, overwritten, written, dropped
+)
+
+telemetry_buffer_depth = Gauge(
+    'brikk_telemetry_buffer_depth',
+    'SDK telemetry events waiting in the ring buffer',
+    multiprocess_mode='livesum'
+)
+
+telemetry_flush_seconds = Histogram(
+    'brikk_telemetry_flush_seconds',
+    'Latency of telemetry bulk writes (events and rollups) in seconds',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+telemetry_flush_batch_size = Histogram(
+    'brikk_telemetry_flush_batch_size',
+    'Raw telemetry events per bulk insert',
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+)
+
+
+def _text(value: Any, max_length: int) -> Optional[str]:
+    if value is None:
+        return None
+    return str(value)[:max_length]
+
+
+def _timestamp(value: Any, received_at: datetime) -> datetime:
+    """Parse an ISO 8601 timestamp to naive UTC; unparseable or future times use received_at."""
+    if not isinstance(value, str):
+        return received_at
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return received_at
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(parsed, received_at)
+
+
+def normalize_event(event: Any, sdk_info: Dict[str, Any],
+                    received_at: datetime) -> Optional[Dict[str, Any]]:
+    """
+    Build a telemetry_events row from one SDK event.
+
+    Returns:
+        Row dict, or None if the event is not an object with an event_type
+    """
+    if not isinstance(event, dict):
+        return None
+    event_type = event.get('event_type')
+    if not event_type or not isinstance(event_type, str):
+        return None
+
+    duration_ms = event.get('duration_ms')
+    if isinstance(duration_ms, bool) or not isinstance(duration_ms, (int, float)) or duration_ms < 0:
+        duration_ms = None
+    status_code = event.get('status_code')
+    if isinstance(status_code, bool) or not isinstance(status_code, int):
+        status_code = None
+    metadata = event.get('metadata')
+
+    return {
+        'occurred_at': _timestamp(event.get('timestamp'), received_at),
+        'received_at': received_at,
+        'event_type': event_type[:50],
+        'sdk_name': _text(sdk_info.get('name'), 100),
+        'sdk_version': _text(event.get('sdk_version') or sdk_info.get('version'), 50) or UNKNOWN,
+        'sdk_language': _text(event.get('sdk_language') or sdk_info.get('language'), 50) or UNKNOWN,
+        'platform': _text(sdk_info.get('platform'), 50),
+        'endpoint': _text(event.get('endpoint'), 255),
+        'method': _text(event.get('method'), 10),
+        'status_code': status_code,
+        'duration_ms': float(duration_ms) if duration_ms is not None else None,
+        'error': _text(event.get('error'), 2000),
+        'sample_rate': 1.0,
+        'event_metadata': metadata if isinstance(metadata, dict) else None,
+    }
+
+
+def _is_error(row: Dict[str, Any]) -> bool:
+    return bool(row['error']) or (row['status_code'] or 0) >= 500
+
+
+class RollupAccumulator:
+    """
+    In-memory per-minute rollups awaiting a flush.
+
+    Each key maps to [event_count, error_count, duration_count,
+    duration_sum_ms, per-bucket latency counts...]; buckets are stored
+    non-cumulative and made cumulative when rows are built.
+    """
+
+    WIDTH = 4 + len(LATENCY_BUCKETS_MS) + 1  # + overflow bucket
+
+    def __init__(self):
+        self.counts: Dict[RollupKey, List[float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def add(self, row: Dict[str, Any]) -> None:
+        key = (row['occurred_at'].replace(second=0, microsecond=0),
+               row['sdk_language'], row['sdk_version'], row['event_type'])
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = [0] * self.WIDTH
+        counts[0] += 1
+        if _is_error(row):
+            counts[1] += 1
+        duration = row['duration_ms']
+        if duration is not None:
+            counts[2] += 1
+            counts[3] += duration
+            counts[4 + bisect_left(LATENCY_BUCKETS_MS, duration)] += 1
+
+    def merge(self, other: 'RollupAccumulator') -> None:
+        for key, counts in other.counts.items():
+            mine = self.counts.get(key)
+            if mine is None:
+                self.counts[key] = counts
+            else:
+                for i, value in enumerate(counts):
+                    mine[i] += value
+
+    def rows(self, now: datetime) -> List[Dict[str, Any]]:
+        """Rollup rows for bulk_upsert (cumulative latency buckets)."""
+        rows = []
+        for key, counts in self.counts.items():
+            row = dict(zip(ROLLUP_KEY, key))
+            row.update(event_count=counts[0], error_count=counts[1],
+                       duration_count=counts[2], duration_sum_ms=float(counts[3]), updated_at=now)
+            cumulative = 0
+            for name, count in zip(LATENCY_COLUMNS, counts[4:]):
+                cumulative += count
+                row[name] = cumulative
+            rows.append(row)
+        return rows
+
+
+class TelemetryPipeline(BatchWriter):
+    """
+    Ring buffer plus background flusher for SDK telemetry.
+
+    The flusher thread starts lazily on the first submitted batch.
+    """
+
+    thread_name = 'telemetry-flusher'
+
+    def __init__(self,
+                 app: Optional[Flask] = None,
+                 buffer_size: Optional[int] = None,
+                 batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None,
+                 high_water: Optional[float] = None,
+                 shed_sample_rate: Optional[float] = None,
+                 rng: Optional[random.Random] = None):
+        super().__init__(flush_interval or float(os.getenv('BRIKK_TELEMETRY_FLUSH_INTERVAL', '1.0')))
+        self.buffer_size = buffer_size or int(os.getenv('BRIKK_TELEMETRY_BUFFER_SIZE', '50000'))
+        self.batch_size = batch_size or int(os.getenv('BRIKK_TELEMETRY_BATCH_SIZE', '2000'))
+        high_water = high_water or float(os.getenv('BRIKK_TELEMETRY_HIGH_WATER', '0.8'))
+        self.high_water_mark = max(1, int(self.buffer_size * high_water))
+        self.shed_sample_rate = (shed_sample_rate if shed_sample_rate is not None
+                                 else float(os.getenv('BRIKK_TELEMETRY_SHED_SAMPLE_RATE', '0.1')))
+        self.app: Optional[Flask] = None
+
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=self.buffer_size)
+        self._rollups = RollupAccumulator()
+        self._rollup_lock = threading.Lock()
+        self._rng = rng or random.Random()
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """Bind to the app and register shutdown flush."""
+        self.app = app
+        app.extensions['telemetry_pipeline'] = self
+        atexit.register(self.stop)
+
+    # --- Producer side (request thread) ---
+
+    def submit(self, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Fold rows into the rollups and admit them to the ring buffer without blocking.
+
+        Returns:
+            {'buffered': n, 'shed': n}
+        """
+        if not rows:
+            return {'buffered': 0, 'shed': 0}
+        self._ensure_started()
+
+        batch_rollups = RollupAccumulator()
+        for row in rows:
+            batch_rollups.add(row)
+        with self._rollup_lock:
+            self._rollups.merge(batch_rollups)
+
+        buffered = shed = overwritten = 0
+        for row in rows:
+            depth = len(self._buffer)
+            if depth >= self.high_water_mark and not _is_error(row):
+                if self._rng.random() >= self.shed_sample_rate:
+                    shed += 1
+                    continue
+                row['sample_rate'] = self.shed_sample_rate
+            if depth >= self.buffer_size:
+                overwritten += 1
+            self._buffer.append(row)  # deque(maxlen) drops the oldest when full
+            buffered += 1
+
+        telemetry_events_total.labels(outcome='buffered').inc(buffered)
+        if shed:
+            telemetry_events_total.labels(outcome='shed').inc(shed)
+        if overwritten:
+            telemetry_events_total.labels(outcome='overwritten').inc(overwritten)
+        depth = len(self._buffer)
+        telemetry_buffer_depth.set(depth)
+        if depth >= self.batch_size:
+            self.wake()
+        return {'buffered': buffered, 'shed': shed}
+
+    def buffer_depth(self) -> int:
+        return len(self._buffer)
+
+    # --- Flusher side ---
+
+    def _drain(self, max_rows: int) -> List[Dict[str, Any]]:
+        rows = []
+        popleft = self._buffer.popleft
+        while len(rows) < max_rows:
+            try:
+                rows.append(popleft())
+            except IndexError:
+                break
+        return rows
+
+    def _take_rollups(self) -> RollupAccumulator:
+        with self._rollup_lock:
+            rollups, self._rollups = self._rollups, RollupAccumulator()
+        return rollups
+
+    def _write(self, rows: List[Dict[str, Any]], rollups: RollupAccumulator) -> bool:
+        """Insert raw rows and merge rollups in one transaction."""
+        # Neighbouring rows share dimension values: better locality and
+        # compression for columnar/BRIN storage downstream
+        rows.sort(key=lambda r: (r['event_type'], r['sdk_version'], r['occurred_at']))
+        start = time.perf_counter()
+        try:
+            with self.app.app_context():
+                try:
+                    TelemetryEvent.bulk_insert(rows)
+                    bulk_upsert(TelemetryRollupMinute, rollups.rows(datetime.utcnow()),
+                                index_elements=list(ROLLUP_KEY), update_columns=['updated_at'],
+                                increment_columns=ROLLUP_COUNTERS)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            logger.error(f"Telemetry flush failed, dropping {len(rows)} events: {e}")
+            telemetry_events_total.labels(outcome='dropped').inc(len(rows))
+            with self._rollup_lock:
+                rollups.merge(self._rollups)
+                self._rollups = rollups
+            return False
+        telemetry_flush_seconds.observe(time.perf_counter() - start)
+        if rows:
+            telemetry_flush_batch_size.observe(len(rows))
+            telemetry_events_total.labels(outcome='written').inc(len(rows))
+        return True
+
+    # --- Lifecycle ---
+
+    def flush(self) -> int:
+        """
+        Synchronously write everything currently buffered.
+
+        Returns:
+            Number of raw events written
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                rows = self._drain(self.batch_size)
+                rollups = self._take_rollups()
+                if not rows and not rollups:
+                    break
+                if not self._write(rows, rollups):
+                    break
+                written += len(rows)
+            telemetry_buffer_depth.set(len(self._buffer))
+        return written
+
+
+_init_lock = threading.Lock()
+
+
+def init_telemetry_pipeline(app: Flask) -> TelemetryPipeline:
+    """Create the app's telemetry pipeline (idempotent)."""
+    with _init_lock:
+        pipeline = app.extensions.get('telemetry_pipeline')
+        if pipeline is None:
+            pipeline = TelemetryPipeline(app)
+        return pipeline
+
+
+def get_telemetry_pipeline() -> TelemetryPipeline:
+    """Get the current app's telemetry pipeline, creating it on first use."""
+    from flask import current_app
+
+    pipeline = current_app.extensions.get('telemetry_pipeline')
+    if pipeline is None:
+        pipeline = init_telemetry_pipeline(current_app._get_current_object())
+    return pipeline
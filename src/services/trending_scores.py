@@ -0,0 +1,198 @@
+"""
+Batch trending score calculation
+Scores every published agent in one pass instead of per-agent queries:
+- Per-agent activity comes from a handful of GROUP BY queries (windowed
+  sums over the last 14 days of AgentAnalyticsDaily, recent installs and
+  recent reviews)
+- Velocity, momentum, recency decay and the composite score are computed
+  on numpy arrays
+- Ranks are assigned with one sort and rows are written with bulk upserts
+
+Formula (unchanged):
+- Velocity: growth of invocations and users, last 7 days vs the 7 before
+- Momentum: growth of invocations, days 4-1 ago vs days 7-5 ago
+- Recency: invocations in the last 3 days / 100, capped at 1
+- Popularity: log10(installs + 1) / 5, capped at 1
+
+Trending Score = 100 * (Velocity * 0.4 + Momentum * 0.3 + Recency * 0.2 + Popularity * 0.1),
+clipped to 0-100. Agents with fewer than 7 days of analytics in the window
+keep their previous score but are still ranked.
+"""
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import and_, case, func, select
+
+from src.infra.db import db, bulk_upsert
+from src.models.analytics import AgentAnalyticsDaily, AgentTrendingScore
+from src.models.marketplace import AgentInstallation, MarketplaceListing
+from src.models.reviews import AgentReview
+
+WINDOW_DAYS = 14
+MIN_ACTIVE_DAYS = 7
+RECENT_DAYS = 7
+
+WEIGHTS = {'velocity': 0.4, 'momentum': 0.3, 'recency': 0.2, 'popularity': 0.1}
+SCORE_COLUMNS = [
+    'trending_score', 'velocity', 'momentum', 'recent_installs', 'recent_reviews',
+    'recent_usage', 'rank', 'calculated_at', 'updated_at',
+]
+
+
+def growth(new: np.ndarray, old: np.ndarray) -> np.ndarray:
+    """(new - old) / old; 1.0 when starting from zero with activity, else 0.0."""
+    safe_old = np.where(old > 0, old, 1.0)
+    return np.where(old > 0, (new - old) / safe_old, np.where(new > 0, 1.0, 0.0))
+
+
+def assign_ranks(scores: np.ndarray, tiebreak: np.ndarray) -> np.ndarray:
+    """1-based ranks by descending score; ties ordered by tiebreak."""
+    order = np.lexsort((tiebreak, -scores))
+    ranks = np.empty(len(scores), dtype=np.int64)
+    ranks[order] = np.arange(1, len(scores) + 1)
+    return ranks
+
+
+class TrendingScoreCalculator:
+    """Computes and stores AgentTrendingScore for all published agents."""
+
+    def __init__(self, today: Optional[date] = None):
+        self.today = today or date.today()
+
+    def _days_ago(self, days: int) -> date:
+        return self.today - timedelta(days=days)
+
+    def _window_sum(self, column, start_days_ago: int, end_days_ago: int):
+        """SUM(column) over dates in [today - start, today - end)."""
+        in_window = and_(AgentAnalyticsDaily.date >= self._days_ago(start_days_ago),
+                         AgentAnalyticsDaily.date < self._days_ago(end_days_ago))
+        return func.coalesce(func.sum(case((in_window, column), else_=0)), 0)
+
+    def _counts(self, stmt, index: Dict[str, int], width: int) -> np.ndarray:
+        """Run a GROUP BY (agent_id, value...) into an (agents x width) array."""
+        values = np.zeros((len(index), width), dtype=np.float64)
+        rows = [row for row in db.session.execute(stmt) if row[0] in index]
+        if rows:
+            positions = np.fromiter((index[row[0]] for row in rows), dtype=np.int64, count=len(rows))
+            values[positions] = np.array([row[1:] for row in rows], dtype=np.float64)
+        return values
+
+    def load(self) -> dict:
+        """Fetch per-agent inputs for every published agent as arrays."""
+        listings = db.session.execute(
+            select(MarketplaceListing.agent_id, MarketplaceListing.install_count)
+            .where(MarketplaceListing.status == 'published')
+        ).all()
+        agent_ids = np.array([row[0] for row in listings], dtype=object)
+        index = {agent_id: i for i, agent_id in enumerate(agent_ids)}
+        install_count = np.array([row[1] or 0 for row in listings], dtype=np.float64)
+
+        invocations = AgentAnalyticsDaily.invocation_count
+        users = AgentAnalyticsDaily.unique_users
+        activity = self._counts(
+            select(
+                AgentAnalyticsDaily.agent_id,
+                func.count(),
+                self._window_sum(invocations, 14, 7),
+                self._window_sum(invocations, 7, 0),
+                self._window_sum(users, 14, 7),
+                self._window_sum(users, 7, 0),
+                self._window_sum(invocations, 7, 4),
+                self._window_sum(invocations, 4, 0),
+                self._window_sum(invocations, 3, 0),
+            ).where(
+                AgentAnalyticsDaily.date >= self._days_ago(WINDOW_DAYS),
+                AgentAnalyticsDaily.date < self.today,
+            ).group_by(AgentAnalyticsDaily.agent_id),
+            index, 8)
+
+        since = datetime.combine(self._days_ago(RECENT_DAYS), time.min)
+        installs = self._counts(
+            select(AgentInstallation.agent_id, func.count())
+            .where(AgentInstallation.installed_at >= since)
+            .group_by(AgentInstallation.agent_id),
+            index, 1)[:, 0]
+        reviews = self._counts(
+            select(AgentReview.agent_id, func.count())
+            .where(AgentReview.created_at >= since)
+            .group_by(AgentReview.agent_id),
+            index, 1)[:, 0]
+
+        return {
+            'agent_ids': agent_ids,
+            'install_count': install_count,
+            'active_days': activity[:, 0],
+            'week1_invocations': activity[:, 1],
+            'week2_invocations': activity[:, 2],
+            'week1_users': activity[:, 3],
+            'week2_users': activity[:, 4],
+            'early_invocations': activity[:, 5],
+            'late_invocations': activity[:, 6],
+            'last3_invocations': activity[:, 7],
+            'recent_installs': installs,
+            'recent_reviews': reviews,
+        }
+
+    @staticmethod
+    def compute(inputs: dict) -> dict:
+        """Vectorised velocity, momentum, decay and score for all agents."""
+        velocity = (growth(inputs['week2_invocations'], inputs['week1_invocations']) +
+                    growth(inputs['week2_users'], inputs['week1_users'])) / 2
+        momentum = growth(inputs['late_invocations'], inputs['early_invocations'])
+        recency = np.minimum(inputs['last3_invocations'] / 100.0, 1.0)
+        popularity = np.minimum(np.log10(inputs['install_count'] + 1) / 5.0, 1.0)
+
+        score = (velocity * WEIGHTS['velocity'] + momentum * WEIGHTS['momentum'] +
+                 recency * WEIGHTS['recency'] + popularity * WEIGHTS['popularity'])
+        return {
+            'trending_score': np.round(np.clip(score * 100, 0, 100), 4),
+            'velocity': np.round(velocity, 4),
+            'momentum': np.round(momentum, 4),
+            'eligible': inputs['active_days'] >= MIN_ACTIVE_DAYS,
+        }
+
+    def run(self) -> Dict[str, int]:
+        """Score, rank and upsert; returns counts. Does not commit."""
+        inputs = self.load()
+        scores = self.compute(inputs)
+        eligible = scores['eligible']
+        scored_ids = inputs['agent_ids'][eligible]
+
+        # Agents without enough data keep their stored score for ranking
+        scored = set(scored_ids.tolist())
+        kept = [(agent_id, float(score or 0)) for agent_id, score in db.session.execute(
+            select(AgentTrendingScore.agent_id, AgentTrendingScore.trending_score))
+            if agent_id not in scored]
+        kept_ids = np.array([agent_id for agent_id, _ in kept], dtype=object)
+        all_ids = np.concatenate([scored_ids, kept_ids]).astype(str)
+        all_scores = np.concatenate([
+            scores['trending_score'][eligible],
+            np.array([score for _, score in kept], dtype=np.float64),
+        ])
+        ranks = assign_ranks(all_scores, all_ids)
+
+        now = datetime.now(timezone.utc)
+        columns = {
+            'trending_score': scores['trending_score'][eligible].tolist(),
+            'velocity': scores['velocity'][eligible].tolist(),
+            'momentum': scores['momentum'][eligible].tolist(),
+            'recent_installs': inputs['recent_installs'][eligible].astype(np.int64).tolist(),
+            'recent_reviews': inputs['recent_reviews'][eligible].astype(np.int64).tolist(),
+            'recent_usage': inputs['week2_invocations'][eligible].astype(np.int64).tolist(),
+            'rank': ranks[:len(scored_ids)].tolist(),
+        }
+        rows: List[dict] = [
+            {'id': str(uuid.uuid4()), 'agent_id': agent_id, 'calculated_at': now, 'updated_at': now,
+             **{name: values[i] for name, values in columns.items()}}
+            for i, agent_id in enumerate(scored_ids.tolist())
+        ]
+        bulk_upsert(AgentTrendingScore, rows, index_elements=['agent_id'], update_columns=SCORE_COLUMNS)
+        bulk_upsert(
+            AgentTrendingScore,
+            [{'id': str(uuid.uuid4()), 'agent_id': agent_id, 'rank': rank, 'updated_at': now}
+             for agent_id, rank in zip(kept_ids.tolist(), ranks[len(scored_ids):].tolist())],
+            index_elements=['agent_id'], update_columns=['rank', 'updated_at'])
+
+        return {'scores_calculated': len(rows), 'agents_ranked': len(all_ids)}
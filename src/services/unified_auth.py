@@ -24,6 +24,7 @@ from src.database import db
 from src.models.api_gateway import OrgApiKey, OAuthToken
 from src.models.api_key import ApiKey
 from src.services.api_key_utils import APIKeyUtils
+from src.services.request_timing import timed
 from src.services.security_enhanced import HMACSecurityService
 
 
@@ -33,6 +34,7 @@ class UnifiedAuth:
     def __init__(self):
         self.hmac_service = HMACSecurityService()
     
+    @timed("auth")
     def authenticate(self) -> Tuple[bool, Optional[Dict[str, Any]], int]:
         """
         Authenticate request using available methods in priority order.
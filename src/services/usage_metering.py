@@ -4,10 +4,16 @@ Usage Metering Middleware (Phase 6 PR-2).
 
 Records API usage in the ledger for metered billing.
 Integrates with existing request context and auth middleware.
+
+Rows are handed to the write-behind pipeline (src/services/usage_pipeline.py)
+so the request never waits on a ledger commit. Set BRIKK_USAGE_WRITE_BEHIND=false
+to fall back to one synchronous insert per request.
 """
+import os
 from flask import Flask, g, request, Response
 from src.models.usage_ledger import UsageLedger
 from src.services.pricing import get_unit_cost
+from src.services.usage_pipeline import UsageWriteBehindPipeline
 from src.database import db
 from decimal import Decimal
 from typing import Optional
@@ -29,14 +35,19 @@ class UsageMeteringMiddleware:
         '/static/openapi.json',
     }
     
-    def __init__(self, app: Optional[Flask] = None):
+    def __init__(self, app: Optional[Flask] = None,
+                 pipeline: Optional[UsageWriteBehindPipeline] = None):
         """Initialize usage metering middleware."""
         self.app = app
+        self.pipeline = pipeline
         if app:
             self.init_app(app)
     
     def init_app(self, app: Flask):
         """Register middleware with Flask app."""
+        write_behind = os.getenv('BRIKK_USAGE_WRITE_BEHIND', 'true').lower() == 'true'
+        if write_behind and self.pipeline is None:
+            self.pipeline = UsageWriteBehindPipeline(app)
         app.after_request(self._record_usage)
     
     def _should_meter(self, response: Response) -> bool:
@@ -153,14 +164,24 @@ class UsageMeteringMiddleware:
             
             # Record usage (default: 1 unit per request)
             # Future: extend to support CPU/latency-based units
-            UsageLedger.record_usage(
-                org_id=org_id,
-                actor_id=actor_id,
-                route=route,
-                unit_cost=unit_cost,
-                usage_units=1,
-                agent_id=agent_id
-            )
+            if self.pipeline is not None:
+                self.pipeline.submit(UsageLedger.build_row(
+                    org_id=org_id,
+                    actor_id=actor_id,
+                    route=route,
+                    unit_cost=unit_cost,
+                    usage_units=1,
+                    agent_id=agent_id
+                ))
+            else:
+                UsageLedger.record_usage(
+                    org_id=org_id,
+                    actor_id=actor_id,
+                    route=route,
+                    unit_cost=unit_cost,
+                    usage_units=1,
+                    agent_id=agent_id
+                )
             
         except Exception as e:
             # Log error but don't fail the request
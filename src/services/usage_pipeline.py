@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+Write-behind Usage Metering Pipeline.
+
+Moves UsageLedger writes off the request path:
+- Requests enqueue ledger rows on a bounded in-process queue
+- A flusher thread bulk-inserts rows when a size or time threshold is hit
+- Rows that cannot be written (DB down, queue full) go to an append-only
+  local spool file that is replayed on startup and after the DB recovers
+- Replay renames the spool to a claim file that is deleted only after its
+  rows are committed or appended back to the spool; claim files left by a
+  crashed process or a failed replay are adopted on the next replay, and
+  rows whose id is already stored are skipped
+- Queue depth, spill and flush metrics expose backpressure
+
+Configuration:
+    BRIKK_USAGE_WRITE_BEHIND=true|false   - Enable the pipeline (default: true)
+    BRIKK_USAGE_QUEUE_SIZE=10000          - Max rows held in memory
+    BRIKK_USAGE_BATCH_SIZE=500            - Rows per bulk insert
+    BRIKK_USAGE_FLUSH_INTERVAL=1.0        - Max seconds a row waits in memory
+    BRIKK_USAGE_SPOOL_PATH=...            - Spool file (default: <instance>/usage_spool.jsonl)
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Flask
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import Table, select
+
+from src.database import db
+from src.models.usage_ledger import UsageLedger
+from src.services.batch_writer import SpooledBatchWriter
+
+logger = logging.getLogger(__name__)
+
+
+usage_queue_depth = Gauge(
+    'brikk_usage_queue_depth',
+    'Usage ledger rows waiting in the write-behind queue',
+    multiprocess_mode='livesum'
+)
+
+usage_rows_total = Counter(
+    'brikk_usage_rows_total',
+    'Usage ledger rows handled by the write-behind pipeline',
+    ['outcome']  # enqueued, written, spooled, replayed, dropped
+)
+
+usage_spills_total = Counter(
+    'brikk_usage_spills_total',
+    'Usage rows diverted to the spool file',
+    ['reason']  # queue_full, db_error
+)
+
+usage_flush_seconds = Histogram(
+    'brikk_usage_flush_seconds',
+    'Latency of usage ledger bulk inserts in seconds',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+usage_flush_batch_size = Histogram(
+    'brikk_usage_flush_batch_size',
+    'Rows per usage ledger bulk insert',
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 5000)
+)
+
+
+class UsageSpool:
+    """Append-only JSONL spool for ledger rows that could not be written."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # Claim files this instance is replaying right now
+        self._claimed = set()
+
+    @staticmethod
+    def _encode(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            **row,
+            'id': str(row['id']),
+            'unit_cost': str(row['unit_cost']),
+            'total_cost': str(row['total_cost']),
+            'created_at': row['created_at'].isoformat(),
+        }
+
+    @staticmethod
+    def _decode(data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            **data,
+            'id': uuid.UUID(data['id']),
+            'unit_cost': Decimal(data['unit_cost']),
+            'total_cost': Decimal(data['total_cost']),
+            'created_at': datetime.fromisoformat(data['created_at']),
+        }
+
+    def append(self, rows: List[Dict[str, Any]]) -> None:
+        """Durably append rows (fsync) to the spool."""
+        if not rows:
+            return
+        payload = ''.join(json.dumps(self._encode(r)) + '\n' for r in rows)
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def has_rows(self) -> bool:
+        try:
+            if os.path.getsize(self.path) > 0:
+                return True
+        except OSError:
+            pass
+        return bool(self._abandoned_claims())
+
+    def _abandoned_claims(self) -> List[str]:
+        """Claim files whose replay never finished (the owning process died)."""
+        abandoned = []
+        for claimed in glob.glob(glob.escape(self.path) + '.*.replay'):
+            if claimed in self._claimed:
+                continue
+            pid = claimed[len(self.path) + 1:].split('.', 1)[0]
+            # A file with our own pid is from an earlier process (pid reuse, containers)
+            if not pid.isdigit() or int(pid) == os.getpid() or not _pid_alive(int(pid)):
+                abandoned.append(claimed)
+        return abandoned
+
+    def _claim_name(self) -> str:
+        return f"{self.path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.replay"
+
+    def claim(self) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Detach the spool and any abandoned claim files.
+
+        Returns:
+            (claimed files, rows); pass the files to release() once the rows
+            are committed. Until then a crash leaves them for the next claim.
+        """
+        claimed = []
+        with self._lock:
+            for abandoned in self._abandoned_claims():
+                adopted = self._claim_name()
+                try:
+                    os.rename(abandoned, adopted)
+                except FileNotFoundError:
+                    continue  # another process adopted it first
+                claimed.append(adopted)
+            try:
+                if os.path.getsize(self.path) > 0:
+                    claimed.append(self._claim_name())
+                    os.replace(self.path, claimed[-1])
+            except OSError:
+                pass
+            self._claimed.update(claimed)
+
+        rows = []
+        for path in claimed:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        rows.append(self._decode(json.loads(line)))
+                    except (ValueError, KeyError):
+                        # Torn write from a crash mid-append; skip it
+                        logger.warning("Skipping unreadable usage spool line")
+        return claimed, rows
+
+    def release(self, claimed: List[str]) -> None:
+        """Delete claim files whose rows were written (or appended back to the spool)."""
+        with self._lock:
+            for path in claimed:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                self._claimed.discard(path)
+
+    def abandon(self, claimed: List[str]) -> None:
+        """Stop tracking claim files without deleting them; the next claim() adopts them."""
+        with self._lock:
+            self._claimed.difference_update(claimed)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # exists, owned by another user
+    return True
+
+
+def unwritten_rows(table: Table, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rows whose id is not in table yet (replays after a crash may repeat rows)."""
+    if not rows:
+        return rows
+    ids = [row['id'] for row in rows]
+    stored = set(db.session.execute(select(table.c.id).where(table.c.id.in_(ids))).scalars())
+    return [row for row in rows if row['id'] not in stored] if stored else rows
+
+
+class UsageWriteBehindPipeline(SpooledBatchWriter):
+    """
+    Bounded queue plus background flusher for UsageLedger rows.
+
+    The flusher thread starts lazily on the first submitted row.
+    """
+
+    thread_name = 'usage-write-behind'
+    depth_gauge = usage_queue_depth
+
+    def __init__(self,
+                 app: Optional[Flask] = None,
+                 max_queue_size: Optional[int] = None,
+                 batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None,
+                 spool_path: Optional[str] = None):
+        super().__init__(
+            flush_interval=flush_interval or float(os.getenv('BRIKK_USAGE_FLUSH_INTERVAL', '1.0')),
+            batch_size=batch_size or int(os.getenv('BRIKK_USAGE_BATCH_SIZE', '500')),
+            max_queue_size=max_queue_size or int(os.getenv('BRIKK_USAGE_QUEUE_SIZE', '10000')),
+        )
+        self._spool_path = spool_path
+        self.spool: Optional[UsageSpool] = None
+        self.app: Optional[Flask] = None
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """Bind to the app, replay any spooled rows and register shutdown flush."""
+        self.app = app
+        path = self._spool_path or os.getenv('BRIKK_USAGE_SPOOL_PATH') or os.path.join(
+            app.instance_path, 'usage_spool.jsonl')
+        self.spool = UsageSpool(path)
+        app.extensions['usage_pipeline'] = self
+
+        if self.spool.has_rows():
+            self._spool_dirty = True
+            try:
+                self.replay_spool()
+            except Exception as e:
+                logger.warning(f"Usage spool replay deferred: {e}")
+
+        atexit.register(self.stop)
+
+    # --- Producer side (request thread) ---
+
+    def submit(self, row: Dict[str, Any]) -> bool:
+        """
+        Enqueue a row without blocking.
+
+        Returns:
+            True if queued, False if the queue was full and the row was spooled
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            usage_spills_total.labels(reason='queue_full').inc()
+            self._spill([row])
+            return False
+        usage_rows_total.labels(outcome='enqueued').inc()
+        self._enqueued()
+        return True
+
+    # --- Flusher side ---
+
+    def _write(self, rows: List[Dict[str, Any]]) -> bool:
+        """Bulk insert rows; spool them on failure."""
+        if not rows:
+            return True
+        start = time.perf_counter()
+        try:
+            with self.app.app_context():
+                try:
+                    UsageLedger.bulk_insert(rows)
+                except Exception:
+                    db.session.rollback()
+                    raise
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            logger.error(f"Usage ledger flush failed, spooling {len(rows)} rows: {e}")
+            usage_spills_total.labels(reason='db_error').inc(len(rows))
+            self._spill(rows)
+            return False
+        usage_flush_seconds.observe(time.perf_counter() - start)
+        usage_flush_batch_size.observe(len(rows))
+        usage_rows_total.labels(outcome='written').inc(len(rows))
+        return True
+
+    def _replay_batch(self, rows: List[Dict[str, Any]]) -> None:
+        with self.app.app_context():
+            try:
+                UsageLedger.bulk_insert(unwritten_rows(UsageLedger.__table__, rows))
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    def _count(self, rows: List[Dict[str, Any]], outcome: str) -> None:
+        usage_rows_total.labels(outcome=outcome).inc(len(rows))
+
+
+def get_usage_pipeline() -> Optional[UsageWriteBehindPipeline]:
+    """Get the write-behind pipeline from the current app context."""
+    from flask import current_app, has_app_context
+
+    if has_app_context():
+        return current_app.extensions.get('usage_pipeline')
+    return None
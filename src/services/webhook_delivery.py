@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+"""
+Asynchronous Webhook Delivery Engine.
+
+Moves webhook HTTP calls off the request path:
+- WebhookService.trigger_event() only records events and enqueues their ids
+- A bounded pool of worker threads pops ids from a Redis list and POSTs
+  them over per-thread keep-alive sessions (requests.Session)
+- Each endpoint (scheme://host:port) has a concurrency limit; deliveries to a
+  saturated endpoint are deferred instead of tying up a worker
+- Failures are retried with exponential backoff and full jitter through a
+  Redis sorted-set delay queue (score = due time); a Lua script atomically
+  promotes due ids back to the ready list
+- Events that exhaust their retries are moved to the dead_letter state
+- Delivery latency, outcomes and queue depth are exported as metrics
+
+Configuration:
+    BRIKK_WEBHOOK_WORKERS=8              - Delivery threads per process (0 disables)
+    BRIKK_WEBHOOK_PER_ENDPOINT=4         - Concurrent deliveries per endpoint
+    BRIKK_WEBHOOK_TIMEOUT=10             - HTTP read timeout in seconds
+    BRIKK_WEBHOOK_RETRY_MAX_DELAY=3600   - Backoff cap in seconds
+    WEBHOOK_MAX_RETRIES=5                - Attempts before dead-lettering
+    WEBHOOK_RETRY_DELAY=60               - Backoff base in seconds
+"""
+import atexit
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import redis
+import requests
+from flask import Flask, current_app, has_app_context
+from prometheus_client import Counter, Gauge, Histogram
+from requests.adapters import HTTPAdapter
+
+from src.database import db
+from src.infra.redis_pool import get_redis
+from src.models.webhook import Webhook, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+READY_KEY = 'brikk:webhooks:ready'
+DELAYED_KEY = 'brikk:webhooks:delayed'
+CLAIM_KEY = 'brikk:webhooks:claim:{}'
+
+CONNECT_TIMEOUT = 3.0
+DEFER_SECONDS = 0.2  # retry delay when an endpoint is at its concurrency limit
+PROMOTE_BATCH = 500
+
+# Move up to ARGV[2] ids due by ARGV[1] from the delay zset to the ready list
+PROMOTE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+    redis.call('LPUSH', KEYS[2], unpack(due))
+end
+return #due
+"""
+
+
+webhook_deliveries_total = Counter(
+    'brikk_webhook_deliveries_total',
+    'Webhook delivery attempts by outcome',
+    ['outcome']  # success, retry, dead_letter, deferred, skipped
+)
+
+webhook_delivery_seconds = Histogram(
+    'brikk_webhook_delivery_seconds',
+    'Webhook HTTP delivery latency in seconds',
+    ['outcome'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+)
+
+webhook_queue_depth = Gauge(
+    'brikk_webhook_queue_depth',
+    'Webhook events waiting for delivery',
+    ['queue'],  # ready, delayed
+    multiprocess_mode='livesum'
+)
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng=random) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**(attempt-1)))."""
+    return rng.uniform(0, min(cap, base * (2 ** max(attempt - 1, 0))))
+
+
+def sign_payload(secret: str, payload: str) -> str:
+    """HMAC-SHA256 signature sent in X-Brikk-Signature."""
+    return hmac.new(secret.encode('utf-8'), payload.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def endpoint_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+class EndpointLimiter:
+    """Per-endpoint concurrency limits within this process."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, url: str) -> threading.BoundedSemaphore:
+        key = endpoint_key(url)
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = threading.BoundedSemaphore(self.limit)
+            return slot
+
+    def try_acquire(self, url: str) -> bool:
+        return self._slot(url).acquire(blocking=False)
+
+    def release(self, url: str) -> None:
+        self._slot(url).release()
+
+
+class WebhookDeliveryEngine:
+    """
+    Redis-backed delivery queue plus a bounded pool of delivery threads.
+
+    Threads start lazily on the first enqueue or schedule.
+    """
+
+    def __init__(self,
+                 app: Optional[Flask] = None,
+                 redis_client: Optional[redis.Redis] = None,
+                 workers: Optional[int] = None,
+                 per_endpoint: Optional[int] = None,
+                 timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None,
+                 base_delay: Optional[float] = None,
+                 max_delay: Optional[float] = None,
+                 poll_interval: float = 0.5):
+        self.workers = workers if workers is not None else int(os.getenv('BRIKK_WEBHOOK_WORKERS', '8'))
+        self.per_endpoint = per_endpoint or int(os.getenv('BRIKK_WEBHOOK_PER_ENDPOINT', '4'))
+        self.timeout = timeout or float(os.getenv('BRIKK_WEBHOOK_TIMEOUT', '10'))
+        self.max_retries = max_retries or int(os.getenv('WEBHOOK_MAX_RETRIES', '5'))
+        self.base_delay = base_delay if base_delay is not None else float(os.getenv('WEBHOOK_RETRY_DELAY', '60'))
+        self.max_delay = max_delay or float(os.getenv('BRIKK_WEBHOOK_RETRY_MAX_DELAY', '3600'))
+        self.poll_interval = poll_interval
+        self.app: Optional[Flask] = None
+
+        self._redis = redis_client
+        self._promote = None
+        self.limiter = EndpointLimiter(self.per_endpoint)
+        self._local = threading.local()
+        self._threads = []
+        self._pid = os.getpid()
+        self._thread_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.app = app
+        app.extensions['webhook_delivery'] = self
+        atexit.register(self.stop)
+
+    @property
+    def redis(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = get_redis('webhooks')
+        return self._redis
+
+    # --- Producer side ---
+
+    def enqueue(self, event_ids: Iterable[int]) -> bool:
+        """
+        Queue events for immediate delivery.
+
+        Returns:
+            False if Redis is unreachable (events stay pending for
+            WebhookService.retry_failed_events to recover)
+        """
+        ids = [int(i) for i in event_ids]
+        if not ids:
+            return True
+        try:
+            self.redis.lpush(READY_KEY, *ids)
+        except redis.RedisError as e:
+            logger.warning(f"Webhook enqueue failed, leaving {len(ids)} events pending: {e}")
+            return False
+        self._ensure_started()
+        return True
+
+    def schedule(self, event_id: int, delay: float, only_new: bool = False) -> None:
+        """Queue an event for delivery after delay seconds."""
+        self.redis.zadd(DELAYED_KEY, {str(event_id): time.time() + delay}, nx=only_new)
+        # After a restart, retry_failed_events may be the only producer
+        self._ensure_started()
+
+    def promote_due(self, now: Optional[float] = None) -> int:
+        """Move due events from the delay queue to the ready list."""
+        if self._promote is None:
+            self._promote = self.redis.register_script(PROMOTE_SCRIPT)
+        return int(self._promote(keys=[DELAYED_KEY, READY_KEY],
+                                 args=[now if now is not None else time.time(), PROMOTE_BATCH]))
+
+    def queue_depths(self) -> Dict[str, int]:
+        depths = {'ready': self.redis.llen(READY_KEY), 'delayed': self.redis.zcard(DELAYED_KEY)}
+        for name, depth in depths.items():
+            webhook_queue_depth.labels(queue=name).set(depth)
+        return depths
+
+    # --- Worker side ---
+
+    def _ensure_started(self) -> None:
+        if self.workers <= 0 or (self._threads and self._pid == os.getpid()):
+            return
+        with self._thread_lock:
+            if self._threads and self._pid == os.getpid():
+                return
+            # Threads do not survive fork (gunicorn --preload): start new ones
+            self._pid = os.getpid()
+            self._threads = []
+            self._stop.clear()
+            self._threads.append(threading.Thread(
+                target=self._run_scheduler, name='webhook-scheduler', daemon=True))
+            self._threads.extend(
+                threading.Thread(target=self._run_worker, name=f'webhook-worker-{i}', daemon=True)
+                for i in range(self.workers))
+            for thread in self._threads:
+                thread.start()
+
+    def _run_scheduler(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.promote_due()
+                self.queue_depths()
+            except Exception as e:  # never let the scheduler thread die
+                logger.error(f"Webhook scheduler error: {e}")
+
+    def _run_worker(self) -> None:
+        while not self._stop.is_set():
+            try:
+                item = self.redis.brpop(READY_KEY, timeout=1)
+                if item is not None:
+                    self.process(int(item[1]))
+            except Exception as e:  # never let a worker thread die
+                logger.error(f"Webhook worker error: {e}")
+                self._stop.wait(1)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _session(self) -> requests.Session:
+        """Keep-alive session owned by the current worker thread."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=self.per_endpoint)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+        return session
+
+    def _load(self, event_id: int) -> Optional[dict]:
+        with self.app.app_context():
+            row = db.session.query(
+                WebhookEvent.status, WebhookEvent.payload, WebhookEvent.retry_count,
+                Webhook.url, Webhook.secret, Webhook.is_active,
+            ).join(Webhook, Webhook.id == WebhookEvent.webhook_id).filter(
+                WebhookEvent.id == event_id).first()
+            return row._asdict() if row else None
+
+    def _record(self, event_id: int, **values) -> None:
+        with self.app.app_context():
+            db.session.query(WebhookEvent).filter(WebhookEvent.id == event_id).update(values)
+            db.session.commit()
+
+    def process(self, event_id: int) -> str:
+        """
+        Make one delivery attempt for an event.
+
+        Returns:
+            Outcome: success, retry, dead_letter, deferred or skipped
+        """
+        event = self._load(event_id)
+        if event is None or event['status'] in ('success', 'dead_letter'):
+            webhook_deliveries_total.labels(outcome='skipped').inc()
+            return 'skipped'
+        if not event['is_active']:
+            self._record(event_id, status='dead_letter', response_body='webhook inactive')
+            webhook_deliveries_total.labels(outcome='dead_letter').inc()
+            return 'dead_letter'
+
+        url = event['url']
+        if not self.limiter.try_acquire(url):
+            self.schedule(event_id, DEFER_SECONDS)
+            webhook_deliveries_total.labels(outcome='deferred').inc()
+            return 'deferred'
+
+        # Guard against the same event being delivered twice concurrently
+        claim = CLAIM_KEY.format(event_id)
+        if not self.redis.set(claim, b'1', nx=True, px=int((CONNECT_TIMEOUT + self.timeout) * 2000)):
+            self.limiter.release(url)
+            webhook_deliveries_total.labels(outcome='skipped').inc()
+            return 'skipped'
+
+        try:
+            status_code, body, error = self._post(event_id, event)
+        finally:
+            self.limiter.release(url)
+            self.redis.delete(claim)
+
+        if error is None and 200 <= status_code < 300:
+            self._record(event_id, status='success', response_status_code=status_code,
+                         response_body=body)
+            webhook_deliveries_total.labels(outcome='success').inc()
+            return 'success'
+
+        attempts = event['retry_count'] + 1
+        values = {'retry_count': attempts, 'response_status_code': status_code,
+                  'response_body': body if error is None else error}
+        if attempts >= self.max_retries:
+            self._record(event_id, status='dead_letter', **values)
+            webhook_deliveries_total.labels(outcome='dead_letter').inc()
+            logger.error(f"Webhook event {event_id} dead-lettered after {attempts} attempts")
+            return 'dead_letter'
+
+        self._record(event_id, status='failed', **values)
+        self.schedule(event_id, backoff_delay(attempts, self.base_delay, self.max_delay))
+        webhook_deliveries_total.labels(outcome='retry').inc()
+        return 'retry'
+
+    def _post(self, event_id: int, event: dict):
+        payload_json = json.dumps(event['payload'], sort_keys=True)
+        headers = {
+            'Content-Type': 'application/json',
+            'X-Brikk-Signature': sign_payload(event['secret'], payload_json),
+            'X-Brikk-Event-Id': str(event_id),
+        }
+        start = time.perf_counter()
+        try:
+            response = self._session().post(
+                event['url'], data=payload_json, headers=headers,
+                timeout=(CONNECT_TIMEOUT, self.timeout))
+        except requests.RequestException as e:
+            webhook_delivery_seconds.labels(outcome='error').observe(time.perf_counter() - start)
+            return None, None, f"{type(e).__name__}: {e}"[:1000]
+        outcome = 'success' if 200 <= response.status_code < 300 else 'http_error'
+        webhook_delivery_seconds.labels(outcome=outcome).observe(time.perf_counter() - start)
+        return response.status_code, response.text[:10000], None
+
+
+def get_webhook_delivery() -> Optional[WebhookDeliveryEngine]:
+    """Delivery engine of the current app, if one was initialised."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('webhook_delivery')
+
+
+def init_webhook_delivery(app: Flask) -> WebhookDeliveryEngine:
+    """Initialize the webhook delivery engine for the application."""
+    return WebhookDeliveryEngine(app)
@@ -3,12 +3,14 @@
 Webhook Service
 
 Provides functionality for sending and receiving webhook events to enable external system integrations.
+
+Deliveries are asynchronous: trigger_event() records events and hands them to
+the delivery engine (src/services/webhook_delivery.py).
 """
 
 import os
 import json
 import hmac
-import hashlib
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, asdict
@@ -20,6 +22,7 @@ from sqlalchemy.orm import Session
 from src.database import db
 from src.models.webhook import Webhook, WebhookEvent
 from src.services.structured_logging import get_logger
+from src.services.webhook_delivery import get_webhook_delivery, sign_payload
 
 logger = get_logger('brikk.webhooks')
 
@@ -28,6 +31,7 @@ class WebhookEventStatus(Enum):
     PENDING = "pending"
     SUCCESS = "success"
     FAILED = "failed"
+    DEAD_LETTER = "dead_letter"
 
 
 @dataclass
@@ -142,36 +146,27 @@ class WebhookService:
                 metadata=metadata
             )
 
-            # Create and send webhook events
-            for webhook in subscribed_webhooks:
-                self._create_and_send_webhook_event(webhook, payload)
-
-        except Exception as e:
-            logger.error(f"Failed to trigger event {event_type}: {e}")
-
-    def _create_and_send_webhook_event(
-            self,
-            webhook: Webhook,
-            payload: WebhookPayload) -> None:
-        """Create a webhook event record and attempt to send it"""
-        try:
-            # Create event record
-            event = WebhookEvent(
-                webhook_id=webhook.id,
-                event_type=payload.event_type,
-                payload=asdict(payload),
-                status=WebhookEventStatus.PENDING.value
-            )
-            self.db.add(event)
+            # Record one event per webhook and queue them for delivery
+            events = [
+                WebhookEvent(
+                    webhook_id=webhook.id,
+                    event_type=payload.event_type,
+                    payload=asdict(payload),
+                    status=WebhookEventStatus.PENDING.value
+                )
+                for webhook in subscribed_webhooks
+            ]
+            self.db.add_all(events)
             self.db.commit()
 
-            # Send the event
-            self.send_webhook_event(event.id)
+            engine = get_webhook_delivery()
+            if engine is None or not engine.enqueue([e.id for e in events]):
+                logger.warning(
+                    f"Webhook delivery queue unavailable; {len(events)} events left pending")
 
         except Exception as e:
             self.db.rollback()
-            logger.error(
-                f"Failed to create webhook event for webhook {webhook.id}: {e}")
+            logger.error(f"Failed to trigger event {event_type}: {e}")
 
     def send_webhook_event(self, event_id: int) -> bool:
         """Send a specific webhook event"""
@@ -225,21 +220,39 @@ class WebhookService:
             self.db.commit()
             return False
 
-    def retry_failed_events(self) -> None:
-        """Retry sending failed webhook events"""
+    def retry_failed_events(self, batch_size: int = 1000) -> int:
+        """
+        Re-queue failed and pending events that are not already scheduled.
+
+        Recovers events whose enqueue was lost (e.g. Redis was down). Events
+        with a scheduled retry keep their due time.
+
+        Returns:
+            Number of events checked
+        """
+        engine = get_webhook_delivery()
+        if engine is None:
+            logger.warning("Webhook delivery engine not initialised; cannot retry events")
+            return 0
         try:
-            failed_events = self.db.query(WebhookEvent).filter(
-                WebhookEvent.status == WebhookEventStatus.FAILED.value,
+            event_ids = self.db.query(WebhookEvent.id).filter(
+                WebhookEvent.status.in_([
+                    WebhookEventStatus.FAILED.value,
+                    WebhookEventStatus.PENDING.value,
+                ]),
                 WebhookEvent.retry_count < self.max_retries
-            ).all()
+            ).yield_per(batch_size)
 
-            for event in failed_events:
-                logger.info(
-                    f"Retrying webhook event {event.id} (attempt {event.retry_count + 1})")
-                self.send_webhook_event(event.id)
+            count = 0
+            for (event_id,) in event_ids:
+                engine.schedule(event_id, 0, only_new=True)
+                count += 1
+            logger.info(f"Re-queued up to {count} webhook events")
+            return count
 
         except Exception as e:
             logger.error(f"Failed to retry failed webhook events: {e}")
+            return 0
 
     def _handle_failed_delivery(
             self,
@@ -272,10 +285,7 @@ class WebhookService:
 
     def _generate_signature(self, secret: str, payload: str) -> str:
         """Generate HMAC-SHA256 signature for webhook payload"""
-        return hmac.new(
-            secret.encode('utf-8'),
-            payload.encode('utf-8'),
-            hashlib.sha256).hexdigest()
+        return sign_payload(secret, payload)
 
     def verify_signature(self, secret: str, payload: str,
                          received_signature: str) -> bool:
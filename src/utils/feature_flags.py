@@ -7,6 +7,9 @@ dynamically without code deployments.
 Features:
 - Environment variable-based configuration
 - Redis-backed dynamic flags (optional)
+- In-memory snapshot: checks cost a dict lookup, refreshed by pub/sub
+  invalidation with a TTL fallback
+- Deterministic percentage rollouts keyed by org_id
 - Default values for safety
 - Easy-to-use API
 - Type-safe flag definitions
@@ -18,18 +21,31 @@ Usage:
         # Feature is enabled
         pass
 
+    if is_enabled(FeatureFlag.AGENT_ANALYTICS, org_id=current_org_id()):
+        # Enabled for the request's organization (percentage rollout)
+        pass
+
 Environment Variables:
-    FEATURE_FLAG_<NAME>=true|false  - Override flag value
-    REDIS_URL=redis://...           - Enable Redis-backed flags (optional)
+    FEATURE_FLAG_<NAME>=true|false|25%  - Override flag value or rollout
+    BRIKK_FEATURE_FLAG_TTL=30           - Snapshot refresh fallback (seconds)
+    REDIS_URL=redis://...               - Enable Redis-backed flags (optional)
 """
 
+import hashlib
 import os
+import threading
+import time
 from enum import Enum
-from typing import Optional
+from typing import Dict, Optional
 import logging
 
+from flask import g, has_app_context
+
 logger = logging.getLogger(__name__)
 
+INVALIDATION_CHANNEL = "feature_flags:invalidate"
+LISTENER_RETRY_SECONDS = 5.0
+
 
 class FeatureFlag(str, Enum):
     """
@@ -85,71 +101,145 @@ DEFAULT_FLAGS = {
 class FeatureFlagManager:
     """
     Manages feature flags with support for environment variables and Redis.
+
+    Flag values are held in an in-memory snapshot so checks never touch
+    os.environ or Redis. The snapshot is rebuilt (one MGET) when a message
+    arrives on the invalidation channel, or after the TTL as a fallback;
+    a TTL refresh that needs Redis runs in a background thread and the
+    stale snapshot keeps serving until it completes.
     """
     
-    def __init__(self, redis_client: Optional[object] = None):
+    def __init__(self, redis_client: Optional[object] = None, ttl: Optional[float] = None):
         """
         Initialize the feature flag manager.
         
         Args:
             redis_client: Optional Redis client for dynamic flags
+            ttl: Seconds before the snapshot is refreshed without an
+                invalidation message (BRIKK_FEATURE_FLAG_TTL, default 30)
         """
         self.redis_client = redis_client
-        self._cache = {}
+        self.ttl = ttl if ttl is not None else float(os.getenv("BRIKK_FEATURE_FLAG_TTL", "30"))
+        self._redis_values: Dict[str, str] = {}
+        self._rollouts: Dict[str, int] = {}
+        self._expires_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._listen_requested = False
+        self._stop = threading.Event()
+        
+        self.refresh()
         
         if redis_client:
             logger.info("Feature flags initialized with Redis backend")
         else:
             logger.info("Feature flags initialized with environment variables only")
     
-    def is_enabled(self, flag: FeatureFlag) -> bool:
+    def refresh(self) -> None:
         """
-        Check if a feature flag is enabled.
+        Rebuild the snapshot.
         
-        Priority order:
-        1. Environment variable (FEATURE_FLAG_<NAME>=true|false)
+        Priority order per flag:
+        1. Environment variable (FEATURE_FLAG_<NAME>=true|false|<n>%)
         2. Redis value (if Redis is configured)
         3. Default value
+        """
+        if self.redis_client:
+            keys = [_redis_key(flag) for flag in FeatureFlag]
+            try:
+                values = self.redis_client.mget(keys)
+                self._redis_values = {
+                    flag.value: value.decode("utf-8") if isinstance(value, bytes) else value
+                    for flag, value in zip(FeatureFlag, values)
+                    if value is not None
+                }
+            except Exception as e:
+                # Keep serving the last values Redis gave us
+                logger.warning(f"Failed to load feature flags from Redis: {e}")
+        
+        rollouts = {}
+        for flag in FeatureFlag:
+            rollout = _parse_rollout(os.getenv(_env_key(flag)))
+            if rollout is None:
+                rollout = _parse_rollout(self._redis_values.get(flag.value))
+            if rollout is None:
+                rollout = 100 if DEFAULT_FLAGS.get(flag, False) else 0
+            rollouts[flag] = rollout
+        
+        self._rollouts = rollouts
+        self._expires_at = time.monotonic() + self.ttl
+    
+    def _refresh_in_background(self) -> None:
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # a refresh is already running
+        self._expires_at = time.monotonic() + self.ttl
+        
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._refresh_lock.release()
+        
+        threading.Thread(target=run, name="feature-flag-refresh", daemon=True).start()
+    
+    def is_enabled(self, flag: FeatureFlag, org_id: Optional[object] = None) -> bool:
+        """
+        Check if a feature flag is enabled.
         
         Args:
             flag: The feature flag to check
+            org_id: Organization to evaluate a percentage rollout for; a
+                partially rolled out flag is off when org_id is None
             
         Returns:
             True if the feature is enabled, False otherwise
         """
-        # Check environment variable first
-        env_key = f"FEATURE_FLAG_{flag.value.upper()}"
-        env_value = os.getenv(env_key)
+        if time.monotonic() >= self._expires_at:
+            if self.redis_client:
+                self._refresh_in_background()
+                if self._listen_requested:
+                    self.start_listener()  # threads do not survive fork()
+            else:
+                self.refresh()
         
-        if env_value is not None:
-            result = env_value.lower() in ("true", "1", "yes", "on")
-            logger.debug(f"Feature flag {flag.value} from env: {result}")
-            return result
+        rollout = self._rollouts.get(flag, 0)
+        if rollout >= 100:
+            return True
+        if rollout <= 0 or org_id is None:
+            return False
+        return rollout_bucket(flag, org_id) < rollout
+    
+    def get_rollout(self, flag: FeatureFlag) -> int:
+        """Percentage (0-100) of organizations the flag is enabled for."""
+        return self._rollouts.get(flag, 0)
+    
+    def _write(self, flag: FeatureFlag, value: str, ttl: Optional[int]) -> bool:
+        if not self.redis_client:
+            logger.warning(f"Cannot set feature flag {flag.value}: Redis not configured")
+            return False
         
-        # Check Redis if available
-        if self.redis_client:
-            try:
-                redis_key = f"feature_flag:{flag.value}"
-                redis_value = self.redis_client.get(redis_key)
-                
-                if redis_value is not None:
-                    result = redis_value.decode("utf-8").lower() in ("true", "1", "yes", "on")
-                    logger.debug(f"Feature flag {flag.value} from Redis: {result}")
-                    return result
-            except Exception as e:
-                logger.warning(f"Failed to get feature flag {flag.value} from Redis: {e}")
+        try:
+            redis_key = _redis_key(flag)
+            if ttl:
+                self.redis_client.setex(redis_key, ttl, value)
+            else:
+                self.redis_client.set(redis_key, value)
+            self.redis_client.publish(INVALIDATION_CHANNEL, flag.value)
+        except Exception as e:
+            logger.error(f"Failed to set feature flag {flag.value}: {e}")
+            return False
         
-        # Fall back to default value
-        result = DEFAULT_FLAGS.get(flag, False)
-        logger.debug(f"Feature flag {flag.value} from default: {result}")
-        return result
+        self.refresh()
+        logger.info(f"Feature flag {flag.value} set to {value} (TTL: {ttl})")
+        return True
     
     def set_flag(self, flag: FeatureFlag, enabled: bool, ttl: Optional[int] = None) -> bool:
         """
         Set a feature flag value in Redis.
         
         Note: This only works if Redis is configured. Environment variables
-        take precedence and cannot be overridden.
+        take precedence and cannot be overridden. Other processes pick the
+        change up through the invalidation channel.
         
         Args:
             flag: The feature flag to set
@@ -159,24 +249,26 @@ class FeatureFlagManager:
         Returns:
             True if the flag was set successfully, False otherwise
         """
-        if not self.redis_client:
-            logger.warning(f"Cannot set feature flag {flag.value}: Redis not configured")
-            return False
+        return self._write(flag, "true" if enabled else "false", ttl)
+    
+    def set_rollout(self, flag: FeatureFlag, percentage: int, ttl: Optional[int] = None) -> bool:
+        """
+        Enable a flag for a deterministic percentage of organizations.
         
-        try:
-            redis_key = f"feature_flag:{flag.value}"
-            value = "true" if enabled else "false"
-            
-            if ttl:
-                self.redis_client.setex(redis_key, ttl, value)
-            else:
-                self.redis_client.set(redis_key, value)
+        An organization's bucket is a stable hash of (flag, org_id), so the
+        same organizations stay enabled as the percentage grows.
+        
+        Args:
+            flag: The feature flag to set
+            percentage: 0-100
+            ttl: Optional time-to-live in seconds
             
-            logger.info(f"Feature flag {flag.value} set to {enabled} (TTL: {ttl})")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to set feature flag {flag.value}: {e}")
-            return False
+        Returns:
+            True if the rollout was set successfully, False otherwise
+        """
+        if not 0 <= percentage <= 100:
+            raise ValueError("percentage must be between 0 and 100")
+        return self._write(flag, f"{int(percentage)}%", ttl)
     
     def get_all_flags(self) -> dict:
         """
@@ -189,27 +281,115 @@ class FeatureFlagManager:
             flag.value: self.is_enabled(flag)
             for flag in FeatureFlag
         }
+    
+    def start_listener(self) -> None:
+        """Subscribe to the invalidation channel in a daemon thread (Redis only)."""
+        if not self.redis_client or (self._listener and self._listener.is_alive()):
+            return
+        self._listen_requested = True
+        self._stop.clear()
+        self._listener = threading.Thread(
+            target=self._listen, name="feature-flag-listener", daemon=True)
+        self._listener.start()
+    
+    def stop_listener(self) -> None:
+        self._listen_requested = False
+        self._stop.set()
+        if self._listener:
+            self._listener.join(timeout=5)
+            self._listener = None
+    
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Catch up on anything published while we were not subscribed
+                self.refresh()
+                while not self._stop.is_set():
+                    if pubsub.get_message(timeout=1.0) is not None:
+                        self.refresh()
+            except Exception as e:
+                logger.warning(f"Feature flag listener error, resubscribing: {e}")
+                self._stop.wait(LISTENER_RETRY_SECONDS)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+
+def _env_key(flag: FeatureFlag) -> str:
+    return f"FEATURE_FLAG_{flag.value.upper()}"
+
+
+def _redis_key(flag: FeatureFlag) -> str:
+    return f"feature_flag:{flag.value}"
+
+
+def _parse_rollout(value: Optional[str]) -> Optional[int]:
+    """'true'/'false' style values -> 100/0, '25%' -> 25; None if unset or invalid."""
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if value.endswith("%"):
+        try:
+            return max(0, min(100, int(float(value[:-1]))))
+        except ValueError:
+            return None
+    return 100 if value in ("true", "1", "yes", "on") else 0
+
+
+def rollout_bucket(flag: FeatureFlag, org_id: object) -> int:
+    """Stable bucket 0-99 for an organization under a flag (same in every process)."""
+    digest = hashlib.blake2b(f"{flag.value}:{org_id}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % 100
+
+
+def current_org_id() -> Optional[object]:
+    """
+    Organization of the authenticated request, for percentage rollouts.
+
+    unified_auth sets g.org_id, coordination auth sets g.organization_id and
+    the API key middleware keeps g.api_key_context; None when unauthenticated.
+    """
+    if not has_app_context():
+        return None
+    for attr in ('org_id', 'organization_id'):
+        org_id = g.get(attr)
+        if org_id is not None:
+            return org_id
+    api_key_context = g.get('api_key_context')
+    return api_key_context.organization_id if api_key_context is not None else None
 
 
 # Global instance (initialized by application factory)
 _manager: Optional[FeatureFlagManager] = None
 
 
-def init_feature_flags(redis_client: Optional[object] = None):
+def init_feature_flags(redis_client: Optional[object] = None, listen: bool = False):
     """
     Initialize the global feature flag manager.
     
     This should be called once during application startup.
     
     Args:
-        redis_client: Optional Redis client for dynamic flags
+        redis_client: Optional Redis client for dynamic flags, normally
+            src.infra.redis_pool.get_redis('feature_flags')
+        listen: Subscribe to invalidation messages in a background thread
     """
     global _manager
+    if _manager is not None:
+        _manager.stop_listener()
     _manager = FeatureFlagManager(redis_client)
+    if listen:
+        _manager.start_listener()
     logger.info("Feature flags system initialized")
 
 
-def is_enabled(flag: FeatureFlag) -> bool:
+def is_enabled(flag: FeatureFlag, org_id: Optional[object] = None) -> bool:
     """
     Check if a feature flag is enabled.
     
@@ -217,6 +397,7 @@ def is_enabled(flag: FeatureFlag) -> bool:
     
     Args:
         flag: The feature flag to check
+        org_id: Organization for percentage rollouts
         
     Returns:
         True if the feature is enabled, False otherwise
@@ -225,7 +406,7 @@ def is_enabled(flag: FeatureFlag) -> bool:
         # Auto-initialize if not already done
         init_feature_flags()
     
-    return _manager.is_enabled(flag)
+    return _manager.is_enabled(flag, org_id)
 
 
 def set_flag(flag: FeatureFlag, enabled: bool, ttl: Optional[int] = None) -> bool:
@@ -248,6 +429,18 @@ def set_flag(flag: FeatureFlag, enabled: bool, ttl: Optional[int] = None) -> boo
     return _manager.set_flag(flag, enabled, ttl)
 
 
+def set_rollout(flag: FeatureFlag, percentage: int, ttl: Optional[int] = None) -> bool:
+    """
+    Roll a feature flag out to a percentage of organizations.
+    
+    This is a convenience function that uses the global manager instance.
+    """
+    if _manager is None:
+        init_feature_flags()
+    
+    return _manager.set_rollout(flag, percentage, ttl)
+
+
 def get_all_flags() -> dict:
     """
     Get the current state of all feature flags.
@@ -259,4 +452,3 @@ def get_all_flags() -> dict:
         init_feature_flags()
     
     return _manager.get_all_flags()
-
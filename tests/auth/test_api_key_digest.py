@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for indexed digest lookup and the verified-key cache on ApiKey.
+"""
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from cryptography.fernet import Fernet
+from sqlalchemy import event
+
+import src.models  # noqa: F401  (register all mappers)
+from src.database import db
+from src.models.api_key import ApiKey, compute_key_digest, verified_key_cache
+
+TEST_FERNET_KEY = Fernet.generate_key().decode()
+
+
+@pytest.fixture
+def app(make_app, monkeypatch):
+    monkeypatch.setenv("BRIKK_ENCRYPTION_KEY", TEST_FERNET_KEY)
+    verified_key_cache.clear()
+    yield make_app([ApiKey.__table__])
+    verified_key_cache.clear()
+
+
+def _count_queries(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+class TestApiKeyDigestLookup:
+
+    def test_create_sets_digest(self, app):
+        api_key, secret = ApiKey.create_api_key(organization_id=None, name="k")
+        assert api_key.key_digest == compute_key_digest(secret)
+        assert len(api_key.key_digest) == 64
+
+    def test_authenticate_uses_digest_without_decrypting(self, app):
+        api_key, secret = ApiKey.create_api_key(organization_id=None, name="k")
+        for i in range(5):
+            ApiKey.create_api_key(organization_id=None, name=f"other-{i}")
+
+        with patch.object(ApiKey, "decrypt_secret", side_effect=AssertionError("decrypted")):
+            record = ApiKey.authenticate_api_key(secret)
+        assert record is not None
+        assert record.id == api_key.id
+
+    def test_authenticate_rejects_unknown_key(self, app):
+        ApiKey.create_api_key(organization_id=None, name="k")
+        assert ApiKey.authenticate_api_key("brikk_not_a_real_key") is None
+        assert ApiKey.authenticate_api_key("") is None
+
+    def test_authenticate_rejects_expired_key(self, app):
+        api_key, secret = ApiKey.create_api_key(organization_id=None, name="k")
+        api_key.expires_at = datetime.utcnow() - timedelta(minutes=1)
+        db.session.commit()
+        assert ApiKey.authenticate_api_key(secret) is None
+
+    def test_legacy_row_is_backfilled_on_first_match(self, app):
+        api_key, secret = ApiKey.create_api_key(organization_id=None, name="legacy")
+        api_key.key_digest = None
+        db.session.commit()
+
+        record = ApiKey.authenticate_api_key(secret)
+        assert record is not None
+        assert record.key_digest == compute_key_digest(secret)
+
+    def test_backfill_key_digests(self, app):
+        secrets_by_id = {}
+        for i in range(7):
+            api_key, secret = ApiKey.create_api_key(organization_id=None, name=f"k{i}")
+            api_key.key_digest = None
+            secrets_by_id[api_key.id] = secret
+        db.session.commit()
+
+        assert ApiKey.backfill_key_digests(batch_size=3) == 7
+        for api_key in ApiKey.query.all():
+            assert api_key.key_digest == compute_key_digest(secrets_by_id[api_key.id])
+
+
+class TestVerifiedKeyCache:
+
+    def test_cache_hit_skips_digest_query(self, app):
+        api_key, secret = ApiKey.create_api_key(organization_id=None, name="k")
+        db.session.expunge_all()
+        assert ApiKey.authenticate_api_key(secret) is not None
+        assert len(verified_key_cache) == 1
+
+        statements, stop = _count_queries(db.engine)
+        try:
+            assert ApiKey.authenticate_api_key(secret) is not None
+        finally:
+            stop()
+        assert not any("key_digest =" in s for s in statements)
+
+    def test_verify_cache_hit_runs_no_query(self, app):
+        api_key, secret = ApiKey.create_api_key(organization_id=None, name="k")
+        api_key.scopes = "agents:read"
+        db.session.commit()
+        assert ApiKey.verify_api_key(secret) is not None
+
+        statements, stop = _count_queries(db.engine)
+        try:
+            context = ApiKey.verify_api_key(secret)
+        finally:
+            stop()
+        assert statements == []
+        assert (context.id, context.scopes, context.is_active) == (api_key.id, "agents:read", True)
+
+    def test_usage_updates_keep_cache_entry(self, app):
+        api_key, secret = ApiKey.create_api_key(organization_id=None, name="k")
+        assert ApiKey.verify_api_key(secret) is not None
+
+        api_key.update_usage(success=True)
+        assert len(verified_key_cache) == 1
+
+        api_key.requests_per_minute = 5
+        db.session.commit()
+        assert len(verified_key_cache) == 0
+        assert ApiKey.verify_api_key(secret).requests_per_minute == 5
+
+    def test_disable_invalidates_cache(self, app):
+        api_key, secret = ApiKey.create_api_key(organization_id=None, name="k")
+        assert ApiKey.authenticate_api_key(secret) is not None
+
+        api_key.disable()
+        assert len(verified_key_cache) == 0
+        assert ApiKey.authenticate_api_key(secret) is None
+
+    def test_rotate_invalidates_old_secret(self, app):
+        api_key, old_secret = ApiKey.create_api_key(organization_id=None, name="k")
+        assert ApiKey.authenticate_api_key(old_secret) is not None
+
+        new_secret = api_key.rotate_secret()
+        assert ApiKey.authenticate_api_key(old_secret) is None
+        assert ApiKey.authenticate_api_key(new_secret).id == api_key.id
+
+    def test_direct_deactivation_is_caught_on_cache_hit(self, app):
+        api_key, secret = ApiKey.create_api_key(organization_id=None, name="k")
+        assert ApiKey.authenticate_api_key(secret) is not None
+
+        api_key.is_active = False
+        db.session.commit()
+        assert ApiKey.authenticate_api_key(secret) is None
+
+    def test_cache_is_bounded_lru(self):
+        from src.models.api_key import VerifiedKeyCache, VerifiedKeyContext
+        cache = VerifiedKeyCache(max_size=2, ttl_seconds=60)
+        for i in range(3):
+            cache.put(f"d{i}", VerifiedKeyContext(i, f"bk_{i}", None, None, None))
+        assert len(cache) == 2
+        assert cache.get("d0") is None
+        assert cache.get("d2").id == 2
+
+    def test_cache_entries_expire(self):
+        from src.models.api_key import VerifiedKeyCache, VerifiedKeyContext
+        cache = VerifiedKeyCache(max_size=10, ttl_seconds=0)
+        cache.put("d", VerifiedKeyContext(1, "bk_1", None, None, None))
+        with patch("src.models.api_key.time.monotonic", return_value=10**9):
+            assert cache.get("d") is None
@@ -7,7 +7,7 @@ import json
 from unittest.mock import patch, MagicMock
 from flask import Flask
 
-from src.services.idempotency import IdempotencyService
+from src.services.idempotency import IdempotencyService, decode_record, encode_record
 from src.factory import create_app
 
 
@@ -75,15 +75,16 @@ class TestIdempotencyService:
         idempotency_service.store_response(
             idem_key, response_data, status_code)
 
-        # Verify Redis setex was called with correct parameters
-        mock_redis.setex.assert_called_once()
-        call_args = mock_redis.setex.call_args
+        # Record and lock release go through one script call
+        script = mock_redis.register_script.return_value
+        script.assert_called_once()
+        call_kwargs = script.call_args.kwargs
 
-        assert call_args[0][0] == idem_key  # key
-        assert call_args[0][1] == 86400  # TTL (24 hours)
+        assert call_kwargs['keys'] == [idem_key, f"{idem_key}:lock"]
+        assert call_kwargs['args'][1] == 86400  # TTL (24 hours)
 
         # Verify stored data structure
-        stored_data = json.loads(call_args[0][2])
+        stored_data = decode_record(call_kwargs['args'][0])
         assert stored_data['response_data'] == response_data
         assert stored_data['status_code'] == status_code
         assert 'created_at' in stored_data
@@ -138,24 +139,26 @@ class TestIdempotencyService:
         assert response is None
         assert status_code is None
 
-    def test_process_request_idempotency_first_request(
+    def test_begin_request_first_request(
             self, app: Flask, idempotency_service, mock_redis):
         """Test idempotency processing for first request."""
         key_id = "bk_test_key"
         body_hash = "abc123"
 
-        # No cached response
-        mock_redis.get.return_value = None
+        # No cached response, lock acquired
+        mock_redis.register_script.return_value.return_value = [0]
 
         with app.app_context():
-            should_process, response, status = idempotency_service.process_request_idempotency(
+            outcome = idempotency_service.begin_request(
                 key_id, body_hash)
 
-        assert should_process
-        assert response is None
-        assert status is None
+        assert outcome.should_process
+        assert outcome.response_data is None
+        assert outcome.status_code is None
+        # The caller completes or releases the lock with this token
+        assert outcome.lock_token
 
-    def test_process_request_idempotency_cached_response(
+    def test_begin_request_cached_response(
             self, app: Flask, idempotency_service, mock_redis):
         """Test idempotency processing with cached response."""
         key_id = "bk_test_key"
@@ -167,86 +170,70 @@ class TestIdempotencyService:
             "stored_at": "2023-12-01T10:30:00Z"
         }
 
-        # Mock Redis calls
-        def mock_get(key):
-            if key.startswith("idem:"):
-                return json.dumps(cached_data)
-            return None
-
-        mock_redis.get.side_effect = mock_get
+        mock_redis.register_script.return_value.return_value = [
+            1, encode_record(cached_data, body_hash)]
 
         with app.app_context():
-            should_process, response, status = idempotency_service.process_request_idempotency(
+            outcome = idempotency_service.begin_request(
                 key_id, body_hash)
 
-        assert not should_process
-        assert response == cached_data['response_data']
-        assert status == 202
+        assert not outcome.should_process
+        assert outcome.response_data == cached_data['response_data']
+        assert outcome.status_code == 202
 
-    def test_process_request_idempotency_body_conflict(
+    def test_begin_request_body_conflict(
             self, app: Flask, idempotency_service, mock_redis):
         """Test idempotency processing with body hash conflict."""
         key_id = "bk_test_key"
         body_hash = "abc123"
         custom_key = "custom_idem_key"
 
-        # Mock Redis calls
-        def mock_get(key):
-            if "custom" in key:
-                return json.dumps({
-                    "response_data": {"status": "processed", "custom": True},
-                    "status_code": 200,
-                    "stored_at": "2023-12-01T10:30:00Z"
-                })
-            return None
-
-        mock_redis.get.side_effect = mock_get
+        # Stored record carries a different body hash
+        mock_redis.register_script.return_value.return_value = [2]
 
         with app.app_context():
-            should_process, response, status = idempotency_service.process_request_idempotency(
+            outcome = idempotency_service.begin_request(
                 key_id, body_hash, custom_key)
 
-        assert not should_process
-        assert response['code'] == 'idempotency_conflict'
-        assert status == 409
+        assert not outcome.should_process
+        assert outcome.response_data['code'] == 'idempotency_conflict'
+        assert outcome.status_code == 409
 
-    def test_process_request_idempotency_with_custom_key(
+    def test_begin_request_with_custom_key(
             self, app: Flask, idempotency_service, mock_redis):
         """Test idempotency processing with custom idempotency key."""
         key_id = "bk_test_key"
         body_hash = "abc123"
         custom_key = "custom_idem_key"
 
-        # No cached response
-        mock_redis.get.return_value = None
+        script = mock_redis.register_script.return_value
+        script.return_value = [0]
 
         with app.app_context():
-            should_process, response, status = idempotency_service.process_request_idempotency(
+            outcome = idempotency_service.begin_request(
                 key_id, body_hash, custom_key)
 
-        assert should_process
-        assert response is None
-        assert status is None
+        assert outcome.should_process
+        assert outcome.response_data is None
+        assert outcome.status_code is None
 
         # Should check for custom idempotency key
         expected_idem_key = idempotency_service.generate_idempotency_key(
             key_id, "", custom_key)
-        mock_redis.get.assert_called_with(expected_idem_key)
+        assert script.call_args.kwargs['keys'] == [
+            expected_idem_key, f"{expected_idem_key}:lock"]
 
-    def test_process_request_idempotency_redis_error(
+    def test_begin_request_redis_error(
             self, app: Flask, idempotency_service, mock_redis):
         """Test idempotency processing with Redis error."""
         key_id = "bk_test_key"
         body_hash = "abc123"
 
         # Redis raises exception
-        mock_redis.get.side_effect = Exception("Redis connection error")
+        mock_redis.register_script.return_value.side_effect = Exception(
+            "Redis connection error")
 
+        # Propagates; the auth middlewares catch it and fail open
         with app.app_context():
-            should_process, response, status = idempotency_service.process_request_idempotency(
-                key_id, body_hash)
-
-        # Should fail open (allow processing) on Redis errors
-        assert should_process
-        assert response is None
-        assert status is None
+            with pytest.raises(Exception, match="Redis connection error"):
+                idempotency_service.begin_request(key_id, body_hash)
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+'''
+Tests for single-round-trip idempotency and in-flight request coalescing.
+
+Runs the Lua scripts against fakeredis.
+'''
+import json
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from src.services.idempotency import (  # noqa: E402
+    IdempotencyService, decode_record, encode_record
+)
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def service(redis_client, monkeypatch):
+    monkeypatch.setenv('BRIKK_IDEM_LEASE_MS', '500')
+    monkeypatch.setenv('BRIKK_IDEM_WAIT_MS', '1000')
+    return IdempotencyService(redis_client)
+
+
+def test_record_roundtrip():
+    record = {'response_data': {'id': 'x'}, 'status_code': 202}
+    data = encode_record(record, 'a' * 64)
+
+    assert data.startswith(b'BKI1')
+    assert decode_record(data) == record
+    # Legacy plain-JSON records are still readable
+    assert decode_record(json.dumps(record)) == record
+
+
+def test_first_request_acquires_lock(app, service, redis_client):
+    outcome = service.begin_request('bk_key', 'a' * 64)
+
+    assert outcome.should_process
+    assert redis_client.get(f"{outcome.record_key}:lock") == outcome.lock_token.encode()
+
+
+def test_completed_request_is_replayed(app, service, redis_client):
+    first = service.begin_request('bk_key', 'a' * 64)
+    service.complete_request(first, {'status': 'accepted'}, 202, body_hash='a' * 64)
+
+    assert not redis_client.exists(f"{first.record_key}:lock")
+
+    replay = service.begin_request('bk_key', 'a' * 64)
+    assert not replay.should_process
+    assert replay.response_data == {'status': 'accepted'}
+    assert replay.status_code == 202
+
+
+def test_custom_key_with_different_body_conflicts(app, service):
+    first = service.begin_request('bk_key', 'a' * 64, 'order-1')
+    service.complete_request(first, {'ok': True}, 202, body_hash='a' * 64)
+
+    same = service.begin_request('bk_key', 'a' * 64, 'order-1')
+    other = service.begin_request('bk_key', 'b' * 64, 'order-1')
+
+    assert same.status_code == 202
+    assert not other.should_process
+    assert other.status_code == 409
+    assert other.response_data['code'] == 'idempotency_conflict'
+
+
+def test_check_is_single_round_trip(app, service, redis_client, monkeypatch):
+    service.begin_request('bk_key', 'a' * 64)  # loads the script
+
+    commands = []
+    execute = redis_client.execute_command
+
+    def counting(*args, **kwargs):
+        commands.append(args[0])
+        return execute(*args, **kwargs)
+
+    monkeypatch.setattr(redis_client, 'execute_command', counting)
+    service.begin_request('bk_key', 'c' * 64)
+    assert commands == ['EVALSHA']
+
+
+def test_duplicate_waits_for_first_result(app, service):
+    first = service.begin_request('bk_key', 'a' * 64)
+
+    def finish():
+        time.sleep(0.1)
+        service.complete_request(first, {'status': 'done'}, 202, body_hash='a' * 64)
+
+    worker = threading.Thread(target=finish)
+    worker.start()
+    started = time.monotonic()
+    duplicate = service.begin_request('bk_key', 'a' * 64)
+    worker.join()
+
+    assert not duplicate.should_process
+    assert duplicate.response_data == {'status': 'done'}
+    assert time.monotonic() - started < 1.0
+
+
+def test_duplicate_times_out_with_in_progress(app, service, monkeypatch):
+    service.wait_ms = 50
+    service.begin_request('bk_key', 'a' * 64)
+
+    duplicate = service.begin_request('bk_key', 'a' * 64)
+
+    assert duplicate.status_code == 409
+    assert duplicate.response_data['code'] == 'idempotency_in_progress'
+
+
+def test_released_lock_lets_duplicate_run(app, service):
+    first = service.begin_request('bk_key', 'a' * 64)
+    assert service.release(first)
+
+    retry = service.begin_request('bk_key', 'a' * 64)
+    assert retry.should_process
+
+
+def test_release_does_not_drop_someone_elses_lock(app, service):
+    first = service.begin_request('bk_key', 'a' * 64)
+    service.release(first)
+    second = service.begin_request('bk_key', 'a' * 64)
+
+    assert not service.release(first)
+    assert service.redis.get(f"{second.record_key}:lock") == second.lock_token.encode()
+
+
+def test_concurrent_duplicates_run_handler_once(app, service):
+    runs = []
+    results = []
+
+    def handle():
+        with app.app_context():
+            outcome = service.begin_request('bk_key', 'a' * 64)
+            if outcome.should_process:
+                runs.append(1)
+                time.sleep(0.05)
+                service.complete_request(outcome, {'n': 1}, 202, body_hash='a' * 64)
+                results.append(202)
+            else:
+                results.append(outcome.status_code)
+
+    threads = [threading.Thread(target=handle) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(runs) == 1
+    assert results == [202] * 8
+
+
+def test_legacy_json_record_is_replayed(app, service, redis_client):
+    key = service.record_key('bk_key', 'a' * 64)
+    redis_client.set(key, json.dumps({'response_data': {'old': True}, 'status_code': 202}))
+
+    outcome = service.begin_request('bk_key', 'a' * 64)
+
+    assert not outcome.should_process
+    assert outcome.response_data == {'old': True}
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""
+Hot-path benchmark suite (pytest-benchmark).
+"""
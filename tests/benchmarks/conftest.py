@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures for the hot-path benchmark suite.
+
+Redis-backed services run against fakeredis and database paths against a
+file-backed sqlite database, so the numbers are comparable between runs on
+the same machine without any external services.
+"""
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # idempotency and rate limit scripts are Lua
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def redis_client(redis_server):
+    return fakeredis.FakeRedis(server=redis_server)
+
+
+@pytest.fixture
+def redis_pools(redis_server):
+    """Point the shared Redis pool registry (used by services that build their own client) at fakeredis."""
+    from src.infra.redis_pool import configure_redis_pools, reset_redis_pools
+
+    yield configure_redis_pools(
+        connection_class=getattr(fakeredis, "FakeRedisConnection", fakeredis.FakeConnection), server=redis_server)
+    reset_redis_pools()
+
+
+@pytest.fixture
+def db_app(make_app, tmp_path, monkeypatch):
+    """Minimal app with the ledger and API key tables on a file-backed sqlite database."""
+    from cryptography.fernet import Fernet
+
+    import src.models  # noqa: F401  (register all mappers)
+    from src.models.api_key import ApiKey
+    from src.models.usage_ledger import UsageLedger
+
+    monkeypatch.setenv("BRIKK_ENCRYPTION_KEY", Fernet.generate_key().decode())
+    return make_app([ApiKey.__table__, UsageLedger.__table__], uri=f"sqlite:///{tmp_path / 'bench.db'}")
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for the request hot paths.
+
+Run with JSON output and compare against the stored baseline:
+
+    make bench
+    make bench-compare
+
+Under a plain `pytest` run each benchmark executes as a normal test, so the
+assertions here also keep the fixtures honest.
+"""
+import json
+import secrets
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from src.schemas.envelope import Envelope
+from src.services.idempotency import IdempotencyService
+from src.services.rate_limit import RateLimitService, reset_rate_limiter
+from src.services.security_enhanced import HMACSecurityService
+
+SECRET = "bench-secret-" + "x" * 32
+PATH = "/api/v1/coordination"
+
+
+def uuid7() -> str:
+    """UUIDv7 string (48-bit ms timestamp, random tail) as the envelope requires."""
+    value = (int(time.time() * 1000) << 80) | int.from_bytes(secrets.token_bytes(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)
+    return str(uuid.UUID(int=value))
+
+
+def _envelope(message_id=None):
+    return {
+        "version": "1.0",
+        "message_id": message_id or uuid7(),
+        "ts": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z",
+        "type": "message",
+        "sender": {"agent_id": "agent-bench-sender"},
+        "recipient": {"agent_id": "agent-bench-recipient"},
+        "payload": {"action": "summarise", "items": list(range(20))},
+        "ttl_ms": 30000,
+    }
+
+
+@pytest.mark.benchmark(group="envelope")
+def test_envelope_validation(benchmark):
+    data = _envelope()
+
+    envelope = benchmark(Envelope, **data)
+
+    assert envelope.message_id == data["message_id"]
+
+
+@pytest.mark.benchmark(group="hmac")
+def test_hmac_sign(benchmark):
+    body = json.dumps(_envelope()).encode()
+    timestamp = datetime.now(timezone.utc).isoformat()
+
+    signature = benchmark(HMACSecurityService.create_signature, "POST", PATH, timestamp, body, SECRET)
+
+    assert signature.startswith("v1=")
+
+
+@pytest.mark.benchmark(group="hmac")
+def test_hmac_verify(benchmark):
+    body = json.dumps(_envelope()).encode()
+    timestamp = datetime.now(timezone.utc).isoformat()
+    signature = HMACSecurityService.create_signature("POST", PATH, timestamp, body, SECRET)
+
+    assert benchmark(HMACSecurityService.verify_signature, "POST", PATH, timestamp, body, SECRET, signature)
+
+
+@pytest.mark.benchmark(group="redis")
+@pytest.mark.parametrize("algorithm", ["sliding_log", "gcra", "sliding_window"])
+def test_rate_limit_check(benchmark, monkeypatch, redis_server, algorithm):
+    import fakeredis
+    monkeypatch.setenv("BRIKK_RLIMIT_ENABLED", "true")
+    monkeypatch.setenv("BRIKK_RLIMIT_PER_MIN", "1000000")
+    monkeypatch.setenv("BRIKK_RLIMIT_ALGORITHM", algorithm)
+    limiter = RateLimitService(redis_client=fakeredis.FakeRedis(server=redis_server, decode_responses=True))
+
+    result = benchmark(limiter.check_rate_limit, "rlimit:org:bench")
+
+    assert result.allowed
+
+
+@pytest.mark.benchmark(group="redis")
+def test_idempotency_begin_new(benchmark, redis_client):
+    service = IdempotencyService(redis_client=redis_client)
+
+    def reset():
+        redis_client.flushdb()
+
+    # Flush between rounds: fakeredis slows down as unexpired keys pile up
+    outcome = benchmark.pedantic(
+        service.begin_request, kwargs={"api_key_id": "key-bench", "body_hash": "cd" * 32},
+        setup=reset, rounds=2000, warmup_rounds=50)
+
+    assert outcome.should_process
+
+
+@pytest.mark.benchmark(group="redis")
+def test_idempotency_replay(benchmark, redis_client):
+    service = IdempotencyService(redis_client=redis_client)
+    body_hash = "ab" * 32
+    outcome = service.begin_request(api_key_id="key-bench", body_hash=body_hash)
+    service.complete_request(outcome, {"status": "accepted"}, 202)
+
+    replay = benchmark(service.begin_request, api_key_id="key-bench", body_hash=body_hash)
+
+    assert not replay.should_process and replay.status_code == 202
+
+
+@pytest.mark.benchmark(group="database")
+def test_usage_ledger_record(benchmark, db_app):
+    from src.models.usage_ledger import UsageLedger
+
+    entry = benchmark(UsageLedger.record_usage, org_id=1, actor_id="api_key:bench",
+                      route=PATH, unit_cost=Decimal("0.0100"))
+
+    assert entry.id is not None
+
+
+@pytest.mark.benchmark(group="database")
+@pytest.mark.parametrize("cached", [False, True], ids=["digest", "cached"])
+def test_api_key_authenticate(benchmark, db_app, cached):
+    from src.database import db
+    from src.models.api_key import ApiKey, verified_key_cache
+
+    for i in range(200):
+        ApiKey.create_api_key(organization_id=1, name=f"bench-{i}")
+    target, secret = ApiKey.create_api_key(organization_id=1, name="target")
+    target_key_id = target.key_id
+    verified_key_cache.clear()
+
+    def authenticate():
+        if not cached:
+            verified_key_cache.clear()
+        db.session.expunge_all()
+        return ApiKey.verify_api_key(secret)
+
+    assert benchmark(authenticate).key_id == target_key_id
+    verified_key_cache.clear()
+
+
+@pytest.mark.benchmark(group="metrics")
+def test_http_metrics_record(benchmark):
+    from flask import Flask
+    from prometheus_client import CollectorRegistry
+    from src.services.metrics import MetricsService
+
+    app = Flask(__name__)
+    app.add_url_rule("/api/v1/agents/<agent_id>", "agent", lambda agent_id: "")
+    service = MetricsService(registry=CollectorRegistry())
+
+    def record():
+        service.record_http_request(route=service.route_label(), method="GET",
+                                    status_code=200, duration_seconds=0.01)
+
+    with app.test_request_context(f"/api/v1/agents/{uuid.uuid4()}"):
+        benchmark(record)
+
+    samples = [s for m in service.http_requests_total.collect() for s in m.samples if s.name.endswith("_total")]
+    assert [s.labels["route"] for s in samples] == ["/api/v1/agents/{agent_id}"]
+
+
+def _hooked_app():
+    from flask import Flask
+
+    app = Flask(__name__)
+    for _ in range(8):
+        app.before_request_funcs.setdefault(None, []).append(lambda: None)
+        app.after_request_funcs.setdefault(None, []).append(lambda response: response)
+    app.add_url_rule("/api/v1/agents/<agent_id>", "agent", lambda agent_id: "")
+    return app
+
+
+def _dispatch_us(app, requests):
+    with app.test_request_context("/api/v1/agents/a1"):
+        start = time.perf_counter()
+        for _ in range(requests):
+            app.full_dispatch_request()
+        return (time.perf_counter() - start) / requests * 1e6
+
+
+@pytest.mark.benchmark(group="metrics")
+def test_request_timing_dispatch(benchmark):
+    """full_dispatch_request() with 16 no-op hooks (compare: bench_request_timing.py).
+
+    Also holds the 20us per-request overhead budget: fastest of interleaved
+    blocks against the same app without the middleware.
+    """
+    from prometheus_client import CollectorRegistry
+    from src.services.request_timing import RequestTimingMiddleware
+
+    app = _hooked_app()
+    middleware = RequestTimingMiddleware(app, CollectorRegistry())
+
+    with app.test_request_context("/api/v1/agents/a1"):
+        response = benchmark(app.full_dispatch_request)
+    middleware.stage_seconds.flush()
+
+    assert response.status_code == 200
+    assert middleware.stage_seconds.histogram.labels(stage="handler")._sum.get() > 0
+
+    plain_app = _hooked_app()
+    plain = instrumented = float("inf")
+    for _ in range(10):
+        plain = min(plain, _dispatch_us(plain_app, 2000))
+        instrumented = min(instrumented, _dispatch_us(app, 2000))
+    assert instrumented - plain < 20
+
+
+@pytest.mark.benchmark(group="logging")
+@pytest.mark.parametrize("async_enabled", [False, True], ids=["sync", "async"])
+def test_structured_log_call(benchmark, async_enabled):
+    """Request-thread cost of one coordination_success log call (compare: bench_structured_logging.py)."""
+    import io
+    import logging
+    from flask import Flask, g
+    from src.services.structured_logging import (
+        StructuredFormatter, StructuredLogger, start_async_logging, stop_async_logging,
+    )
+
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(StructuredFormatter(json_enabled=True))
+    logger = StructuredLogger("bench.coordination")
+    logger.logger.handlers[:] = [start_async_logging(handler) if async_enabled else handler]
+    logger.logger.propagate = False
+    logger.logger.setLevel(logging.INFO)
+
+    def log():
+        logger.info("Coordination request processed successfully", event_type="coordination_success",
+                    message_id=str(uuid.uuid4()), sender_agent_id="a", recipient_agent_id="b")
+
+    try:
+        with Flask(__name__).test_request_context(PATH, method="POST"):
+            g.request_id = str(uuid.uuid4())
+            benchmark(log)
+    finally:
+        stop_async_logging()
+        logger.logger.handlers[:] = []
+
+    assert json.loads(stream.getvalue().splitlines()[-1])["event_type"] == "coordination_success"
+
+@pytest.fixture
+def coordination_client(monkeypatch, redis_pools):
+    from flask import Flask
+    from src.routes.coordination import coordination_v1_bp
+
+    monkeypatch.setenv("BRIKK_FEATURE_PER_ORG_KEYS", "false")
+    monkeypatch.setenv("BRIKK_IDEM_ENABLED", "true")
+    monkeypatch.setenv("BRIKK_RLIMIT_ENABLED", "true")
+    monkeypatch.setenv("BRIKK_RLIMIT_PER_MIN", "1000000")
+    reset_rate_limiter()
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+    app.register_blueprint(coordination_v1_bp)
+    yield app.test_client()
+    reset_rate_limiter()
+
+
+@pytest.mark.benchmark(group="coordination")
+def test_coordination_post(benchmark, coordination_client):
+    headers = {
+        "X-Brikk-Key": "bk_bench",
+        "X-Brikk-Timestamp": datetime.now(timezone.utc).isoformat(),
+        "X-Brikk-Signature": "v1=unused",
+    }
+
+    def post():
+        return coordination_client.post(PATH, json=_envelope(), headers=headers)
+
+    response = benchmark(post)
+
+    assert response.status_code == 202, response.get_json()
+    assert response.headers.get("X-RateLimit-Limit")
@@ -43,7 +43,49 @@ def app():
     os.unlink(db_path)
 
 
+@pytest.fixture
+def make_app(tmp_path):
+    """
+    Factory for a minimal Flask app with only the given tables created.
+
+    make_app(tables, uri=..., **config) returns the app with an app context
+    pushed for the rest of the test. uri defaults to an in-memory sqlite
+    database; pass a file under tmp_path when worker threads need their own
+    connections.
+    """
+    from flask import Flask
+    from src.database import db
+
+    contexts = []
+
+    def factory(tables, uri="sqlite:///:memory:", **config):
+        app = Flask(__name__, instance_path=str(tmp_path))
+        app.config["TESTING"] = True
+        app.config["SQLALCHEMY_DATABASE_URI"] = uri
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        app.config.update(config)
+        db.init_app(app)
+        ctx = app.app_context()
+        ctx.push()
+        contexts.append((ctx, tables))
+        db.metadata.create_all(bind=db.engine, tables=tables)
+        return app
+
+    yield factory
+    for ctx, tables in reversed(contexts):
+        db.session.remove()
+        db.metadata.drop_all(bind=db.engine, tables=tables)
+        ctx.pop()
+
+
 @pytest.fixture
 def client(app):
     """A test client for the app."""
     return app.test_client()
+
+
+@pytest.fixture
+def assert_max_queries():
+    """Context manager failing the test if its block runs more than n SQL statements."""
+    from src.infra.query_log import assert_max_queries
+    return assert_max_queries
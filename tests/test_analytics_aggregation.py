@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the SQL-side daily analytics aggregation engine.
+
+Results are validated against the previous in-Python implementation.
+"""
+import random
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import src.models  # noqa: F401,E402  (register all mappers)
+from src.database import db  # noqa: E402
+from src.models.analytics import (  # noqa: E402
+    AgentUsageEvent, AgentAnalyticsDaily, UserAnalyticsDaily
+)
+from src.services.analytics_aggregation import DailyAnalyticsAggregator, DurationSketch  # noqa: E402
+from src.services.analytics_jobs import AnalyticsJobService  # noqa: E402
+
+DAY = date(2026, 3, 14)
+TABLES = [AgentUsageEvent.__table__, AgentAnalyticsDaily.__table__, UserAnalyticsDaily.__table__]
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(TABLES)
+
+
+def _seed(n=5000, agents=8, users=40, seed=7):
+    rng = random.Random(seed)
+    start = datetime.combine(DAY, datetime.min.time())
+    rows = []
+    for _ in range(n):
+        duration = None if rng.random() < 0.05 else int(rng.lognormvariate(5, 1.2))
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "agent_id": f"agent-{rng.randrange(agents)}",
+            "user_id": rng.choice([None, ""] + [f"user-{u}" for u in range(users)]),
+            "event_type": "invocation",
+            "duration_ms": duration,
+            "success": rng.choice([True, True, True, False, None]),
+            "created_at": start + timedelta(seconds=rng.randrange(86400)),
+        })
+    # Events outside the day must be ignored
+    rows.append({**rows[0], "id": str(uuid.uuid4()), "created_at": start - timedelta(seconds=1)})
+    rows.append({**rows[0], "id": str(uuid.uuid4()), "created_at": start + timedelta(days=1)})
+    db.session.execute(AgentUsageEvent.__table__.insert(), rows)
+    db.session.commit()
+    return rows[:n]
+
+
+def _legacy_agent_metrics(events):
+    """The previous per-agent computation over in-memory events."""
+    by_agent = {}
+    for e in events:
+        by_agent.setdefault(e["agent_id"], []).append(e)
+    out = {}
+    for agent_id, evs in by_agent.items():
+        durations = sorted(e["duration_ms"] for e in evs if e["duration_ms"] is not None)
+        out[agent_id] = {
+            "invocation_count": len(evs),
+            "unique_users": len(set(e["user_id"] for e in evs if e["user_id"])),
+            "success_count": sum(1 for e in evs if e["success"]),
+            "error_count": sum(1 for e in evs if not e["success"]),
+            "avg_duration_ms": sum(durations) / len(durations),
+            "p50_duration_ms": durations[len(durations) // 2],
+            "p95_duration_ms": durations[int(len(durations) * 0.95)],
+            "p99_duration_ms": durations[int(len(durations) * 0.99)],
+        }
+    return out
+
+
+def _legacy_user_metrics(events):
+    by_user = {}
+    for e in events:
+        if e["user_id"]:
+            by_user.setdefault(e["user_id"], []).append(e)
+    return {
+        user_id: {
+            "agents_used": len(set(e["agent_id"] for e in evs)),
+            "total_invocations": len(evs),
+            "active_time_minutes": int(sum(e["duration_ms"] for e in evs if e["duration_ms"] is not None) / 60000),
+        }
+        for user_id, evs in by_user.items()
+    }
+
+
+def test_sketch_quantiles_within_relative_accuracy():
+    rng = random.Random(1)
+    values = sorted(int(rng.lognormvariate(6, 1.5)) + 1 for _ in range(20000))
+    sketch = DurationSketch(relative_accuracy=0.01)
+    for v in values:
+        sketch.add(v)
+
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(len(values) * q)]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.01)
+
+
+def test_sketches_merge():
+    a, b, whole = DurationSketch(), DurationSketch(), DurationSketch()
+    for v in range(1, 1001):
+        (a if v % 2 else b).add(v)
+        whole.add(v)
+    a.merge(b)
+
+    assert a.count == whole.count
+    assert a.quantile(0.95) == whole.quantile(0.95)
+
+
+def test_matches_legacy_implementation(app):
+    events = _seed()
+
+    result = AnalyticsJobService.aggregate_daily_analytics(DAY)
+
+    legacy_agents = _legacy_agent_metrics(events)
+    legacy_users = _legacy_user_metrics(events)
+    assert result["total_events"] == len(events)
+    assert result["agents_aggregated"] == len(legacy_agents)
+    assert result["users_aggregated"] == len(legacy_users)
+
+    for row in AgentAnalyticsDaily.query.filter_by(date=DAY):
+        expected = legacy_agents[row.agent_id]
+        for col in ("invocation_count", "unique_users", "success_count", "error_count"):
+            assert getattr(row, col) == expected[col], col
+        assert float(row.avg_duration_ms) == pytest.approx(expected["avg_duration_ms"], abs=0.01)
+        for col in ("p50_duration_ms", "p95_duration_ms", "p99_duration_ms"):
+            assert getattr(row, col) == pytest.approx(expected[col], rel=0.01, abs=1), col
+
+    for row in UserAnalyticsDaily.query.filter_by(date=DAY):
+        expected = legacy_users[row.user_id]
+        assert row.agents_used == expected["agents_used"]
+        assert row.total_invocations == expected["total_invocations"]
+        assert row.active_time_minutes == expected["active_time_minutes"]
+
+
+@pytest.mark.parametrize("native_upsert", [True, False], ids=["on_conflict", "portable"])
+def test_rerun_updates_rows_in_place(app, monkeypatch, native_upsert):
+    if not native_upsert:
+        monkeypatch.setattr("src.infra.db.NATIVE_UPSERT_DIALECTS", ())
+    _seed(n=500)
+    AnalyticsJobService.aggregate_daily_analytics(DAY)
+    ids_before = {r.agent_id: r.id for r in AgentAnalyticsDaily.query}
+
+    extra = {"id": str(uuid.uuid4()), "agent_id": "agent-0", "user_id": "user-1",
+             "event_type": "invocation", "duration_ms": 10, "success": True,
+             "created_at": datetime.combine(DAY, datetime.min.time()) + timedelta(hours=1)}
+    db.session.execute(AgentUsageEvent.__table__.insert(), [extra])
+    db.session.commit()
+    before = AgentAnalyticsDaily.query.filter_by(agent_id="agent-0").one().invocation_count
+    db.session.expire_all()
+
+    AnalyticsJobService.aggregate_daily_analytics(DAY)
+
+    row = AgentAnalyticsDaily.query.filter_by(agent_id="agent-0").one()
+    assert row.invocation_count == before + 1
+    assert {r.agent_id: r.id for r in AgentAnalyticsDaily.query} == ids_before
+
+
+def test_portable_upsert_increments(app, monkeypatch):
+    from src.infra.db import bulk_upsert
+
+    monkeypatch.setattr("src.infra.db.NATIVE_UPSERT_DIALECTS", ())
+    row = {"user_id": "user-1", "date": DAY, "total_invocations": 3}
+    for agents_used in (1, 2):
+        bulk_upsert(UserAnalyticsDaily, [{**row, "id": str(uuid.uuid4()), "agents_used": agents_used}],
+                    index_elements=["user_id", "date"], update_columns=["agents_used"],
+                    increment_columns=["total_invocations"])
+    db.session.commit()
+
+    stored = UserAnalyticsDaily.query.one()
+    assert (stored.agents_used, stored.total_invocations) == (2, 6)
+
+
+def test_single_agent_aggregation(app):
+    _seed(n=500)
+
+    count = DailyAnalyticsAggregator().aggregate_agents(DAY, agent_id="agent-3")
+    db.session.commit()
+
+    assert count == 1
+    assert [r.agent_id for r in AgentAnalyticsDaily.query] == ["agent-3"]
+
+
+def test_streams_in_chunks(app):
+    events = _seed(n=2000)
+    small = DailyAnalyticsAggregator(chunk_size=97).duration_sketches(DAY)
+    large = DailyAnalyticsAggregator().duration_sketches(DAY)
+
+    assert sum(s.count for s in small.values()) == sum(1 for e in events if e["duration_ms"] is not None)
+    assert {a: dict(s.bins) for a, s in small.items()} == {a: dict(s.bins) for a, s in large.items()}
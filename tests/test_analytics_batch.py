@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for batch usage event ingestion (POST /api/v1/analytics/events/batch).
+"""
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+import src.models  # noqa: F401  (register all mappers)
+from src.database import db
+from src.infra.query_log import profile_queries
+from src.models.agent import Agent
+from src.models.analytics import AgentUsageEvent
+from src.models.marketplace import AgentInstallation
+from src.utils.feature_flags import init_feature_flags
+
+TABLES = [Agent.__table__, AgentUsageEvent.__table__, AgentInstallation.__table__]
+URL = "/api/v1/analytics/events/batch"
+
+
+@pytest.fixture
+def app(make_app, monkeypatch):
+    from src.routes.analytics import analytics_bp
+
+    monkeypatch.setenv("FEATURE_FLAG_AGENT_ANALYTICS", "true")
+    init_feature_flags()
+    app = make_app(TABLES)
+    app.register_blueprint(analytics_bp)
+    return app
+
+
+@pytest.fixture
+def agents(app):
+    agents = [Agent(name=f"Agent {i}", language="en", organization_id="org-1") for i in range(3)]
+    db.session.add_all(agents)
+    db.session.commit()
+    return [a.id for a in agents]
+
+
+def test_json_array_reports_per_item_results(app, agents):
+    events = [
+        {"agent_id": agents[0], "event_type": "invocation", "duration_ms": 12},
+        {"agent_id": agents[1], "event_type": "error", "success": False, "error_message": "boom"},
+        {"event_type": "invocation"},
+        {"agent_id": agents[2], "event_type": "invocation", "duration_ms": -1},
+        {"agent_id": "missing", "event_type": "invocation"},
+        {"agent_id": agents[2], "event_type": "invocation", "metadata": {"sdk": "py"}},
+    ]
+
+    response = app.test_client().post(URL, json=events)
+
+    body = response.get_json()
+    assert response.status_code == 207
+    assert (body["accepted"], body["rejected"]) == (3, 3)
+    assert [r["status"] for r in body["results"]] == [
+        "accepted", "accepted", "rejected", "rejected", "rejected", "accepted"]
+    assert body["results"][4]["error"] == "unknown_agent"
+    stored = {e.id: e for e in AgentUsageEvent.query.all()}
+    assert set(stored) == {r["event_id"] for r in body["results"] if r["status"] == "accepted"}
+    assert stored[body["results"][5]["event_id"]].event_metadata == {"sdk": "py"}
+    assert stored[body["results"][1]["event_id"]].success is False
+
+
+def test_ndjson_stream_with_timestamps(app, agents):
+    lines = [json.dumps({"agent_id": agents[0], "event_type": "invocation",
+                         "timestamp": f"2026-03-14T10:00:0{i}Z"}) for i in range(5)]
+    body = "\n".join(lines) + "\n\n"
+
+    response = app.test_client().post(URL, data=body, content_type="application/x-ndjson")
+
+    assert response.status_code == 201
+    assert response.get_json()["accepted"] == 5
+    times = sorted(e.created_at.replace(tzinfo=timezone.utc) for e in AgentUsageEvent.query.all())
+    assert times[0] == datetime(2026, 3, 14, 10, 0, 0, tzinfo=timezone.utc)
+
+
+def test_batch_is_constant_queries_and_coalesces_installations(app, agents):
+    db.session.add_all([
+        AgentInstallation(agent_id=agents[0], user_id="user-1"),
+        AgentInstallation(agent_id=agents[1], user_id="user-1",
+                          uninstalled_at=datetime(2026, 1, 1)),
+        AgentInstallation(agent_id=agents[0], user_id="user-2"),
+    ])
+    db.session.commit()
+    events = [{"agent_id": agents[i % 2], "event_type": "invocation"} for i in range(500)]
+
+    with profile_queries() as queries:
+        response = app.test_client().post(URL, json={"events": events}, headers={"X-User-ID": "user-1"})
+
+    assert response.status_code == 201
+    assert AgentUsageEvent.query.count() == 500
+    # agent lookup, bulk insert, one installation update
+    assert 0 < queries.count <= 4
+    used = {(i.agent_id, i.user_id): i.last_used_at for i in AgentInstallation.query.all()}
+    assert used[(agents[0], "user-1")] is not None
+    assert used[(agents[1], "user-1")] is None
+    assert used[(agents[0], "user-2")] is None
+
+
+def test_batch_limits(app, agents, monkeypatch):
+    monkeypatch.setattr("src.routes.analytics.MAX_BATCH_EVENTS", 3)
+    client = app.test_client()
+    event = {"agent_id": agents[0], "event_type": "invocation"}
+
+    assert client.post(URL, json=[event] * 4).status_code == 413
+    ndjson = "\n".join(json.dumps(event) for _ in range(4))
+    assert client.post(URL, data=ndjson, content_type="application/x-ndjson").status_code == 413
+    assert client.post(URL, data="{bad", content_type="application/x-ndjson").status_code == 400
+    assert client.post(URL, json={"agent_id": agents[0]}).status_code == 400
+    response = client.post(URL, json=[{"event_type": "invocation"}])
+    assert response.status_code == 400 and response.get_json()["rejected"] == 1
+    assert AgentUsageEvent.query.count() == 0
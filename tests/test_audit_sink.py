@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the async batched audit sink (ApiAuditLog + AuditLog).
+"""
+import os
+import threading
+import time
+import uuid
+
+import pytest
+from flask import g, jsonify
+from sqlalchemy import event
+
+import src.models  # noqa: F401  (register all mappers)
+from src.database import db
+from src.infra.query_log import profile_queries
+from src.middleware.security_middleware import log_audit_event
+from src.models.api_gateway import ApiAuditLog
+from src.models.audit_log import AuditLog
+from src.services import audit_sink as audit_sink_module
+from src.services.audit_logger import init_audit_logging
+from src.services.audit_sink import AuditSink, audit_rows_total
+
+TABLES = [ApiAuditLog.__table__, AuditLog.__table__]
+ORG_ID = "5f0c1f6e-2a4b-4c6d-8e9f-a1b2c3d4e5f6"
+COMMIT_DELAY = 0.3
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    return make_app(TABLES, uri=f"sqlite:///{tmp_path / 'audit.db'}")
+
+
+def _sink(app, tmp_path, **kwargs):
+    # Long interval and batches larger than the queue: tests decide when to flush
+    options = {"flush_interval": 60, "batch_size": 100, "spool_path": str(tmp_path / "spool.jsonl"), **kwargs}
+    sink = AuditSink(**options)
+    sink.init_app(app, handle_signals=False)
+    return sink
+
+
+def _api_row(i=0):
+    return ApiAuditLog.build_row(org_id=ORG_ID, actor_type="api_key", actor_id=f"key-{i}",
+                                 request_id=f"req-{i}", method="GET", path="/api/v1/ping", status=200)
+
+
+def _dropped(table):
+    return sum(s.value for m in audit_rows_total.collect() for s in m.samples
+               if s.name.endswith("_total") and s.labels == {"table": table, "outcome": "dropped"})
+
+
+def test_request_does_not_wait_for_audit_commit(app, tmp_path):
+    sink = _sink(app, tmp_path)
+    init_audit_logging(app)
+
+    @app.before_request
+    def authenticate():
+        g.request_start_time = time.time()
+        g.org_id, g.actor_id, g.actor_type = ORG_ID, "key-1", "api_key"
+
+    @app.get("/api/v1/ping")
+    def ping():
+        log_audit_event("api_call", api_key_id="key-1", resource_type="agent", details={"status_code": 200})
+        return jsonify(ok=True)
+
+    commits = []
+
+    def slow_commit(conn):
+        commits.append(1)
+        time.sleep(COMMIT_DELAY)
+
+    event.listen(db.engine, "commit", slow_commit)
+    try:
+        with profile_queries() as queries:
+            start = time.perf_counter()
+            response = app.test_client().get("/api/v1/ping")
+            request_seconds = time.perf_counter() - start
+
+        assert response.status_code == 200
+        assert queries.count == 0 and commits == []
+        assert request_seconds < COMMIT_DELAY
+        assert sink.queue_depth() == 2
+
+        start = time.perf_counter()
+        sink.flush()
+        assert time.perf_counter() - start >= COMMIT_DELAY
+        assert len(commits) == 1  # both tables, one transaction
+    finally:
+        event.remove(db.engine, "commit", slow_commit)
+        sink.stop()
+
+    api_log = ApiAuditLog.query.one()
+    assert (api_log.org_id, api_log.actor_id, api_log.path) == (uuid.UUID(ORG_ID), "key-1", "/api/v1/ping")
+    audit_log = AuditLog.query.one()
+    assert (audit_log.actor_id, audit_log.action, audit_log.resource_type) == ("key-1", "api_call", "agent")
+    assert audit_log.details["status_code"] == 200 and "ip_address" in audit_log.details
+
+
+def test_flush_batches_mixed_tables(app, tmp_path):
+    sink = _sink(app, tmp_path, max_queue_size=2_000, batch_size=500)
+    commits = []
+    event.listen(db.engine, "commit", lambda conn: commits.append(1))
+    try:
+        for i in range(600):
+            sink.submit(ApiAuditLog, _api_row(i))
+            sink.submit(AuditLog, AuditLog.build_row(actor_id=f"key-{i}", action="api_call"))
+        sink.flush()
+    finally:
+        sink.stop()
+
+    assert len(commits) == 3
+    assert ApiAuditLog.query.count() == 600 and AuditLog.query.count() == 600
+
+
+def test_overflow_policies(app, tmp_path):
+    dropping = _sink(app, tmp_path, max_queue_size=2, overflow="drop")
+    before = _dropped("api_audit_log")
+    assert [dropping.submit(ApiAuditLog, _api_row(i)) for i in range(3)] == [True, True, False]
+    assert _dropped("api_audit_log") == before + 1
+    dropping.stop()
+
+    blocking = _sink(app, tmp_path, max_queue_size=2, overflow="block", block_timeout=0.05)
+    blocking.submit(ApiAuditLog, _api_row(0))
+    blocking.submit(ApiAuditLog, _api_row(1))
+    start = time.perf_counter()
+    assert blocking.submit(ApiAuditLog, _api_row(2)) is False
+    assert time.perf_counter() - start >= 0.05
+    blocking.block_timeout = 5
+    threading.Timer(0.05, lambda: blocking._drain(1)).start()
+    assert blocking.submit(ApiAuditLog, _api_row(3)) is True  # waited for space
+    blocking.stop()
+
+    spooling = _sink(app, tmp_path, max_queue_size=1, overflow="spool")
+    spooling.submit(AuditLog, AuditLog.build_row(actor_id="key-0", action="api_call", details={"n": 0}))
+    assert spooling.submit(ApiAuditLog, _api_row(9)) is False
+    assert spooling.spool.has_rows()
+    assert spooling.replay_spool() == 1
+    spooling.stop()
+
+    assert ApiAuditLog.query.filter_by(request_id="req-9").one().org_id == uuid.UUID(ORG_ID)
+    assert AuditLog.query.one().details == {"n": 0}
+
+
+def test_failed_write_is_spooled_and_replayed(app, tmp_path, monkeypatch):
+    sink = _sink(app, tmp_path)
+    for i in range(5):
+        sink.submit(ApiAuditLog, _api_row(i))
+
+    with monkeypatch.context() as m:
+        m.setattr(audit_sink_module, "_write_batch", lambda entries: 1 / 0)
+        sink.flush()
+    assert ApiAuditLog.query.count() == 0 and sink.spool.has_rows()
+
+    # A restarted process replays the spool on init
+    restarted = _sink(app, tmp_path)
+    assert ApiAuditLog.query.count() == 5 and not restarted.spool.has_rows()
+    sink.stop()
+    restarted.stop()
+
+
+def test_claim_left_by_crashed_replay_is_adopted(app, tmp_path):
+    sink = _sink(app, tmp_path)
+    sink.spool.append([(ApiAuditLog.__table__, _api_row(i)) for i in range(4)])
+
+    # Crash after committing part of the claimed rows, before release
+    claimed, entries = sink.spool.claim()
+    audit_sink_module._write_batch(entries[:2])
+
+    restarted = _sink(app, tmp_path)
+    assert ApiAuditLog.query.count() == 4 and not restarted.spool.has_rows()
+    assert not [path for path in claimed if os.path.exists(path)]
+    sink.stop()
+    restarted.stop()
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the two-tier cache: L1/L2 lookups, single flight, early
+expiration and tag invalidation. Uses fakeredis for L2.
+"""
+import threading
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from src.services import caching_service as caching  # noqa: E402
+from src.services.caching_service import (  # noqa: E402
+    CacheEntry, CachingService, LocalCache, TAG_KEY, cached
+)
+
+
+def _sample(metric, *labels):
+    for family in metric.collect():
+        for sample in family.samples:
+            if sample.name.endswith("_total") and tuple(sample.labels.values()) == labels:
+                return sample.value
+    return 0.0
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def make_cache(server):
+    def make(**kwargs):
+        kwargs.setdefault("lock_timeout", 2)
+        return CachingService(redis_client=fakeredis.FakeRedis(server=server), **kwargs)
+    return make
+
+
+class SlowSource:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+        time.sleep(self.delay)
+        return {"n": n}
+
+
+def test_l1_serves_repeat_reads_without_redis(make_cache, monkeypatch):
+    cache = make_cache()
+    assert cache.get_or_set("k", lambda: [1, 2], ttl=60) == [1, 2]
+    monkeypatch.setattr(cache.redis_client, "execute_command",
+                        lambda *a, **kw: pytest.fail("unexpected Redis call"))
+    l1_hits = _sample(caching.cache_requests_total, "l1", "hit")
+
+    for _ in range(100):
+        assert cache.get("k") == [1, 2]
+
+    assert _sample(caching.cache_requests_total, "l1", "hit") == l1_hits + 100
+
+
+def test_l2_is_shared_between_processes(make_cache):
+    writer, reader = make_cache(), make_cache()
+    writer.set("k", {"a": 1}, ttl=60)
+
+    assert reader.get("k") == {"a": 1}
+    assert len(reader.l1) == 1
+    # Plain JSON values written without metadata are still readable
+    writer.redis_client.set("legacy", '{"b": 2}')
+    assert reader.get("legacy") == {"b": 2}
+
+
+def test_local_cache_is_bounded_lru():
+    l1 = LocalCache(max_size=2, ttl_seconds=10)
+    now = time.time()
+    entry = CacheEntry("v", now + 60, 0.0)
+    l1.put("a", entry, now)
+    l1.put("b", entry, now)
+    assert l1.get("a", now) is entry  # a is now most recent
+    l1.put("c", entry, now)
+
+    assert l1.get("b", now) is None
+    assert l1.get("a", now) is entry
+    assert l1.get("c", now + 11) is None  # L1 TTL
+
+
+def test_single_flight_within_a_process(make_cache):
+    cache = make_cache()
+    source = SlowSource(delay=0.2)
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_set("k", source, ttl=60)))
+               for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert source.calls == 1
+    assert results == [{"n": 1}] * 20
+
+
+def test_single_flight_across_processes(make_cache):
+    caches = [make_cache() for _ in range(4)]
+    source = SlowSource(delay=0.2)
+    results = []
+
+    threads = [threading.Thread(target=lambda c=c: results.append(c.get_or_set("k", source, ttl=60)))
+               for c in caches]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert source.calls == 1
+    assert results == [{"n": 1}] * 4
+    assert caches[0].redis_client.get("cache:lock:k") is None  # released
+
+
+def test_compute_errors_are_not_cached(make_cache):
+    cache = make_cache()
+
+    def broken():
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_set("k", broken, ttl=60)
+    assert cache.get_or_set("k", lambda: "ok", ttl=60) == "ok"
+
+
+def test_xfetch_refreshes_before_expiry(make_cache, monkeypatch):
+    cache = make_cache(l1_size=0)
+    now = time.time()
+    cache._store("k", CacheEntry("old", now + 1.0, 0.5), 60, None)
+    other = make_cache(l1_size=0)
+
+    # -log(1 - 0.99) * 0.5 = 2.3s ahead: well past the 1s left
+    monkeypatch.setattr(caching.random, "random", lambda: 0.99)
+    assert other._acquire("k")  # someone else is already refreshing
+    assert cache.get_or_set("k", lambda: "new", ttl=60) == "old"
+    cache.redis_client.delete("cache:lock:k")
+    assert cache.get_or_set("k", lambda: "new", ttl=60) == "new"
+
+    # Far from expiry, or with beta=0, nothing is recomputed
+    monkeypatch.setattr(caching.random, "random", lambda: 0.5)
+    assert cache.get_or_set("k", lambda: "newer", ttl=60) == "new"
+    assert make_cache(beta=0)._expires_early(CacheEntry("v", now, 10.0), now) is False
+
+
+def test_tag_ttl_covers_longest_member_on_redis_6():
+    # EXPIRE NX/GT arrived in Redis 7
+    cache = CachingService(redis_client=fakeredis.FakeRedis(server=fakeredis.FakeServer(version=6)))
+    cache.set("agent:1", 1, ttl=600, tags=["agents"])
+    cache.set("agent:2", 2, ttl=60, tags=["agents"])
+
+    assert cache.redis_client.ttl(TAG_KEY.format("agents")) > 60
+    assert cache.redis_client.smembers(TAG_KEY.format("agents")) == {b"agent:1", b"agent:2"}
+    assert cache.redis_client.ttl("agent:2") <= 60
+
+
+def test_invalidate_tags_uses_tag_sets(make_cache, monkeypatch):
+    cache = make_cache()
+    cache.set("agent:1", 1, ttl=60, tags=["agent:1", "agents"])
+    cache.set("agent:2", 2, ttl=600, tags=["agents"])
+    cache.set("other", 3, ttl=60)
+    assert cache.get("agent:1") == 1  # fill L1
+    monkeypatch.setattr(cache.redis_client, "scan_iter", lambda *a, **kw: pytest.fail("keyspace scan"))
+    assert 0 < cache.redis_client.ttl(TAG_KEY.format("agents")) <= 600
+
+    assert cache.invalidate_tags(["agents"]) == 2
+
+    assert cache.get("agent:1") is None
+    assert cache.get("agent:2") is None
+    assert cache.get("other") == 3
+    assert not cache.redis_client.exists(TAG_KEY.format("agents"))
+
+
+def test_cached_decorator(make_cache):
+    cache = make_cache()
+    calls = []
+
+    @cached(ttl=60, tags=lambda agent_id, **kw: [f"agent:{agent_id}"], service=cache)
+    def profile(agent_id, verbose=False):
+        calls.append(agent_id)
+        return {"id": agent_id, "verbose": verbose}
+
+    assert profile("a") == {"id": "a", "verbose": False}
+    assert profile("a") == {"id": "a", "verbose": False}
+    assert profile("a", verbose=True)["verbose"] is True
+    assert profile("b")["id"] == "b"
+    assert calls == ["a", "a", "b"]
+
+    cache.invalidate_tags(["agent:a"])
+    profile("a")
+    assert calls == ["a", "a", "b", "a"]
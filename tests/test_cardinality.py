@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the cardinality guard on tenant-labelled gateway metrics.
+"""
+import random
+
+from flask import Flask
+from prometheus_client import CollectorRegistry
+
+from src.services.cardinality import OTHER_LABEL, CardinalityGuard, SpaceSaving
+from src.services.gateway_metrics import GatewayMetrics, init_gateway_metrics
+from src.services.metrics import init_metrics
+
+
+def _series(metric, label):
+    return {s.labels[label]: s.value for m in metric.collect() for s in m.samples
+            if s.name.endswith("_total")}
+
+
+def test_space_saving_keeps_heavy_hitters_in_bounded_memory():
+    rng = random.Random(7)
+    sketch = SpaceSaving(capacity=50)
+    stream = [f"heavy-{i}" for i in range(5) for _ in range(2_000)]
+    stream += [f"tail-{i}" for i in range(20_000)]
+    rng.shuffle(stream)
+    for item in stream:
+        sketch.add(item)
+
+    assert len(sketch) == 50 and sketch.total == len(stream)
+    top = sketch.top(5)
+    assert {item for item, _, _ in top} == {f"heavy-{i}" for i in range(5)}
+    for item, estimate, error in top:
+        assert estimate - error <= 2_000 <= estimate
+
+
+def test_gateway_labels_bounded_to_top_k():
+    metrics = GatewayMetrics(CollectorRegistry(), top_k=3)
+    metrics.guard = CardinalityGuard(("key_id", "org_id", "actor_id", "client_id"),
+                                     top_k=3, rebalance_every=100)
+    # First come first admitted, then the tail is folded into "other"
+    for actor in ("a", "b", "c", "d", "e"):
+        metrics.record_risk_score(org_id=actor)
+    assert _series(metrics.risk_score_computed, "org_id") == {"a": 1, "b": 1, "c": 1, OTHER_LABEL: 2}
+
+    # A rebalance promotes the real heavy hitters and drops demoted series
+    for _ in range(40):
+        for org in ("x", "y", "z"):
+            metrics.record_risk_score(org_id=org)
+    series = _series(metrics.risk_score_computed, "org_id")
+    assert {"x", "y", "z"} <= set(series) and not {"a", "b", "c"} & set(series)
+    assert len(series) == 4
+
+    metrics.record_api_key_usage(key_id="k1", org_id="tail-org")
+    usage = {tuple(s.labels.values()) for m in metrics.api_key_usage_total.collect() for s in m.samples
+             if s.name.endswith("_total")}
+    assert usage == {("k1", OTHER_LABEL)}
+
+
+def test_cardinality_endpoint_lists_dropped_label_sets(monkeypatch):
+    monkeypatch.setenv("BRIKK_METRICS_LABEL_TOP_K", "2")
+    monkeypatch.setenv("BRIKK_ADMIN_TOKEN", "test-admin-token")
+    app = Flask(__name__)
+    with app.app_context():
+        init_metrics(app)
+        init_gateway_metrics(app)
+        gateway = app.extensions["gateway_metrics"]
+        for i in range(5):
+            gateway.record_rate_limit_remaining(actor_id=f"actor-{i}", tier="free", remaining=10 - i)
+        gateway.record_rate_limit_remaining(actor_id="actor-4", tier="free", remaining=3)
+
+        client = app.test_client()
+        assert client.get("/metrics/cardinality").status_code == 401
+        report = client.get("/metrics/cardinality?limit=2",
+                            headers={"Authorization": "Bearer test-admin-token"}).get_json()
+
+    assert report["top_k"] == 2
+    assert report["labels"]["actor_id"] == {"observations": 6, "tracked": 2, "dropped_observations": 4}
+    assert report["dropped"][0] == {"metric": "brikk_rate_limit_remaining",
+                                    "labels": {"actor_id": "actor-4", "tier": "free"},
+                                    "count": 2, "error": 0}
+    assert len(report["dropped"]) == 2
@@ -21,7 +21,7 @@ from src.factory import create_app
 from src.models.api_key import ApiKey
 from src.models.org import Organization
 from src.services.security_enhanced import HMACSecurityService
-from src.services.idempotency import IdempotencyService
+from src.services.idempotency import IdempotencyOutcome, IdempotencyService
 
 
 class TestCoordinationAuth:
@@ -257,7 +257,7 @@ class TestCoordinationAuth:
             mock_api_key.update_usage.assert_called_once_with(success=False)
 
     @patch('src.models.api_key.ApiKey.query')
-    @patch('src.services.idempotency.IdempotencyService.process_request_idempotency')
+    @patch('src.services.idempotency.IdempotencyService.begin_request')
     def test_coordination_endpoint_idempotent_replay(
             self,
             mock_idempotency,
@@ -273,7 +273,7 @@ class TestCoordinationAuth:
             "status": "accepted",
             "echo": {"message_id": valid_envelope['message_id']}
         }
-        mock_idempotency.return_value = (False, cached_response, 202)
+        mock_idempotency.return_value = IdempotencyOutcome(False, cached_response, 202)
 
         with patch.dict(os.environ, {
             'BRIKK_FEATURE_PER_ORG_KEYS': 'true',
@@ -297,14 +297,14 @@ class TestCoordinationAuth:
             assert data['echo']['message_id'] == valid_envelope['message_id']
 
     @patch('src.models.api_key.ApiKey.query')
-    @patch('src.services.idempotency.IdempotencyService.process_request_idempotency')
+    @patch('src.services.idempotency.IdempotencyService.begin_request')
     def test_coordination_endpoint_idempotency_conflict(
             self, mock_idempotency, mock_query, client, valid_envelope, mock_api_key):
         """Test coordination endpoint with idempotency conflict (same key, different body)."""
         mock_query.filter_by.return_value.first.return_value = mock_api_key
 
         # Mock idempotency service to return conflict
-        mock_idempotency.return_value = (
+        mock_idempotency.return_value = IdempotencyOutcome(
             False,
             {
                 'code': 'idempotency_conflict',
@@ -438,8 +438,8 @@ class TestCoordinationAuth:
             )
             headers['Idempotency-Key'] = 'custom-idempotency-key'
 
-            with patch.object(IdempotencyService, 'process_request_idempotency') as mock_process:
-                mock_process.return_value = (True, None, None)
+            with patch.object(IdempotencyService, 'begin_request') as mock_process:
+                mock_process.return_value = IdempotencyOutcome(True)
 
                 response = client.post(
                     '/api/v1/coordination',
@@ -451,5 +451,5 @@ class TestCoordinationAuth:
 
                 # Verify idempotency service was called with custom key
                 mock_process.assert_called_once()
-                call_args = mock_process.call_args[0]
-                assert call_args[2] == 'custom-idempotency-key'
+                call_kwargs = mock_process.call_args.kwargs
+                assert call_kwargs['custom_idempotency_key'] == 'custom-idempotency-key'
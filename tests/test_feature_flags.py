@@ -4,12 +4,14 @@ Tests for Feature Flags System
 
 import pytest
 import os
+import time
 from src.utils.feature_flags import (
     FeatureFlag,
     FeatureFlagManager,
     is_enabled,
     init_feature_flags,
     get_all_flags,
+    rollout_bucket,
 )
 
 
@@ -118,3 +120,163 @@ class TestFeatureFlagEnum:
             assert flag.value == flag.value.lower()
             assert " " not in flag.value
 
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestFlagSnapshot:
+    """Tests for the in-memory snapshot, invalidation and rollouts"""
+    
+    @pytest.fixture
+    def server(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        return fakeredis.FakeServer()
+    
+    @pytest.fixture
+    def make_manager(self, server):
+        import fakeredis
+        managers = []
+        
+        def make(**kwargs):
+            manager = FeatureFlagManager(fakeredis.FakeRedis(server=server), **kwargs)
+            managers.append(manager)
+            return manager
+        
+        yield make
+        for manager in managers:
+            manager.stop_listener()
+    
+    def test_checks_are_served_from_memory(self, make_manager, monkeypatch):
+        manager = make_manager()
+        manager.redis_client.set("feature_flag:agent_marketplace", "true")
+        manager.refresh()
+        calls = []
+        monkeypatch.setattr(manager.redis_client, "execute_command",
+                            lambda *args, **kwargs: calls.append(args))
+        monkeypatch.setattr(os, "getenv", lambda *args: calls.append(args))
+        
+        for _ in range(1000):
+            assert manager.is_enabled(FeatureFlag.AGENT_MARKETPLACE) is True
+        
+        assert calls == []
+    
+    def test_refresh_is_one_round_trip(self, make_manager, monkeypatch):
+        manager = make_manager()
+        commands = []
+        original = manager.redis_client.execute_command
+        monkeypatch.setattr(manager.redis_client, "execute_command",
+                            lambda *args, **kwargs: commands.append(args[0]) or original(*args, **kwargs))
+        
+        manager.refresh()
+        
+        assert commands == ["MGET"]
+    
+    def test_invalidation_message_updates_other_processes(self, make_manager):
+        reader = make_manager(ttl=3600)
+        writer = make_manager(ttl=3600)
+        reader.start_listener()
+        assert reader.is_enabled(FeatureFlag.AGENT_ANALYTICS) is False
+        time.sleep(0.1)  # let the listener subscribe
+        
+        assert writer.set_flag(FeatureFlag.AGENT_ANALYTICS, True)
+        
+        assert writer.is_enabled(FeatureFlag.AGENT_ANALYTICS) is True
+        assert _wait_for(lambda: reader.is_enabled(FeatureFlag.AGENT_ANALYTICS))
+    
+    def test_ttl_fallback_refreshes_in_background(self, make_manager):
+        manager = make_manager(ttl=0.05)
+        manager.redis_client.set("feature_flag:reviews_ratings", "true")  # no invalidation
+        assert manager.is_enabled(FeatureFlag.REVIEWS_RATINGS) is False
+        
+        time.sleep(0.06)
+        
+        assert _wait_for(lambda: manager.is_enabled(FeatureFlag.REVIEWS_RATINGS))
+    
+    def test_environment_overrides_redis(self, make_manager, monkeypatch):
+        monkeypatch.setenv("FEATURE_FLAG_CACHING", "false")
+        manager = make_manager()
+        
+        assert manager.set_flag(FeatureFlag.CACHING, True)
+        
+        assert manager.is_enabled(FeatureFlag.CACHING) is False
+    
+    def test_percentage_rollout_is_deterministic(self, make_manager):
+        manager = make_manager()
+        orgs = [f"org-{i}" for i in range(2000)]
+        
+        assert manager.set_rollout(FeatureFlag.AGENT_ANALYTICS, 30)
+        at_30 = {org for org in orgs if manager.is_enabled(FeatureFlag.AGENT_ANALYTICS, org_id=org)}
+        assert 500 <= len(at_30) <= 700
+        # Same answer in another process, and org_id is required
+        assert at_30 == {org for org in orgs if make_manager().is_enabled(FeatureFlag.AGENT_ANALYTICS, org)}
+        assert manager.is_enabled(FeatureFlag.AGENT_ANALYTICS) is False
+        
+        manager.set_rollout(FeatureFlag.AGENT_ANALYTICS, 60)
+        at_60 = {org for org in orgs if manager.is_enabled(FeatureFlag.AGENT_ANALYTICS, org_id=org)}
+        assert at_30 < at_60
+        assert all(rollout_bucket(FeatureFlag.AGENT_ANALYTICS, org) < 60 for org in at_60)
+    
+    def test_environment_rollout(self, monkeypatch):
+        monkeypatch.setenv("FEATURE_FLAG_DEBUG_MODE", "25%")
+        manager = FeatureFlagManager()
+        
+        assert manager.get_rollout(FeatureFlag.DEBUG_MODE) == 25
+        enabled = sum(manager.is_enabled(FeatureFlag.DEBUG_MODE, org_id=i) for i in range(1000))
+        assert 180 <= enabled <= 320
+
+
+
+class TestRouteRollout:
+    """Route guards evaluate rollouts for the org that auth put on g"""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        from flask import Flask, g, request
+        from src.routes import agent_discovery
+        from src.utils import feature_flags
+
+        monkeypatch.setenv("FEATURE_FLAG_ENHANCED_DISCOVERY", "50%")
+        monkeypatch.setattr(feature_flags, "_manager", FeatureFlagManager())
+        monkeypatch.setattr(agent_discovery.DiscoveryService, "search_agents",
+                            staticmethod(lambda **kwargs: {"results": [], "total": 0}))
+
+        app = Flask(__name__)
+
+        @app.before_request
+        def authenticate():
+            # What unified_auth does for an authenticated request
+            if "X-Org" in request.headers:
+                g.org_id = request.headers["X-Org"]
+
+        app.register_blueprint(agent_discovery.agent_discovery_bp)
+        return app.test_client()
+
+    def test_partial_rollout_follows_request_org(self, client):
+        orgs = [f"org-{i}" for i in range(20)]
+        inside = next(o for o in orgs if rollout_bucket(FeatureFlag.ENHANCED_DISCOVERY, o) < 50)
+        outside = next(o for o in orgs if rollout_bucket(FeatureFlag.ENHANCED_DISCOVERY, o) >= 50)
+
+        assert client.get("/api/v1/agent-discovery/search", headers={"X-Org": inside}).status_code == 200
+        assert client.get("/api/v1/agent-discovery/search", headers={"X-Org": outside}).status_code == 503
+        assert client.get("/api/v1/agent-discovery/search").status_code == 503
+
+    def test_current_org_id_sources(self):
+        from flask import Flask, g
+        from src.models.api_key import VerifiedKeyContext
+        from src.utils.feature_flags import current_org_id
+
+        assert current_org_id() is None
+        with Flask(__name__).test_request_context():
+            assert current_org_id() is None
+            g.api_key_context = VerifiedKeyContext(1, "bk_1", 7, None, None)
+            assert current_org_id() == 7
+            g.organization_id = 8
+            assert current_org_id() == 8
+            g.org_id = "org-uuid"
+            assert current_org_id() == "org-uuid"
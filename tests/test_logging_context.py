@@ -8,6 +8,7 @@ and integration with Flask request lifecycle.
 
 import pytest
 import json
+import os
 import uuid
 import logging
 import io
@@ -18,9 +19,11 @@ from src.services.request_context import (
     RequestContextMiddleware, init_request_context,
     get_request_id, get_request_context, set_auth_context
 )
+from src.services import structured_logging
 from src.services.structured_logging import (
     StructuredLogger, StructuredFormatter, get_logger,
-    configure_logging, LoggingMiddleware, init_logging
+    configure_logging, LoggingMiddleware, init_logging,
+    ContextQueueHandler, EventSampler, start_async_logging, stop_async_logging
 )
 
 
@@ -563,5 +566,143 @@ class TestLoggingIntegration:
         assert logger.logger.name == 'test.module'
 
 
+class TestAsyncLogging:
+    """Test queue-based logging and event sampling."""
+
+    @pytest.fixture
+    def capture(self):
+        """Attach a JSON stream handler to a dedicated logger; yields (logger, stream, attach)."""
+        stream = io.StringIO()
+        stream_handler = logging.StreamHandler(stream)
+        stream_handler.setFormatter(StructuredFormatter(json_enabled=True))
+        logger = StructuredLogger('test.async')
+        logger.logger.setLevel(logging.DEBUG)
+        logger.logger.propagate = False
+        attached = []
+
+        def attach(handler):
+            logger.logger.addHandler(handler)
+            attached.append(handler)
+            return handler
+
+        yield logger, stream, stream_handler, attach
+        for handler in attached:
+            logger.logger.removeHandler(handler)
+        stop_async_logging()
+
+    def _lines(self, stream):
+        return [json.loads(line) for line in stream.getvalue().strip().split('\n') if line]
+
+    def test_context_captured_on_request_thread(self, app, capture):
+        """Request context is taken when logging, not when the listener formats."""
+        logger, stream, stream_handler, attach = capture
+        attach(start_async_logging(stream_handler))
+        init_request_context(app)
+
+        @app.route('/test')
+        def test_route():
+            logger.info('Async message', event_type='coordination_success')
+            return {'request_id': get_request_id()}
+
+        response = app.test_client().get('/test?x=1')
+        stop_async_logging()
+
+        [entry] = self._lines(stream)
+        assert entry['message'] == 'Async message'
+        assert entry['request_id'] == response.get_json()['request_id']
+        assert entry['path'] == '/test'
+        assert entry['event_type'] == 'coordination_success'
+
+    def test_message_args_merged_before_queueing(self, capture):
+        logger, stream, stream_handler, attach = capture
+        handler = attach(start_async_logging(stream_handler))
+        args = ['before']
+        logger.logger.info('value: %s', args)
+        args[0] = 'after'
+        stop_async_logging()
+
+        assert isinstance(handler, ContextQueueHandler)
+        assert self._lines(stream)[0]['message'] == "value: ['before']"
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason="requires os.fork")
+    def test_child_gets_own_queue_after_fork(self, capture, tmp_path):
+        logger, _, _, attach = capture
+        file_handler = logging.FileHandler(tmp_path / 'log.jsonl')
+        file_handler.setFormatter(StructuredFormatter(json_enabled=True))
+        handler = attach(start_async_logging(file_handler))
+        parent_queue = handler.queue
+        logger.info('Parent message')
+
+        pid = os.fork()
+        if pid == 0:  # child: log through a fresh queue and listener thread
+            ok = False
+            try:
+                logger.info('Child message')
+                ok = handler.queue is not parent_queue
+                stop_async_logging()
+            finally:
+                os._exit(0 if ok else 1)
+
+        _, status = os.waitpid(pid, 0)
+        stop_async_logging()
+        assert os.WEXITSTATUS(status) == 0
+        messages = [json.loads(line)['message'] for line in (tmp_path / 'log.jsonl').read_text().splitlines()]
+        assert sorted(messages) == ['Child message', 'Parent message']
+
+    @patch.dict('os.environ', {'BRIKK_LOG_ASYNC': 'true'})
+    def test_configure_logging_async(self, app):
+        configure_logging(app)
+        try:
+            handler = logging.getLogger().handlers[0]
+            assert isinstance(handler, ContextQueueHandler)
+            assert structured_logging._listener is not None
+        finally:
+            stop_async_logging()
+
+    def test_json_fallback_without_orjson(self, monkeypatch):
+        monkeypatch.setattr(structured_logging, 'orjson', None)
+        record = logging.LogRecord('test.logger', logging.INFO, 'test.py', 1, 'Fallback', (), None)
+        record.extra_fields = {'count': 2 ** 70}
+        assert json.loads(StructuredFormatter(json_enabled=True).format(record))['count'] == 2 ** 70
+
+    def test_sampling(self, capture):
+        logger, stream, stream_handler, attach = capture
+        stream_handler.addFilter(EventSampler(sample_rates={'noisy': 0.0, 'kept': 1.0}))
+        attach(stream_handler)
+        for _ in range(10):
+            logger.info('Noisy', event_type='noisy')
+        logger.info('Kept', event_type='kept')
+        logger.info('Unsampled')
+
+        entries = self._lines(stream)
+        assert [e['message'] for e in entries] == ['Kept', 'Unsampled']
+        assert entries[0]['sample_rate'] == 1.0
+
+    def test_rate_limited_deduplication(self, capture, monkeypatch):
+        logger, stream, stream_handler, attach = capture
+        stream_handler.addFilter(EventSampler(rate_limits={'coordination_success': (2, 60.0)}))
+        attach(stream_handler)
+        now = [1000.0]
+        monkeypatch.setattr(structured_logging.time, 'monotonic', lambda: now[0])
+
+        for _ in range(5):
+            logger.info('Coordination request processed successfully', event_type='coordination_success')
+        logger.info('Other message', event_type='coordination_success')
+        now[0] += 61
+        logger.info('Coordination request processed successfully', event_type='coordination_success')
+
+        entries = self._lines(stream)
+        assert [e['message'] for e in entries].count('Coordination request processed successfully') == 3
+        assert entries[-1]['suppressed'] == 3
+        assert 'suppressed' not in entries[0]
+
+    @patch.dict('os.environ', {'BRIKK_LOG_SAMPLE': 'coordination_success=0.1, request_end=0.5',
+                               'BRIKK_LOG_RATE_LIMIT': 'auth_event=100/30'})
+    def test_sampler_from_env(self):
+        sampler = EventSampler.from_env()
+        assert sampler.sample_rates == {'coordination_success': 0.1, 'request_end': 0.5}
+        assert sampler.rate_limits == {'auth_event': (100, 30.0)}
+
+
 if __name__ == '__main__':
     pytest.main([__file__])
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Query-count tests for marketplace listing and search responses.
+
+Serialising a page must not issue per-row queries for agents or ratings.
+"""
+import pytest
+
+import src.models  # noqa: F401  (register all mappers)
+from src.database import db
+from src.infra.db import batch_load
+from src.infra.query_log import profile_queries
+from src.models.agent import Agent
+from src.models.marketplace import MarketplaceListing
+from src.models.reviews import AgentRatingSummary
+from src.services.discovery import DiscoveryService
+from src.utils.feature_flags import init_feature_flags
+
+TABLES = [Agent.__table__, MarketplaceListing.__table__, AgentRatingSummary.__table__]
+
+
+@pytest.fixture
+def app(make_app, monkeypatch):
+    from src.routes.marketplace import marketplace_bp
+
+    monkeypatch.setenv("FEATURE_FLAG_AGENT_MARKETPLACE", "true")
+    init_feature_flags()  # rebuild the flag snapshot with the override
+    app = make_app(TABLES, BRIKK_SEARCH_BACKEND="like")
+    app.register_blueprint(marketplace_bp)
+    return app
+
+
+def _seed(n):
+    for i in range(n):
+        agent = Agent(name=f"Agent {i}", language="en", organization_id="org-1")
+        db.session.add(agent)
+        db.session.flush()
+        db.session.add(MarketplaceListing(
+            agent_id=agent.id, publisher_id="user-1", status="published",
+            short_description=f"helper number {i}", install_count=i))
+        if i % 2:
+            db.session.add(AgentRatingSummary(agent_id=agent.id, total_reviews=1, average_rating=4))
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def test_batch_load(app):
+    _seed(3)
+    agents = Agent.query.all()
+    ids = [a.id for a in agents]
+    db.session.expunge_all()
+
+    with profile_queries() as queries:
+        loaded = batch_load(Agent, ids + [ids[0], None, "missing"])
+
+    assert queries.count == 1
+    assert set(loaded) == set(ids)
+    assert {a.name for a in batch_load(Agent, ["Agent 1"], key="name").values()} == {"Agent 1"}
+    assert batch_load(Agent, []) == {}
+
+
+@pytest.mark.parametrize("per_page", [4, 50])
+def test_list_agents_query_count_is_constant(app, per_page):
+    _seed(60)
+    client = app.test_client()
+
+    with profile_queries() as queries:
+        response = client.get(f"/api/v1/marketplace/agents?per_page={per_page}")
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert len(body["listings"]) == per_page
+    assert all("agent" in listing for listing in body["listings"])
+    assert sum("rating" in listing for listing in body["listings"]) == per_page // 2
+    # count, page, agents, ratings
+    assert 0 < queries.count <= 4
+
+
+@pytest.mark.parametrize("limit", [5, 50])
+def test_search_query_count_is_constant(app, limit):
+    _seed(60)
+
+    with profile_queries() as queries:
+        result = DiscoveryService.search_agents("helper", limit=limit)
+
+    assert len(result["results"]) == limit
+    assert all(r["agent"]["name"].startswith("Agent") for r in result["results"])
+    # count, page ids, listings, agents, ratings
+    assert 0 < queries.count <= 5
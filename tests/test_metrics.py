@@ -5,17 +5,43 @@ Test suite for Prometheus metrics functionality.
 Tests metrics collection, labels, health endpoints, and feature flag behavior.
 """
 
+import ast
 import pytest
 import os
+import subprocess
+import sys
 import time
+from pathlib import Path
 from unittest.mock import patch, MagicMock
 from flask import Flask
 from prometheus_client import REGISTRY, CollectorRegistry
 
 from src.services.metrics import (
-    MetricsService, get_metrics_service, init_metrics,
+    MetricsService, get_metrics_service, init_metrics, mark_process_dead,
 )
 
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+WORKER_SCRIPT = """
+import os
+from flask import Flask
+from src.services.metrics import get_metrics_service, init_metrics
+
+app = Flask(__name__)
+with app.app_context():
+    init_metrics(app)
+
+    @app.route("/work/<int:n>")
+    def work(n):
+        return {"n": n}
+
+    client = app.test_client()
+    for i in range(int(os.environ["REQUESTS"])):
+        client.get(f"/work/{i}")
+    get_metrics_service().redis_up.set(1)
+print(os.getpid())
+"""
+
 
 @pytest.fixture
 def app():
@@ -112,3 +138,113 @@ class TestMetricsMiddleware:
             assert "route=\"/test\"" in metrics_data
             assert "method=\"GET\"" in metrics_data
             assert "status=\"200\"" in metrics_data
+
+
+class TestRouteLabels:
+    """Test route-template labelling and cardinality bounds."""
+
+    def test_matched_requests_use_route_template(self, app, client):
+        @app.route("/agents/<agent_id>/runs/<int:run_id>")
+        def agent_run(agent_id, run_id):
+            return {"ok": True}
+
+        client.get("/agents/not-a-uuid-slug/runs/7")
+        client.get("/agents/another-agent/runs/8")
+
+        metrics_data = get_metrics_service().get_metrics()
+        assert 'route="/agents/{agent_id}/runs/{run_id}"' in metrics_data
+        assert "not-a-uuid-slug" not in metrics_data
+
+    def test_unmatched_paths_are_normalized(self, client):
+        client.get("/missing/12345/5f0c1f6e-2a4b-4c6d-8e9f-a1b2c3d4e5f6")
+        client.get("/missing/9/bk_live_abc123def456ghi789")
+
+        metrics_data = get_metrics_service().get_metrics()
+        assert 'route="/missing/{id}/{uuid}",status="404"' in metrics_data
+        assert 'route="/missing/{id}/{id}",status="404"' in metrics_data
+
+    def test_fallback_labels_are_capped(self, monkeypatch):
+        monkeypatch.setenv("BRIKK_METRICS_MAX_ROUTES", "2")
+        app = Flask(__name__)
+        with app.app_context():
+            init_metrics(app)
+
+            @app.route("/known")
+            def known():
+                return {"ok": True}
+
+            client = app.test_client()
+            for path in ("/a", "/b", "/c", "/d", "/known", "/a"):
+                client.get(path)
+
+            metrics_data = get_metrics_service().get_metrics()
+        assert 'route="/a"' in metrics_data and 'route="/b"' in metrics_data
+        assert 'route="/c"' not in metrics_data and 'route="/d"' not in metrics_data
+        assert 'route="__other__"' in metrics_data
+        assert 'route="/known"' in metrics_data  # templates are not capped
+
+
+    def test_unknown_methods_share_one_label(self):
+        service = MetricsService(registry=CollectorRegistry())
+        for method in ("GET", "BREW", "PROPFIND", "X" * 40):
+            service.record_http_request(route="/known", method=method, status_code=405,
+                                        duration_seconds=0.01)
+
+        metrics_data = service.get_metrics()
+        assert 'method="GET"' in metrics_data and 'method="other"' in metrics_data
+        assert "BREW" not in metrics_data
+        assert {key[1] for key in service._http_children} == {"GET", "other"}
+
+class TestMultiprocess:
+    """Test aggregation across worker processes (gunicorn multiprocess mode)."""
+
+    def test_metrics_aggregate_across_workers(self, tmp_path, monkeypatch):
+        workers, requests_per_worker = 3, 40
+        env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path),
+               "REQUESTS": str(requests_per_worker)}
+        procs = [subprocess.Popen([sys.executable, "-c", WORKER_SCRIPT], cwd=REPO_ROOT, env=env,
+                                  stdout=subprocess.PIPE, text=True)
+                 for _ in range(workers)]
+        pids = [int(proc.communicate(timeout=60)[0].strip()) for proc in procs]
+        assert all(proc.returncode == 0 for proc in procs)
+
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+        app = Flask(__name__)
+        with app.app_context():
+            init_metrics(app)
+            metrics_data = app.test_client().get("/metrics").get_data(as_text=True)
+            for pid in pids:
+                mark_process_dead(pid, str(tmp_path))
+            after_exit = get_metrics_service().get_metrics()
+
+        total = workers * requests_per_worker
+        assert (f'brikk_http_requests_total{{method="GET",route="/work/{{n}}",status="200"}} {total}.0'
+                in metrics_data)
+        assert (f'brikk_http_request_duration_seconds_count{{method="GET",route="/work/{{n}}"}} {total}.0'
+                in metrics_data)
+        assert "brikk_redis_up 1.0" in metrics_data
+
+        # Dead workers' live gauges are dropped; their counters stay in the totals
+        assert not list(tmp_path.glob("gauge_live*"))
+        assert "brikk_redis_up 1.0" not in after_exit
+        assert f'status="200"}} {total}.0' in after_exit
+
+    def test_gauges_are_multiprocess_safe(self):
+        """Every Gauge declares a multiprocess_mode and none relies on set_function.
+
+        set_function() values live in the process that registered them and
+        are never written to the multiprocess files, so they aggregate to 0.
+        """
+        problems = []
+        for path in sorted((REPO_ROOT / "src").rglob("*.py")):
+            for node in ast.walk(ast.parse(path.read_text(), str(path))):
+                if not isinstance(node, ast.Call):
+                    continue
+                func = node.func
+                name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+                where = f"{path.relative_to(REPO_ROOT)}:{node.lineno}"
+                if name == "Gauge" and "multiprocess_mode" not in {kw.arg for kw in node.keywords}:
+                    problems.append(f"{where} Gauge without multiprocess_mode")
+                elif name == "set_function":
+                    problems.append(f"{where} Gauge.set_function")
+        assert problems == []
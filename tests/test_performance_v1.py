@@ -8,11 +8,11 @@ from src.services.task_queue import TaskQueueService, celery_app
 # --- Caching Service Tests ---
 
 
-@patch("redis.from_url")
-def test_caching_service_get_set(mock_redis_from_url):
+@patch("src.services.caching_service.get_redis")
+def test_caching_service_get_set(mock_get_redis):
     """Test setting and getting a value from the cache"""
     mock_redis_client = MagicMock()
-    mock_redis_from_url.return_value = mock_redis_client
+    mock_get_redis.return_value = mock_redis_client
 
     caching_service = CachingService()
 
@@ -32,11 +32,11 @@ def test_caching_service_get_set(mock_redis_from_url):
     assert result is None
 
 
-@patch("redis.from_url")
-def test_caching_service_delete(mock_redis_from_url):
+@patch("src.services.caching_service.get_redis")
+def test_caching_service_delete(mock_get_redis):
     """Test deleting a value from the cache"""
     mock_redis_client = MagicMock()
-    mock_redis_from_url.return_value = mock_redis_client
+    mock_get_redis.return_value = mock_redis_client
 
     caching_service = CachingService()
     caching_service.delete("test_key")
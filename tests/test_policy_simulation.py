@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the columnar policy simulation engine.
+"""
+import operator
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import src.models  # noqa: F401,E402  (register all mappers)
+from src.database import db  # noqa: E402
+from src.models.api_key import ApiKey  # noqa: E402
+from src.models.usage_event import UsageEvent  # noqa: E402
+from src.services.policy_simulation import (  # noqa: E402
+    PROVIDER_COST_PER_1K_TOKENS, PROVIDER_LATENCY_MS,
+    PolicySimulator, compile_conditions, confidence_intervals, EventChunk
+)
+
+ORG_ID = 1
+OTHER_ORG_ID = 2
+PROVIDERS = ["openai", "mistral", "anthropic"]
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app([ApiKey.__table__, UsageEvent.__table__])
+
+
+def _seed(n, org_id=ORG_ID, key_pk=1, start_id=1, now=None):
+    """Insert an api key and n usage events with varied latency/cost/provider."""
+    now = now or datetime.utcnow()
+    db.session.execute(ApiKey.__table__.insert(), [{
+        "id": key_pk, "key_id": f"bk_{key_pk}", "key_prefix": "bk_", "organization_id": org_id,
+        "name": "k", "api_key_encrypted": "x", "api_key_hash": "x", "is_active": True,
+        "scopes": "[]", "created_at": now, "updated_at": now,
+        "total_requests": 0, "failed_requests": 0}])
+    rng = np.random.default_rng(start_id)
+    rows = [{
+        "id": start_id + i,
+        "request_id": uuid.uuid4(),
+        "api_key_id": key_pk,
+        "provider": PROVIDERS[i % len(PROVIDERS)],
+        "model": "m",
+        "prompt_tokens": int(rng.integers(0, 2000)),
+        "completion_tokens": int(rng.integers(0, 500)) if i % 7 else 0,
+        "cost_usd": round(float(rng.random()) * 0.1, 6),
+        "latency_ms": int(rng.integers(50, 3000)),
+        "fallback": False,
+        "created_at": now - timedelta(seconds=i),
+    } for i in range(n)]
+    db.session.execute(UsageEvent.__table__.insert(), rows)
+    db.session.commit()
+    return rows
+
+
+def _reference(conditions, actions, rows):
+    """Per-event evaluation, mirroring the original row-at-a-time simulator."""
+    ops = {">": operator.gt, "<": operator.lt, "==": operator.eq, "!=": operator.ne}
+    fields = {"latency": "latency_ms", "cost": "cost_usd", "provider": "provider"}
+    matched, lat_before, lat_after, cost_before, cost_after = 0, 0.0, 0.0, 0.0, 0.0
+    action = actions[0] if actions else {}
+    for row in rows:
+        ok = all(
+            ops[c["operator"]](row[fields[c["type"]]], c["value"])
+            for c in conditions if c.get("type") in fields and c.get("operator") in ops)
+        if not ok:
+            continue
+        matched += 1
+        if action.get("type") == "route":
+            provider = action["provider"]
+            tokens = (row["prompt_tokens"] + row["completion_tokens"]) or 1000
+            lat_before += row["latency_ms"]
+            lat_after += PROVIDER_LATENCY_MS[provider]
+            cost_before += row["cost_usd"]
+            cost_after += tokens / 1000 * PROVIDER_COST_PER_1K_TOKENS[provider]
+    return matched, lat_before, lat_after, cost_before, cost_after
+
+
+CONDITIONS = [
+    {"type": "latency", "operator": ">", "value": 1000},
+    {"type": "provider", "operator": "!=", "value": "anthropic"},
+]
+ACTIONS = [{"type": "route", "provider": "google"}]
+
+
+def test_matches_per_event_reference_across_chunks(app):
+    rows = _seed(1000)
+    simulator = PolicySimulator(db.session, chunk_size=64)
+
+    totals = simulator.run(CONDITIONS, ACTIONS, simulator.iter_chunks(
+        ORG_ID, datetime.utcnow() - timedelta(hours=1)))
+
+    matched, lat_before, lat_after, cost_before, cost_after = _reference(CONDITIONS, ACTIONS, rows)
+    assert totals.analyzed == 1000
+    assert totals.matched == matched
+    assert totals.routing_changes == {"google": matched}
+    assert totals.latency_before == pytest.approx(lat_before)
+    assert totals.latency_after == pytest.approx(lat_after)
+    assert totals.cost_before == pytest.approx(cost_before)
+    assert totals.cost_after == pytest.approx(cost_after)
+    assert len(totals.sample_matches) == 10
+    assert all(m["timestamp"] for m in totals.sample_matches)
+
+
+def test_streams_in_chunks(app):
+    _seed(300)
+    simulator = PolicySimulator(db.session, chunk_size=100)
+
+    sizes = [len(c) for c in simulator.iter_chunks(ORG_ID, datetime.utcnow() - timedelta(hours=1))]
+
+    assert sizes == [100, 100, 100]
+
+
+def test_scoped_to_org_and_window(app):
+    now = datetime.utcnow()
+    _seed(50, org_id=ORG_ID, key_pk=1, start_id=1, now=now)
+    _seed(50, org_id=OTHER_ORG_ID, key_pk=2, start_id=1000, now=now)
+    simulator = PolicySimulator(db.session)
+
+    totals = simulator.run([], [], simulator.iter_chunks(ORG_ID, now - timedelta(seconds=9.5)))
+
+    assert totals.analyzed == 10
+
+
+def test_unknown_conditions_and_operators_are_ignored():
+    chunk = EventChunk(
+        ids=np.array([1, 2]),
+        providers=np.array(["openai", "mistral"], dtype=object),
+        latency_ms=np.array([100.0, 2000.0]), cost_usd=np.array([0.1, 0.2]),
+        tokens=np.array([10.0, 20.0]))
+
+    mask = compile_conditions([
+        {"type": "region", "operator": "==", "value": "eu"},
+        {"type": "latency", "operator": ">=", "value": 5000},
+        {"type": "provider", "operator": "==", "value": "mistral"},
+    ])(chunk)
+
+    assert mask.tolist() == [False, True]
+
+
+def test_sampling_reports_intervals_covering_full_result(app):
+    rows = _seed(5000)
+    simulator = PolicySimulator(db.session, chunk_size=512)
+    since = datetime.utcnow() - timedelta(hours=2)
+
+    full = simulator.run(CONDITIONS, ACTIONS, simulator.iter_chunks(ORG_ID, since))
+    sampled = simulator.run(CONDITIONS, ACTIONS, simulator.iter_chunks(ORG_ID, since, sample_rate=0.2))
+    intervals = confidence_intervals(sampled, 0.2, confidence_level=0.99)
+
+    assert 0.1 * len(rows) < sampled.analyzed < 0.3 * len(rows)
+    low, high = intervals["hit_rate_percentage"]
+    assert low <= full.matched / full.analyzed * 100 <= high
+    low, high = intervals["estimated_latency_change_ms"]
+    assert low <= (full.latency_after - full.latency_before) / full.routed <= high
+    low, high = intervals["estimated_cost_change"]
+    assert low <= full.cost_after - full.cost_before <= high
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the pooled/streaming provider transport and the router SSE path.
+
+Provider calls go to a local fake OpenAI-compatible server.
+"""
+import json
+
+import pytest
+
+from scripts.benchmarks.fake_provider import FakeProviderServer
+from src.services.provider_transport import (
+    ProviderTransport, iter_sse_data, reset_transports, stream_chat_completion
+)
+from src.services.router_service import RouterService
+
+
+@pytest.fixture
+def fake():
+    server = FakeProviderServer(tokens=3)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def router(monkeypatch, fake):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("MISTRAL_API_KEY", "ms-test")
+    monkeypatch.setenv("OPENAI_API_BASE", fake.url)
+    monkeypatch.setenv("MISTRAL_API_BASE", fake.url)
+    reset_transports()
+    yield RouterService()
+    reset_transports()
+
+
+def _stream(transport, fake, **payload):
+    payload = {"model": "m", "messages": [], "stream": True, **payload}
+    return list(stream_chat_completion(
+        transport, f"{fake.url}/chat/completions", {}, payload, "m", "req-1"))
+
+
+def test_iter_sse_data():
+    lines = ["data: a", "", ": comment", "event: x", "data: b", "data: c", "", "data: tail"]
+    assert list(iter_sse_data(lines)) == ["a", "b\nc", "tail"]
+
+
+def test_pooled_transport_reuses_connection(fake):
+    transport = ProviderTransport("openai", pool_size=2, timeout=5)
+
+    for _ in range(5):
+        response = transport.post(f"{fake.url}/chat/completions", {}, {"messages": []})
+        assert response.status_code == 200
+    transport.close()
+
+    assert fake.requests == 5
+    assert fake.connections == 1
+
+
+def test_stream_yields_tokens_then_done(fake):
+    transport = ProviderTransport("openai", pool_size=2, timeout=5)
+
+    events = _stream(transport, fake)
+    transport.close()
+
+    assert [e["content"] for e in events[:-1]] == ["tok0 ", "tok1 ", "tok2 "]
+    done = events[-1]
+    assert done["type"] == "done"
+    assert done["usage"]["total_tokens"] == 6
+    assert 0 <= done["ttft_ms"] <= done["latency_ms"]
+
+
+def test_stream_http_error_is_not_partial(fake):
+    fake.status = 500
+    transport = ProviderTransport("openai", pool_size=2, timeout=5)
+
+    events = _stream(transport, fake)
+    transport.close()
+
+    assert len(events) == 1
+    assert events[0]["type"] == "error"
+    assert events[0]["partial"] is False
+    assert "500" in events[0]["error"]
+
+
+def test_buffered_chat_uses_pool(router, fake):
+    for _ in range(3):
+        result = router.route_chat("hi", language="en")
+        assert result["provider"] == "openai" and result["fallback"] is False
+        assert result["message"] == "tok0 tok1 tok2 "
+
+    assert fake.connections == 1
+
+
+def test_router_stream_falls_back_before_first_token(router, fake, monkeypatch):
+    monkeypatch.setattr(router.openai, "api_base", "http://127.0.0.1:9/v1")
+
+    events = list(router.route_chat_stream("hi", language="en"))
+
+    assert "".join(e["content"] for e in events if e["type"] == "token") == "tok0 tok1 tok2 "
+    assert [e["type"] for e in events if e["type"] != "token"] == ["done"]
+    assert events[-1]["provider"] == "mistral"
+    assert events[-1]["fallback"] is True
+
+
+def test_chat_route_streams_sse(router, monkeypatch):
+    from flask import Flask
+    from src.routes import multi_provider
+
+    monkeypatch.setattr(multi_provider, "router_service", router)
+    app = Flask(__name__)
+    app.register_blueprint(multi_provider.bp)
+
+    response = app.test_client().post(
+        "/agents/route/chat", json={"message": "hi", "language": "en", "stream": True})
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    blocks = [b for b in response.get_data(as_text=True).split("\n\n") if b]
+    kinds = [b.split("\n")[0] for b in blocks]
+    assert kinds == ["event: token"] * 3 + ["event: done"]
+    done = json.loads(blocks[-1].split("data: ", 1)[1])
+    assert done["provider"] == "openai" and done["fallback"] is False
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the SQL query profiler and N+1 detector.
+"""
+import logging
+
+import pytest
+import sqlalchemy as sa
+from flask import Flask, g
+from prometheus_client import CollectorRegistry
+
+from src.infra import query_log
+from src.infra.query_log import fingerprint, profile_queries, set_slow_query_threshold
+from src.services import query_profiler
+from src.services.query_profiler import QueryProfilerMiddleware
+
+ADMIN_TOKEN = "test-admin-token"
+
+
+@pytest.fixture
+def engine():
+    engine = sa.create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(sa.text("CREATE TABLE agents (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(sa.text("INSERT INTO agents (id, name) VALUES (1, 'a'), (2, 'b'), (3, 'c')"))
+    return engine
+
+
+@pytest.fixture
+def profiled_app(monkeypatch, engine):
+    monkeypatch.setenv("BRIKK_ADMIN_TOKEN", ADMIN_TOKEN)
+    app = Flask(__name__)
+
+    @app.route("/agents")
+    def agents():
+        with engine.connect() as conn:
+            ids = [row.id for row in conn.execute(sa.text("SELECT id FROM agents"))]
+            # One query per row: the pattern the detector looks for
+            for agent_id in ids:
+                conn.execute(sa.text("SELECT name FROM agents WHERE id = :id"), {"id": agent_id})
+        return {"queries": g.query_log.count}
+
+    registry = CollectorRegistry()
+    profiler = QueryProfilerMiddleware(app, registry, nplus1_threshold=3)
+    return app, profiler, registry
+
+
+def test_fingerprint_normalises_literals_and_lists():
+    assert fingerprint("SELECT * FROM agents\n  WHERE id = 42 AND name = 'x''y'") == \
+        "SELECT * FROM agents WHERE id = ? AND name = ?"
+    assert fingerprint("SELECT * FROM agents WHERE id IN (:id_1, :id_2, :id_3)") == \
+        fingerprint("SELECT * FROM agents WHERE id IN (%(id_1)s)") == \
+        "SELECT * FROM agents WHERE id IN (...)"
+    assert fingerprint("INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)") == \
+        "INSERT INTO t (a, b) VALUES (...)"
+    assert fingerprint("SELECT col1 FROM t2") == "SELECT col1 FROM t2"
+
+
+def test_profile_queries_records_count_time_and_fingerprints(engine):
+    with profile_queries() as outer:
+        with engine.connect() as conn:
+            conn.execute(sa.text("SELECT name FROM agents WHERE id = 1"))
+            with profile_queries() as inner:
+                conn.execute(sa.text("SELECT name FROM agents WHERE id = 2"))
+
+    assert inner.count == 1
+    assert outer.count == 2 and outer.total_ns > 0
+    assert outer.fingerprints["SELECT name FROM agents WHERE id = ?"][0] == 2
+    assert outer.repeated(2)[0]["count"] == 2
+
+
+def test_assert_max_queries_fixture(engine, assert_max_queries):
+    with assert_max_queries(1):
+        with engine.connect() as conn:
+            conn.execute(sa.text("SELECT 1"))
+
+    with pytest.raises(AssertionError, match=r"at most 1 queries, 2 were executed:\n  2 x SELECT \?"):
+        with assert_max_queries(1):
+            with engine.connect() as conn:
+                conn.execute(sa.text("SELECT 1"))
+                conn.execute(sa.text("SELECT 2"))
+
+
+def test_request_nplus1_detected(profiled_app, caplog):
+    app, profiler, registry = profiled_app
+    with caplog.at_level(logging.WARNING, logger=query_profiler.__name__):
+        response = app.test_client().get("/agents")
+
+    assert response.get_json()["queries"] == 4
+    assert "Probable N+1 in GET /agents: 3 x SELECT name FROM agents WHERE id = ?" in caplog.text
+    assert registry.get_sample_value("brikk_db_nplus1_total", {"route": "/agents"}) == 1
+    assert registry.get_sample_value("brikk_db_queries_per_request_sum") == 4
+    summary = profiler.report()["requests"][0]
+    assert summary["path"] == "/agents" and summary["count"] == 4
+    assert summary["n_plus_one"][0]["fingerprint"] == "SELECT name FROM agents WHERE id = ?"
+
+
+def test_slow_query_log(engine, caplog):
+    set_slow_query_threshold(0)
+    try:
+        with caplog.at_level(logging.WARNING, logger=query_log.__name__):
+            with engine.connect() as conn:
+                conn.execute(sa.text("SELECT name FROM agents WHERE id = 3"))
+    finally:
+        set_slow_query_threshold(200)
+
+    assert "Slow query" in caplog.text
+    assert query_log.recent_slow_queries()[-1]["fingerprint"] == "SELECT name FROM agents WHERE id = ?"
+
+
+def test_debug_queries_requires_admin_token(profiled_app):
+    app, _, _ = profiled_app
+    client = app.test_client()
+    client.get("/agents")
+
+    assert client.get("/debug/queries").status_code == 401
+    response = client.get("/debug/queries?n_plus_one=1",
+                          headers={"Authorization": f"Bearer {ADMIN_TOKEN}"})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["settings"]["nplus1_threshold"] == 3
+    assert [r["path"] for r in body["requests"]] == ["/agents"]
+
+
+def test_query_log_core_does_not_import_services():
+    """src.infra sits below src.services: the listeners must load without them."""
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    code = ("import sys, src.infra.db, src.infra.query_log; "
+            "print(sorted(m for m in sys.modules if m.startswith('src.services')))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parents[1],
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+fakeredis-backed tests for the selectable rate limit algorithms.
+"""
+import itertools
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # fakeredis needs lupa to run Lua scripts
+
+from src.services.rate_limit import ALGORITHMS, RateLimitService  # noqa: E402
+
+@pytest.fixture
+def now():
+    """10s into the next 60s window, computed per test.
+
+    fakeredis checks TTLs against time.time(), so key assertions run inside
+    pinned(now); a time computed once at collection could already be minutes
+    in the past when a slow run reaches the test.
+    """
+    return float((int(time.time()) // 60 + 1) * 60 + 10)
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def make_limiter(redis_client, algorithm, per_min="60", burst="20"):
+    with patch.dict(os.environ, {
+        "BRIKK_RLIMIT_ENABLED": "true",
+        "BRIKK_RLIMIT_PER_MIN": per_min,
+        "BRIKK_RLIMIT_BURST": burst,
+        "BRIKK_RLIMIT_ALGORITHM": algorithm,
+    }):
+        return RateLimitService(redis_client=redis_client)
+
+
+def frozen_clock(now):
+    """Clock pinned at `now`, advancing 1us per read so ZSET members stay unique."""
+    ticks = itertools.count()
+    return lambda: now + next(ticks) * 1e-6
+
+
+def pinned(now):
+    return patch("time.time", side_effect=frozen_clock(now))
+
+
+def run_checks(limiter, n, now, scope="rlimit:org:1"):
+    with pinned(now):
+        return [limiter.check_rate_limit(scope) for _ in range(n)]
+
+
+class TestAlgorithmSelection:
+
+    def test_default_is_sliding_log(self, redis_client):
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop("BRIKK_RLIMIT_ALGORITHM", None)
+            assert RateLimitService(redis_client=redis_client).algorithm == "sliding_log"
+
+    def test_invalid_algorithm_falls_back(self, redis_client):
+        assert make_limiter(redis_client, "leaky").algorithm == "sliding_log"
+
+    def test_configuration_reports_algorithm(self, redis_client):
+        config = make_limiter(redis_client, "gcra").get_configuration()
+        assert config["algorithm"] == "gcra"
+        assert config["total_limit"] == 80
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+class TestAlgorithmContract:
+    """Every algorithm honours the same limit and header contract."""
+
+    def test_allows_up_to_total_limit_then_denies(self, redis_client, algorithm, now):
+        limiter = make_limiter(redis_client, algorithm)
+        results = run_checks(limiter, 81, now)
+
+        assert all(r.allowed for r in results[:80])
+        denied = results[80]
+        assert denied.allowed is False
+        assert denied.remaining == 0
+        assert denied.retry_after is not None and denied.retry_after >= 1
+
+    def test_remaining_counts_down(self, redis_client, algorithm, now):
+        limiter = make_limiter(redis_client, algorithm)
+        results = run_checks(limiter, 3, now)
+        assert [r.remaining for r in results] == [79, 78, 77]
+
+    def test_headers(self, redis_client, algorithm, now):
+        limiter = make_limiter(redis_client, algorithm)
+        allowed = run_checks(limiter, 1, now)[0].to_headers()
+        assert allowed["X-RateLimit-Limit"] == "80"
+        assert allowed["X-RateLimit-Remaining"] == "79"
+        assert int(allowed["X-RateLimit-Reset"]) >= int(now)
+        assert "Retry-After" not in allowed
+
+        denied = run_checks(limiter, 80, now + 0.01)[-1].to_headers()
+        assert denied["X-RateLimit-Remaining"] == "0"
+        assert "Retry-After" in denied
+
+    def test_scopes_are_independent(self, redis_client, algorithm, now):
+        limiter = make_limiter(redis_client, algorithm)
+        run_checks(limiter, 80, now, scope="rlimit:org:1")
+        assert run_checks(limiter, 1, now, scope="rlimit:org:2")[0].allowed
+
+    def test_reset_scope_clears_state(self, redis_client, algorithm, now):
+        limiter = make_limiter(redis_client, algorithm)
+        run_checks(limiter, 81, now)
+        with pinned(now + 0.01):
+            assert limiter.reset_scope("rlimit:org:1") is True
+            assert limiter.check_rate_limit("rlimit:org:1").allowed
+
+    def test_current_usage(self, redis_client, algorithm, now):
+        limiter = make_limiter(redis_client, algorithm)
+        run_checks(limiter, 10, now)
+        with pinned(now):
+            usage = limiter.get_current_usage("rlimit:org:1")
+        assert usage["algorithm"] == algorithm
+        assert usage["current_count"] == 10
+        assert usage["remaining"] == 70
+
+    def test_redis_failure_degrades_to_allow(self, algorithm):
+        limiter = make_limiter(fakeredis.FakeRedis(decode_responses=True), algorithm)
+        limiter.redis_client = fakeredis.FakeRedis(
+            server=fakeredis.FakeServer(), decode_responses=True)
+        limiter.redis_client.connected = False
+        limiter.redis_client.connection_pool.connection_kwargs["server"].connected = False
+        result = limiter.check_rate_limit("rlimit:org:1")
+        assert result.allowed is True
+        assert result.remaining == 80
+
+
+class TestGCRA:
+
+    def test_single_key_constant_memory(self, redis_client, now):
+        limiter = make_limiter(redis_client, "gcra")
+        run_checks(limiter, 50, now)
+        with pinned(now):
+            assert redis_client.keys("*") == ["rlimit:org:1:gcra"]
+            assert redis_client.type("rlimit:org:1:gcra") == "string"
+
+    def test_refills_at_per_minute_rate(self, redis_client, now):
+        limiter = make_limiter(redis_client, "gcra")
+        run_checks(limiter, 80, now)
+        assert not run_checks(limiter, 1, now)[0].allowed
+
+        # 60/min => one token per second
+        assert run_checks(limiter, 1, now + 1.0)[0].allowed
+        assert not run_checks(limiter, 1, now + 1.0)[0].allowed
+        assert all(r.allowed for r in run_checks(limiter, 5, now + 6.0)[:5])
+
+    def test_retry_after_matches_refill(self, redis_client, now):
+        limiter = make_limiter(redis_client, "gcra")
+        denied = run_checks(limiter, 81, now)[-1]
+        assert denied.retry_after == 1
+
+    def test_denied_requests_do_not_consume(self, redis_client, now):
+        limiter = make_limiter(redis_client, "gcra")
+        run_checks(limiter, 200, now)
+        assert run_checks(limiter, 1, now + 1.0)[0].allowed
+
+    def test_state_expires_when_idle(self, redis_client, now):
+        limiter = make_limiter(redis_client, "gcra")
+        run_checks(limiter, 10, now)
+        with pinned(now):
+            ttl_ms = redis_client.pttl("rlimit:org:1:gcra")
+        assert 0 < ttl_ms <= 10 * 1000
+
+
+class TestSlidingWindowCounter:
+
+    def test_two_counters_per_scope(self, redis_client, now):
+        limiter = make_limiter(redis_client, "sliding_window")
+        run_checks(limiter, 30, now)
+        run_checks(limiter, 30, now + 60)
+        with pinned(now + 60):
+            keys = sorted(redis_client.keys("*"))
+        assert len(keys) == 2
+        assert all(k.startswith("{rlimit:org:1}:swc:") for k in keys)
+
+    def test_previous_window_is_weighted(self, redis_client, now):
+        limiter = make_limiter(redis_client, "sliding_window")
+        # Fill the limit 10s into window N
+        run_checks(limiter, 80, now)
+        # 30s into window N+1, half the previous window still counts: 40 used
+        results = run_checks(limiter, 41, now + 80)
+        assert sum(r.allowed for r in results) == 40
+        assert results[-1].allowed is False
+
+    def test_previous_window_fully_expires(self, redis_client, now):
+        limiter = make_limiter(redis_client, "sliding_window")
+        run_checks(limiter, 80, now)
+        results = run_checks(limiter, 80, now + 120)
+        assert all(r.allowed for r in results)
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for incremental rating summary maintenance and reconciliation.
+
+The incremental path must always agree with a full recount, including
+under concurrent review writes.
+"""
+import random
+import threading
+import uuid
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import src.models  # noqa: F401  (register all mappers)
+from src.database import db
+from src.infra.query_log import profile_queries
+from src.models.agent import Agent
+from src.models.reviews import AgentRatingSummary, AgentReview, ReviewVote
+
+TABLES = [Agent.__table__, AgentReview.__table__, ReviewVote.__table__, AgentRatingSummary.__table__]
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    # File database: writer threads use their own connections
+    return make_app(TABLES, uri=f"sqlite:///{tmp_path / 'reviews.db'}")
+
+
+def _agents(n):
+    agents = [Agent(name=f"Agent {i}", language="en", organization_id="org-1") for i in range(n)]
+    db.session.add_all(agents)
+    db.session.commit()
+    return [a.id for a in agents]
+
+
+def _add(agent_id, rating, user_id=None):
+    review = AgentReview(agent_id=agent_id, user_id=user_id or str(uuid.uuid4()), rating=rating)
+    db.session.add(review)
+    db.session.flush()
+    AgentRatingSummary.apply_review_change(agent_id, new_rating=rating)
+    db.session.commit()
+    return review.id
+
+
+def _change(review_id, rating):
+    review = db.session.get(AgentReview, review_id)
+    old_rating, review.rating = review.rating, rating
+    AgentRatingSummary.apply_review_change(review.agent_id, old_rating=old_rating, new_rating=rating)
+    db.session.commit()
+
+
+def _delete(review_id):
+    review = db.session.get(AgentReview, review_id)
+    db.session.delete(review)
+    db.session.flush()
+    AgentRatingSummary.apply_review_change(review.agent_id, old_rating=review.rating)
+    db.session.commit()
+
+
+def _assert_matches_recount():
+    db.session.expire_all()
+    expected = {agent_id: (count, total, *buckets)
+                for agent_id, count, total, *buckets in AgentRatingSummary._recount()}
+    for summary in AgentRatingSummary.query.all():
+        counts = expected.pop(summary.agent_id, (0,) * 7)
+        assert (summary.total_reviews, summary.rating_sum, summary.rating_1_count,
+                summary.rating_2_count, summary.rating_3_count, summary.rating_4_count,
+                summary.rating_5_count) == counts
+        average = Decimal(counts[1]) / counts[0] if counts[0] else Decimal(0)
+        assert abs(Decimal(str(summary.average_rating)) - average) < Decimal("0.01")
+    assert expected == {}
+
+
+def test_incremental_updates_match_recount(app):
+    agent_id, = _agents(1)
+    rng = random.Random(7)
+    reviews = []
+
+    for _ in range(60):
+        op = rng.random()
+        if op < 0.5 or not reviews:
+            reviews.append(_add(agent_id, rng.randint(1, 5)))
+        elif op < 0.8:
+            _change(rng.choice(reviews), rng.randint(1, 5))
+        else:
+            review_id = reviews.pop(rng.randrange(len(reviews)))
+            _delete(review_id)
+        _assert_matches_recount()
+
+
+def test_review_write_is_one_update(app):
+    agent_id, = _agents(1)
+    review_id = _add(agent_id, 5)
+    for _ in range(50):
+        _add(agent_id, 4)
+
+    db.session.get(AgentReview, review_id).rating = 1
+    db.session.flush()
+
+    with profile_queries() as queries:
+        AgentRatingSummary.apply_review_change(agent_id, old_rating=5, new_rating=1)
+    db.session.commit()
+
+    assert queries.count == 1
+    _assert_matches_recount()
+
+
+def test_concurrent_writes_match_recount(app):
+    agent_ids = _agents(3)
+    errors = []
+
+    def writer(seed):
+        rng = random.Random(seed)
+        mine = []
+        with app.app_context():
+            for _ in range(25):
+                for _attempt in range(50):
+                    try:
+                        if rng.random() < 0.6 or not mine:
+                            mine.append(_add(rng.choice(agent_ids), rng.randint(1, 5)))
+                        elif rng.random() < 0.5:
+                            _change(rng.choice(mine), rng.randint(1, 5))
+                        else:
+                            _delete(mine.pop(rng.randrange(len(mine))))
+                        break
+                    except OperationalError:  # sqlite: database is locked
+                        db.session.rollback()
+                else:
+                    errors.append("gave up after retries")
+            db.session.remove()
+
+    threads = [threading.Thread(target=writer, args=(seed,)) for seed in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    _assert_matches_recount()
+    assert AgentRatingSummary.reconcile()["drifted"] == 0
+
+
+def test_reconcile_repairs_drift_with_one_recount(app):
+    agent_ids = _agents(4)
+    for agent_id in agent_ids[:3]:
+        for rating in (5, 4, 4):
+            _add(agent_id, rating)
+    # Drift: wrong counts, a missing summary, a stale summary without reviews
+    summary = db.session.get(AgentRatingSummary, agent_ids[0])
+    summary.total_reviews, summary.rating_4_count = 10, 9
+    db.session.delete(db.session.get(AgentRatingSummary, agent_ids[1]))
+    db.session.add(AgentRatingSummary(agent_id=agent_ids[3], total_reviews=2, rating_sum=6,
+                                      rating_3_count=2, average_rating=3))
+    db.session.commit()
+
+    with profile_queries() as queries:
+        result = AgentRatingSummary.reconcile()
+    db.session.commit()
+
+    assert result == {"checked": 4, "drifted": 3, "created": 1, "repaired": 2}
+    # read summaries, GROUP BY, bulk update, savepoint + insert + release
+    assert queries.count <= 6
+    _assert_matches_recount()
+    assert AgentRatingSummary.reconcile()["drifted"] == 0
+
+
+def test_reconcile_skips_rows_written_during_the_run(app, monkeypatch):
+    agent_id, = _agents(1)
+    _add(agent_id, 3)
+    summary = db.session.get(AgentRatingSummary, agent_id)
+    summary.rating_3_count = 0  # drift
+    db.session.commit()
+    real_recount = AgentRatingSummary._recount
+
+    def recount_then_concurrent_write(*args):
+        rows = real_recount(*args)
+        # A review lands after the summaries were read
+        db.session.execute(AgentRatingSummary.__table__.update().values(
+            total_reviews=AgentRatingSummary.total_reviews + 1))
+        return rows
+
+    monkeypatch.setattr(AgentRatingSummary, "_recount", staticmethod(recount_then_concurrent_write))
+    result = AgentRatingSummary.reconcile()
+
+    assert result["drifted"] == 1 and result["repaired"] == 0
+    assert db.session.get(AgentRatingSummary, agent_id).total_reviews == 2
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the shared Redis connection pool registry.
+"""
+import os
+from datetime import datetime, timezone
+
+import pytest
+import redis
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # idempotency and rate limit scripts are Lua
+
+# FakeConnection became a deprecated factory function in fakeredis 2.3x
+FakeConnection = getattr(fakeredis, "FakeRedisConnection", fakeredis.FakeConnection)
+
+from src.infra.redis_pool import (  # noqa: E402
+    configure_redis_pools, get_redis, redis_pool_connections, reset_redis_pools
+)
+from src.services.idempotency import IdempotencyService  # noqa: E402
+from src.services.rate_limit import RateLimitService, reset_rate_limiter  # noqa: E402
+
+
+class CountingConnection(FakeConnection):
+    connects = 0
+
+    def connect(self):
+        if self._sock is None:
+            type(self).connects += 1
+        return super().connect()
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def registry(server):
+    CountingConnection.connects = 0
+    yield configure_redis_pools(connection_class=CountingConnection, server=server)
+    reset_redis_pools()
+
+
+def _sample(pool, state):
+    for metric in redis_pool_connections.collect():
+        for sample in metric.samples:
+            if sample.labels == {"pool": pool, "state": state}:
+                return sample.value
+    return None
+
+
+def test_services_share_one_client_per_pool(registry):
+    assert IdempotencyService().redis is IdempotencyService().redis
+    assert RateLimitService().redis_client is get_redis("rate_limit")
+    assert get_redis("rate_limit").get_connection_kwargs()["decode_responses"] is True
+    assert get_redis("idempotency").get_connection_kwargs()["decode_responses"] is False
+
+
+def test_1000_coordination_requests_open_bounded_connections(registry, monkeypatch):
+    from flask import Flask
+    from src.routes.coordination import coordination_v1_bp
+    from tests.benchmarks.test_hot_paths import uuid7
+
+    monkeypatch.setenv("BRIKK_FEATURE_PER_ORG_KEYS", "false")
+    monkeypatch.setenv("BRIKK_IDEM_ENABLED", "true")
+    monkeypatch.setenv("BRIKK_RLIMIT_ENABLED", "true")
+    monkeypatch.setenv("BRIKK_RLIMIT_PER_MIN", "100000")
+    reset_rate_limiter()
+    app = Flask(__name__)
+    app.register_blueprint(coordination_v1_bp)
+    client = app.test_client()
+    headers = {"X-Brikk-Key": "bk_test", "X-Brikk-Timestamp": "t", "X-Brikk-Signature": "v1=x"}
+    ts = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    statuses = set()
+    for _ in range(1000):
+        envelope = {"version": "1.0", "message_id": uuid7(), "ts": ts, "type": "message",
+                    "sender": {"agent_id": "a"}, "recipient": {"agent_id": "b"}, "payload": {}}
+        statuses.add(client.post("/api/v1/coordination", json=envelope, headers=headers).status_code)
+    reset_rate_limiter()
+
+    assert statuses == {202}
+    stats = registry.stats()
+    assert set(stats) == {"idempotency", "rate_limit"}
+    # One connection per pool, reused for every request
+    assert CountingConnection.connects == 2
+    assert sum(pool["created"] for pool in stats.values()) == 2
+
+
+def test_pool_size_is_a_hard_limit(server):
+    registry = configure_redis_pools(connection_class=FakeConnection, server=server,
+                                     pool_size=2, timeout=0.05)
+    try:
+        pool = registry.pool("cache")
+        held = [pool.get_connection(), pool.get_connection()]
+
+        assert registry.stats()["cache"] == {"max": 2, "created": 2, "in_use": 2, "idle": 0}
+        assert _sample("cache", "in_use") == 2
+        with pytest.raises(redis.ConnectionError):
+            pool.get_connection()
+
+        pool.release(held.pop())
+        assert registry.stats()["cache"]["idle"] == 1
+        assert _sample("cache", "idle") == 1
+    finally:
+        reset_redis_pools()
+
+
+def test_client_recovers_after_server_outage(registry, server):
+    client = get_redis("cache")
+    client.set("k", "v")
+
+    server.connected = False
+    assert registry.ping("cache") is False
+
+    server.connected = True
+    assert registry.ping("cache") is True
+    assert client.get("k") == "v"
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_fork_drops_inherited_connections(registry):
+    client = get_redis("idempotency")
+    client.ping()
+    parent_connection = registry.pool("idempotency")._connections[0]
+
+    pid = os.fork()
+    if pid == 0:  # child: inherited sockets must not be reused
+        pool = registry.pool("idempotency")
+        ok = (pool._connections == [] and client.ping()
+              and parent_connection not in pool._connections)
+        os._exit(0 if ok else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert registry.pool("idempotency")._connections == [parent_connection]
+
+
+def test_idempotency_imports_on_its_own():
+    """src.infra must not pull in services while one of them imports redis_pool."""
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    result = subprocess.run([sys.executable, "-c", "import src.services.idempotency"],
+                            cwd=Path(__file__).resolve().parents[1], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+POOL_GAUGE_SCRIPT = """
+import fakeredis
+from prometheus_client import CollectorRegistry, multiprocess
+from src.infra.redis_pool import configure_redis_pools
+
+FakeConnection = getattr(fakeredis, "FakeRedisConnection", fakeredis.FakeConnection)
+registry = configure_redis_pools(connection_class=FakeConnection, server=fakeredis.FakeServer())
+pool = registry.pool("cache")
+held = [pool.get_connection("PING") for _ in range(3)]
+pool.release(held.pop())
+
+aggregate = CollectorRegistry()
+multiprocess.MultiProcessCollector(aggregate)
+for state in ("in_use", "idle", "max"):
+    print(aggregate.get_sample_value("brikk_redis_pool_connections", {"pool": "cache", "state": state}))
+"""
+
+
+def test_pool_gauges_in_multiprocess_mode(tmp_path):
+    """in_use/idle reach the multiprocess files (set_function values never do)."""
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    result = subprocess.run([sys.executable, "-c", POOL_GAUGE_SCRIPT],
+                            cwd=Path(__file__).resolve().parents[1], capture_output=True, text=True,
+                            env={**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)})
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["2.0", "1.0", "20.0"]
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the per-stage request timing middleware.
+"""
+import time
+
+import pytest
+import sqlalchemy as sa
+from flask import Flask, g
+from prometheus_client import CollectorRegistry
+
+from src.services.request_timing import (
+    SERVER_TIMING_HEADER, STAGE_BUCKETS, RequestTimingMiddleware, StageHistogram, hook_stage, span, timed,
+)
+
+ADMIN_TOKEN = "test-admin-token"
+
+
+@timed("auth")
+def _authenticate(engine):
+    with engine.connect() as conn:
+        conn.execute(sa.text("SELECT 1"))
+    time.sleep(0.002)
+
+
+@pytest.fixture
+def timed_app(monkeypatch):
+    monkeypatch.setenv("BRIKK_ADMIN_TOKEN", ADMIN_TOKEN)
+    engine = sa.create_engine("sqlite://")
+    app = Flask(__name__)
+
+    @app.before_request
+    def slow_before():
+        time.sleep(0.001)
+
+    @app.after_request
+    def tag(response):
+        response.headers["X-Tagged"] = "1"
+        return response
+
+    @app.route("/work")
+    def work():
+        _authenticate(engine)
+        with span("rate_limit"):
+            time.sleep(0.001)
+        return {"stages": sorted(g.request_timer.stages)}
+
+    registry = CollectorRegistry()
+    middleware = RequestTimingMiddleware(app, registry)
+    return app, middleware, registry
+
+
+def _server_timing(response):
+    return {entry.split(";")[0]: float(entry.split("dur=")[1])
+            for entry in response.headers["Server-Timing"].split(", ")}
+
+
+def test_stage_breakdown_in_server_timing_header(timed_app):
+    app, _, _ = timed_app
+    response = app.test_client().get("/work", headers={SERVER_TIMING_HEADER: ADMIN_TOKEN})
+
+    assert response.headers["X-Tagged"] == "1"
+    assert response.get_json()["stages"] == ["auth", "before", "before.tests", "db", "rate_limit"]
+    timing = _server_timing(response)
+    assert set(timing) == {"before", "before.tests", "auth", "db", "rate_limit", "handler",
+                           "after", "after.tests", "total"}
+    # Exclusive times: the sleeps land in their own stage, not in the handler
+    assert timing["auth"] >= 2 and timing["rate_limit"] >= 1 and timing["before.tests"] >= 1
+    assert timing["handler"] < 1
+    assert sum(v for k, v in timing.items() if k != "total") <= timing["total"]
+
+
+def test_hooks_timed_as_phases_unless_detailed(timed_app):
+    app, middleware, _ = timed_app
+    client = app.test_client()
+
+    middleware.hook_sample = 0
+    assert client.get("/work").get_json()["stages"] == ["auth", "before", "db", "rate_limit"]
+    middleware.hook_sample = 1
+    assert client.get("/work").get_json()["stages"] == ["auth", "before", "before.tests", "db", "rate_limit"]
+
+
+def test_server_timing_requires_admin_token(timed_app):
+    app, _, _ = timed_app
+    client = app.test_client()
+
+    assert "Server-Timing" not in client.get("/work").headers
+    assert "Server-Timing" not in client.get("/work", headers={SERVER_TIMING_HEADER: "guess"}).headers
+
+
+def test_stage_histograms_flushed_in_bulk(timed_app):
+    app, middleware, registry = timed_app
+    client = app.test_client()
+    for _ in range(3):
+        client.get("/work")
+    middleware.stage_seconds.flush()
+
+    assert registry.get_sample_value("brikk_request_stage_seconds_count", {"stage": "auth"}) == 3
+    assert registry.get_sample_value("brikk_request_stage_seconds_sum", {"stage": "auth"}) >= 0.006
+    assert registry.get_sample_value(
+        "brikk_request_stage_seconds_bucket", {"stage": "auth", "le": "0.001"}) == 0
+    assert registry.get_sample_value(
+        "brikk_request_stage_seconds_bucket", {"stage": "auth", "le": "+Inf"}) == 3
+    assert registry.get_sample_value("brikk_request_stage_seconds_count", {"stage": "handler"}) == 3
+
+
+def test_bulk_flush_matches_observe():
+    # Bulk flushing writes prometheus_client internals; pin the result to observe()
+    from prometheus_client import Histogram
+
+    values_ns = [0, 1, 99_999, 100_000, 100_001, 2_500_000, 999_999_999, 1_000_000_000, 7_000_000_000]
+    stage_seconds = StageHistogram(CollectorRegistry())
+    reference_registry = CollectorRegistry()
+    reference = Histogram("brikk_request_stage_seconds", "", ["stage"], buckets=STAGE_BUCKETS,
+                          registry=reference_registry)
+    for ns in values_ns:
+        stage_seconds.record({"db": ns}, 0)
+        reference.labels(stage="db").observe(ns / 1e9)
+    stage_seconds.close()
+
+    assert StageHistogram.bulk_supported(stage_seconds.histogram.labels(stage="db"))
+    for bound in [str(b) for b in STAGE_BUCKETS] + ["+Inf"]:
+        labels = {"stage": "db", "le": bound}
+        assert _sample(stage_seconds.histogram, "_bucket", labels) == _sample(reference, "_bucket", labels)
+    assert _sample(stage_seconds.histogram, "_sum", {"stage": "db"}) == \
+        pytest.approx(_sample(reference, "_sum", {"stage": "db"}))
+
+
+def _sample(histogram, suffix, labels):
+    return next(s.value for s in histogram.collect()[0].samples
+                if s.name == "brikk_request_stage_seconds" + suffix and s.labels == labels)
+
+
+def test_idle_buffer_flushed_in_background():
+    registry = CollectorRegistry()
+    stage_seconds = StageHistogram(registry, flush_interval=0.05)
+    stage_seconds.record({"handler": 1_000_000}, time.perf_counter_ns())
+
+    deadline = time.monotonic() + 2
+    while registry.get_sample_value("brikk_request_stage_seconds_count", {"stage": "handler"}) != 1:
+        assert time.monotonic() < deadline, "buffer was not flushed"
+        time.sleep(0.01)
+    stage_seconds.close()
+
+
+def test_timed_is_transparent_outside_requests():
+    assert timed("auth")(lambda x: x * 2)(21) == 42
+    with span("db"):
+        pass
+
+
+def test_hook_stage_names():
+    from src.services.metrics import MetricsService
+
+    assert hook_stage("after", MetricsService.record_http_request) == "after.metrics"
+    assert hook_stage("before", time.sleep) == "before.time"
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the marketplace full-text search index backends.
+"""
+import pytest
+
+import src.models  # noqa: F401  (register all mappers)
+from src.database import db
+from src.models.agent import Agent
+from src.models.marketplace import MarketplaceListing
+from src.models.reviews import AgentRatingSummary
+from src.services.discovery import DiscoveryService
+from src.services.search_index import (
+    MemorySearchBackend, SearchFilters, SqliteFTSSearchBackend, create_search_backend, get_search_index,
+    init_search_index
+)
+
+TABLES = [Agent.__table__, MarketplaceListing.__table__, AgentRatingSummary.__table__]
+
+
+@pytest.fixture(params=["sqlite_fts", "memory"])
+def app(make_app, request):
+    app = make_app(TABLES, BRIKK_SEARCH_BACKEND=request.param)
+    init_search_index(app)
+    return app
+
+
+def _listing(name, short="", long="", status="published", agent_description=None, **kwargs):
+    agent = Agent(name=name, language="en", organization_id="org-1", description=agent_description)
+    db.session.add(agent)
+    db.session.flush()
+    listing = MarketplaceListing(
+        agent_id=agent.id, publisher_id="user-1", status=status,
+        short_description=short, long_description=long, **kwargs)
+    db.session.add(listing)
+    db.session.commit()
+    return listing
+
+
+def _search(query, **filters):
+    total, hits = get_search_index().search(query, SearchFilters(**filters), limit=50)
+    return total, [listing_id for listing_id, _ in hits]
+
+
+def test_auto_backend_follows_dialect():
+    assert create_search_backend("auto", "postgresql://u@h/db").name == "postgres"
+    assert create_search_backend("auto", "sqlite:///:memory:").name == "sqlite_fts"
+    assert create_search_backend("auto", "mysql://u@h/db").name == "memory"
+    with pytest.raises(ValueError):
+        create_search_backend("elastic")
+
+
+def test_relevance_ordering_and_prefix(app):
+    by_name = _listing("Invoice Parser", short="Extracts totals")
+    by_summary = _listing("Ledger Bot", short="Reads invoice PDFs")
+    by_body = _listing("Helper", long="Can also look at an invoice now and then, among many other things")
+    _listing("Weather", short="Forecasts")
+
+    total, ids = _search("invoice")
+    assert total == 3
+    assert ids == [by_name.id, by_summary.id, by_body.id]
+
+    # Last term matches as a prefix; all terms must match
+    assert _search("invoice pars")[1] == [by_name.id]
+    assert _search("weather invoice") == (0, [])
+
+
+def test_index_follows_listing_lifecycle(app):
+    listing = _listing("Translator", short="Translates documents", status="draft")
+    assert _search("translator") == (0, [])
+
+    listing.status = "published"
+    db.session.commit()
+    assert _search("translator")[1] == [listing.id]
+
+    listing.short_description = "Converts subtitles"
+    db.session.commit()
+    assert _search("subtitles")[1] == [listing.id]
+    assert _search("documents") == (0, [])
+
+    listing.agent.name = "Polyglot"
+    db.session.commit()
+    assert _search("polyglot")[1] == [listing.id]
+    assert _search("translator") == (0, [])
+
+    db.session.delete(listing)
+    db.session.commit()
+    assert _search("polyglot") == (0, [])
+
+
+def test_rolled_back_changes_are_not_indexed(app):
+    listing = _listing("Summarizer", short="Short notes")
+    listing.short_description = "Meeting minutes"
+    db.session.flush()
+    db.session.rollback()
+
+    assert _search("summarizer")[1] == [listing.id]
+    assert _search("minutes") == (0, [])
+
+
+def test_filters(app):
+    free = _listing("Data Cleaner", category="data", tags=["etl", "csv"], pricing_model="free")
+    paid = _listing("Data Loader", category="data", tags=["etl"], pricing_model="paid")
+    _listing("Data Viz", category="charts", tags=["csv"], pricing_model="free")
+    db.session.add(AgentRatingSummary(agent_id=paid.agent_id, total_reviews=3, average_rating=4.5))
+    db.session.commit()
+
+    assert set(_search("data", category="data")[1]) == {free.id, paid.id}
+    assert _search("data", tags=["etl", "csv"])[1] == [free.id]
+    assert _search("data", pricing="paid")[1] == [paid.id]
+    assert _search("data", min_rating=4)[1] == [paid.id]
+
+
+def test_rebuild_picks_up_bulk_inserted_rows(app):
+    listing = _listing("Scheduler", short="Books meetings")
+    assert _search("meetings")[1] == [listing.id]
+    db.session.execute(MarketplaceListing.__table__.update().values(short_description="Plans calendars"))
+    db.session.commit()
+    assert _search("calendars") == (0, [])
+
+    get_search_index().rebuild()
+    db.session.commit()
+    assert _search("calendars")[1] == [listing.id]
+
+
+def test_memory_backend_sees_other_workers_changes(app):
+    # A second worker's index: session events in this process never reach it
+    other_worker = MemorySearchBackend(refresh_interval=0)
+    listing = _listing("Scheduler", short="Books meetings")
+    assert other_worker.search("meetings", SearchFilters())[0] == 1
+
+    listing.short_description = "Plans calendars"
+    db.session.commit()
+    added = _listing("Calendar Sync", short="Mirrors calendars")
+    renamed = db.session.get(Agent, listing.agent_id)
+    renamed.name = "Planner"
+    db.session.commit()
+
+    total, hits = other_worker.search("calendars", SearchFilters())
+    assert total == 2 and {listing_id for listing_id, _ in hits} == {listing.id, added.id}
+    assert other_worker.search("meetings", SearchFilters()) == (0, [])
+    assert other_worker.search("planner", SearchFilters())[1][0][0] == listing.id
+
+
+def test_discovery_search_uses_index(app):
+    _listing("Email Triage", short="Sorts your inbox", install_count=5)
+    top = _listing("Inbox Zero", short="Email cleanup", install_count=1)
+    _listing("Weather", short="Forecasts")
+
+    result = DiscoveryService.search_agents("inbox", limit=1)
+
+    assert result["total"] == 2
+    assert [r["id"] for r in result["results"]] == [top.id]
+    assert result["results"][0]["relevance"] > 0
+    assert result["results"][0]["agent"]["name"] == "Inbox Zero"
+
+
+def test_fts_rowid_is_stable():
+    assert SqliteFTSSearchBackend.fts_rowid("abc") == SqliteFTSSearchBackend.fts_rowid("abc")
+    assert SqliteFTSSearchBackend.fts_rowid("abc") != SqliteFTSSearchBackend.fts_rowid("abd")
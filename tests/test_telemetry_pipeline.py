@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the SDK telemetry ingestion pipeline (POST /telemetry/events).
+"""
+import random
+import time
+from datetime import datetime
+
+import pytest
+
+import src.models  # noqa: F401  (register all mappers)
+from src.database import db
+from src.models.telemetry import TelemetryEvent, TelemetryRollupMinute
+from src.services.telemetry_pipeline import TelemetryPipeline, normalize_event
+
+TABLES = [TelemetryEvent.__table__, TelemetryRollupMinute.__table__]
+SDK = {"name": "brikk-python-sdk", "version": "1.0.0", "language": "python", "platform": "linux"}
+RECEIVED = datetime(2026, 3, 14, 10, 5, 0)
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    from src.routes.telemetry import telemetry_bp
+
+    app = make_app(TABLES, uri=f"sqlite:///{tmp_path / 'telemetry.db'}")
+    app.register_blueprint(telemetry_bp, url_prefix="/telemetry")
+    return app
+
+
+@pytest.fixture
+def pipeline(app):
+    # Long interval and large batches: tests decide when to flush
+    pipeline = TelemetryPipeline(app, buffer_size=100_000, batch_size=5_000, flush_interval=60)
+    yield pipeline
+    pipeline.stop()
+
+
+def _event(i=0, **overrides):
+    return {"event_type": "api_call", "timestamp": f"2026-03-14T10:0{i % 2}:{i % 60:02d}Z",
+            "endpoint": "/api/v1/agents", "method": "GET", "status_code": 200,
+            "duration_ms": (5, 40, 400, 20000)[i % 4], **overrides}
+
+
+def _rows(n, **overrides):
+    return [normalize_event(_event(i, **overrides), SDK, RECEIVED) for i in range(n)]
+
+
+def _rollups():
+    db.session.expire_all()
+    return {(r.bucket_start.minute, r.event_type): r for r in TelemetryRollupMinute.query.all()}
+
+
+def test_endpoint_buffers_events_and_flush_stores_them(app, pipeline):
+    events = [_event(i) for i in range(8)] + [
+        {"event_type": "error", "error": "timeout", "timestamp": "2026-03-14T10:01:30Z"},
+        {"timestamp": "2026-03-14T10:01:30Z"},
+        "not-an-event",
+    ]
+
+    response = app.test_client().post("/telemetry/events", json={"events": events, "sdk_info": SDK})
+
+    assert response.status_code == 202
+    assert response.get_json() == {"message": "Events received", "events_count": 11,
+                                   "accepted": 9, "rejected": 2}
+    assert pipeline.buffer_depth() == 9
+    assert pipeline.flush() == 9
+    stored = TelemetryEvent.query.all()
+    assert len(stored) == 9
+    assert {e.sdk_version for e in stored} == {"1.0.0"}
+    assert [e.event_type for e in stored] == sorted(e.event_type for e in stored)
+    assert app.test_client().post("/telemetry/events", json={"events": []}).status_code == 400
+
+
+def test_rollups_count_and_histogram_merge_across_flushes(app, pipeline):
+    pipeline.submit(_rows(8))
+    pipeline.flush()
+    pipeline.submit(_rows(8) + _rows(2, event_type="error", status_code=503, duration_ms=None))
+    pipeline.flush()
+
+    rollups = _rollups()
+    minute0 = rollups[(0, "api_call")]
+    # Each flush adds durations 5, 400 (minute 0) -> two flushes
+    assert (minute0.event_count, minute0.error_count, minute0.duration_count) == (8, 0, 8)
+    assert minute0.duration_sum_ms == pytest.approx(2 * (5 + 400 + 5 + 400))
+    assert (minute0.latency_le_10ms, minute0.latency_le_250ms, minute0.latency_le_500ms) == (4, 4, 8)
+    minute1 = rollups[(1, "api_call")]
+    # durations 40 and 20000 (beyond the last bucket)
+    assert (minute1.latency_le_50ms, minute1.latency_le_10000ms, minute1.duration_count) == (4, 4, 8)
+    errors = rollups[(0, "error")]
+    assert (errors.event_count, errors.error_count, errors.duration_count) == (1, 1, 0)
+    assert errors.to_dict()["latency_histogram"]["+Inf"] == 0
+    assert TelemetryRollupMinute.query.count() == 4
+
+
+def test_sheds_raw_events_above_high_water_but_rollups_stay_exact(app):
+    pipeline = TelemetryPipeline(app, buffer_size=1_000, batch_size=5_000, flush_interval=60,
+                                 high_water=0.1, shed_sample_rate=0.25, rng=random.Random(1))
+    try:
+        result = pipeline.submit(_rows(2_000) + _rows(20, error="boom"))
+        pipeline.flush()
+    finally:
+        pipeline.stop()
+
+    # 100 below the high-water mark, ~25% of the rest, every error
+    assert result["buffered"] + result["shed"] == 2_020
+    assert 400 < result["buffered"] < 700
+    stored = TelemetryEvent.query.all()
+    assert len(stored) == result["buffered"]
+    assert sum(1 for e in stored if e.error) == 20
+    assert {e.sample_rate for e in stored} == {1.0, 0.25}
+    assert sum(r.event_count for r in _rollups().values()) == 2_020
+
+
+def test_failed_flush_drops_raw_events_and_retries_rollups(app, pipeline, monkeypatch):
+    pipeline.submit(_rows(10))
+    with monkeypatch.context() as m:
+        m.setattr(TelemetryEvent, "bulk_insert", classmethod(lambda cls, rows: 1 / 0))
+        assert pipeline.flush() == 0
+
+    pipeline.submit(_rows(4))
+    assert pipeline.flush() == 4
+
+    assert TelemetryEvent.query.count() == 4
+    assert sum(r.event_count for r in _rollups().values()) == 14
+
+
+def test_sustains_thousands_of_events_per_second(app, pipeline):
+    batches = [_rows(500) for _ in range(40)]
+
+    start = time.perf_counter()
+    for rows in batches:
+        pipeline.submit(rows)
+    pipeline.flush()
+    elapsed = time.perf_counter() - start
+
+    assert TelemetryEvent.query.count() == 20_000
+    assert sum(r.event_count for r in _rollups().values()) == 20_000
+    assert 20_000 / elapsed > 2_000
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the batch trending score job.
+
+Scores are validated against the previous per-agent implementation.
+"""
+import random
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import numpy as np  # noqa: E402
+
+import src.models  # noqa: F401,E402  (register all mappers)
+from src.database import db  # noqa: E402
+from src.infra.query_log import profile_queries  # noqa: E402
+from src.models.analytics import AgentAnalyticsDaily, AgentTrendingScore  # noqa: E402
+from src.models.marketplace import AgentInstallation, MarketplaceListing  # noqa: E402
+from src.models.reviews import AgentReview  # noqa: E402
+from src.services.analytics_jobs import AnalyticsJobService  # noqa: E402
+from src.services.trending_scores import TrendingScoreCalculator, assign_ranks, growth  # noqa: E402
+
+TODAY = date(2026, 3, 14)
+TABLES = [MarketplaceListing.__table__, AgentAnalyticsDaily.__table__, AgentTrendingScore.__table__,
+          AgentInstallation.__table__, AgentReview.__table__]
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(TABLES)
+
+
+def _seed(n, days=14, seed=3):
+    rng = random.Random(seed)
+    agent_ids = [str(uuid.uuid4()) for _ in range(n)]
+    listings, daily = [], []
+    for agent_id in agent_ids:
+        listings.append({"id": str(uuid.uuid4()), "agent_id": agent_id, "publisher_id": "p",
+                         "status": "published", "install_count": rng.choice([0, 3, 40, 5000])})
+        base = rng.choice([0, 5, 50])
+        trend = rng.uniform(-3, 6)
+        for ago in range(days, 0, -1):
+            daily.append({
+                "id": str(uuid.uuid4()), "agent_id": agent_id, "date": TODAY - timedelta(days=ago),
+                "invocation_count": max(0, int(base + trend * (14 - ago) + rng.randint(0, 5))),
+                "unique_users": rng.randint(0, 4),
+            })
+    db.session.execute(MarketplaceListing.__table__.insert(), listings)
+    db.session.execute(AgentAnalyticsDaily.__table__.insert(), daily)
+    db.session.commit()
+    return agent_ids
+
+
+def _legacy_score(agent_id):
+    """The previous per-agent formula (two queries per agent)."""
+    import math
+    rows = AgentAnalyticsDaily.query.filter(
+        AgentAnalyticsDaily.agent_id == agent_id,
+        AgentAnalyticsDaily.date >= TODAY - timedelta(days=14),
+        AgentAnalyticsDaily.date < TODAY,
+    ).order_by(AgentAnalyticsDaily.date).all()
+    if len(rows) < 7:
+        return None
+    week1, week2 = rows[:7], rows[7:]
+
+    def rate(new, old):
+        return (new - old) / old if old > 0 else (1.0 if new > 0 else 0.0)
+
+    velocity = (rate(sum(a.invocation_count for a in week2), sum(a.invocation_count for a in week1)) +
+                rate(sum(a.unique_users for a in week2), sum(a.unique_users for a in week1))) / 2
+    half = len(week2) // 2
+    momentum = rate(sum(a.invocation_count for a in week2[half:]),
+                    sum(a.invocation_count for a in week2[:half]))
+    recency = min(sum(a.invocation_count for a in rows if a.date >= TODAY - timedelta(days=3)) / 100.0, 1.0)
+    listing = MarketplaceListing.query.filter_by(agent_id=agent_id).first()
+    popularity = min(math.log10(listing.install_count + 1) / 5.0, 1.0)
+    score = velocity * 0.4 + momentum * 0.3 + recency * 0.2 + popularity * 0.1
+    return round(max(0, min(100, score * 100)), 4), round(velocity, 4), round(momentum, 4)
+
+
+def test_batch_scores_match_per_agent_formula(app):
+    agent_ids = _seed(40)
+
+    TrendingScoreCalculator(today=TODAY).run()
+    db.session.commit()
+
+    stored = {s.agent_id: s for s in AgentTrendingScore.query.all()}
+    assert set(stored) == set(agent_ids)
+    for agent_id in agent_ids:
+        score, velocity, momentum = _legacy_score(agent_id)
+        row = stored[agent_id]
+        assert float(row.trending_score) == pytest.approx(score, abs=1e-4)
+        assert float(row.velocity) == pytest.approx(velocity, abs=1e-4)
+        assert float(row.momentum) == pytest.approx(momentum, abs=1e-4)
+    ranked = sorted(stored.values(), key=lambda s: s.rank)
+    assert [s.rank for s in ranked] == list(range(1, 41))
+    assert all(a.trending_score >= b.trending_score for a, b in zip(ranked, ranked[1:]))
+
+
+def test_query_count_does_not_grow_with_agents(app):
+    for n in (10, 300):
+        db.session.execute(AgentAnalyticsDaily.__table__.delete())
+        _seed(n, seed=n)
+        with profile_queries() as queries:
+            TrendingScoreCalculator(today=TODAY).run()
+        db.session.commit()
+        # listings, activity, installs, reviews, stored scores, two upserts
+        assert queries.count <= 7
+
+
+def test_recent_activity_and_sparse_agents(app):
+    active, sparse = _seed(1), _seed(1, days=5, seed=9)
+    stale = str(uuid.uuid4())  # previously scored, now unlisted
+    db.session.add(AgentTrendingScore(agent_id=stale, trending_score=99.0))
+    db.session.add(AgentTrendingScore(agent_id=sparse[0], trending_score=1.5))
+    now = datetime.combine(TODAY, datetime.min.time())
+    db.session.add_all([
+        AgentInstallation(agent_id=active[0], user_id="u1", installed_at=now - timedelta(days=2)),
+        AgentInstallation(agent_id=active[0], user_id="u2", installed_at=now - timedelta(days=30)),
+        AgentReview(agent_id=active[0], user_id="u1", rating=5, created_at=now - timedelta(days=1)),
+    ])
+    db.session.commit()
+
+    counts = TrendingScoreCalculator(today=TODAY).run()
+    db.session.commit()
+
+    assert counts == {"scores_calculated": 1, "agents_ranked": 3}
+    rows = {s.agent_id: s for s in AgentTrendingScore.query.all()}
+    assert (rows[active[0]].recent_installs, rows[active[0]].recent_reviews) == (1, 1)
+    assert float(rows[sparse[0]].trending_score) == 1.5  # kept, not rescored
+    assert rows[stale].rank == 1
+    assert sorted(s.rank for s in rows.values()) == [1, 2, 3]
+
+
+def test_job_commits_and_reports(app):
+    _seed(3)
+
+    result = AnalyticsJobService.calculate_trending_scores()
+
+    # Seeded analytics are months old relative to date.today(): nothing to score
+    assert result["scores_calculated"] == 0
+    assert "timestamp" in result
+
+
+def test_vector_helpers():
+    new = np.array([10.0, 0.0, 5.0, 0.0])
+    old = np.array([5.0, 5.0, 0.0, 0.0])
+    assert growth(new, old).tolist() == [1.0, -1.0, 1.0, 0.0]
+    ranks = assign_ranks(np.array([1.0, 3.0, 3.0, 2.0]), np.array(["d", "c", "a", "b"]))
+    assert ranks.tolist() == [4, 2, 1, 3]
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the write-behind usage metering pipeline.
+"""
+import os
+import time
+from decimal import Decimal
+
+import pytest
+
+import src.models  # noqa: F401  (register all mappers)
+from src.database import db
+from src.models.usage_ledger import UsageLedger
+from src.services.pricing import get_unit_cost
+from src.services.usage_pipeline import UsageWriteBehindPipeline
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    """Minimal app with only the usage_ledger table."""
+    return make_app([UsageLedger.__table__], uri=f"sqlite:///{tmp_path / 'ledger.db'}")
+
+
+def _row(org_id=1, tier='STARTER', units=1):
+    return UsageLedger.build_row(
+        org_id=org_id,
+        actor_id='api_key:test',
+        route='/api/v1/coordination',
+        unit_cost=get_unit_cost(tier),
+        usage_units=units,
+    )
+
+
+def _count(app):
+    with app.app_context():
+        return UsageLedger.query.count()
+
+
+def test_build_row_preserves_cost_calculation():
+    row = _row(tier='PRO', units=4)
+    assert row['unit_cost'] == Decimal('0.0075')
+    assert row['total_cost'] == Decimal('0.0300')
+
+
+def test_bulk_insert_writes_all_rows(app):
+    rows = [_row(org_id=i) for i in range(50)]
+    assert UsageLedger.bulk_insert(rows) == 50
+    assert UsageLedger.query.count() == 50
+
+
+def test_flush_writes_queued_rows(app):
+    pipeline = UsageWriteBehindPipeline(app, batch_size=10, flush_interval=60)
+    for i in range(25):
+        assert pipeline.submit(_row(org_id=i, units=2))
+    pipeline.flush()
+
+    assert _count(app) == 25
+    entry = UsageLedger.query.first()
+    assert entry.total_cost == Decimal('0.0200')
+    pipeline.stop()
+
+
+def test_background_flusher_writes_on_interval(app):
+    pipeline = UsageWriteBehindPipeline(app, batch_size=1000, flush_interval=0.05)
+    for i in range(5):
+        pipeline.submit(_row(org_id=i))
+
+    deadline = time.monotonic() + 5
+    while _count(app) < 5 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert _count(app) == 5
+    pipeline.stop()
+
+
+def test_queue_full_spools_instead_of_blocking(app):
+    pipeline = UsageWriteBehindPipeline(app, max_queue_size=2, batch_size=10, flush_interval=60)
+    pipeline._ensure_started = lambda: None  # keep rows in the queue
+    results = [pipeline.submit(_row(org_id=i)) for i in range(5)]
+
+    assert results == [True, True, False, False, False]
+    assert pipeline.spool.has_rows()
+
+    pipeline.flush()
+    assert pipeline.replay_spool() == 3
+    assert _count(app) == 5
+
+
+def test_db_failure_spools_and_replays_on_startup(app, tmp_path):
+    spool_path = str(tmp_path / 'spool.jsonl')
+    # Batch larger than the submitted rows so the flusher isn't woken early
+    pipeline = UsageWriteBehindPipeline(app, batch_size=50, flush_interval=60, spool_path=spool_path)
+    for i in range(12):
+        pipeline.submit(_row(org_id=i))
+
+    db.metadata.drop_all(bind=db.engine, tables=[UsageLedger.__table__])
+    pipeline.stop()
+    assert os.path.getsize(spool_path) > 0
+
+    db.metadata.create_all(bind=db.engine, tables=[UsageLedger.__table__])
+    restarted = UsageWriteBehindPipeline(app, batch_size=10, flush_interval=60, spool_path=spool_path)
+    assert _count(app) == 12
+    assert not restarted.spool.has_rows()
+
+
+def test_failed_replay_keeps_rows_in_spool(app, tmp_path):
+    pipeline = UsageWriteBehindPipeline(app, batch_size=10, flush_interval=60,
+                                        spool_path=str(tmp_path / 'spool.jsonl'))
+    pipeline.spool.append([_row(org_id=i) for i in range(3)])
+
+    db.metadata.drop_all(bind=db.engine, tables=[UsageLedger.__table__])
+    with pytest.raises(Exception):
+        pipeline.replay_spool()
+    assert pipeline.spool.has_rows()
+
+    db.metadata.create_all(bind=db.engine, tables=[UsageLedger.__table__])
+    assert pipeline.replay_spool() == 3
+
+
+def test_failed_replay_and_respool_keeps_claim(app, tmp_path, monkeypatch):
+    pipeline = UsageWriteBehindPipeline(app, batch_size=10, flush_interval=60,
+                                        spool_path=str(tmp_path / 'spool.jsonl'))
+    pipeline.spool.append([_row(org_id=i) for i in range(3)])
+
+    def disk_full(rows):
+        raise OSError("No space left on device")
+
+    db.metadata.drop_all(bind=db.engine, tables=[UsageLedger.__table__])
+    monkeypatch.setattr(pipeline.spool, 'append', disk_full)
+    with pytest.raises(OSError):
+        pipeline.replay_spool()
+    assert pipeline.spool.has_rows()
+
+    monkeypatch.undo()
+    db.metadata.create_all(bind=db.engine, tables=[UsageLedger.__table__])
+    assert pipeline.replay_spool() == 3
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.replay')]
+
+
+def test_crash_mid_replay_loses_and_duplicates_nothing(app, tmp_path):
+    spool_path = str(tmp_path / 'spool.jsonl')
+    pipeline = UsageWriteBehindPipeline(app, batch_size=10, flush_interval=60, spool_path=spool_path)
+    pipeline.spool.append([_row(org_id=i) for i in range(12)])
+
+    # Crash after claiming the spool and committing one batch, before release
+    claimed, rows = pipeline.spool.claim()
+    UsageLedger.bulk_insert(rows[:10])
+    assert not os.path.exists(spool_path) and all(os.path.exists(path) for path in claimed)
+
+    restarted = UsageWriteBehindPipeline(app, batch_size=10, flush_interval=60, spool_path=spool_path)
+    assert _count(app) == 12
+    assert not restarted.spool.has_rows()
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.replay')]
+
+
+def test_claim_files_of_live_processes_are_left_alone(app, tmp_path):
+    spool_path = str(tmp_path / 'spool.jsonl')
+    pipeline = UsageWriteBehindPipeline(app, batch_size=10, flush_interval=60, spool_path=spool_path)
+    pipeline.spool.append([_row()])
+    # A replay in progress in another (live) worker, e.g. the gunicorn master's pid
+    os.rename(spool_path, f"{spool_path}.{os.getppid()}.abcd1234.replay")
+
+    assert not pipeline.spool.has_rows()
+    assert pipeline.replay_spool() == 0
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the asynchronous webhook delivery engine.
+
+Uses fakeredis for the queues and a local HTTP server as the subscriber.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+import src.models  # noqa: F401,E402  (register all mappers)
+from src.database import db  # noqa: E402
+from src.models.webhook import Webhook, WebhookEvent  # noqa: E402
+from src.services.webhook_delivery import (  # noqa: E402
+    DELAYED_KEY, READY_KEY, WebhookDeliveryEngine, backoff_delay, sign_payload
+)
+from src.services.webhook_service import WebhookService  # noqa: E402
+
+TABLES = [Webhook.__table__, WebhookEvent.__table__]
+
+
+class StubSubscriber:
+    """Local HTTP/1.1 (keep-alive) server recording webhook requests."""
+
+    def __init__(self):
+        self.requests = []
+        self.status = 200
+        self.delay = 0.0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                with stub._lock:
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                time.sleep(stub.delay)
+                with stub._lock:
+                    stub.active -= 1
+                    stub.requests.append((self.client_address, dict(self.headers), body))
+                reply = b"ok"
+                self.send_response(stub.status)
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def subscriber():
+    stub = StubSubscriber()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    # File database: worker threads use their own connections
+    return make_app(TABLES, uri=f"sqlite:///{tmp_path / 'webhooks.db'}")
+
+
+@pytest.fixture
+def engine(app):
+    engine = WebhookDeliveryEngine(
+        app, redis_client=fakeredis.FakeRedis(), workers=0, per_endpoint=2,
+        timeout=5, max_retries=3, base_delay=1, max_delay=10, poll_interval=0.05)
+    yield engine
+    engine.stop()
+
+
+def _webhook(url, events=("agent.created",)):
+    webhook = Webhook(organization_id=1, url=url, secret="s3cret", events=list(events))
+    db.session.add(webhook)
+    db.session.commit()
+    return webhook
+
+
+def _status(event_id):
+    db.session.expire_all()
+    return db.session.get(WebhookEvent, event_id)
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_trigger_event_only_enqueues(app, engine):
+    _webhook("http://127.0.0.1:9/unreachable")
+
+    with patch("requests.post") as post, patch("requests.Session.post") as session_post:
+        WebhookService(db.session).trigger_event("agent.created", {"id": 1}, organization_id=1)
+
+    post.assert_not_called()
+    session_post.assert_not_called()
+    event = WebhookEvent.query.one()
+    assert event.status == "pending"
+    assert engine.redis.lrange(READY_KEY, 0, -1) == [str(event.id).encode()]
+
+
+def test_worker_pool_delivers_signed_payload(app, engine, subscriber):
+    _webhook(subscriber.url)
+    engine.workers = 2
+
+    WebhookService(db.session).trigger_event("agent.created", {"id": 7}, organization_id=1)
+    event_id = WebhookEvent.query.one().id
+
+    assert _wait_for(lambda: _status(event_id).status == "success")
+    _, headers, body = subscriber.requests[0]
+    assert json.loads(body)["data"] == {"id": 7}
+    assert headers["X-Brikk-Signature"] == sign_payload("s3cret", body.decode())
+    assert headers["X-Brikk-Event-Id"] == str(event_id)
+
+
+def test_connections_are_kept_alive(app, engine, subscriber):
+    webhook = _webhook(subscriber.url)
+    events = [WebhookEvent(webhook_id=webhook.id, event_type="e", payload={"n": i}) for i in range(10)]
+    db.session.add_all(events)
+    db.session.commit()
+
+    for event in events:
+        assert engine.process(event.id) == "success"
+
+    client_ports = {address[1] for address, _, _ in subscriber.requests}
+    assert len(subscriber.requests) == 10
+    assert len(client_ports) == 1
+
+
+def test_failures_back_off_then_dead_letter(app, engine, subscriber):
+    subscriber.status = 503
+    webhook = _webhook(subscriber.url)
+    event = WebhookEvent(webhook_id=webhook.id, event_type="e", payload={})
+    db.session.add(event)
+    db.session.commit()
+
+    before = time.time()
+    assert engine.process(event.id) == "retry"
+    due = engine.redis.zscore(DELAYED_KEY, str(event.id))
+    assert before <= due <= time.time() + 1  # attempt 1: up to base_delay
+    assert _status(event.id).status == "failed"
+
+    # Not due yet; then due
+    assert engine.promote_due(now=before - 1) == 0
+    assert engine.promote_due(now=due) == 1
+    assert engine.redis.lrange(READY_KEY, 0, -1) == [str(event.id).encode()]
+
+    assert engine.process(event.id) == "retry"
+    assert engine.process(event.id) == "dead_letter"
+    final = _status(event.id)
+    assert final.status == "dead_letter"
+    assert final.retry_count == 3
+    assert final.response_status_code == 503
+    # Dead-lettered events are not attempted again
+    assert engine.process(event.id) == "skipped"
+    assert len(subscriber.requests) == 3
+
+
+def test_connection_errors_are_retried(app, engine):
+    webhook = _webhook("http://127.0.0.1:9/closed")
+    event = WebhookEvent(webhook_id=webhook.id, event_type="e", payload={})
+    db.session.add(event)
+    db.session.commit()
+
+    assert engine.process(event.id) == "retry"
+    assert "ConnectionError" in _status(event.id).response_body
+
+
+def test_per_endpoint_concurrency_limit(app, engine, subscriber):
+    subscriber.delay = 0.1
+    webhook = _webhook(subscriber.url)
+    events = [WebhookEvent(webhook_id=webhook.id, event_type="e", payload={"n": i}) for i in range(8)]
+    db.session.add_all(events)
+    db.session.commit()
+    engine.workers = 6
+
+    assert engine.enqueue(e.id for e in events)
+
+    assert _wait_for(lambda: all(_status(e.id).status == "success" for e in events), timeout=10)
+    assert subscriber.max_active <= 2
+
+
+def test_backoff_is_exponential_with_jitter():
+    rng = random.Random(3)
+    samples = [backoff_delay(4, base=1, cap=100, rng=rng) for _ in range(1000)]
+    assert 0 <= min(samples) and max(samples) <= 8
+    assert len(set(samples)) > 900
+    assert backoff_delay(30, base=1, cap=10, rng=rng) <= 10
+
+
+def test_retry_failed_events_requeues_unscheduled(app, engine):
+    webhook = _webhook("http://127.0.0.1:9/x")
+    lost = WebhookEvent(webhook_id=webhook.id, event_type="e", payload={}, status="pending")
+    scheduled = WebhookEvent(webhook_id=webhook.id, event_type="e", payload={}, status="failed", retry_count=1)
+    done = WebhookEvent(webhook_id=webhook.id, event_type="e", payload={}, status="success")
+    db.session.add_all([lost, scheduled, done])
+    db.session.commit()
+    engine.schedule(scheduled.id, 600)
+    scheduled_due = engine.redis.zscore(DELAYED_KEY, str(scheduled.id))
+
+    assert WebhookService(db.session).retry_failed_events() == 2
+
+    assert engine.redis.zscore(DELAYED_KEY, str(lost.id)) <= time.time()
+    assert engine.redis.zscore(DELAYED_KEY, str(scheduled.id)) == scheduled_due
+    assert engine.redis.zscore(DELAYED_KEY, str(done.id)) is None
+
+
+def test_restart_with_only_scheduled_retries_pending(app, engine, subscriber):
+    """A new process drains retries left in Redis without any new trigger_event."""
+    webhook = _webhook(subscriber.url)
+    due = WebhookEvent(webhook_id=webhook.id, event_type="e", payload={"n": 1}, status="failed", retry_count=1)
+    ready = WebhookEvent(webhook_id=webhook.id, event_type="e", payload={"n": 2}, status="pending")
+    db.session.add_all([due, ready])
+    db.session.commit()
+    engine.schedule(due.id, 0)
+    engine.redis.lpush(READY_KEY, ready.id)
+    engine.stop()
+
+    restarted = WebhookDeliveryEngine(
+        app, redis_client=engine.redis, workers=2, per_endpoint=2,
+        timeout=5, max_retries=3, base_delay=1, max_delay=10, poll_interval=0.05)
+    try:
+        WebhookService(db.session).retry_failed_events()
+        assert _wait_for(lambda: _status(due.id).status == "success" and _status(ready.id).status == "success")
+    finally:
+        restarted.stop()
+    assert len(subscriber.requests) == 2